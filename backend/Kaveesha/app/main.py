@@ -1,9 +1,12 @@
 import os
+import sys
 import pickle
+from pathlib import Path
 import numpy as np
 import pandas as pd
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import json
@@ -11,10 +14,28 @@ from datetime import datetime
 
 from schemas import (
     CustomerInfo, FinancialData, BehavioralData, 
-    PredictionRequest, PredictionResponse, ModelComparison
+    PredictionRequest, PredictionResponse, ModelComparison, BatchPredictionRequest
 )
-from models import PredictionModels
-from utils import calculate_derived_features
+from models import PredictionModels, RESULT_KEYS, from_model
+from utils import (
+    DERIVED_INPUTS, calculate_derived_features, calculate_derived_features_frame, compact_features,
+    derived_features_reading, recalculate_derived_features
+)
+
+# Make the shared backend helpers importable when run from this directory
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from common.responses import (
+    BATCH_FORMATS, SINGLE_FORMATS, FastJSONResponse,
+    batch_payload, check_format, parse_fields, select_fields
+)
+from common.columnar import (
+    accepts_binary, batch_frame_dependency, batch_openapi, write_frame
+)
+from common.validation import FrameSchema
+from common.store import LocalStore
+from common import delta, metrics, profiling, sweep, warmup
+from common.distill import check_tier, with_tier
+from common.shadow import ShadowEvaluator, challengers
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -32,12 +53,90 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize models
-prediction_models = PredictionModels()
+# Initialize models (from KAVEESHA_MODEL_DIR if set, else backend/Kaveesha/models)
+prediction_models = PredictionModels(os.environ.get("KAVEESHA_MODEL_DIR"))
+
+# Per-stage latency histograms and request counters on GET /metrics
+metrics.install(app, "kaveesha", cache_stats=lambda: prediction_models.cache.stats())
+# Opt-in sampling profiles of single requests (X-Profile header, see common/profiling.py)
+profiling.install(app, "kaveesha")
+warmup.install(app, "kaveesha")
+
+@app.on_event("startup")
+def start_warmup():
+    prediction_models.loader.start()
+
+# Saved predictions and high risk customers, shared by every worker process (in production, use a database)
+STATE_DB = os.environ.get("KAVEESHA_STATE_DB", str(Path(__file__).resolve().parents[1] / ".state" / "kaveesha.db"))
+store = LocalStore(STATE_DB)
+# Challenger models scored against the one that answered, off the request path (common/shadow.py)
+shadow = ShadowEvaluator("kaveesha", store)
+
+# Static model metadata, sent once per response (or not at all with format=compact)
+RANDOM_FOREST_INFO = {
+    "name": "Random Forest",
+    "version": "2.0.0",
+    "training_date": "2024-01-15",
+    "accuracy": 0.92,
+    "auc_score": 0.94
+}
+
+MODEL_PERFORMANCE = {
+    "random_forest": {
+        "accuracy": 0.92,
+        "precision": 0.89,
+        "recall": 0.91,
+        "f1_score": 0.90,
+        "auc_score": 0.94
+    },
+    "xgboost": {
+        "accuracy": 0.90,
+        "precision": 0.87,
+        "recall": 0.89,
+        "f1_score": 0.88,
+        "auc_score": 0.92
+    },
+    "logistic_regression": {
+        "accuracy": 0.85,
+        "precision": 0.82,
+        "recall": 0.83,
+        "f1_score": 0.82,
+        "auc_score": 0.88
+    },
+    "decision_tree": {
+        "accuracy": 0.82,
+        "precision": 0.80,
+        "recall": 0.81,
+        "f1_score": 0.80,
+        "auc_score": 0.85
+    }
+}
+
+# Fields dropped by format=compact: they are either static or only used by the detail view
+COMPACT_EXCLUDED_FIELDS = ("model_info", "model_performance", "feature_contributions")
+PREDICTION_FIELDS = list(PredictionResponse.model_fields)
 
-# In-memory storage for predictions (in production, use a database)
-saved_predictions = []
-high_risk_customers = []
+MODEL_KEYS = ("random_forest", "xgboost", "logistic_regression", "decision_tree")
+TIER_QUERY = "accurate | fast (distilled student, see /models/info; the model itself when it has none)"
+BATCH_RESULT_FIELDS = ["customer_id", "pd", "risk_category", "confidence", "model", "fallback"]
+
+# One column per CustomerInfo/FinancialData/BehavioralData field. JSON batch
+# bodies keep the nested PredictionRequest shape; Arrow/.npy bodies are flat.
+PREDICTION_SCHEMA = FrameSchema.from_models(
+    CustomerInfo, FinancialData, BehavioralData,
+    groups=("customer_info", "financial_data", "behavioral_data")
+)
+
+prediction_batch_frame = batch_frame_dependency(PREDICTION_SCHEMA, "requests")
+
+# /predict/sweep: one customer plus the numeric inputs to vary (derived features follow them)
+class SweepPredictionRequest(PredictionRequest):
+    axes: List[sweep.SweepAxis]
+
+SWEEP_COLUMNS = {
+    column.name: column for column in PREDICTION_SCHEMA.columns
+    if column.dtype in ("float", "int") and column.name not in DERIVED_INPUTS
+}
 
 class FeatureImportance(BaseModel):
     feature: str
@@ -79,40 +178,113 @@ async def root():
             "health": "/health",
             "predict": "/predict",
             "predict_all_models": "/predict/all",
-            "model_info": "/models/info"
+            "model_info": "/models/info",
+            "shadow_stats": "/shadow/stats"
         }
     }
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {"status": "healthy", "models": prediction_models.loader.state, "timestamp": datetime.now().isoformat()}
 
 @app.get("/models/info")
 async def get_model_info():
     """Get information about all loaded models"""
+    await prediction_models.loader.ready()
     return {
         "models": prediction_models.get_model_info(),
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/shadow/stats")
+async def get_shadow_stats(all_versions: bool = False):
+    """Challenger models against the model that answered shadowed requests
+
+    Label agreement is on risk categories, score deltas on PD (challenger
+    minus champion). Only the loaded models' comparisons unless
+    `all_versions`.
+    """
+    await prediction_models.loader.ready()
+    return await run_in_threadpool(shadow.summary, None if all_versions else prediction_models.version)
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Prediction cache size, hit ratio and eviction counters"""
+    return prediction_models.cache.stats()
+
+def score_customer(request: PredictionRequest, model_name: str = "random_forest", tier: str = "accurate") -> tuple:
+    """(input data with derived features, cached prediction of ``model_name`` in ``tier``) for one customer"""
+    data = {
+        **request.customer_info.dict(),
+        **request.financial_data.dict(),
+        **request.behavioral_data.dict()
+    }
+    with metrics.stage("features"):
+        data = calculate_derived_features(data)
+    result = prediction_models.predict_cached(model_name, data, tier)
+    shadow_results(prediction_models.cache_namespace(model_name, tier), [data], [result["fallback"]])
+    return data, result
+
+def shadow_score(model_name: str, inputs: Any) -> tuple:
+    frame = inputs if isinstance(inputs, pd.DataFrame) else pd.DataFrame(inputs)
+    return prediction_models.challenger_scores(model_name, frame)
+
+def shadow_results(champion: str, inputs: Any, fallback: List[bool]) -> None:
+    """Offer the rows ``champion`` (a cache namespace) answered to the shadow evaluator.
+
+    Off the request, the champion and the other loaded models score the
+    same rows through ``_predict_frame``, so only the models differ between
+    them (single requests are answered by the per-row predict_* methods,
+    and cached answers by either); scorecard answers are not compared.
+    Labels are risk categories, scores PDs. A student answering tier=fast
+    has its own teacher among the challengers.
+    """
+    if not shadow.enabled or any(fallback):
+        return
+    loaded = [name for name in MODEL_KEYS if name in prediction_models.models]
+    shadow.offer(champion, inputs, None, None, challengers(loaded, champion), shadow_score,
+                 prediction_models.version)
+
+def sweep_customer(data: Dict[str, Any], features: List[str], points: List[np.ndarray],
+                   model_name: str) -> Dict[str, List[Any]]:
+    """``model_name`` results for the customer as given, then every grid point, from one uncached model call.
+
+    Derived features are calculated once; grid rows recalculate only those
+    reading a swept input.
+    """
+    values = sweep.grid(features, points)
+    rows = np.zeros(len(values[features[0]]) + 1, dtype=int)
+    with metrics.stage("features"):
+        base = calculate_derived_features_frame(pd.DataFrame([data]), compact=False)
+        frame = base.iloc[rows].reset_index(drop=True)
+        frame = frame.assign(**{f: np.concatenate([[float(data[f])], values[f]]) for f in features})
+        frame = compact_features(recalculate_derived_features(frame, features))
+    scored = prediction_models.batch_scorer(frame, model_name)(np.arange(len(rows)))
+    return {key: [r[key] for r in scored] for key in RESULT_KEYS}
+
 @app.post("/predict", response_model=PredictionResponse)
-async def predict_default_probability(request: PredictionRequest):
+@metrics.timed
+async def predict_default_probability(
+    request: PredictionRequest,
+    response_format: str = Query("full", alias="format", description="full | compact (drop static model blobs)"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. pd,risk_category"),
+    tier: Optional[str] = Query(None, description=TIER_QUERY)
+):
     """
     Predict probability of default using the best model (Random Forest)
+
+    `tier=fast` scores with the Random Forest's distilled student when one
+    is installed; the `X-Serving-Tier` header names the tier that answered.
     """
+    check_format(response_format, SINGLE_FORMATS)
+    selected = parse_fields(fields, PREDICTION_FIELDS)
+    tier = check_tier(tier)
+    # A first call loads the models off the event loop (without them the scorecard fallback answers)
+    await prediction_models.loader.ready()
     try:
-        # Combine all data
-        data = {
-            **request.customer_info.dict(),
-            **request.financial_data.dict(),
-            **request.behavioral_data.dict()
-        }
-        
-        # Calculate derived features
-        data = calculate_derived_features(data)
-        
-        # Use Random Forest model (most accurate)
-        result = prediction_models.predict_random_forest(data)
+        # Derived features, then the Random Forest model (most accurate)
+        data, result = score_customer(request, tier=tier)
+        served = prediction_models.resolve_tier("random_forest", tier)
         
         # Calculate feature contributions
         feature_contributions = prediction_models.get_feature_contributions(data)
@@ -131,40 +303,87 @@ async def predict_default_probability(request: PredictionRequest):
             request.behavioral_data
         )
         
-        return PredictionResponse(
-            pd=result['pd'],
-            risk_category=result['risk_category'],
-            confidence=result['confidence'],
-            timestamp=datetime.now().isoformat(),
-            top_features=top_features,
-            recommendations=recommendations,
-            model_info={
-                "name": "Random Forest",
-                "version": "2.0.0",
-                "training_date": "2024-01-15",
-                "features_used": len(data),
-                "accuracy": 0.92,
-                "auc_score": 0.94
-            },
-            feature_contributions=feature_contributions,
-            model_used="Random Forest",
-            model_performance={
-                "accuracy": 0.92,
-                "precision": 0.89,
-                "recall": 0.91,
-                "f1_score": 0.90,
-                "auc_score": 0.94
-            }
-        )
+        response = {
+            "pd": result['pd'],
+            "risk_category": result['risk_category'],
+            "confidence": result['confidence'],
+            "timestamp": datetime.now().isoformat(),
+            "top_features": top_features,
+            "recommendations": recommendations,
+            "model_info": {**RANDOM_FOREST_INFO, "features_used": len(data)},
+            "feature_contributions": feature_contributions,
+            "model_used": ("Scorecard fallback (Random Forest unavailable)" if result['fallback']
+                           else "Random Forest (distilled)" if served == "fast" else "Random Forest"),
+            "model_performance": MODEL_PERFORMANCE["random_forest"],
+            "fallback_used": result['fallback']
+        }
+        if response_format == "compact":
+            for field in COMPACT_EXCLUDED_FIELDS:
+                response.pop(field)
+        with metrics.stage("serialization"):
+            return with_tier(FastJSONResponse(select_fields(response, selected)), served)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/predict/all")
+@app.post("/predict/sweep")
+@metrics.timed
+async def predict_sweep(
+    request: SweepPredictionRequest,
+    model: str = Query("random_forest", description="random_forest | xgboost | logistic_regression | decision_tree")
+):
+    """
+    PD of one customer over a range of one or two inputs
+
+    Takes a `/predict` body plus `axes`, each varying one numeric input
+    (e.g. `EffectiveRate`, `NoOfRentalInArrears`) by `values` or
+    `start`/`stop`/`steps`. Two axes make a grid, returned as
+    `[first][second]` nested lists. Derived features such as `arrears_ratio`
+    and `payment_coverage` are recalculated only where a swept input feeds
+    them, and the whole curve or grid is scored in one model call.
+    """
+    if model not in MODEL_KEYS:
+        raise HTTPException(status_code=400, detail=f"Unknown model '{model}'. Choose one of: {', '.join(MODEL_KEYS)}")
+    features = [axis.feature for axis in request.axes]
+    try:
+        points = sweep.check_axes(request.axes, SWEEP_COLUMNS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await prediction_models.loader.ready()
+    data = {
+        **request.customer_info.dict(),
+        **request.financial_data.dict(),
+        **request.behavioral_data.dict()
+    }
+    try:
+        result = await run_in_threadpool(sweep_customer, data, features, points, model)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    with metrics.stage("serialization"):
+        return FastJSONResponse({
+            "model": model,
+            "axes": sweep.axes_payload(features, points),
+            "pd": sweep.reshape(result["pd"][1:], points),
+            "risk_category": sweep.reshape(result["risk_category"][1:], points),
+            "base": {"pd": result["pd"][0], "risk_category": result["risk_category"][0],
+                     **{feature: data[feature] for feature in features}},
+            "recomputed_features": features + derived_features_reading(features),
+            "fallback_used": any(result["fallback"]),
+            "timestamp": datetime.now().isoformat()
+        })
+
+@app.post("/predict/all", deprecated=True)
+@metrics.timed
 async def predict_all_models(request: PredictionRequest):
     """
     Predict using all 4 models and compare results
+
+    Deprecated: this scores every model on the request path. Enable shadow
+    evaluation (`SHADOW_SAMPLE_RATE`) and read the comparisons from
+    `/shadow/stats` instead.
     """
+    await prediction_models.loader.ready()
     try:
         # Combine all data
         data = {
@@ -174,47 +393,11 @@ async def predict_all_models(request: PredictionRequest):
         }
         
         # Calculate derived features
-        data = calculate_derived_features(data)
+        with metrics.stage("features"):
+            data = calculate_derived_features(data)
         
         # Predict with all models
-        results = {
-            "random_forest": prediction_models.predict_random_forest(data),
-            "xgboost": prediction_models.predict_xgboost(data),
-            "logistic_regression": prediction_models.predict_logistic_regression(data),
-            "decision_tree": prediction_models.predict_decision_tree(data)
-        }
-        
-        # Model performance metrics
-        model_performance = {
-            "random_forest": {
-                "accuracy": 0.92,
-                "precision": 0.89,
-                "recall": 0.91,
-                "f1_score": 0.90,
-                "auc_score": 0.94
-            },
-            "xgboost": {
-                "accuracy": 0.90,
-                "precision": 0.87,
-                "recall": 0.89,
-                "f1_score": 0.88,
-                "auc_score": 0.92
-            },
-            "logistic_regression": {
-                "accuracy": 0.85,
-                "precision": 0.82,
-                "recall": 0.83,
-                "f1_score": 0.82,
-                "auc_score": 0.88
-            },
-            "decision_tree": {
-                "accuracy": 0.82,
-                "precision": 0.80,
-                "recall": 0.81,
-                "f1_score": 0.80,
-                "auc_score": 0.85
-            }
-        }
+        results = {model_name: prediction_models.predict_cached(model_name, data) for model_name in MODEL_KEYS}
         
         # Prepare comparison data
         comparison = []
@@ -224,22 +407,136 @@ async def predict_all_models(request: PredictionRequest):
                 "pd": result['pd'],
                 "risk_category": result['risk_category'],
                 "confidence": result['confidence'],
-                "performance": model_performance[model_name]
+                "performance": MODEL_PERFORMANCE[model_name],
+                "fallback": result['fallback']
             })
         
         # Sort by PD for consistency
         comparison.sort(key=lambda x: x['pd'], reverse=True)
         
-        return {
+        return FastJSONResponse({
             "comparison": comparison,
             "best_model": "Random Forest",
             "best_model_reason": "Highest accuracy and AUC score",
             "timestamp": datetime.now().isoformat()
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/predict/batch", openapi_extra=batch_openapi(BatchPredictionRequest))
+@metrics.timed
+async def predict_batch(
+    request: Request,
+    df: pd.DataFrame = Depends(prediction_batch_frame),
+    model: str = Query("random_forest", description="random_forest | xgboost | logistic_regression | decision_tree"),
+    response_format: str = Query("rows", alias="format", description="rows | compact | columnar"),
+    fields: Optional[str] = Query(None, description="Comma separated per-customer fields, e.g. customer_id,pd"),
+    tier: Optional[str] = Query(None, description=TIER_QUERY)
+):
+    """
+    Predict probability of default for many customers with one model call
+
+    JSON bodies are `{"requests": [PredictionRequest, ...]}`. Arrow IPC and
+    `.npy` bodies carry one flat column per customer/financial/behavioral
+    field; `Accept` selects a binary response in the same formats.
+    """
+    check_format(response_format, BATCH_FORMATS)
+    selected = parse_fields(fields, BATCH_RESULT_FIELDS)
+    tier = check_tier(tier)
+    if model not in MODEL_KEYS:
+        raise HTTPException(status_code=400, detail=f"Unknown model '{model}'. Choose one of: {', '.join(MODEL_KEYS)}")
+    metrics.observe_batch(len(df))
+    await prediction_models.loader.ready()
+    try:
+        with metrics.stage("features"):
+            frame = calculate_derived_features_frame(df)
+        result = prediction_models.predict_batch(frame, model, tier)
+        shadow_results(prediction_models.cache_namespace(model, tier), frame, result["fallback"])
+        columns = {"customer_id": frame["customerId"].astype(str).tolist(), **result}
+        served = prediction_models.resolve_tier(model, tier)
+
+        binary = accepts_binary(request.headers.get("accept"))
+        with metrics.stage("serialization"):
+            if binary:
+                return with_tier(write_frame(pd.DataFrame(columns), binary), served)
+
+            return with_tier(FastJSONResponse(batch_payload(
+                columns=columns,
+                constants={},
+                fmt=response_format,
+                fields=selected,
+                summary={
+                    "total_records": len(frame),
+                    "high_risk_count": sum(1 for p in result["pd"] if p >= 0.5),
+                    "fallback_count": sum(result["fallback"]),
+                    "tier": served,
+                    "timestamp": datetime.now().isoformat()
+                }
+            )), served)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/predict/delta", openapi_extra=batch_openapi(BatchPredictionRequest))
+@metrics.timed
+async def predict_delta(
+    request: Request,
+    df: pd.DataFrame = Depends(prediction_batch_frame),
+    model: str = Query("random_forest", description="random_forest | xgboost | logistic_regression | decision_tree"),
+    response_format: str = Query("rows", alias="format", description="rows | compact | columnar"),
+    fields: Optional[str] = Query(None, description="Comma separated per-customer fields, e.g. customer_id,pd,status")
+):
+    """
+    PD for a snapshot of customers, rescoring only new and changed ones
+
+    Takes `/predict/batch` bodies; `customer_info.customerId` identifies each
+    customer. A customer whose model inputs (derived features such as
+    `loan_age` included) and the model version match the last run gets the
+    stored result back (`status` = `unchanged`); the others are scored in one
+    model call and stored per model. Scorecard fallbacks are returned but not
+    stored, so those customers are scored again on the next run.
+    """
+    check_format(response_format, BATCH_FORMATS)
+    selected = parse_fields(fields, BATCH_RESULT_FIELDS + ["status"])
+    if model not in MODEL_KEYS:
+        raise HTTPException(status_code=400, detail=f"Unknown model '{model}'. Choose one of: {', '.join(MODEL_KEYS)}")
+    metrics.observe_batch(len(df))
+    await prediction_models.loader.ready()
+    try:
+        with metrics.stage("features"):
+            frame = calculate_derived_features_frame(df)
+        ids = frame["customerId"].astype(str).tolist()
+        results, statuses = await run_in_threadpool(
+            delta.delta_score, store, f"delta:{model}", ids, prediction_models.batch_features(frame, model),
+            prediction_models.version, prediction_models.batch_scorer(frame, model), from_model)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    columns = {"customer_id": ids, **{key: [r[key] for r in results] for key in RESULT_KEYS}, "status": statuses}
+    binary = accepts_binary(request.headers.get("accept"))
+    with metrics.stage("serialization"):
+        if binary:
+            return write_frame(pd.DataFrame(columns), binary)
+        return FastJSONResponse(batch_payload(
+            columns=columns,
+            constants={},
+            fmt=response_format,
+            fields=selected,
+            summary={
+                "total_records": len(ids),
+                "delta": delta.summary(statuses),
+                "high_risk_count": sum(1 for p in columns["pd"] if p >= 0.5),
+                "fallback_count": sum(columns["fallback"]),
+                "model_version": prediction_models.version,
+                "timestamp": datetime.now().isoformat()
+            }
+        ))
+
 @app.post("/predictions/save")
 async def save_prediction(request: SavePredictionRequest):
     """
@@ -260,30 +557,25 @@ async def save_prediction(request: SavePredictionRequest):
         }
         
         # Add to saved predictions
-        saved_predictions.append(prediction_summary)
+        prediction_id = await run_in_threadpool(store.append, "saved_predictions", prediction_summary)
         
         # If high risk, add to high risk customers list (if not already there)
         pd = prediction_result.get("pd", 0)
         if pd >= 0.5:  # High risk threshold
-            existing_customer = next(
-                (c for c in high_risk_customers if c["customer_id"] == request.customer_info.customerId),
-                None
-            )
-            if not existing_customer:
-                high_risk_customers.append({
-                    "customer_id": request.customer_info.customerId,
-                    "customer_name": request.customer_info.name,
-                    "pd": pd,
-                    "risk_category": prediction_result.get("risk_category", "High Risk"),
-                    "prediction_date": datetime.now().isoformat(),
-                    "email": getattr(request.customer_info, 'email', ''),
-                    "phone": getattr(request.customer_info, 'phone', ''),
-                })
+            await run_in_threadpool(store.add_unique, "high_risk_customers", request.customer_info.customerId, {
+                "customer_id": request.customer_info.customerId,
+                "customer_name": request.customer_info.name,
+                "pd": pd,
+                "risk_category": prediction_result.get("risk_category", "High Risk"),
+                "prediction_date": datetime.now().isoformat(),
+                "email": getattr(request.customer_info, 'email', ''),
+                "phone": getattr(request.customer_info, 'phone', ''),
+            })
         
         return {
             "success": True,
             "message": "Prediction saved successfully",
-            "prediction_id": len(saved_predictions) - 1,
+            "prediction_id": prediction_id,
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -294,9 +586,10 @@ async def get_high_risk_customers():
     """
     Get list of high risk customers
     """
+    customers = await run_in_threadpool(store.records, "high_risk_customers")
     return {
-        "customers": high_risk_customers,
-        "count": len(high_risk_customers),
+        "customers": customers,
+        "count": len(customers),
         "timestamp": datetime.now().isoformat()
     }
 
@@ -308,7 +601,7 @@ async def send_notifications():
     try:
         sent_notifications = []
         
-        for customer in high_risk_customers:
+        for customer in await run_in_threadpool(store.records, "high_risk_customers"):
             # Mock email sending (in production, use actual email service)
             email_status = {
                 "customer_id": customer["customer_id"],
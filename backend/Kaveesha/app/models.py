@@ -5,6 +5,7 @@ from pathlib import Path
 from typing import Dict, Any, List
 import logging
 import os
+import sys
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,8 +18,35 @@ except ImportError:
     JOBLIB_AVAILABLE = False
     logger.warning("joblib not available, using pickle instead")
 
+# Make the shared backend helpers importable when run from this directory
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from common.cache import PredictionCache, file_version
+from common import metrics, warmup
+from common.distill import load_students
+from scorecard import FALLBACK_CONFIDENCE, load_scorecard, score
+
+MODEL_FILES = {
+    "random_forest": "randomforest_model.pkl",
+    "logistic_regression": "logistic_regression_model.pkl",
+    "decision_tree": "decision_tree_default_risk_model.pkl",
+    "xgboost": "xgboost_default_model.pkl",
+}
+
+# Inputs read by calibrate_pd (and the scorecard fallback) besides the model features
+CALIBRATION_FEATURES = [
+    'ArrearsCapital', 'ArrearsOD', 'ArrearsInterest', 'ArrearsVat', 'NoOfRentalInArrears',
+    'payment_regularity', 'onTimePaymentPercentage', 'FacilityAmount',
+    'debt_to_income_ratio', 'previousDefaults',
+]
+
+RESULT_KEYS = ('pd', 'risk_category', 'confidence', 'model', 'fallback')
+
+def from_model(result: Dict[str, Any]) -> bool:
+    """Scorecard fallback results stand in for an unavailable model and are not cached or stored"""
+    return not result['fallback']
+
 class PredictionModels:
-    def __init__(self, model_dir: str = None):
+    def __init__(self, model_dir: str = None, scorecard: Dict[str, Any] = None):
         if model_dir is None:
             # Get the directory where this file is located (backend/app)
             current_file = Path(__file__).resolve()
@@ -26,13 +54,14 @@ class PredictionModels:
             backend_dir = current_file.parent.parent
             model_dir = str(backend_dir / "models")
         self.model_dir = Path(model_dir)
-        self.models = {}
-        self.feature_names = []
-        self.load_models()
-    
-    def load_models(self):
-        """Load all trained models with sklearn version compatibility"""
-        # First, define feature names (update based on your model)
+        self._models = {}
+        # Model files (and scorecard) version, set when the models load
+        self.version = ""
+        # Version per loaded model file, and the distilled students serving the 'fast' tier
+        # (common/distill.py) of the models they were distilled from
+        self.model_versions = {}
+        self.students = {}
+        # Feature names (update based on your model)
         self.feature_names = [
             'Age', 'ArrearsOD', 'payment_regularity', 'NoOfRentalInArrears',
             'overdue_intensity', 'early_settlement', 'has_arrears',
@@ -43,11 +72,28 @@ class PredictionModels:
             'latePaymentFrequency', 'customerResponsiveness', 'previousDefaults',
             'employmentStability', 'Prepayment'
         ]
-        
+        self.cache = PredictionCache()
+        # Fallback coefficients: explicit argument, else models/scorecard.json, else defaults
+        self.scorecard = scorecard or load_scorecard(self.model_dir / "scorecard.json")
+        # The models load on first use of self.models, POST /warmup or startup (common/warmup.py)
+        self.loader = warmup.ModelLoader("kaveesha", self.load_models)
+
+    @property
+    def models(self) -> Dict[str, Any]:
+        self.loader.ensure()
+        return self._models
+    
+    def load_models(self):
+        """Load all trained models with sklearn version compatibility"""
+        self._models = {}
+        self.version = file_version(*(self.model_dir / name for name in MODEL_FILES.values()),
+                                    self.model_dir / "scorecard.json")
+        self.cache.reset(self.version)
+
         # Try to load models with compatibility handling
         try:
             # Load Random Forest
-            rf_path = self.model_dir / "randomforest_model.pkl"
+            rf_path = self.model_dir / MODEL_FILES["random_forest"]
             if rf_path.exists():
                 try:
                     if JOBLIB_AVAILABLE:
@@ -55,29 +101,29 @@ class PredictionModels:
                         # Extract model from dictionary if it's a dict
                         if isinstance(loaded_data, dict):
                             if 'model' in loaded_data:
-                                self.models["random_forest"] = loaded_data['model']
+                                self._models["random_forest"] = loaded_data['model']
                                 # Store scaler and other preprocessing objects if available
                                 if 'scaler' in loaded_data:
-                                    self.models["random_forest_scaler"] = loaded_data['scaler']
+                                    self._models["random_forest_scaler"] = loaded_data['scaler']
                                 if 'feature_columns' in loaded_data:
-                                    self.models["random_forest_features"] = loaded_data['feature_columns']
+                                    self._models["random_forest_features"] = loaded_data['feature_columns']
                                 logger.info("Loaded random_forest model successfully (extracted from dict)")
                             else:
                                 # If dict but no 'model' key, try using the dict itself
-                                self.models["random_forest"] = loaded_data
+                                self._models["random_forest"] = loaded_data
                                 logger.warning("Random forest data loaded but 'model' key not found, using whole dict")
                         else:
                             # Not a dict, use directly
-                            self.models["random_forest"] = loaded_data
+                            self._models["random_forest"] = loaded_data
                             logger.info("Loaded random_forest model successfully (direct model object)")
                     else:
                         # Fallback to pickle
                         with open(rf_path, 'rb') as f:
                             loaded_data = pickle.load(f)
                             if isinstance(loaded_data, dict) and 'model' in loaded_data:
-                                self.models["random_forest"] = loaded_data['model']
+                                self._models["random_forest"] = loaded_data['model']
                             else:
-                                self.models["random_forest"] = loaded_data
+                                self._models["random_forest"] = loaded_data
                         logger.info("Loaded random_forest model successfully with pickle")
                 except Exception as e:
                     logger.error(f"Failed to load random_forest: {e}")
@@ -85,7 +131,7 @@ class PredictionModels:
                     logger.error(traceback.format_exc())
             
             # Load Logistic Regression
-            lr_path = self.model_dir / "logistic_regression_model.pkl"
+            lr_path = self.model_dir / MODEL_FILES["logistic_regression"]
             if lr_path.exists():
                 try:
                     if JOBLIB_AVAILABLE:
@@ -94,50 +140,50 @@ class PredictionModels:
                         if isinstance(loaded_data, dict):
                             # Try 'model' first, then 'best_model'
                             if 'model' in loaded_data:
-                                self.models["logistic_regression"] = loaded_data['model']
+                                self._models["logistic_regression"] = loaded_data['model']
                             elif 'best_model' in loaded_data:
-                                self.models["logistic_regression"] = loaded_data['best_model']
+                                self._models["logistic_regression"] = loaded_data['best_model']
                             else:
-                                self.models["logistic_regression"] = loaded_data
+                                self._models["logistic_regression"] = loaded_data
                             # Store scaler and other preprocessing objects if available
                             if 'scaler' in loaded_data:
-                                self.models["logistic_regression_scaler"] = loaded_data['scaler']
+                                self._models["logistic_regression_scaler"] = loaded_data['scaler']
                             if 'imputer' in loaded_data:
-                                self.models["logistic_regression_imputer"] = loaded_data['imputer']
+                                self._models["logistic_regression_imputer"] = loaded_data['imputer']
                             logger.info("Loaded logistic_regression model successfully (extracted from dict)")
                         else:
-                            self.models["logistic_regression"] = loaded_data
+                            self._models["logistic_regression"] = loaded_data
                             logger.info("Loaded logistic_regression model successfully (direct model object)")
                     else:
                         with open(lr_path, 'rb') as f:
                             loaded_data = pickle.load(f)
                             if isinstance(loaded_data, dict):
-                                self.models["logistic_regression"] = loaded_data.get('model') or loaded_data.get('best_model') or loaded_data
+                                self._models["logistic_regression"] = loaded_data.get('model') or loaded_data.get('best_model') or loaded_data
                             else:
-                                self.models["logistic_regression"] = loaded_data
+                                self._models["logistic_regression"] = loaded_data
                         logger.info("Loaded logistic_regression model successfully with pickle")
                 except Exception as e:
                     logger.error(f"Error loading logistic_regression: {e}")
             
             # Load Decision Tree
-            dt_path = self.model_dir / "decision_tree_default_risk_model.pkl"
+            dt_path = self.model_dir / MODEL_FILES["decision_tree"]
             if dt_path.exists():
                 try:
                     if JOBLIB_AVAILABLE:
                         loaded_data = joblib.load(dt_path)
                         # Decision Tree is saved directly as model object, not dict
                         if isinstance(loaded_data, dict) and 'model' in loaded_data:
-                            self.models["decision_tree"] = loaded_data['model']
+                            self._models["decision_tree"] = loaded_data['model']
                         else:
-                            self.models["decision_tree"] = loaded_data
+                            self._models["decision_tree"] = loaded_data
                         logger.info("Loaded decision_tree model successfully with joblib")
                     else:
                         with open(dt_path, 'rb') as f:
                             loaded_data = pickle.load(f)
                             if isinstance(loaded_data, dict) and 'model' in loaded_data:
-                                self.models["decision_tree"] = loaded_data['model']
+                                self._models["decision_tree"] = loaded_data['model']
                             else:
-                                self.models["decision_tree"] = loaded_data
+                                self._models["decision_tree"] = loaded_data
                         logger.info("Loaded decision_tree model successfully with pickle")
                 except Exception as e:
                     logger.error(f"Error loading decision_tree: {e}")
@@ -145,27 +191,27 @@ class PredictionModels:
                     logger.error(traceback.format_exc())
             
             # XGBoost - optional
+            xgb_path = self.model_dir / MODEL_FILES["xgboost"]
             try:
-                import xgboost
-                xgb_path = self.model_dir / "xgboost_default_model.pkl"
                 if xgb_path.exists():
+                    import xgboost  # only needed (and slow to import) when there is an artifact
                     if JOBLIB_AVAILABLE:
                         loaded_data = joblib.load(xgb_path)
                         # Extract model from dictionary if it's a dict
                         if isinstance(loaded_data, dict) and 'model' in loaded_data:
-                            self.models["xgboost"] = loaded_data['model']
+                            self._models["xgboost"] = loaded_data['model']
                             if 'scaler' in loaded_data:
-                                self.models["xgboost_scaler"] = loaded_data['scaler']
+                                self._models["xgboost_scaler"] = loaded_data['scaler']
                         else:
-                            self.models["xgboost"] = loaded_data
+                            self._models["xgboost"] = loaded_data
                         logger.info("Loaded xgboost model successfully with joblib")
                     else:
                         with open(xgb_path, 'rb') as f:
                             loaded_data = pickle.load(f)
                             if isinstance(loaded_data, dict) and 'model' in loaded_data:
-                                self.models["xgboost"] = loaded_data['model']
+                                self._models["xgboost"] = loaded_data['model']
                             else:
-                                self.models["xgboost"] = loaded_data
+                                self._models["xgboost"] = loaded_data
                         logger.info("Loaded xgboost model successfully with pickle")
             except ImportError:
                 logger.warning("XGBoost not installed, skipping xgboost model")
@@ -174,6 +220,24 @@ class PredictionModels:
                 
         except Exception as e:
             logger.error(f"Critical error loading models: {e}")
+
+        self.model_versions = {
+            name: file_version(self.model_dir / MODEL_FILES[name]) for name in MODEL_FILES if name in self._models
+        }
+        self.students = load_students(self.model_dir, self.model_versions)
+        if self.students:
+            logger.info(f"Loaded distilled students for {', '.join(self.students)}")
+        return bool(self._models)
+
+    def resolve_tier(self, model_name: str, tier: str = "accurate") -> str:
+        """The tier that answers: 'fast' only when ``model_name`` has a distilled student"""
+        return "fast" if tier == "fast" and model_name in self.students else "accurate"
+
+    def serving_model(self, model_name: str, tier: str = "accurate") -> Any:
+        """``model_name``'s student for the fast tier when there is one, else the model itself"""
+        if self.resolve_tier(model_name, tier) == "fast":
+            return self.students[model_name]
+        return self.models[model_name]
     
     def prepare_features(self, data: Dict[str, Any]) -> np.ndarray:
         """Prepare feature array from input data"""
@@ -218,45 +282,49 @@ class PredictionModels:
         
         return np.array(features).reshape(1, -1)
     
-    def predict_random_forest(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def predict_random_forest(self, data: Dict[str, Any], tier: str = "accurate") -> Dict[str, Any]:
         """Predict using Random Forest model"""
         if "random_forest" in self.models:
             try:
-                # Use Random Forest specific feature preparation
-                features = self.prepare_rf_features(data)
-                model = self.models["random_forest"]
-                
-                # Apply scaler if available
-                if "random_forest_scaler" in self.models:
-                    scaler = self.models["random_forest_scaler"]
-                    features = scaler.transform(features)
+                with metrics.stage("scaling"):
+                    # Use Random Forest specific feature preparation
+                    features = self.prepare_rf_features(data)
+                    
+                    # Apply scaler if available
+                    if "random_forest_scaler" in self.models:
+                        scaler = self.models["random_forest_scaler"]
+                        features = scaler.transform(features)
+                model = self.serving_model("random_forest", tier)
                 
-                # Check if model has predict_proba
-                if hasattr(model, 'predict_proba'):
-                    pd_prob = model.predict_proba(features)[0][1]
-                elif hasattr(model, 'predict'):
-                    prediction = model.predict(features)[0]
-                    # If binary classification, convert to probability
-                    if prediction in [0, 1]:
-                        pd_prob = float(prediction)
+                with metrics.stage("inference"):
+                    # Check if model has predict_proba
+                    if hasattr(model, 'predict_proba'):
+                        pd_prob = model.predict_proba(features)[0][1]
+                    elif hasattr(model, 'predict'):
+                        prediction = model.predict(features)[0]
+                        # If binary classification, convert to probability
+                        if prediction in [0, 1]:
+                            pd_prob = float(prediction)
+                        else:
+                            pd_prob = max(0.0, min(1.0, float(prediction)))
                     else:
-                        pd_prob = max(0.0, min(1.0, float(prediction)))
-                else:
-                    raise AttributeError("Model has no prediction method")
+                        raise AttributeError("Model has no prediction method")
                 
                 raw_pd = max(0.01, min(0.99, float(pd_prob)))
                 
-                # Calibrate PD to match expected business ranges
-                pd_prob = self.calibrate_pd(raw_pd, data)
-                
-                risk_category = self.get_risk_category(pd_prob)
-                confidence = self.calculate_confidence(pd_prob, "random_forest")
+                with metrics.stage("calibrate_pd"):
+                    # Calibrate PD to match expected business ranges
+                    pd_prob = self.calibrate_pd(raw_pd, data)
+                    
+                    risk_category = self.get_risk_category(pd_prob)
+                    confidence = self.calculate_confidence(pd_prob, "random_forest")
                 
                 return {
                     'pd': pd_prob,
                     'risk_category': risk_category,
                     'confidence': confidence,
-                    'model': 'random_forest'
+                    'model': 'random_forest',
+                    'fallback': False
                 }
                 
             except Exception as e:
@@ -264,20 +332,21 @@ class PredictionModels:
                 import traceback
                 logger.error(traceback.format_exc())
         
-        # Fallback to rule-based
-        return self.rule_based_prediction(data, "random_forest")
+        # Fallback to the scorecard
+        return self.scorecard_prediction(data, "random_forest")
     
-    def predict_logistic_regression(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def predict_logistic_regression(self, data: Dict[str, Any], tier: str = "accurate") -> Dict[str, Any]:
         """Predict using Logistic Regression model"""
         if "logistic_regression" in self.models:
             try:
                 features = self.prepare_features(data)
-                model = self.models["logistic_regression"]
+                model = self.serving_model("logistic_regression", tier)
                 
-                if hasattr(model, 'predict_proba'):
-                    pd_prob = model.predict_proba(features)[0][1]
-                else:
-                    pd_prob = model.predict(features)[0]
+                with metrics.stage("inference"):
+                    if hasattr(model, 'predict_proba'):
+                        pd_prob = model.predict_proba(features)[0][1]
+                    else:
+                        pd_prob = model.predict(features)[0]
                 
                 raw_pd = max(0.01, min(0.99, float(pd_prob)))
                 
@@ -291,25 +360,27 @@ class PredictionModels:
                     'pd': pd_prob,
                     'risk_category': risk_category,
                     'confidence': confidence,
-                    'model': 'logistic_regression'
+                    'model': 'logistic_regression',
+                    'fallback': False
                 }
                 
             except Exception as e:
                 logger.error(f"Logistic Regression prediction error: {e}")
         
-        return self.rule_based_prediction(data, "logistic_regression")
+        return self.scorecard_prediction(data, "logistic_regression")
     
-    def predict_decision_tree(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def predict_decision_tree(self, data: Dict[str, Any], tier: str = "accurate") -> Dict[str, Any]:
         """Predict using Decision Tree model"""
         if "decision_tree" in self.models:
             try:
                 features = self.prepare_features(data)
-                model = self.models["decision_tree"]
+                model = self.serving_model("decision_tree", tier)
                 
-                if hasattr(model, 'predict_proba'):
-                    pd_prob = model.predict_proba(features)[0][1]
-                else:
-                    pd_prob = model.predict(features)[0]
+                with metrics.stage("inference"):
+                    if hasattr(model, 'predict_proba'):
+                        pd_prob = model.predict_proba(features)[0][1]
+                    else:
+                        pd_prob = model.predict(features)[0]
                 
                 raw_pd = max(0.01, min(0.99, float(pd_prob)))
                 
@@ -323,25 +394,27 @@ class PredictionModels:
                     'pd': pd_prob,
                     'risk_category': risk_category,
                     'confidence': confidence,
-                    'model': 'decision_tree'
+                    'model': 'decision_tree',
+                    'fallback': False
                 }
                 
             except Exception as e:
                 logger.error(f"Decision Tree prediction error: {e}")
         
-        return self.rule_based_prediction(data, "decision_tree")
+        return self.scorecard_prediction(data, "decision_tree")
     
-    def predict_xgboost(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def predict_xgboost(self, data: Dict[str, Any], tier: str = "accurate") -> Dict[str, Any]:
         """Predict using XGBoost model"""
         if "xgboost" in self.models:
             try:
                 features = self.prepare_features(data)
-                model = self.models["xgboost"]
+                model = self.serving_model("xgboost", tier)
                 
-                if hasattr(model, 'predict_proba'):
-                    pd_prob = model.predict_proba(features)[0][1]
-                else:
-                    pd_prob = model.predict(features)[0]
+                with metrics.stage("inference"):
+                    if hasattr(model, 'predict_proba'):
+                        pd_prob = model.predict_proba(features)[0][1]
+                    else:
+                        pd_prob = model.predict(features)[0]
                 
                 raw_pd = max(0.01, min(0.99, float(pd_prob)))
                 
@@ -355,133 +428,221 @@ class PredictionModels:
                     'pd': pd_prob,
                     'risk_category': risk_category,
                     'confidence': confidence,
-                    'model': 'xgboost'
+                    'model': 'xgboost',
+                    'fallback': False
                 }
                 
             except Exception as e:
                 logger.error(f"XGBoost prediction error: {e}")
         
-        return self.rule_based_prediction(data, "xgboost")
+        return self.scorecard_prediction(data, "xgboost")
     
-    def rule_based_prediction(self, data: Dict[str, Any], model_name: str) -> Dict[str, Any]:
-        """Fallback rule-based prediction when models fail"""
-        # Extract key features
-        arrears_capital = float(data.get('ArrearsCapital', 0))
-        arrears_od = float(data.get('ArrearsOD', 0))
-        no_arrears = float(data.get('NoOfRentalInArrears', 0))
-        payment_regularity = float(data.get('payment_regularity', 0.5))
-        on_time_payment = float(data.get('onTimePaymentPercentage', 50))
-        
-        # Calculate base PD
-        pd_score = 0.1  # Base 10%
-        
-        # Adjust based on arrears
-        if arrears_capital > 0:
-            pd_score += min(0.4, arrears_capital / 50000)
-        if arrears_od > 0:
-            pd_score += min(0.2, arrears_od / 10000)
-        if no_arrears > 0:
-            pd_score += min(0.3, no_arrears / 10)
-        
-        # Adjust based on payment behavior
-        pd_score -= min(0.2, (on_time_payment - 50) / 250)  # Good payment reduces PD
-        
-        # Add some randomness for demo
-        import random
-        pd_score += random.uniform(-0.05, 0.05)
-        
-        # Ensure within bounds
-        raw_pd = max(0.01, min(0.99, pd_score))
-        
+    def model_columns(self, model_name: str) -> List[str]:
+        """Feature columns fed to ``model_name``"""
+        if model_name == "random_forest":
+            return list(self.models.get("random_forest_features", self.feature_names))
+        return self.feature_names
+
+    def cache_columns(self, model_name: str) -> List[str]:
+        """Every input a prediction depends on: model features plus calibration inputs.
+
+        Derived features such as ``loan_age`` (which moves with the current
+        date) are included, so cached results never outlive their inputs.
+        """
+        return list(dict.fromkeys(self.model_columns(model_name) + CALIBRATION_FEATURES))
+
+    def cache_vector(self, model_name: str, data: Dict[str, Any]) -> np.ndarray:
+        """Canonical float vector of ``data`` for cache keys (missing/non-numeric -> NaN)"""
+        values = []
+        for feature in self.cache_columns(model_name):
+            try:
+                values.append(float(data[feature]))
+            except (KeyError, TypeError, ValueError):
+                values.append(np.nan)
+        return np.array(values)
+
+    def cache_namespace(self, model_name: str, tier: str = "accurate") -> str:
+        """Cache (and model counter) key of ``model_name``, apart for its distilled student"""
+        return f"{model_name}:fast" if self.resolve_tier(model_name, tier) == "fast" else model_name
+
+    def predict_cached(self, model_name: str, data: Dict[str, Any], tier: str = "accurate") -> Dict[str, Any]:
+        """``predict_<model_name>`` behind the prediction cache"""
+        predictor = getattr(self, f"predict_{model_name}")
+        namespace = self.cache_namespace(model_name, tier)
+
+        def compute(rows: np.ndarray) -> List[Dict[str, Any]]:
+            metrics.count_model(namespace, len(rows))
+            return [predictor(data, tier)]
+
+        result = self.cache.lookup(namespace, self.cache_vector(model_name, data)[np.newaxis, :], compute,
+                                   cacheable=from_model)[0]
+        return dict(result)
+
+    def batch_features(self, frame: pd.DataFrame, model_name: str) -> np.ndarray:
+        """``cache_columns`` of every row as floats (cache keys and delta-scoring fingerprints)"""
+        return (
+            frame.reindex(columns=self.cache_columns(model_name))
+            .apply(pd.to_numeric, errors='coerce')
+            .to_numpy(dtype=float)
+        )
+
+    def batch_scorer(self, frame: pd.DataFrame, model_name: str, tier: str = "accurate"):
+        """``compute(rows)``: one result dict per position of ``frame``, scored in one model call"""
+        def compute(rows: np.ndarray) -> List[Dict[str, Any]]:
+            metrics.count_model(self.cache_namespace(model_name, tier), len(rows))
+            scored = self._predict_frame(frame.iloc[rows], model_name, tier)
+            return [dict(zip(scored, values)) for values in zip(*scored.values())]
+        return compute
+
+    def predict_batch(self, frame: pd.DataFrame, model_name: str = "random_forest",
+                      tier: str = "accurate") -> Dict[str, List[Any]]:
+        """Predict a batch of rows (with derived features), scoring cache misses in one model call.
+
+        Returns per-row lists keyed 'pd', 'risk_category', 'confidence',
+        'model' and 'fallback', matching the single-row predict_* methods.
+        """
+        results = self.cache.lookup(self.cache_namespace(model_name, tier), self.batch_features(frame, model_name),
+                                    self.batch_scorer(frame, model_name, tier), cacheable=from_model)
+        return {key: [r[key] for r in results] for key in RESULT_KEYS}
+
+    def challenger_scores(self, namespace: str, frame: pd.DataFrame) -> tuple:
+        """(risk categories, PDs) of a model or its student (``cache_namespace``) for the rows of ``frame``,
+        uncached (shadow evaluation)"""
+        model_name, _, tier = namespace.partition(":")
+        scored = self._predict_frame(frame, model_name, tier or "accurate")
+        if any(scored['fallback']):
+            raise RuntimeError(f"{namespace} could not score, the scorecard answered")
+        return scored['risk_category'], scored['pd']
+
+    def feature_matrix(self, frame: pd.DataFrame, model_name: str) -> np.ndarray:
+        """What ``model_name`` takes for the rows of ``frame``: its feature columns, scaled for the Random Forest"""
+        features = (
+            frame.reindex(columns=self.model_columns(model_name))
+            .apply(pd.to_numeric, errors='coerce')
+            .fillna(0.0)
+            .to_numpy(dtype=float)
+        )
+        if model_name == "random_forest" and "random_forest_scaler" in self.models:
+            features = self.models["random_forest_scaler"].transform(features)
+        return features
+
+    def _predict_frame(self, frame: pd.DataFrame, model_name: str, tier: str = "accurate") -> Dict[str, List[Any]]:
+        if model_name in self.models:
+            try:
+                with metrics.stage("scaling"):
+                    features = self.feature_matrix(frame, model_name)
+
+                model = self.serving_model(model_name, tier)
+                with metrics.stage("inference"):
+                    if hasattr(model, 'predict_proba'):
+                        raw = model.predict_proba(features)[:, 1]
+                    else:
+                        raw = model.predict(features)
+                raw_pd = np.clip(np.asarray(raw, dtype=float), 0.01, 0.99)
+
+                with metrics.stage("calibrate_pd"):
+                    # Calibrate PD to match expected business ranges
+                    pd_values = self.calibrate_pd(raw_pd, frame)
+
+                    return {
+                        'pd': pd_values.tolist(),
+                        'risk_category': [self.get_risk_category(p) for p in pd_values],
+                        'confidence': [self.calculate_confidence(p, model_name) for p in pd_values],
+                        'model': [model_name] * len(frame),
+                        'fallback': [False] * len(frame)
+                    }
+
+            except Exception as e:
+                logger.error(f"{model_name} batch prediction error: {e}")
+
+        return self.scorecard_batch(frame, model_name)
+    
+    def scorecard_prediction(self, data: Dict[str, Any], model_name: str) -> Dict[str, Any]:
+        """Deterministic scorecard fallback when ``model_name`` is unavailable or fails"""
+        return {key: values[0] for key, values in self.scorecard_batch(pd.DataFrame([data]), model_name).items()}
+
+    def scorecard_batch(self, frame: pd.DataFrame, model_name: str) -> Dict[str, List[Any]]:
+        """Vectorized scorecard fallback for a batch, same keys as predict_batch"""
+        raw_pd = np.atleast_1d(score(frame, self.scorecard))
+
         # Calibrate PD to match expected business ranges
-        pd_score = self.calibrate_pd(raw_pd, data)
-        
-        risk_category = self.get_risk_category(pd_score)
-        
-        # Lower confidence for rule-based
-        confidence_map = {
-            "random_forest": 0.65,
-            "logistic_regression": 0.60,
-            "decision_tree": 0.58,
-            "xgboost": 0.62
-        }
-        confidence = confidence_map.get(model_name, 0.60)
-        
+        pd_values = np.atleast_1d(self.calibrate_pd(raw_pd, frame))
+
         return {
-            'pd': pd_score,
-            'risk_category': risk_category,
-            'confidence': confidence,
-            'model': f"{model_name}_rule_based"
+            'pd': pd_values.tolist(),
+            'risk_category': [self.get_risk_category(p) for p in pd_values],
+            # Lower confidence for the scorecard than for the model it replaces
+            'confidence': [FALLBACK_CONFIDENCE.get(model_name, 0.60)] * len(frame),
+            'model': [f"{model_name}_scorecard"] * len(frame),
+            'fallback': [True] * len(frame)
         }
     
-    def calibrate_pd(self, raw_pd: float, data: Dict[str, Any]) -> float:
+    def calibrate_pd(self, raw_pd, data):
         """
         Calibrate PD to match expected business ranges:
         - High Risk: PD >= 0.80
         - Medium Risk: 0.20 <= PD < 0.80
         - Low Risk: PD < 0.20
+
+        Accepts a single request dict with a float ``raw_pd`` (returns a float)
+        or a batch DataFrame with an array of raw PDs (returns an array).
         """
+        def feature(name, default):
+            return np.asarray(data.get(name, default), dtype=float)
+
         # Extract key risk indicators
-        arrears_capital = float(data.get('ArrearsCapital', 0))
-        arrears_od = float(data.get('ArrearsOD', 0))
-        no_arrears = float(data.get('NoOfRentalInArrears', 0))
-        total_arrears = arrears_capital + arrears_od + float(data.get('ArrearsInterest', 0)) + float(data.get('ArrearsVat', 0))
-        payment_regularity = float(data.get('payment_regularity', 0.5))
-        on_time_payment = float(data.get('onTimePaymentPercentage', 50))
-        facility_amount = float(data.get('FacilityAmount', 0))
-        arrears_ratio = total_arrears / facility_amount if facility_amount > 0 else 0
+        arrears_capital = feature('ArrearsCapital', 0)
+        arrears_od = feature('ArrearsOD', 0)
+        no_arrears = feature('NoOfRentalInArrears', 0)
+        total_arrears = arrears_capital + arrears_od + feature('ArrearsInterest', 0) + feature('ArrearsVat', 0)
+        payment_regularity = feature('payment_regularity', 0.5)
+        on_time_payment = feature('onTimePaymentPercentage', 50)
+        facility_amount = feature('FacilityAmount', 0)
+        arrears_ratio = np.where(facility_amount > 0, total_arrears / np.where(facility_amount > 0, facility_amount, 1), 0)
         
         # Calculate risk score based on key indicators
-        risk_score = 0.0
-        
-        # Arrears indicators (40% weight)
-        if no_arrears >= 6 or arrears_ratio > 0.25:
-            risk_score += 0.4  # High risk
-        elif no_arrears >= 3 or arrears_ratio > 0.10:
-            risk_score += 0.25  # Medium-high risk
-        elif no_arrears > 0 or arrears_ratio > 0:
-            risk_score += 0.15  # Medium risk
+        # Arrears indicators (40% weight): high / medium-high / medium risk
+        risk_score = np.select(
+            [(no_arrears >= 6) | (arrears_ratio > 0.25),
+             (no_arrears >= 3) | (arrears_ratio > 0.10),
+             (no_arrears > 0) | (arrears_ratio > 0)],
+            [0.4, 0.25, 0.15],
+            default=0.0
+        )
         
         # Payment behavior (30% weight)
-        if on_time_payment < 50 or payment_regularity < 0.5:
-            risk_score += 0.3
-        elif on_time_payment < 70 or payment_regularity < 0.7:
-            risk_score += 0.15
+        risk_score = risk_score + np.select(
+            [(on_time_payment < 50) | (payment_regularity < 0.5),
+             (on_time_payment < 70) | (payment_regularity < 0.7)],
+            [0.3, 0.15],
+            default=0.0
+        )
         
         # Debt burden (20% weight)
-        debt_to_income = float(data.get('debt_to_income_ratio', 0))
-        if debt_to_income > 2.0:
-            risk_score += 0.2
-        elif debt_to_income > 1.0:
-            risk_score += 0.1
+        debt_to_income = feature('debt_to_income_ratio', 0)
+        risk_score = risk_score + np.select([debt_to_income > 2.0, debt_to_income > 1.0], [0.2, 0.1], default=0.0)
         
         # Customer profile (10% weight)
-        previous_defaults = float(data.get('previousDefaults', 0))
-        if previous_defaults > 0:
-            risk_score += 0.1
+        previous_defaults = feature('previousDefaults', 0)
+        risk_score = risk_score + np.where(previous_defaults > 0, 0.1, 0.0)
         
         # Combine raw PD with risk score
-        combined_score = (raw_pd * 0.4) + (risk_score * 0.6)
-        
-        # Map to expected PD ranges with fine-tuning
-        if combined_score >= 0.70:  # High risk indicators
-            # Map to 0.85-0.92 range (target: ~0.88)
-            if combined_score >= 0.85:
-                calibrated_pd = 0.88 + (combined_score - 0.85) * (0.04 / 0.15)  # Map 0.85-1.0 to 0.88-0.92
-            else:
-                calibrated_pd = 0.85 + (combined_score - 0.70) * (0.03 / 0.15)  # Map 0.70-0.85 to 0.85-0.88
-        elif combined_score >= 0.30:  # Medium risk indicators
-            # Map to 0.35-0.45 range (target: ~0.40)
-            if combined_score >= 0.50:
-                calibrated_pd = 0.40 + (combined_score - 0.50) * (0.05 / 0.20)  # Map 0.50-0.70 to 0.40-0.45
-            else:
-                calibrated_pd = 0.35 + (combined_score - 0.30) * (0.05 / 0.20)  # Map 0.30-0.50 to 0.35-0.40
-        else:  # Low risk indicators
-            # Map to 0.08-0.15 range (target: ~0.12)
-            calibrated_pd = 0.08 + (combined_score - 0.0) * (0.07 / 0.30)  # Map 0.0-0.30 to 0.08-0.15
+        combined_score = (np.asarray(raw_pd, dtype=float) * 0.4) + (risk_score * 0.6)
+        
+        # Map to expected PD ranges with fine-tuning:
+        # high risk -> 0.85-0.92 (target ~0.88), medium -> 0.35-0.45 (target ~0.40), low -> 0.08-0.15 (target ~0.12)
+        calibrated_pd = np.select(
+            [combined_score >= 0.85, combined_score >= 0.70, combined_score >= 0.50, combined_score >= 0.30],
+            [0.88 + (combined_score - 0.85) * (0.04 / 0.15),  # Map 0.85-1.0 to 0.88-0.92
+             0.85 + (combined_score - 0.70) * (0.03 / 0.15),  # Map 0.70-0.85 to 0.85-0.88
+             0.40 + (combined_score - 0.50) * (0.05 / 0.20),  # Map 0.50-0.70 to 0.40-0.45
+             0.35 + (combined_score - 0.30) * (0.05 / 0.20)],  # Map 0.30-0.50 to 0.35-0.40
+            default=0.08 + (combined_score - 0.0) * (0.07 / 0.30)  # Map 0.0-0.30 to 0.08-0.15
+        )
         
         # Ensure PD is within bounds
-        return max(0.01, min(0.99, calibrated_pd))
+        calibrated_pd = np.clip(calibrated_pd, 0.01, 0.99)
+        return float(calibrated_pd) if calibrated_pd.ndim == 0 else calibrated_pd
     
     def get_risk_category(self, pd: float) -> str:
         """Determine risk category based on PD score"""
@@ -563,7 +724,9 @@ class PredictionModels:
                     "type": type(model).__name__,
                     "status": "Loaded",
                     "has_predict_proba": hasattr(model, 'predict_proba'),
-                    "features_used": len(self.feature_names)
+                    "features_used": len(self.feature_names),
+                    # Distilled student answering tier=fast: fidelity and serving costs against this model
+                    "fast_tier": self.students[model_key].info() if model_key in self.students else None
                 }
             else:
                 info[model_key] = {
@@ -574,4 +737,4 @@ class PredictionModels:
                     "features_used": 0
                 }
         
-        return info
\ No newline at end of file
+        return info
@@ -94,10 +94,14 @@ class PredictionResponse(BaseModel):
     feature_contributions: List[FeatureImportance]
     model_used: str
     model_performance: Dict[str, float]
+    fallback_used: bool = False
 
 class ModelComparison(BaseModel):
     model: str
     pd: float
     risk_category: str
     confidence: float
-    performance: Dict[str, float]
\ No newline at end of file
+    performance: Dict[str, float]
+
+class BatchPredictionRequest(BaseModel):
+    requests: List[PredictionRequest]
\ No newline at end of file
@@ -0,0 +1,69 @@
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Points-style scorecard used when a model artifact is unavailable.
+# raw PD = base
+#        + min(cap, value / scale) for each risk term with a positive value
+#        - min(cap, (onTimePaymentPercentage - pivot) / scale)
+# then clipped to [floor, ceiling] before the usual calibrate_pd step.
+DEFAULT_SCORECARD = {
+    "base": 0.1,
+    "risk_terms": {
+        "ArrearsCapital": {"scale": 50000.0, "cap": 0.4},
+        "ArrearsOD": {"scale": 10000.0, "cap": 0.2},
+        "NoOfRentalInArrears": {"scale": 10.0, "cap": 0.3},
+    },
+    "on_time_payment": {"pivot": 50.0, "scale": 250.0, "cap": 0.2},
+    "floor": 0.01,
+    "ceiling": 0.99,
+}
+
+# Confidence reported for scorecard results, by the model they stand in for
+FALLBACK_CONFIDENCE = {
+    "random_forest": 0.65,
+    "logistic_regression": 0.60,
+    "decision_tree": 0.58,
+    "xgboost": 0.62
+}
+
+def load_scorecard(path: Optional[Path] = None) -> Dict[str, Any]:
+    """Default scorecard, with overrides from a JSON file at ``path`` if it exists"""
+    scorecard = json.loads(json.dumps(DEFAULT_SCORECARD))
+    if path is not None and Path(path).exists():
+        try:
+            with open(path) as f:
+                overrides = json.load(f)
+            for key, value in overrides.items():
+                if isinstance(value, dict) and isinstance(scorecard.get(key), dict):
+                    scorecard[key].update(value)
+                else:
+                    scorecard[key] = value
+            logger.info(f"Loaded scorecard overrides from {path}")
+        except Exception as e:
+            logger.error(f"Ignoring invalid scorecard file {path}: {e}")
+    return scorecard
+
+def score(data, scorecard: Dict[str, Any]):
+    """Raw PD from the scorecard for a request dict (float) or a batch DataFrame (array)"""
+    def feature(name, default):
+        values = data.get(name, default)
+        return np.nan_to_num(np.asarray(values, dtype=float), nan=default)
+
+    pd_score = np.asarray(float(scorecard["base"]))
+    for name, term in scorecard["risk_terms"].items():
+        value = feature(name, 0)
+        pd_score = pd_score + np.where(value > 0, np.minimum(term["cap"], value / term["scale"]), 0.0)
+
+    # Good payment history reduces PD
+    on_time = scorecard["on_time_payment"]
+    on_time_payment = feature("onTimePaymentPercentage", on_time["pivot"])
+    pd_score = pd_score - np.minimum(on_time["cap"], (on_time_payment - on_time["pivot"]) / on_time["scale"])
+
+    pd_score = np.clip(pd_score, scorecard["floor"], scorecard["ceiling"])
+    return float(pd_score) if pd_score.ndim == 0 else pd_score
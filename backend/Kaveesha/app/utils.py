@@ -1,7 +1,109 @@
 import pandas as pd
 import numpy as np
+import sys
 from datetime import datetime
-from typing import Dict, Any
+from pathlib import Path
+from typing import Dict, Any, List, Sequence
+
+# Make the shared backend helpers importable when run from this directory
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from common.dtypes import CATEGORY, FLOAT32, compact_frame
+
+EQUIPMENT_RISK_SCORES = {
+    'MOTOR CYCLES': 0.6,
+    'MOTOR CARS': 0.5,
+    'THREE WHEELERS': 0.7,
+    'DUAL PURPOSE VEHICLES': 0.5,
+    'LORRY': 0.7,
+    'VAN': 0.6,
+    'Mini Truck': 0.65,
+    'BUSES': 0.6,
+    'Single Cab': 0.6,
+    'Agriculture Equipment': 0.5,
+    'LAND VEHICLE TRACTORS': 0.5,
+    # Legacy equipment types (for backward compatibility)
+    'Construction': 0.8,
+    'Medical': 0.3,
+    'Office': 0.4,
+    'Manufacturing': 0.7,
+    'Transport': 0.6,
+    'Agricultural': 0.5,
+}
+
+BRANCH_ENCODING = {
+    'GODAGAMA': 1,
+    'ANURADHAPURA': 2,
+    'HYDE PARK': 3,
+    'KANDY': 4,
+    'HEAD OFFICE': 5,
+    'MATARA': 6,
+    'BADULLA': 7,
+    'WELLAWATHE': 8,
+    'NARAMMALA': 9,
+    'MULLAITIVU': 10,
+    'MINUWANGODA': 11,
+    # Legacy branch names (for backward compatibility)
+    'Main': 1,
+    'North': 2,
+    'South': 3,
+    'East': 4,
+    'West': 5,
+    'Central': 6,
+    'HQ': 7
+}
+
+SCHEME_ENCODING = {
+    'NORMAL': 1,
+    'STEP-UP': 2,
+    # Legacy scheme types (for backward compatibility)
+    'Standard Lease': 1,
+    'Finance Lease': 2,
+    'Operating Lease': 3,
+    'Sale and Leaseback': 4,
+    'Hire Purchase': 5,
+    'Consumer Lease': 6
+}
+
+# Compact storage (common.dtypes) for batch frames; every other float column becomes float32
+FEATURE_DTYPES = {
+    **dict.fromkeys(['branch', 'status', 'equipmentType', 'schemeType', 'rentalPaymentType',
+                     'occupation', 'maritalStatus'], CATEGORY),
+    'dependents': 'int8',
+    'NoOfRentalInArrears': 'int16',
+    'previousDefaults': 'int16',
+    'partialPayments': 'int16',
+    'paymentReschedules': 'int16',
+    'has_arrears': 'int8',
+    'high_interest_flag': 'int8',
+    'early_settlement': 'int8',
+    'branch_encoded': 'int8',
+    'scheme_encoded': 'int8',
+    'loan_age': 'int16',
+}
+
+# Float inputs compared against fixed thresholds by calibrate_pd and the scorecard: kept float64 so
+# batches band exactly like single requests (70% on time is 0.7, not float32's 0.69999999)
+THRESHOLD_INPUTS = ('ArrearsCapital', 'ArrearsInterest', 'ArrearsVat', 'ArrearsOD', 'FacilityAmount',
+                    'onTimePaymentPercentage', 'payment_regularity', 'debt_to_income_ratio')
+
+# Inputs each derived feature reads (debt_to_income_ratio falls back to NetRental without monthlyIncome)
+_ARREARS = ('ArrearsCapital', 'ArrearsInterest', 'ArrearsVat', 'ArrearsOD')
+DERIVED_INPUTS = {
+    'arrears_intensity': _ARREARS + ('FacilityAmount',),
+    'debt_to_income_ratio': ('FacilityAmount', 'Tenor', 'monthlyIncome', 'NetRental'),
+    'payment_coverage': ('FacilityAmount', 'NetRental', 'Tenor'),
+    'arrears_ratio': _ARREARS + ('FacilityAmount',),
+    'overdue_intensity': ('NoOfRentalInArrears', 'Tenor'),
+    'payment_regularity': ('onTimePaymentPercentage',),
+    'has_arrears': _ARREARS,
+    'high_interest_flag': ('EffectiveRate',),
+    'early_settlement': ('Prepayment', 'earlySettlementHistory'),
+    'equipment_risk_score': ('equipmentType',),
+    'branch_encoded': ('branch',),
+    'scheme_encoded': ('schemeType',),
+    'loan_age': ('grantedDate',),
+    'tenor_to_age_ratio': ('Tenor', 'Age'),
+}
 
 def calculate_derived_features(data: Dict[str, Any]) -> Dict[str, Any]:
     """Calculate derived features from input data"""
@@ -77,66 +179,115 @@ def calculate_derived_features(data: Dict[str, Any]) -> Dict[str, Any]:
     
     return data
 
+def _column(df: pd.DataFrame, name: str, default: Any = 0) -> np.ndarray:
+    """Numeric column as float array, ``default`` when absent or unparseable"""
+    if name not in df.columns:
+        return np.full(len(df), float(default))
+    return pd.to_numeric(df[name], errors='coerce').fillna(default).to_numpy(dtype=float)
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray, where: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=where)
+
+def calculate_derived_features_frame(df: pd.DataFrame, compact: bool = True) -> pd.DataFrame:
+    """Vectorized ``calculate_derived_features`` for a batch of flattened requests.
+
+    Produces the same values as the per-row function, one column per derived
+    feature, with ``datetime.now()`` evaluated once for the whole batch. The
+    result uses FEATURE_DTYPES (float32 otherwise, THRESHOLD_INPUTS excepted) unless
+    ``compact`` is False.
+    """
+    df = df.copy()
+    n = len(df)
+
+    facility_amount = _column(df, 'FacilityAmount')
+    net_rental = _column(df, 'NetRental')
+    arrears_capital = _column(df, 'ArrearsCapital')
+    arrears_interest = _column(df, 'ArrearsInterest')
+    arrears_vat = _column(df, 'ArrearsVat')
+    arrears_od = _column(df, 'ArrearsOD')
+    no_of_rental_in_arrears = _column(df, 'NoOfRentalInArrears')
+    age = _column(df, 'Age')
+    tenor = _column(df, 'Tenor')
+    effective_rate = _column(df, 'EffectiveRate')
+    prepayment = _column(df, 'Prepayment')
+    on_time_payment_percentage = _column(df, 'onTimePaymentPercentage')
+    if 'monthlyIncome' in df.columns:
+        monthly_income = _column(df, 'monthlyIncome')
+    else:
+        monthly_income = net_rental * 3
+
+    total_arrears = arrears_capital + arrears_interest + arrears_vat + arrears_od
+    tenor_or_one = np.where(tenor != 0, tenor, 1.0)
+    rental_total = net_rental * tenor_or_one
+
+    arrears_intensity = _safe_divide(total_arrears, facility_amount, facility_amount > 0)
+    debt_to_income_ratio = _safe_divide(facility_amount / tenor_or_one, monthly_income, monthly_income > 0)
+    payment_coverage = _safe_divide(facility_amount, rental_total, rental_total > 0)
+    overdue_intensity = _safe_divide(no_of_rental_in_arrears, tenor, tenor > 0)
+    tenor_to_age_ratio = _safe_divide(tenor, age, age > 0)
+
+    if 'earlySettlementHistory' in df.columns:
+        settlement_history = df['earlySettlementHistory'].fillna(False).astype(bool).to_numpy()
+    else:
+        settlement_history = np.zeros(n, dtype=bool)
+
+    # Loan age in whole months; unparseable grant dates fall back to 12 like the scalar version
+    if 'grantedDate' in df.columns:
+        granted = pd.to_datetime(df['grantedDate'], format='%Y-%m-%d', errors='coerce')
+    else:
+        granted = pd.to_datetime(pd.Series(['2023-01-01'] * n), format='%Y-%m-%d')
+    today = datetime.now()
+    loan_age_months = ((today.year - granted.dt.year) * 12 + (today.month - granted.dt.month)).fillna(12)
+
+    def _lookup(name: str, table: Dict[str, Any], default: Any) -> np.ndarray:
+        if name not in df.columns:
+            return np.full(n, default)
+        return df[name].map(table).fillna(default).to_numpy()
+
+    df['arrears_intensity'] = arrears_intensity
+    df['debt_to_income_ratio'] = debt_to_income_ratio
+    df['payment_coverage'] = payment_coverage
+    df['arrears_ratio'] = arrears_intensity
+    df['overdue_intensity'] = overdue_intensity
+    df['payment_regularity'] = on_time_payment_percentage / 100
+    df['has_arrears'] = (total_arrears > 0).astype(int)
+    df['high_interest_flag'] = (effective_rate > 10).astype(int)
+    df['early_settlement'] = ((prepayment > 0) | settlement_history).astype(int)
+    df['equipment_risk_score'] = _lookup('equipmentType', EQUIPMENT_RISK_SCORES, 0.5).astype(float)
+    df['branch_encoded'] = _lookup('branch', BRANCH_ENCODING, 0).astype(int)
+    df['scheme_encoded'] = _lookup('schemeType', SCHEME_ENCODING, 0).astype(int)
+    df['loan_age'] = loan_age_months.to_numpy(dtype=float)
+    df['tenor_to_age_ratio'] = tenor_to_age_ratio
+
+    return compact_features(df) if compact else df
+
+def compact_features(df: pd.DataFrame) -> pd.DataFrame:
+    """FEATURE_DTYPES, and float32 for every other float column but THRESHOLD_INPUTS"""
+    dtypes = {col: FLOAT32 for col in df.columns
+              if pd.api.types.is_float_dtype(df[col].dtype) and col not in THRESHOLD_INPUTS}
+    return compact_frame(df, {**dtypes, **FEATURE_DTYPES})
+
+def recalculate_derived_features(df: pd.DataFrame, changed: Sequence[str]) -> pd.DataFrame:
+    """``df`` (derived features already calculated, not compacted) after the ``changed`` inputs were
+    replaced: only the derived features reading them (DERIVED_INPUTS) are recalculated."""
+    affected = derived_features_reading(changed)
+    if not affected:
+        return df
+    reads = sorted({col for name in affected for col in DERIVED_INPUTS[name] if col in df.columns})
+    derived = calculate_derived_features_frame(df[reads], compact=False)
+    return df.assign(**{name: derived[name].to_numpy() for name in affected})
+
+def derived_features_reading(columns: Sequence[str]) -> List[str]:
+    return [name for name, reads in DERIVED_INPUTS.items() if set(reads).intersection(columns)]
+
 def calculate_equipment_risk_score(equipment_type: str) -> float:
     """Calculate risk score based on equipment type"""
-    risk_scores = {
-        'MOTOR CYCLES': 0.6,
-        'MOTOR CARS': 0.5,
-        'THREE WHEELERS': 0.7,
-        'DUAL PURPOSE VEHICLES': 0.5,
-        'LORRY': 0.7,
-        'VAN': 0.6,
-        'Mini Truck': 0.65,
-        'BUSES': 0.6,
-        'Single Cab': 0.6,
-        'Agriculture Equipment': 0.5,
-        'LAND VEHICLE TRACTORS': 0.5,
-        # Legacy equipment types (for backward compatibility)
-        'Construction': 0.8,
-        'Medical': 0.3,
-        'Office': 0.4,
-        'Manufacturing': 0.7,
-        'Transport': 0.6,
-        'Agricultural': 0.5,
-    }
-    return risk_scores.get(equipment_type, 0.5)
+    return EQUIPMENT_RISK_SCORES.get(equipment_type, 0.5)
 
 def encode_branch(branch: str) -> int:
     """Encode branch name to numeric value"""
-    branch_encoding = {
-        'GODAGAMA': 1,
-        'ANURADHAPURA': 2,
-        'HYDE PARK': 3,
-        'KANDY': 4,
-        'HEAD OFFICE': 5,
-        'MATARA': 6,
-        'BADULLA': 7,
-        'WELLAWATHE': 8,
-        'NARAMMALA': 9,
-        'MULLAITIVU': 10,
-        'MINUWANGODA': 11,
-        # Legacy branch names (for backward compatibility)
-        'Main': 1,
-        'North': 2,
-        'South': 3,
-        'East': 4,
-        'West': 5,
-        'Central': 6,
-        'HQ': 7
-    }
-    return branch_encoding.get(branch, 0)
+    return BRANCH_ENCODING.get(branch, 0)
 
 def encode_scheme(scheme: str) -> int:
     """Encode scheme type to numeric value"""
-    scheme_encoding = {
-        'NORMAL': 1,
-        'STEP-UP': 2,
-        # Legacy scheme types (for backward compatibility)
-        'Standard Lease': 1,
-        'Finance Lease': 2,
-        'Operating Lease': 3,
-        'Sale and Leaseback': 4,
-        'Hire Purchase': 5,
-        'Consumer Lease': 6
-    }
-    return scheme_encoding.get(scheme, 0)
\ No newline at end of file
+    return SCHEME_ENCODING.get(scheme, 0)
\ No newline at end of file
@@ -1,13 +1,35 @@
-from fastapi import FastAPI, HTTPException
+import os
+import sys
+from pathlib import Path
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from typing import List, Optional
-import joblib
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import uvicorn
 
+# Make the shared backend helpers importable when run from this directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.responses import (
+    BATCH_FORMATS, SINGLE_FORMATS, FastJSONResponse,
+    batch_payload, check_format, parse_fields, select_fields
+)
+from common.columnar import (
+    accepts_binary, batch_frame_dependency, batch_openapi, write_frame
+)
+from common.validation import Column, FrameSchema
+from common.cache import PredictionCache, file_version
+from common.store import LocalStore
+from common.dtypes import FLOAT32, compact_frame
+from common import delta, metrics, profiling, sweep, warmup
+from common.distill import check_tier, load_students, with_tier
+from portfolio import SEGMENTS, Rollup, parse_segments
+from cascade import CASCADE_FILE, load_cascade
+from stress import SCENARIOS, affected_features, parse_scenarios, shocked_features, shocked_values, with_inputs
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Impairment & ECL Prediction API",
@@ -24,20 +46,89 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
+# Model metadata is identical for every prediction; compact formats send it once
+MODEL_METADATA = {
+    "impairment_model": "Gradient Boosting",
+    "ecl_model": "Stacking Ensemble",
+    "impairment_accuracy": "99.59%",
+    "ecl_accuracy": "92.85%"
+}
+PREDICTION_FIELDS = ["impairment", "ecl_1yr"] + list(MODEL_METADATA)
+# tier=fast: 1 yr ECL from the ensemble's distilled student
+FAST_METADATA = {**MODEL_METADATA, "ecl_model": "Stacking Ensemble (distilled)"}
+TIER_QUERY = "accurate | fast (distilled ECL student, see /models/info; the ensemble when there is none)"
+
+MODEL_FILES = ("gradient_boosting_impairment.pkl", "stacking_ensemble_ecl.pkl", "scaler_advanced.pkl")
+# Where MODEL_FILES are read from (the working directory unless set)
+MODEL_DIR = Path(os.environ.get("LASINDU_MODEL_DIR", "."))
+models_loaded = False
+# Version of the loaded MODEL_FILES (name, size, mtime), plus the ECL cascade when in use;
+# stamped on cache keys and delta-scoring fingerprints
+model_version = ""
+full_model_version = ""
+
+# Early-exit cascade in front of the stacking ECL model (cascade.py): used when CASCADE_FILE
+# sits next to the models and was fitted against them, unless LASINDU_ECL_CASCADE=off
+ECL_CASCADE = os.environ.get("LASINDU_ECL_CASCADE", "auto")
+ecl_cascade = None
+# Distilled student of the ECL ensemble answering tier=fast (students/ecl.joblib, common/distill.py)
+ecl_student = None
+
+# (impairment, ecl_1yr) per engineered feature vector; cleared whenever models load
+prediction_cache = PredictionCache()
+
+# Loans scored at a time by /portfolio/rollup
+ROLLUP_CHUNK_ROWS = int(os.environ.get("LASINDU_ROLLUP_CHUNK_ROWS", "50000"))
+
+# Per-loan fingerprints and predictions for /predict/delta, shared by every worker process
+STATE_DB = os.environ.get("LASINDU_STATE_DB", str(Path(__file__).resolve().parent / ".state" / "lasindu.db"))
+store = LocalStore(STATE_DB)
+DELTA_COLLECTION = "delta:impairment_ecl"
+
+# Per-stage latency histograms and request counters on GET /metrics
+metrics.install(app, "lasindu", cache_stats=prediction_cache.stats)
+# Opt-in sampling profiles of single requests (X-Profile header, see common/profiling.py)
+profiling.install(app, "lasindu")
+
 def load_models():
-    global impairment_model, ecl_model, scaler, models_loaded
+    global impairment_model, ecl_model, scaler, models_loaded, model_version, full_model_version, ecl_cascade
+    global ecl_student
+    import joblib  # with the unpickled models it pulls in scikit-learn; only when loading
 
+    impairment_path, ecl_path, scaler_path = (MODEL_DIR / name for name in MODEL_FILES)
+    full_model_version = file_version(impairment_path, ecl_path, scaler_path)
     try:
-        impairment_model = joblib.load("gradient_boosting_impairment.pkl")
-        ecl_model = joblib.load("stacking_ensemble_ecl.pkl")
-        scaler = joblib.load("scaler_advanced.pkl")
+        impairment_model = joblib.load(impairment_path)
+        ecl_model = joblib.load(ecl_path)
+        scaler = joblib.load(scaler_path)
         models_loaded = True
         print("✓ Models and scaler loaded successfully")
     except Exception as e:
         models_loaded = False
         print("✗ Failed to load models:", e)
 
+    ecl_cascade = None
+    if models_loaded and ECL_CASCADE != "off":
+        ecl_cascade = load_cascade(MODEL_DIR / CASCADE_FILE, full_model_version)
+        if ecl_cascade is not None:
+            print(f"✓ ECL cascade loaded ({int(ecl_cascade.enabled.sum())} early-exit cells)")
+    ecl_student = load_students(MODEL_DIR, {"ecl": full_model_version}).get("ecl") if models_loaded else None
+    if ecl_student is not None:
+        print(f"✓ Distilled ECL student loaded ({ecl_student.candidate})")
+    model_version = full_model_version
+    if ecl_cascade is not None:
+        model_version += "|" + file_version(MODEL_DIR / CASCADE_FILE)
+    prediction_cache.reset(model_version)
+    return models_loaded
+
+# Models load on the first prediction, POST /warmup or at startup per MODEL_WARMUP (common/warmup.py)
+model_loader = warmup.ModelLoader("lasindu", load_models)
+warmup.install(app, "lasindu")
+
+@app.on_event("startup")
+def start_warmup():
+    model_loader.start()
+
 # Pydantic models for request validation
 class LoanInput(BaseModel):
     facility_amount: float = Field(..., description="Loan facility amount", example=100000)
@@ -66,6 +157,37 @@ class LoanInput(BaseModel):
 class BatchLoanInput(BaseModel):
     loans: List[LoanInput]
 
+# Column-wise mirror of LoanInput used to validate batch bodies (JSON, Arrow and .npy)
+LOAN_SCHEMA = FrameSchema([
+    Column("facility_amount", "float"),
+    Column("tenor", "int"),
+    Column("effec_rate", "float"),
+    Column("flat_rate", "float"),
+    Column("net_rental", "float"),
+    Column("no_of_rental_in_arrears", "float"),
+    Column("age", "float"),
+    Column("due_date", "int", required=False, nullable=True),
+])
+
+loan_batch_frame = batch_frame_dependency(LOAN_SCHEMA, "loans")
+
+# /predict/delta: the batch columns plus the id that fingerprints are kept under
+class DeltaLoanInput(LoanInput):
+    loan_id: str = Field(..., description="Stable loan identifier", example="LN-000123")
+
+class DeltaBatchInput(BaseModel):
+    loans: List[DeltaLoanInput]
+
+DELTA_SCHEMA = FrameSchema([Column("loan_id", "str")] + LOAN_SCHEMA.columns)
+DELTA_RESULT_FIELDS = ["loan_id", "impairment", "ecl_1yr", "status"]
+
+loan_delta_frame = batch_frame_dependency(DELTA_SCHEMA, "loans")
+
+# /sweep: a /predict body plus the inputs to vary over a curve or grid
+class SweepLoanInput(LoanInput):
+    axes: List[sweep.SweepAxis] = Field(..., description="One or two inputs to vary, e.g. effec_rate from 6 to 20")
+
+
 class PredictionResponse(BaseModel):
     impairment: float
     ecl_1yr: float
@@ -89,13 +211,65 @@ class HealthResponse(BaseModel):
     ecl_model: str
     timestamp: str
 
+# Engineered features in training order: (name, columns read, derivation). Columns read are
+# request inputs or earlier features, so /stress recomputes only what a shock reaches
+DERIVED_FEATURES = [
+    ('Rate_Difference', ('effec_rate', 'flat_rate'), lambda d: d['effec_rate'] - d['flat_rate']),
+    ('Rental_to_Amount_Ratio', ('net_rental', 'facility_amount'), lambda d: d['net_rental'] / (d['facility_amount'] + 1)),
+    ('Amount_per_Tenor', ('facility_amount', 'tenor'), lambda d: d['facility_amount'] / (d['tenor'] + 1)),
+    ('Rental_per_Tenor', ('net_rental', 'tenor'), lambda d: d['net_rental'] / (d['tenor'] + 1)),
+    ('Arrears_Rate', ('no_of_rental_in_arrears', 'tenor'), lambda d: d['no_of_rental_in_arrears'] / (d['tenor'] + 1)),
+    ('Total_Payment', ('net_rental', 'tenor'), lambda d: d['net_rental'] * d['tenor']),
+    ('Payment_Capacity', ('facility_amount', 'Total_Payment'), lambda d: d['facility_amount'] / (d['Total_Payment'] + 1)),
+    ('Risk_Score', ('no_of_rental_in_arrears', 'effec_rate'), lambda d: d['no_of_rental_in_arrears'] * d['effec_rate'] / 100),
+    ('Age_Tenor_Interaction', ('age', 'tenor'), lambda d: d['age'] * d['tenor']),
+    ('Amount_Rate_Interaction', ('facility_amount', 'effec_rate'), lambda d: d['facility_amount'] * d['effec_rate'] / 100),
+    ('Arrears_Amount', ('no_of_rental_in_arrears', 'net_rental'), lambda d: d['no_of_rental_in_arrears'] * d['net_rental']),
+    # Logarithmic features
+    ('Log_Facility_Amount', ('facility_amount',), lambda d: np.log1p(d['facility_amount'])),
+    ('Log_Net_Rental', ('net_rental',), lambda d: np.log1p(d['net_rental'])),
+    # Squared features
+    ('Tenor_Squared', ('tenor',), lambda d: d['tenor'] ** 2),
+    ('Age_Squared', ('age',), lambda d: d['age'] ** 2),
+    ('Arrears_Squared', ('no_of_rental_in_arrears',), lambda d: d['no_of_rental_in_arrears'] ** 2),
+    # Polynomial features
+    ('Rate_Squared', ('effec_rate',), lambda d: d['effec_rate'] ** 2),
+    ('Rate_Cubed', ('effec_rate',), lambda d: d['effec_rate'] ** 3),
+]
+
+# Training names of the request inputs
+INPUT_RENAMES = {
+    'facility_amount': 'Facility amount',
+    'tenor': 'Tenor',
+    'effec_rate': 'Effec. Rate',
+    'flat_rate': 'Flat Rate',
+    'net_rental': 'Net Rental',
+    'no_of_rental_in_arrears': 'No of Rental in arrears',
+    'age': 'Age'
+}
+
+# Inputs /stress may shock and /sweep may vary (due_date has no derivations of its own), with the
+# bounds and dtypes shocked values are kept within and swept values are checked against
+SWEEP_COLUMNS = {column.name: column for column in [
+    Column("facility_amount", "float", ge=0),
+    Column("tenor", "int", ge=0),
+    Column("effec_rate", "float"),
+    Column("flat_rate", "float"),
+    Column("net_rental", "float", ge=0),
+    Column("no_of_rental_in_arrears", "float", ge=0),
+    Column("age", "float", ge=0),
+]}
+
 # Feature engineering function
-def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
-    """Apply the same feature engineering as training"""
-    
+def engineer_features(df: pd.DataFrame, compact: bool = False) -> pd.DataFrame:
+    """Apply the same feature engineering as training, in float64 like training.
+
+    ``compact`` stores the result as float32 (common.dtypes) for frames held
+    while a book is scored in chunks (/portfolio/rollup, /stress).
+    """
     # Handle due date if present (as integer days)
     if 'due_date' in df.columns and df['due_date'].notna().any():
-        df['Days_to_Due'] = df['due_date']
+        df['Days_to_Due'] = df['due_date'].fillna(0)
         df['Months_to_Due'] = df['Days_to_Due'] / 30
         df['Years_to_Due'] = df['Days_to_Due'] / 365
         df = df.drop('due_date', axis=1)
@@ -104,60 +278,160 @@ def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
         df['Days_to_Due'] = 0
         df['Months_to_Due'] = 0
         df['Years_to_Due'] = 0
+        df = df.drop(columns='due_date', errors='ignore')
     
     # Create all engineered features
-    df['Rate_Difference'] = df['effec_rate'] - df['flat_rate']
-    df['Rental_to_Amount_Ratio'] = df['net_rental'] / (df['facility_amount'] + 1)
-    df['Amount_per_Tenor'] = df['facility_amount'] / (df['tenor'] + 1)
-    df['Rental_per_Tenor'] = df['net_rental'] / (df['tenor'] + 1)
-    df['Arrears_Rate'] = df['no_of_rental_in_arrears'] / (df['tenor'] + 1)
-    df['Total_Payment'] = df['net_rental'] * df['tenor']
-    df['Payment_Capacity'] = df['facility_amount'] / (df['Total_Payment'] + 1)
-    df['Risk_Score'] = df['no_of_rental_in_arrears'] * df['effec_rate'] / 100
-    df['Age_Tenor_Interaction'] = df['age'] * df['tenor']
-    df['Amount_Rate_Interaction'] = df['facility_amount'] * df['effec_rate'] / 100
-    df['Arrears_Amount'] = df['no_of_rental_in_arrears'] * df['net_rental']
-    
-    # Logarithmic features
-    df['Log_Facility_Amount'] = np.log1p(df['facility_amount'])
-    df['Log_Net_Rental'] = np.log1p(df['net_rental'])
-    
-    # Squared features
-    df['Tenor_Squared'] = df['tenor'] ** 2
-    df['Age_Squared'] = df['age'] ** 2
-    df['Arrears_Squared'] = df['no_of_rental_in_arrears'] ** 2
-    
-    # Polynomial features
-    df['Rate_Squared'] = df['effec_rate'] ** 2
-    df['Rate_Cubed'] = df['effec_rate'] ** 3
-    
+    for name, _, derive in DERIVED_FEATURES:
+        df[name] = derive(df)
+
     # Rename columns to match training data format
-    df.rename(columns={
-        'facility_amount': 'Facility amount',
-        'tenor': 'Tenor',
-        'effec_rate': 'Effec. Rate',
-        'flat_rate': 'Flat Rate',
-        'net_rental': 'Net Rental',
-        'no_of_rental_in_arrears': 'No of Rental in arrears',
-        'age': 'Age'
-    }, inplace=True)
+    df.rename(columns=INPUT_RENAMES, inplace=True)
     
-    return df
+    return compact_frame(df, dict.fromkeys(df.columns, FLOAT32)) if compact else df
+
+def resolve_tier(tier: str) -> str:
+    """The tier that answers: 'fast' only with a distilled ECL student loaded"""
+    return "fast" if tier == "fast" and ecl_student is not None else "accurate"
+
+def score_engineered(df_engineered: pd.DataFrame, tier: str = "accurate") -> tuple:
+    """(impairment, ecl_1yr) arrays for engineered rows, without the cache"""
+    # CRITICAL: Scale features (models were trained on scaled data)
+    # in float64 like training; float32 scaling shifts values sitting on tree cuts
+    with metrics.stage("scaling"):
+        scaled = scaler.transform(df_engineered.astype(np.float64))
+    with metrics.stage("inference"):
+        impairment = np.asarray(impairment_model.predict(scaled), dtype=float)
+        fast = resolve_tier(tier) == "fast"
+        if fast:
+            ecl, early = np.asarray(ecl_student.predict(scaled), dtype=float), 0
+        elif ecl_cascade is not None:
+            ecl, exited = ecl_cascade.predict(ecl_model, scaled, df_engineered)
+            early = int(exited.sum())
+        else:
+            ecl, early = np.asarray(ecl_model.predict(scaled), dtype=float), 0
+    metrics.count_model("impairment", len(df_engineered))
+    metrics.count_model("ecl:fast" if fast else "ecl", len(df_engineered) - early)
+    if early:
+        metrics.count_model("ecl_early_exit", early)
+    return impairment, ecl
+
+def predict_engineered(df_engineered: pd.DataFrame, tier: str = "accurate") -> List[tuple]:
+    """(impairment, ecl_1yr) per engineered row, scoring only rows missing from the cache"""
+    def compute(rows: np.ndarray) -> List[tuple]:
+        impairment, ecl = score_engineered(df_engineered.iloc[rows], tier)
+        return list(zip(impairment.tolist(), ecl.tolist()))
+
+    namespace = "impairment_ecl:fast" if resolve_tier(tier) == "fast" else "impairment_ecl"
+    return prediction_cache.lookup(namespace, df_engineered.to_numpy(dtype=float), compute)
+
+def score_loan(loan_data: dict, tier: str = "accurate") -> tuple:
+    """(impairment, ecl_1yr) for one LoanInput record"""
+    with metrics.stage("features"):
+        data_engineered = engineer_features(pd.DataFrame([loan_data]))
+    return predict_engineered(data_engineered, tier)[0]
+
+def segment_inputs(df: pd.DataFrame, segments: List) -> dict:
+    """The loan inputs a Rollup reads (facility amount and the segment columns) as float arrays"""
+    columns = {"facility_amount"} | {segment.column for segment in segments}
+    return {column: df[column].to_numpy(dtype=float, na_value=np.nan) for column in columns}
+
+def rollup_book(df: pd.DataFrame, segments: List, chunk_rows: int) -> Rollup:
+    """Score ``df`` ``chunk_rows`` loans at a time (uncached) and fold each chunk into a Rollup"""
+    rollup = Rollup(segments)
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        inputs = segment_inputs(chunk, segments)
+        with metrics.stage("features"):
+            engineered = engineer_features(chunk, compact=True)
+        impairment, ecl = score_engineered(engineered)
+        rollup.add(inputs, impairment, ecl)
+    return rollup
+
+def stress_book(df: pd.DataFrame, scenarios: List, chunk_rows: int) -> tuple:
+    """(sums, chunks) for the base book and each scenario, sums rows being [facility amount, impairment, ecl].
+
+    Each chunk is engineered once; the scenario matrices are derived from it
+    and scored together with it in one (uncached) model call, the stacked
+    matrix holding at most ``chunk_rows`` rows.
+    """
+    sums = np.zeros((len(scenarios) + 1, 3))
+    per_chunk = max(1, chunk_rows // (len(scenarios) + 1))
+    chunks = 0
+    for start in range(0, len(df), per_chunk):
+        chunk = df.iloc[start:start + per_chunk]
+        with metrics.stage("features"):
+            base = engineer_features(chunk, compact=True)
+            frames = [base] + [
+                shocked_features(chunk, base, scenario, DERIVED_FEATURES, INPUT_RENAMES, SWEEP_COLUMNS)
+                for scenario in scenarios
+            ]
+        impairment, ecl = score_engineered(pd.concat(frames, ignore_index=True))
+        n = len(chunk)
+        # Facility totals from the float64 inputs like rollup_book, not the compact features
+        amounts = chunk['facility_amount'].to_numpy(dtype=np.float64)
+        amounts = [amounts] + [shocked_values(amounts, scenario, 'facility_amount', SWEEP_COLUMNS) for scenario in scenarios]
+        for k in range(len(frames)):
+            rows = slice(k * n, (k + 1) * n)
+            sums[k] += (amounts[k].sum(), impairment[rows].sum(), ecl[rows].sum())
+        chunks += 1
+    return sums, chunks
+
+def sweep_loan(loan_data: dict, features: List[str], points: List[np.ndarray]) -> tuple:
+    """(impairment, ecl_1yr) arrays: the loan as given, then every grid point, from one uncached model call.
+
+    The loan is engineered once; each grid row recomputes only the swept
+    inputs and the features derived from them.
+    """
+    values = sweep.grid(features, points)
+    with metrics.stage("features"):
+        inputs = pd.DataFrame([loan_data])
+        base = engineer_features(inputs)
+        rows = np.zeros(len(values[features[0]]) + 1, dtype=int)
+        inputs, base = (frame.iloc[rows].reset_index(drop=True) for frame in (inputs, base))
+        changed = {
+            feature: pd.Series(np.concatenate([[inputs[feature].iloc[0]], values[feature]]), dtype=np.float64)
+            for feature in features
+        }
+        engineered = with_inputs(inputs, base, changed, DERIVED_FEATURES, INPUT_RENAMES)
+    return score_engineered(engineered)
+
+def stress_totals(loans: int, sums: np.ndarray) -> dict:
+    amount, impairment, ecl = (float(v) for v in sums)
+    return {"loans": loans, "facility_amount": amount, "impairment": impairment, "ecl_1yr": ecl,
+            "ecl_coverage": ecl / amount if amount else None}
+
+def requested_segments(segments: Optional[List[str]]) -> List:
+    try:
+        return parse_segments(segments, SEGMENTS, LOAN_SCHEMA.names)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def requested_scenarios(scenarios: Optional[List[str]]) -> List:
+    try:
+        return parse_scenarios(scenarios, SCENARIOS, list(SWEEP_COLUMNS))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # API Endpoints
 @app.get("/", response_model=HealthResponse)
 async def root():
     """Health check endpoint"""
     return {
-        "status": "healthy",
-        "models_loaded": True,
+        "status": "degraded" if model_loader.state == warmup.FAILED else "healthy",
+        "models_loaded": model_loader.loaded,
         "impairment_model": "Gradient Boosting (99.59% accuracy)",
         "ecl_model": "Stacking Ensemble (92.85% accuracy)",
         "timestamp": datetime.now().isoformat()
     }
 
 @app.post("/predict", response_model=PredictionResponse)
-async def predict_single(loan: LoanInput):
+@metrics.timed
+async def predict_single(
+    loan: LoanInput,
+    response_format: str = Query("full", alias="format", description="full | compact (drop model metadata)"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. impairment,ecl_1yr"),
+    tier: Optional[str] = Query(None, description=TIER_QUERY)
+):
     """
     Predict Impairment and 1 yr ECL for a single loan
     
@@ -169,89 +443,317 @@ async def predict_single(loan: LoanInput):
     - **no_of_rental_in_arrears**: Number of payments missed
     - **age**: Borrower's age
     - **due_date**: Optional - Due date as integer (days value)
+
+    `tier=fast` takes the 1 yr ECL from the ensemble's distilled student;
+    the `X-Serving-Tier` header names the tier that answered.
     """
+    check_format(response_format, SINGLE_FORMATS)
+    selected = parse_fields(fields, PREDICTION_FIELDS)
+    tier = check_tier(tier)
+
     # Return 503 if models or scaler not loaded
-    if not models_loaded or impairment_model is None or ecl_model is None or scaler is None:
+    if not await model_loader.ready():
         raise HTTPException(status_code=503, detail="Models or scaler not loaded; prediction unavailable")
 
     try:
         # Convert to DataFrame (support Pydantic v2 `model_dump` and v1 `dict`)
         loan_data = loan.model_dump() if hasattr(loan, "model_dump") else loan.dict()
-        data = pd.DataFrame([loan_data])
-        
-        # Engineer features
-        data_engineered = engineer_features(data)
-        
-        # CRITICAL: Scale features (models were trained on scaled data)
-        data_scaled = scaler.transform(data_engineered)
+        impairment_pred, ecl_pred = score_loan(loan_data, tier)
+        served = resolve_tier(tier)
         
-        # Make predictions
-        impairment_pred = impairment_model.predict(data_scaled)[0]
-        ecl_pred = ecl_model.predict(data_scaled)[0]
-        
-        return {
-            "impairment": float(impairment_pred),
-            "ecl_1yr": float(ecl_pred),
-            "impairment_model": "Gradient Boosting",
-            "ecl_model": "Stacking Ensemble",
-            "impairment_accuracy": "99.59%",
-            "ecl_accuracy": "92.85%"
-        }
+        result = {"impairment": impairment_pred, "ecl_1yr": ecl_pred}
+        if response_format == "full":
+            result.update(FAST_METADATA if served == "fast" else MODEL_METADATA)
+        with metrics.stage("serialization"):
+            return with_tier(FastJSONResponse(select_fields(result, selected)), served)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
-@app.post("/predict/batch", response_model=BatchPredictionResponse)
-async def predict_batch(batch: BatchLoanInput):
+@app.post("/predict/batch", response_model=BatchPredictionResponse, openapi_extra=batch_openapi(BatchLoanInput))
+@metrics.timed
+async def predict_batch(
+    request: Request,
+    df: pd.DataFrame = Depends(loan_batch_frame),
+    response_format: str = Query("rows", alias="format", description="rows | compact | columnar"),
+    fields: Optional[str] = Query(None, description="Comma separated per-loan fields to return, e.g. ecl_1yr"),
+    segments: Optional[List[str]] = Query(None, description="Also roll the batch up by these segments (see /portfolio/segments)"),
+    tier: Optional[str] = Query(None, description=TIER_QUERY)
+):
     """
     Predict Impairment and 1 yr ECL for multiple loans
     
-    Accepts a list of loan inputs and returns predictions for all
+    Accepts a list of loan inputs and returns predictions for all.
+    `format=compact` sends the model metadata once in a `model` header and
+    `format=columnar` additionally returns `impairment`/`ecl_1yr` as arrays.
+    `segments` adds per-segment tables (as `/portfolio/rollup`) to JSON responses.
+
+    Besides JSON the body may be an Arrow IPC stream or a `.npy` array with
+    one column per `LoanInput` field; send `Accept` with the same media type
+    to get `impairment`/`ecl_1yr` back in that format. `tier=fast` works as
+    on `/predict`.
     """
+    check_format(response_format, BATCH_FORMATS)
+    selected = parse_fields(fields, PREDICTION_FIELDS)
+    tier = check_tier(tier)
+    rollup = Rollup(requested_segments(segments)) if segments else None
+
     # Return 503 if models or scaler not loaded
-    if not models_loaded or impairment_model is None or ecl_model is None or scaler is None:
+    if not await model_loader.ready():
         raise HTTPException(status_code=503, detail="Models or scaler not loaded; batch prediction unavailable")
 
+    metrics.observe_batch(len(df))
     try:
-        # Convert to DataFrame (support Pydantic v2 `model_dump` and v1 `dict`)
-        loans_data = [l.model_dump() if hasattr(l, "model_dump") else l.dict() for l in batch.loans]
-        df = pd.DataFrame(loans_data)
-        df = pd.DataFrame(loans_data)
-        
+        inputs = segment_inputs(df, rollup.segments) if rollup else None
         # Engineer features
-        df_engineered = engineer_features(df)
+        with metrics.stage("features"):
+            df_engineered = engineer_features(df)
         
-        # CRITICAL: Scale features (models were trained on scaled data)
-        df_scaled = scaler.transform(df_engineered)
-        
-        # Make predictions
-        impairment_preds = impairment_model.predict(df_scaled)
-        ecl_preds = ecl_model.predict(df_scaled)
-        
-        # Create response
-        predictions = []
-        for imp, ecl in zip(impairment_preds, ecl_preds):
-            predictions.append({
-                "impairment": float(imp),
-                "ecl_1yr": float(ecl),
-                "impairment_model": "Gradient Boosting",
-                "ecl_model": "Stacking Ensemble",
-                "impairment_accuracy": "99.59%",
-                "ecl_accuracy": "92.85%"
-            })
+        predictions = np.array(predict_engineered(df_engineered, tier), dtype=float).reshape(-1, 2)
+        impairment_preds = predictions[:, 0]
+        ecl_preds = predictions[:, 1]
+        served = resolve_tier(tier)
+
+        binary = accepts_binary(request.headers.get("accept"))
+        if binary:
+            with metrics.stage("serialization"):
+                frame = pd.DataFrame({"impairment": impairment_preds, "ecl_1yr": ecl_preds})
+                return with_tier(write_frame(frame, binary), served)
         
-        return {
-            "predictions": predictions,
-            "total_loans": len(predictions),
+        summary = {
+            "total_loans": len(impairment_preds),
             "average_impairment": float(np.mean(impairment_preds)),
             "average_ecl": float(np.mean(ecl_preds)),
             "total_impairment": float(np.sum(impairment_preds)),
             "total_ecl": float(np.sum(ecl_preds))
         }
+        if rollup:
+            rollup.add(inputs, impairment_preds, ecl_preds)
+            summary["segments"] = rollup.tables()
+        with metrics.stage("serialization"):
+            payload = batch_payload(
+                columns={"impairment": impairment_preds.tolist(), "ecl_1yr": ecl_preds.tolist()},
+                constants=FAST_METADATA if served == "fast" else MODEL_METADATA,
+                fmt=response_format,
+                fields=selected,
+                summary=summary
+            )
+            return with_tier(FastJSONResponse(payload), served)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Batch prediction error: {str(e)}")
 
+@app.post("/predict/delta", openapi_extra=batch_openapi(DeltaBatchInput))
+@metrics.timed
+async def predict_delta(
+    request: Request,
+    df: pd.DataFrame = Depends(loan_delta_frame),
+    response_format: str = Query("rows", alias="format", description="rows | compact | columnar"),
+    fields: Optional[str] = Query(None, description="Comma separated per-loan fields, e.g. loan_id,ecl_1yr,status")
+):
+    """
+    Score a snapshot of the book, rescoring only new and changed loans
+
+    Every loan carries a `loan_id`. A loan whose engineered features and the
+    model version match the last run gets its stored prediction back
+    (`status` = `unchanged`); `new`, `changed` and `model_updated` loans are scored
+    together and stored. Bodies, formats and `Accept` work as in
+    `/predict/batch`. Totals cover the whole snapshot.
+    """
+    check_format(response_format, BATCH_FORMATS)
+    selected = parse_fields(fields, DELTA_RESULT_FIELDS + list(MODEL_METADATA))
+    if not await model_loader.ready():
+        raise HTTPException(status_code=503, detail="Models or scaler not loaded; delta scoring unavailable")
+
+    metrics.observe_batch(len(df))
+    ids = df["loan_id"].astype(str).tolist()
+    try:
+        with metrics.stage("features"):
+            df_engineered = engineer_features(df.drop(columns="loan_id"))
+
+        def compute(rows: np.ndarray) -> List[list]:
+            impairment, ecl = score_engineered(df_engineered.iloc[rows])
+            return [list(pair) for pair in zip(impairment.tolist(), ecl.tolist())]
+
+        results, statuses = await run_in_threadpool(
+            delta.delta_score, store, DELTA_COLLECTION, ids, df_engineered.to_numpy(dtype=float),
+            model_version, compute)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Delta scoring error: {str(e)}")
+
+    predictions = np.array(results, dtype=float).reshape(-1, 2)
+    columns = {"loan_id": ids, "impairment": predictions[:, 0].tolist(), "ecl_1yr": predictions[:, 1].tolist(),
+               "status": statuses}
+    binary = accepts_binary(request.headers.get("accept"))
+    with metrics.stage("serialization"):
+        if binary:
+            return write_frame(pd.DataFrame(columns), binary)
+        return FastJSONResponse(batch_payload(
+            columns=columns,
+            constants=MODEL_METADATA,
+            fmt=response_format,
+            fields=selected,
+            summary={
+                "total_loans": len(ids),
+                "delta": delta.summary(statuses),
+                "total_impairment": float(predictions[:, 0].sum()),
+                "total_ecl": float(predictions[:, 1].sum()),
+                "model_version": model_version
+            }
+        ))
+
+@app.post("/portfolio/rollup", openapi_extra=batch_openapi(BatchLoanInput))
+@metrics.timed
+async def portfolio_rollup(
+    df: pd.DataFrame = Depends(loan_batch_frame),
+    segments: Optional[List[str]] = Query(None, description="Segment names (tenor, arrears, age, rate) or name:edge,edge,... (default: all)"),
+    chunk_rows: int = Query(ROLLUP_CHUNK_ROWS, ge=1, description="Loans scored per chunk")
+):
+    """
+    Impairment and 1 yr ECL of a whole book rolled up by segment
+
+    Takes the same bodies as `/predict/batch` (an Arrow stream suits a full
+    book) and returns book totals plus one compact table per segment: bucket,
+    loans, facility amount, impairment, ECL, their averages and ECL coverage.
+    No per-loan rows are returned. The book is scored `chunk_rows` loans at a
+    time, bypassing the prediction cache, and each chunk is folded into the
+    rollup as soon as it is scored.
+    """
+    selected_segments = requested_segments(segments)
+    if not await model_loader.ready():
+        raise HTTPException(status_code=503, detail="Models or scaler not loaded; rollup unavailable")
+
+    metrics.observe_batch(len(df))
+    try:
+        # Off the event loop: a full book takes a while
+        rollup = await run_in_threadpool(rollup_book, df, selected_segments, chunk_rows)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Rollup error: {str(e)}")
+
+    with metrics.stage("serialization"):
+        return FastJSONResponse({
+            "model": MODEL_METADATA,
+            "portfolio": rollup.totals(),
+            "segments": rollup.tables(),
+            "chunks": rollup.chunks,
+            "timestamp": datetime.now().isoformat()
+        })
+
+@app.get("/portfolio/segments")
+async def get_portfolio_segments():
+    """Segment definitions available to /portfolio/rollup and /predict/batch?segments="""
+    return {
+        name: {"column": segment.column, "edges": list(segment.edges), "buckets": segment.buckets}
+        for name, segment in SEGMENTS.items()
+    }
+
+@app.post("/stress", openapi_extra=batch_openapi(BatchLoanInput))
+@metrics.timed
+async def stress_test(
+    df: pd.DataFrame = Depends(loan_batch_frame),
+    scenarios: Optional[List[str]] = Query(None, description="Scenario names or name:shock,shock,... e.g. severe:effec_rate%2B3,tenor%2B12 (default: all)"),
+    chunk_rows: int = Query(ROLLUP_CHUNK_ROWS, ge=1, description="Rows (loans x scenarios) scored per model call")
+):
+    """
+    Impairment and 1 yr ECL of a book under stress scenarios
+
+    Takes the same bodies as `/predict/batch` once, plus scenarios of
+    declarative shocks to loan inputs (`effec_rate+2` is +200bp; `+ - * =`,
+    URL-encode `+` as `%2B`). Returns base totals and, per scenario, the
+    shocked totals and their change from base. Scenario feature matrices are
+    derived from the engineered base book, recomputing only the features a
+    shock reaches, and all scenarios are scored in the same model calls.
+    """
+    selected_scenarios = requested_scenarios(scenarios)
+    if not await model_loader.ready():
+        raise HTTPException(status_code=503, detail="Models or scaler not loaded; stress test unavailable")
+
+    metrics.observe_batch(len(df))
+    try:
+        sums, chunks = await run_in_threadpool(stress_book, df, selected_scenarios, chunk_rows)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Stress test error: {str(e)}")
+
+    base = stress_totals(len(df), sums[0])
+    results = []
+    for scenario, scenario_sums in zip(selected_scenarios, sums[1:]):
+        totals = stress_totals(len(df), scenario_sums)
+        results.append({
+            "name": scenario.name,
+            "shocks": [str(shock) for shock in scenario.shocks],
+            "recomputed_features": [
+                INPUT_RENAMES.get(name, name)
+                for name in scenario.columns + affected_features(scenario.columns, DERIVED_FEATURES)
+            ],
+            **totals,
+            "impairment_change": totals["impairment"] - base["impairment"],
+            "ecl_change": totals["ecl_1yr"] - base["ecl_1yr"],
+            "ecl_change_pct": (totals["ecl_1yr"] / base["ecl_1yr"] - 1) * 100 if base["ecl_1yr"] else None,
+        })
+
+    with metrics.stage("serialization"):
+        return FastJSONResponse({
+            "model": MODEL_METADATA,
+            "base": base,
+            "scenarios": results,
+            "chunks": chunks,
+            "timestamp": datetime.now().isoformat()
+        })
+
+@app.post("/sweep")
+@metrics.timed
+async def sweep_loan_inputs(loan: SweepLoanInput):
+    """
+    Impairment and 1 yr ECL of one loan over a range of one or two inputs
+
+    Takes a `/predict` body plus `axes`, each varying one input (`values`,
+    or `start`/`stop`/`steps`); two axes make a grid, returned as
+    `[first][second]` nested lists. The whole curve or grid is scored as one
+    batch (bypassing the prediction cache), so a UI can draw it from a single
+    request. `base` is the loan as given.
+    """
+    features = [axis.feature for axis in loan.axes]
+    try:
+        points = sweep.check_axes(loan.axes, SWEEP_COLUMNS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not await model_loader.ready():
+        raise HTTPException(status_code=503, detail="Models or scaler not loaded; sweep unavailable")
+
+    loan_data = loan.model_dump(exclude={"axes"}) if hasattr(loan, "model_dump") else loan.dict(exclude={"axes"})
+    try:
+        impairment, ecl = await run_in_threadpool(sweep_loan, loan_data, features, points)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Sweep error: {str(e)}")
+
+    with metrics.stage("serialization"):
+        return FastJSONResponse({
+            "model": MODEL_METADATA,
+            "axes": sweep.axes_payload(features, points),
+            "impairment": sweep.reshape(impairment[1:].tolist(), points),
+            "ecl_1yr": sweep.reshape(ecl[1:].tolist(), points),
+            "base": {"impairment": float(impairment[0]), "ecl_1yr": float(ecl[0]),
+                     **{feature: loan_data[feature] for feature in features}},
+            "recomputed_features": [
+                INPUT_RENAMES.get(name, name) for name in features + affected_features(features, DERIVED_FEATURES)
+            ],
+            "timestamp": datetime.now().isoformat()
+        })
+
+@app.get("/stress/scenarios")
+async def get_stress_scenarios():
+    """Scenarios available to /stress by name"""
+    return {name: [str(shock) for shock in scenario.shocks] for name, scenario in SCENARIOS.items()}
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Prediction cache size, hit ratio and eviction counters"""
+    return prediction_cache.stats()
+
 @app.get("/models/info")
 async def get_models_info():
     """Get information about loaded models and their performance"""
@@ -271,7 +773,15 @@ async def get_models_info():
             "mae": 1899.75
         },
         "features_used": 28,
-        "training_samples": 99888
+        "training_samples": 99888,
+        "ecl_cascade": None if ecl_cascade is None else {
+            "early_exit_cells": int(ecl_cascade.enabled.sum()),
+            "cells": len(ecl_cascade.enabled),
+            "ecl_cap": ecl_cascade.ecl_cap,
+            "tolerance": ecl_cascade.tolerance
+        },
+        # Distilled student answering tier=fast: fidelity and serving costs against the ensemble
+        "ecl_fast_tier": None if ecl_student is None else ecl_student.info()
     }
 
 # Run the app
@@ -0,0 +1,246 @@
+"""
+Early-exit cascade in front of the stacking ECL model.
+
+The stacking ensemble (gradient boosting and random forest under a ridge
+meta-learner) runs on every loan, including current loans (no rentals in
+arrears) whose ECL is small and smooth in the inputs. The cascade puts one
+regression tree in front of it, fitted to the ensemble's own predictions for
+the current loans of a calibration book. At inference a loan exits early with
+the tree's ECL when it is current, its tenor x rate cell (``portfolio``
+segments) passed the error check and the tree's ECL is within ``ecl_cap``;
+every other loan gets the full ensemble.
+
+Error bounds: a validation part of the calibration book, not used to fit the
+tree, gives each cell's p99 relative error of the tree against the ensemble.
+Cells above ``tolerance`` or with fewer than ``min_rows`` validation loans
+always use the full model. ``evaluate`` re-checks the bounds on a held-out
+book and reports the throughput gain and the accuracy delta.
+
+The cascade is saved as ``ecl_cascade.pkl`` next to the models, with the
+version of the models it was fitted against; the API only uses it while
+that version is loaded (LASINDU_ECL_CASCADE=off disables it). Build and
+evaluate from this directory::
+
+    python cascade.py --model-dir ../../models/Lasindu --book book.csv --holdout holdout.csv
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from portfolio import DEFAULT_SEGMENTS, Segment
+
+CASCADE_FILE = "ecl_cascade.pkl"
+ARREARS_COLUMN = "No of Rental in arrears"
+# Cell segments and their column among the engineered (training-named) features
+CELL_SEGMENTS = {"tenor": "Tenor", "rate": "Effec. Rate"}
+
+
+class EclCascade:
+    """A tree for trivial loans in front of the full ECL model, with per-cell early-exit switches."""
+
+    def __init__(self, stage1: Any, segments: List[Segment], enabled: np.ndarray, ecl_cap: float,
+                 version: str, bounds: Dict[str, list], tolerance: float):
+        self.stage1 = stage1
+        self.segments = segments
+        self.enabled = np.asarray(enabled, dtype=bool)
+        self.ecl_cap = float(ecl_cap)
+        self.version = version
+        self.bounds = bounds
+        self.tolerance = tolerance
+
+    def cells(self, engineered: pd.DataFrame) -> np.ndarray:
+        """Tenor x rate cell per loan"""
+        cells = np.zeros(len(engineered), dtype=np.int64)
+        for segment in self.segments:
+            codes = segment.codes(engineered[segment.column].to_numpy(dtype=float))
+            cells = cells * len(segment.buckets) + codes
+        return cells
+
+    def cell_label(self, cell: int) -> str:
+        labels = []
+        for segment in reversed(self.segments):
+            cell, code = divmod(cell, len(segment.buckets))
+            labels.append(f"{segment.name} {segment.buckets[code]}")
+        return " / ".join(reversed(labels))
+
+    def candidates(self, engineered: pd.DataFrame) -> np.ndarray:
+        """Current loans in cells that passed the error check"""
+        current = engineered[ARREARS_COLUMN].to_numpy(dtype=float) == 0
+        return current & self.enabled[self.cells(engineered)]
+
+    def predict(self, full_model: Any, scaled: np.ndarray, engineered: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """(ECL per loan, mask of loans that exited early); ``scaled`` is what ``full_model`` takes"""
+        ecl = np.empty(len(scaled))
+        exited = np.zeros(len(scaled), dtype=bool)
+        rows = np.flatnonzero(self.candidates(engineered))
+        if len(rows):
+            quick = self.stage1.predict(scaled[rows])
+            within = quick <= self.ecl_cap
+            exited[rows[within]] = True
+            ecl[rows[within]] = quick[within]
+        if not exited.all():
+            ecl[~exited] = full_model.predict(scaled[~exited])
+        return ecl, exited
+
+    def save(self, path: Any) -> None:
+        import joblib
+        joblib.dump({
+            "stage1": self.stage1,
+            "segments": [(s.name, s.column, list(s.edges)) for s in self.segments],
+            "enabled": self.enabled, "ecl_cap": self.ecl_cap, "version": self.version,
+            "bounds": self.bounds, "tolerance": self.tolerance,
+        }, path)
+
+    @classmethod
+    def load(cls, path: Any) -> "EclCascade":
+        import joblib
+        data = joblib.load(path)
+        segments = [Segment(name, column, tuple(edges)) for name, column, edges in data["segments"]]
+        return cls(data["stage1"], segments, data["enabled"], data["ecl_cap"], data["version"],
+                   data["bounds"], data["tolerance"])
+
+
+def load_cascade(path: Path, version: str) -> Optional[EclCascade]:
+    """The cascade at ``path`` if it exists and was fitted against ``version`` of the models"""
+    if not path.exists():
+        return None
+    try:
+        cascade = EclCascade.load(path)
+    except Exception as e:
+        print(f"⚠️ Ignoring ECL cascade {path}: {e}")
+        return None
+    if cascade.version != version:
+        print(f"⚠️ Ignoring ECL cascade {path}: fitted against other models")
+        return None
+    return cascade
+
+
+def _relative_errors(quick: np.ndarray, full: np.ndarray) -> np.ndarray:
+    return np.abs(quick - full) / np.maximum(np.abs(full), 1.0)
+
+
+def cell_bounds(cascade: EclCascade, quick: np.ndarray, full: np.ndarray, cells: np.ndarray) -> Dict[str, list]:
+    """Per cell: loans and p99 relative error of the tree against the full model (None without loans)"""
+    n_cells = len(cascade.enabled)
+    errors = _relative_errors(quick, full)
+    loans = np.bincount(cells, minlength=n_cells)
+    p99 = [float(np.percentile(errors[cells == c], 99)) if loans[c] else None for c in range(n_cells)]
+    return {"loans": loans.tolist(), "p99_relative_error": p99}
+
+
+def fit_cascade(full_model: Any, scaled: np.ndarray, engineered: pd.DataFrame, version: str,
+                tolerance: float = 0.05, min_rows: int = 50, validation: float = 0.3,
+                cap_quantile: float = 0.99, max_depth: int = 10, min_samples_leaf: int = 10,
+                seed: int = 0) -> EclCascade:
+    """Fit the first stage on current loans of a calibration book and switch on the cells within ``tolerance``"""
+    from sklearn.tree import DecisionTreeRegressor
+
+    segments = [Segment(name, column, DEFAULT_SEGMENTS[name].edges) for name, column in CELL_SEGMENTS.items()]
+    n_cells = int(np.prod([len(s.buckets) for s in segments]))
+    cascade = EclCascade(None, segments, np.ones(n_cells, dtype=bool), np.inf, version, {}, tolerance)
+
+    current = np.flatnonzero(engineered[ARREARS_COLUMN].to_numpy(dtype=float) == 0)
+    if len(current) < 2 * min_rows:
+        raise ValueError(f"Calibration book has {len(current)} current loans; need at least {2 * min_rows}")
+    rng = np.random.default_rng(seed)
+    current = rng.permutation(current)
+    n_validation = max(int(len(current) * validation), min_rows)
+    fit_rows, check_rows = current[n_validation:], current[:n_validation]
+
+    target = full_model.predict(scaled[current])
+    fit_target, check_target = target[n_validation:], target[:n_validation]
+    cascade.stage1 = DecisionTreeRegressor(max_depth=max_depth, min_samples_leaf=min_samples_leaf,
+                                           random_state=seed).fit(scaled[fit_rows], fit_target)
+    cascade.ecl_cap = float(np.quantile(fit_target, cap_quantile))
+
+    cells = cascade.cells(engineered.iloc[check_rows])
+    cascade.bounds = cell_bounds(cascade, cascade.stage1.predict(scaled[check_rows]), check_target, cells)
+    cascade.enabled = np.array([
+        loans >= min_rows and p99 is not None and p99 <= tolerance
+        for loans, p99 in zip(cascade.bounds["loans"], cascade.bounds["p99_relative_error"])
+    ])
+    return cascade
+
+
+def _best_seconds(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def evaluate(cascade: EclCascade, full_model: Any, scaled: np.ndarray, engineered: pd.DataFrame,
+             repeat: int = 3) -> Dict[str, Any]:
+    """Throughput and accuracy of the cascade against the full model on a held-out book"""
+    full = full_model.predict(scaled)
+    ecl, exited = cascade.predict(full_model, scaled, engineered)
+    full_seconds = _best_seconds(lambda: full_model.predict(scaled), repeat)
+    cascade_seconds = _best_seconds(lambda: cascade.predict(full_model, scaled, engineered), repeat)
+
+    errors = np.abs(ecl - full)
+    cells = cascade.cells(engineered.iloc[np.flatnonzero(exited)])
+    held_out = cell_bounds(cascade, ecl[exited], full[exited], cells)
+    violations = [
+        f"{cascade.cell_label(c)} ({p99:.3f})" for c, p99 in enumerate(held_out["p99_relative_error"])
+        if p99 is not None and p99 > cascade.tolerance
+    ]
+    return {
+        "loans": len(full),
+        "early_exit_share": float(exited.mean()),
+        "full_loans_per_second": len(full) / full_seconds,
+        "cascade_loans_per_second": len(full) / cascade_seconds,
+        "speedup": full_seconds / cascade_seconds,
+        "mean_abs_error": float(errors.mean()),
+        "p99_abs_error_exited": float(np.percentile(errors[exited], 99)) if exited.any() else 0.0,
+        "max_relative_error_exited": float(_relative_errors(ecl[exited], full[exited]).max()) if exited.any() else 0.0,
+        "total_ecl_delta_pct": float((ecl.sum() / full.sum() - 1) * 100),
+        "cells_enabled": int(cascade.enabled.sum()),
+        "cells_over_tolerance": violations,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fit the early-exit ECL cascade and report it on a held-out book")
+    parser.add_argument("--model-dir", default=".", help="Directory holding the Lasindu .pkl files")
+    parser.add_argument("--book", required=True, help="Calibration loans (CSV with the LoanInput columns)")
+    parser.add_argument("--holdout", required=True, help="Held-out loans (CSV) for the report")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Max p99 relative error per cell")
+    parser.add_argument("--min-rows", type=int, default=50, help="Validation loans a cell needs to exit early")
+    parser.add_argument("--out", help=f"Where to write the cascade (default: <model-dir>/{CASCADE_FILE})")
+    args = parser.parse_args()
+
+    os.environ["LASINDU_MODEL_DIR"] = args.model_dir
+    os.environ["LASINDU_ECL_CASCADE"] = "off"
+    import api  # noqa: E402  (reads the two variables above)
+
+    if not api.model_loader.ensure():
+        raise SystemExit("Models could not be loaded")
+
+    def features(path: str) -> Tuple[np.ndarray, pd.DataFrame]:
+        df = api.LOAN_SCHEMA.validate_frame(pd.read_csv(path))
+        engineered = api.engineer_features(df)
+        return api.scaler.transform(engineered.astype(np.float64)), engineered
+
+    scaled, engineered = features(args.book)
+    cascade = fit_cascade(api.ecl_model, scaled, engineered, api.full_model_version,
+                          tolerance=args.tolerance, min_rows=args.min_rows)
+    out = Path(args.out) if args.out else Path(args.model_dir) / CASCADE_FILE
+    cascade.save(out)
+    print(f"✓ Cascade saved to {out} ({int(cascade.enabled.sum())}/{len(cascade.enabled)} cells early-exit, "
+          f"ECL cap {cascade.ecl_cap:,.0f}) at {datetime.now().isoformat()}")
+
+    report = evaluate(cascade, api.ecl_model, *features(args.holdout))
+    for key, value in report.items():
+        print(f"   {key:<28}{value:,.4f}" if isinstance(value, float) else f"   {key:<28}{value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Portfolio rollups of impairment and 1 yr ECL by segment.
+
+A segment buckets the book on one loan input: ``tenor`` (months), ``arrears``
+(rentals in arrears), ``age`` band and ``rate`` band (effective rate, %) by
+default. Bucket ``i`` holds values in ``[edges[i], edges[i+1])``, the last one
+is open ended, values under the first edge get their own ``<edge`` bucket and
+missing values a ``missing`` one.
+
+Definitions can be replaced or added with a JSON file named by
+LASINDU_SEGMENTS_FILE::
+
+    {"tenor": {"column": "tenor", "edges": [0, 24, 48], "labels": ["short", "medium", "long"]}}
+
+and a request can pick segments by name or set its own edges with
+``name:edge,edge,...`` (e.g. ``rate:0,8,12,20``).
+
+``Rollup`` keeps per-bucket counts and sums (``np.bincount``) and takes the
+scored book a chunk at a time, so per-loan predictions never need to be held
+all at once.
+"""
+import json
+import math
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Summed per bucket, in this order
+MEASURES = ("loans", "facility_amount", "impairment", "ecl_1yr")
+
+
+@dataclass(frozen=True)
+class Segment:
+    name: str
+    column: str
+    edges: Tuple[float, ...]
+    labels: Optional[Tuple[str, ...]] = None
+
+    def __post_init__(self):
+        if not self.edges or any(b <= a for a, b in zip(self.edges, self.edges[1:])):
+            raise ValueError(f"Segment '{self.name}': edges must be increasing, got {list(self.edges)}")
+        if self.labels is not None and len(self.labels) != len(self.edges):
+            raise ValueError(f"Segment '{self.name}': expected {len(self.edges)} labels, got {len(self.labels)}")
+
+    @property
+    def buckets(self) -> List[str]:
+        """Labels by code: below the first edge, one per edge, then missing."""
+        if self.labels is not None:
+            labels = list(self.labels)
+        else:
+            labels = [f"[{lo:g}, {hi:g})" for lo, hi in zip(self.edges, self.edges[1:])]
+            labels.append(f"{self.edges[-1]:g}+")
+        return [f"<{self.edges[0]:g}"] + labels + ["missing"]
+
+    def codes(self, values: np.ndarray) -> np.ndarray:
+        codes = np.searchsorted(np.asarray(self.edges, dtype=float), values, side="right")
+        codes[np.isnan(values)] = len(self.edges) + 1
+        return codes
+
+
+DEFAULT_SEGMENTS = {
+    "tenor": Segment("tenor", "tenor", (0, 12, 24, 36, 48, 60)),
+    "arrears": Segment("arrears", "no_of_rental_in_arrears", (0, 1, 2, 4, 7),
+                       ("current", "1", "2-3", "4-6", "7+")),
+    "age": Segment("age", "age", (0, 25, 35, 45, 55, 65)),
+    "rate": Segment("rate", "effec_rate", (0, 5, 10, 15, 20, 25)),
+}
+
+
+def load_segments(path: Optional[str] = None) -> Dict[str, Segment]:
+    """The default segments, updated from the JSON file at ``path`` when given."""
+    segments = dict(DEFAULT_SEGMENTS)
+    if path:
+        with open(path) as f:
+            for name, spec in json.load(f).items():
+                labels = spec.get("labels")
+                segments[name] = Segment(name, spec.get("column", name), tuple(float(e) for e in spec["edges"]),
+                                         tuple(labels) if labels else None)
+    return segments
+
+
+def parse_segments(values: Optional[Iterable[str]], available: Dict[str, Segment],
+                   columns: Sequence[str]) -> List[Segment]:
+    """Segments requested as ``name`` (comma lists allowed) or ``name:edge,edge,...``; all when empty.
+
+    Raises ValueError for unknown names, bad edges or columns outside ``columns``.
+    """
+    selected: List[Segment] = []
+    for value in values or []:
+        if ":" in value:
+            name, _, edges = value.partition(":")
+            base = available.get(name)
+            try:
+                parsed = tuple(float(e) for e in edges.split(",") if e.strip())
+            except ValueError:
+                raise ValueError(f"Segment '{name}': edges must be numbers, got '{edges}'")
+            selected.append(Segment(name, base.column if base else name, parsed))
+        else:
+            for name in filter(None, (n.strip() for n in value.split(","))):
+                if name not in available:
+                    raise ValueError(f"Unknown segment '{name}'. Choose from: {', '.join(available)} "
+                                     f"or give edges as name:edge,edge")
+                selected.append(available[name])
+    if not selected:
+        selected = list(available.values())
+    for segment in selected:
+        if segment.column not in columns:
+            raise ValueError(f"Segment '{segment.name}': '{segment.column}' is not a loan input "
+                             f"({', '.join(columns)})")
+    return selected
+
+
+class Rollup:
+    """Per-bucket counts and sums of facility amount, impairment and ECL over the chunks added."""
+
+    def __init__(self, segments: Sequence[Segment]):
+        self.segments = list(segments)
+        self._sums = {s.name: np.zeros((len(s.buckets), len(MEASURES))) for s in self.segments}
+        self.chunks = 0
+
+    def add(self, inputs: Dict[str, np.ndarray], impairment: np.ndarray, ecl: np.ndarray) -> None:
+        """Fold in one scored chunk; ``inputs`` maps loan input columns to their values."""
+        weights = (None, np.asarray(inputs["facility_amount"], dtype=float), impairment, ecl)
+        for segment in self.segments:
+            sums = self._sums[segment.name]
+            codes = segment.codes(np.asarray(inputs[segment.column], dtype=float))
+            for k, w in enumerate(weights):
+                sums[:, k] += np.bincount(codes, weights=w, minlength=len(sums))
+        self.chunks += 1
+
+    def tables(self) -> Dict[str, Dict[str, list]]:
+        """``{segment: {column: values}}`` over the non-empty buckets"""
+        tables = {}
+        for segment in self.segments:
+            sums = self._sums[segment.name]
+            keep = sums[:, 0] > 0
+            loans, amount, impairment, ecl = (sums[keep, k] for k in range(len(MEASURES)))
+            tables[segment.name] = {
+                "bucket": [b for b, k in zip(segment.buckets, keep) if k],
+                "loans": loans.astype(int).tolist(),
+                "facility_amount": amount.tolist(),
+                "impairment": impairment.tolist(),
+                "ecl_1yr": ecl.tolist(),
+                "average_impairment": (impairment / loans).tolist(),
+                "average_ecl": (ecl / loans).tolist(),
+                "ecl_coverage": _ratio(ecl, amount),
+            }
+        return tables
+
+    def totals(self) -> Dict[str, float]:
+        """Whole-book sums (every segment holds the whole book; the first is used)"""
+        if not self.segments:
+            return {}
+        loans, amount, impairment, ecl = self._sums[self.segments[0].name].sum(axis=0)
+        return {"loans": int(loans), "facility_amount": float(amount), "impairment": float(impairment),
+                "ecl_1yr": float(ecl), "ecl_coverage": _ratio(np.array([ecl]), np.array([amount]))[0]}
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> List[Optional[float]]:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = numerator / denominator
+    return [None if not math.isfinite(r) else float(r) for r in ratio]
+
+
+SEGMENTS = load_segments(os.environ.get("LASINDU_SEGMENTS_FILE"))
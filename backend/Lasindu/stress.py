@@ -0,0 +1,195 @@
+"""
+Stress scenarios for impairment and 1 yr ECL: declarative shocks to loan inputs.
+
+A shock changes one loan input for the whole book: ``effec_rate+2`` (rates
+are in %, so +200bp), ``no_of_rental_in_arrears*2``, ``tenor+12`` or
+``age=30``; ``-`` subtracts. Shocked values are kept at the input's lower
+bound (no negative arrears) and rounded for integer inputs (tenor). A
+scenario is a name and one or more shocks, applied together.
+
+Defaults are in DEFAULT_SCENARIOS; a JSON file named by
+LASINDU_SCENARIOS_FILE replaces or adds scenarios::
+
+    {"rates_up_300bp": ["effec_rate+3", "flat_rate+3"]}
+
+and a request can pick scenarios by name or define one inline with
+``name:shock,shock,...`` (e.g. ``severe:effec_rate+3,no_of_rental_in_arrears+2``).
+
+The book is engineered once. ``shocked_features`` builds a scenario's
+feature matrix from that base, recomputing only the engineered features that
+read a shocked input, directly or through another feature (``with_inputs``,
+which /sweep also uses for its grid of one loan).
+"""
+import json
+import os
+import re
+from collections import ChainMap
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+OPERATORS = ("+", "-", "*", "=")
+_SHOCK = re.compile(r"^\s*(\w+)\s*([-+*=])\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*$")
+
+# (name, columns read, derivation) per engineered feature, in order
+Derivation = Tuple[str, Tuple[str, ...], Callable[[Mapping[str, Any]], Any]]
+
+
+@dataclass(frozen=True)
+class Shock:
+    column: str
+    op: str
+    value: float
+
+    def __str__(self) -> str:
+        return f"{self.column}{self.op}{self.value:g}"
+
+    def apply(self, values: np.ndarray) -> np.ndarray:
+        if self.op == "+":
+            return values + self.value
+        if self.op == "-":
+            return values - self.value
+        if self.op == "*":
+            return values * self.value
+        return np.full_like(values, self.value)
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    shocks: Tuple[Shock, ...]
+
+    @property
+    def columns(self) -> List[str]:
+        return list(dict.fromkeys(shock.column for shock in self.shocks))
+
+
+def parse_shock(text: str) -> Shock:
+    match = _SHOCK.match(text)
+    if not match:
+        raise ValueError(f"Shock '{text}' should look like column+value (operators: {' '.join(OPERATORS)}; "
+                         f"URL-encode + as %2B)")
+    column, op, value = match.groups()
+    return Shock(column, op, float(value))
+
+
+DEFAULT_SCENARIOS = {
+    "rate_up_200bp": Scenario("rate_up_200bp", (Shock("effec_rate", "+", 2.0),)),
+    "arrears_up_1": Scenario("arrears_up_1", (Shock("no_of_rental_in_arrears", "+", 1.0),)),
+    "arrears_x2": Scenario("arrears_x2", (Shock("no_of_rental_in_arrears", "*", 2.0),)),
+    "tenor_up_12m": Scenario("tenor_up_12m", (Shock("tenor", "+", 12.0),)),
+}
+
+
+def load_scenarios(path: Optional[str] = None) -> Dict[str, Scenario]:
+    """The default scenarios, updated from the JSON file at ``path`` when given."""
+    scenarios = dict(DEFAULT_SCENARIOS)
+    if path:
+        with open(path) as f:
+            for name, shocks in json.load(f).items():
+                scenarios[name] = Scenario(name, tuple(parse_shock(s) for s in shocks))
+    return scenarios
+
+
+def parse_scenarios(values: Optional[Iterable[str]], available: Dict[str, Scenario],
+                    columns: Sequence[str]) -> List[Scenario]:
+    """Scenarios requested as ``name`` (comma lists allowed) or ``name:shock,shock,...``; all when empty.
+
+    Raises ValueError for unknown names, malformed shocks, shocks to columns
+    outside ``columns`` and repeated scenario names.
+    """
+    selected: List[Scenario] = []
+    for value in values or []:
+        if ":" in value:
+            name, _, shocks = value.partition(":")
+            parsed = tuple(parse_shock(s) for s in shocks.split(",") if s.strip())
+            if not parsed:
+                raise ValueError(f"Scenario '{name}' has no shocks")
+            selected.append(Scenario(name.strip(), parsed))
+        else:
+            for name in filter(None, (n.strip() for n in value.split(","))):
+                if name not in available:
+                    raise ValueError(f"Unknown scenario '{name}'. Choose from: {', '.join(available)} "
+                                     f"or define one as name:column+value,...")
+                selected.append(available[name])
+    if not selected:
+        selected = list(available.values())
+    names = [scenario.name for scenario in selected]
+    repeated = sorted({name for name in names if names.count(name) > 1})
+    if repeated:
+        raise ValueError(f"Scenario names must be unique: {', '.join(repeated)}")
+    for scenario in selected:
+        for shock in scenario.shocks:
+            if shock.column not in columns:
+                raise ValueError(f"Scenario '{scenario.name}': cannot shock '{shock.column}' "
+                                 f"(choose from {', '.join(columns)})")
+    return selected
+
+
+def affected_features(columns: Iterable[str], derivations: Sequence[Derivation]) -> List[str]:
+    """Engineered features reading any of ``columns``, directly or through earlier features, in order."""
+    changed = set(columns)
+    affected = []
+    for name, reads, _ in derivations:
+        if changed.intersection(reads):
+            changed.add(name)
+            affected.append(name)
+    return affected
+
+
+def shocked_features(inputs: pd.DataFrame, base: pd.DataFrame, scenario: Scenario,
+                     derivations: Sequence[Derivation], renames: Mapping[str, str],
+                     bounds: Optional[Mapping[str, Any]] = None) -> pd.DataFrame:
+    """``base`` (the engineered book) with ``scenario`` applied.
+
+    ``inputs`` are the loan inputs ``base`` was engineered from and
+    ``renames`` maps them to their names in ``base``. ``bounds`` maps input
+    names to their schema ``Column`` (lower bound ``ge``, ``int`` dtype).
+    Only the shocked inputs and the features they reach are recomputed.
+    """
+    changed = {
+        column: pd.Series(shocked_values(inputs[column], scenario, column, bounds), index=inputs.index)
+        for column in scenario.columns
+    }
+    return with_inputs(inputs, base, changed, derivations, renames)
+
+
+def shocked_values(values: Any, scenario: Scenario, column: str,
+                   bounds: Optional[Mapping[str, Any]] = None) -> np.ndarray:
+    """float64 ``values`` of input ``column`` after ``scenario``'s shocks to it, in order
+    (``bounds`` as in ``shocked_features``); unshocked columns come back unchanged."""
+    values = np.asarray(values, dtype=float)
+    spec = (bounds or {}).get(column)
+    for shock in scenario.shocks:
+        if shock.column != column:
+            continue
+        values = shock.apply(values)
+        if spec is not None and spec.dtype == "int":
+            values = np.round(values)
+        if spec is not None and spec.ge is not None:
+            values = np.maximum(values, spec.ge)
+    return values
+
+
+def with_inputs(inputs: pd.DataFrame, base: pd.DataFrame, changed: Mapping[str, Any],
+                derivations: Sequence[Derivation], renames: Mapping[str, str]) -> pd.DataFrame:
+    """``base`` with the ``changed`` input values (float64, aligned with ``inputs``) and the
+    engineered features reading them recomputed; everything else is taken from ``base``.
+    Recomputed columns are stored in ``base``'s dtypes (float32 when it is compact)."""
+    changed = dict(changed)
+    # Feature values by their names inside engineer_features: changed, then the unchanged rows
+    unchanged = {column: inputs[column] for column in renames}
+    unchanged.update({name: base[name] for name, _, _ in derivations})
+    values = ChainMap(changed, unchanged)
+    for name in affected_features(list(changed), derivations):
+        derive = next(d for n, _, d in derivations if n == name)
+        changed[name] = derive(values)
+
+    updates = {renames.get(name, name): value for name, value in changed.items()}
+    return base.assign(**updates).astype({column: base[column].dtype for column in updates})
+
+
+SCENARIOS = load_scenarios(os.environ.get("LASINDU_SCENARIOS_FILE"))
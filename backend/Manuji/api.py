@@ -1,19 +1,51 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import Depends, FastAPI, HTTPException, UploadFile, File, Query, Request
 from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from functools import partial
 from typing import List, Optional, Dict, Any
 from contextlib import asynccontextmanager
-import joblib
+from pathlib import Path
 import pandas as pd
 import numpy as np
 from glob import glob
 import io
 import os
+import sys
 import tempfile
 from datetime import datetime
 from pydantic import BaseModel, Field
 
+# Make the shared backend helpers importable when run from this directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.responses import BATCH_FORMATS, FastJSONResponse, batch_payload, check_format, parse_fields
+from common.columnar import (
+    accepts_binary, batch_frame_dependency, batch_openapi, write_frame
+)
+from common.validation import Column, FrameSchema
+from common.cache import PredictionCache, file_version
+from common.dtypes import compact_frame, encode_categories
+from common import metrics, profiling, warmup
+from common.distill import check_tier, load_students, with_tier
+from common.shadow import ShadowEvaluator, challengers
+from common.store import LocalStore
+from labeling import FEATURE_DTYPES
+from model_store import LazyModels, ModelPackage, latest_package
+
+BATCH_RESULT_FIELDS = ["record_id", "prediction", "confidence"]
+TIER_QUERY = "accurate | fast (the model's distilled student, see /model/info; the model itself when it has none)"
+
 predictor = None
 
+# (label, confidence) per prepared feature vector and model; cleared whenever a package loads
+prediction_cache = PredictionCache()
+
+# Directory holding packages/ (or legacy all_models_package_*.pkl files), read when the models load
+MODEL_DIR = os.environ.get('MANUJI_MODEL_DIR', 'models')
+
+# Challenger-vs-champion comparisons of shadowed requests (common/shadow.py), shared by every worker process
+STATE_DB = os.environ.get('MANUJI_STATE_DB', str(Path(__file__).resolve().parent / '.state' / 'manuji.db'))
+shadow = ShadowEvaluator('manuji', LocalStore(STATE_DB))
+
 
 class BranchInput(BaseModel):
     Branch: Optional[Any] = Field(..., description="Branch identifier (string or encoded int)")
@@ -44,17 +76,71 @@ class BatchBranchRequest(BaseModel):
     data: List[BranchInput]
 
 
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Load latest model package at startup."""
+# Column-wise mirror of BranchInput (by alias) used to validate batch bodies (JSON, Arrow and .npy)
+BRANCH_SCHEMA = FrameSchema([
+    Column('Branch', 'any', nullable=True),
+    Column('Facility Type', 'str', nullable=True, aliases=('Facility_Type',)),
+    Column('FacilityAmount', 'float', nullable=True),
+    Column('Effective Rate', 'float', nullable=True, aliases=('Effective_Rate',)),
+    Column('No of Rental in arrears', 'int', nullable=True, aliases=('No_of_Rental_in_arrears',)),
+    Column('Age', 'int', nullable=True),
+    Column('ArrearsCapital', 'float', required=False, default=0.0, nullable=True),
+    Column('ArrearsInterest', 'float', required=False, default=0.0, nullable=True),
+    Column('ArrearsVat', 'float', required=False, default=0.0, nullable=True),
+    Column('ArrearsOD', 'float', required=False, default=0.0, nullable=True),
+    Column('FutureCapital', 'float', required=False, default=0.0, nullable=True),
+    Column('FutureInterest', 'float', required=False, default=0.0, nullable=True),
+    Column('NET-OUTSTANDING', 'float', nullable=True, aliases=('NET_OUTSTANDING',)),
+    Column('Status', 'str', nullable=True),
+    Column('NPLStatus', 'str', nullable=True),
+    Column('Last Receipt Paid Amount', 'float', required=False, default=0.0, nullable=True,
+           aliases=('Last_Receipt_Paid_Amount',)),
+    Column('CD_Collection_Rental', 'float', required=False, default=0.0, nullable=True),
+    Column('ClaimablePercentage', 'float', required=False, default=100.0, nullable=True),
+    Column('Arrears_Ratio', 'float', required=False, default=None, nullable=True),
+])
+
+branch_batch_frame = batch_frame_dependency(BRANCH_SCHEMA, 'data')
+
+
+
+def load_predictor() -> bool:
+    """Load the latest model package (versioned packages first, then legacy .pkl files)."""
     global predictor
     try:
-        model_files = glob('models/all_models_package_*.pkl')
-        if not model_files:
-            print("⚠️ No model package found in models/. Start by running the training script.")
+        package_dir = latest_package(MODEL_DIR)
+        model_files = glob(os.path.join(MODEL_DIR, 'all_models_package_*.pkl'))
+        if package_dir is not None:
+            package = ModelPackage(package_dir)
+            preprocessing = package.load_preprocessing()
+            models = LazyModels(package)
+            models[package.best_model_name]  # the default model loads now, the others on first use
+            # Students (distill.py) are served only for the exact artifacts they were distilled from
+            model_versions = {name: artifact['sha256']
+                              for name, artifact in package.manifest['artifacts']['models'].items()}
+            predictor = {
+                'models': models,
+                'scaler': preprocessing['scaler'],
+                'feature_columns': package.feature_columns,
+                'best_model_name': package.best_model_name,
+                'encoders': preprocessing.get('encoders', {}),
+                'target_label_encoder': preprocessing.get('target_label_encoder'),
+                'timestamp': package.manifest.get('created'),
+                'version': package.version,
+                'inference_costs': package.manifest['metrics'].get('inference_costs', {}),
+                'selection': package.manifest['metrics'].get('selection'),
+                'model_versions': model_versions,
+                'students': load_students(MODEL_DIR, model_versions),
+                'package_version': f"v{package.version}|{file_version(package_dir / 'manifest.json')}"
+            }
+            prediction_cache.reset(predictor['package_version'])
+            timings = ', '.join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in package.load_seconds.items())
+            print(f"✅ Loaded model package v{package.version}: {package_dir} ({timings})")
+        elif not model_files:
+            print(f"⚠️ No model package found in {MODEL_DIR}/. Start by running the training script.")
             predictor = None
         else:
+            import joblib
             latest = max(model_files)
             package = joblib.load(latest)
             predictor = {
@@ -66,11 +152,24 @@ async def lifespan(app: FastAPI):
                 'target_label_encoder': package.get('target_label_encoder', None),
                 'timestamp': package.get('timestamp')
             }
-            print(f"✅ Loaded model package: {latest}")
+            predictor['model_versions'] = {name: f"{file_version(latest)}|{name}" for name in predictor['models']}
+            predictor['students'] = load_students(MODEL_DIR, predictor['model_versions'])
+            predictor['package_version'] = file_version(latest)
+            prediction_cache.reset(predictor['package_version'])
+            print(f"✅ Loaded legacy model package: {latest}")
     except Exception as e:
         print(f"❌ Error loading models: {e}")
         predictor = None
+    return predictor is not None
 
+
+# Models load on the first prediction, POST /warmup or at startup per MODEL_WARMUP (common/warmup.py)
+model_loader = warmup.ModelLoader("manuji", load_predictor)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    model_loader.start()
     yield
 
 
@@ -81,14 +180,21 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Per-stage latency histograms and request counters on GET /metrics
+metrics.install(app, "manuji", cache_stats=prediction_cache.stats)
+# Opt-in sampling profiles of single requests (X-Profile header, see common/profiling.py)
+profiling.install(app, "manuji")
+warmup.install(app, "manuji")
+
 
 def _normalize(name: str) -> str:
     return ''.join(ch for ch in str(name).lower() if ch.isalnum())
 
 
-def prepare_input(df: pd.DataFrame) -> pd.DataFrame:
+def prepare_input(df: pd.DataFrame, compact: bool = True) -> pd.DataFrame:
     """Prepare input DataFrame to match predictor['feature_columns'].
     Supports raw columns (e.g. 'Status', 'NPLStatus') if encoders are present.
+    Columns use the compact FEATURE_DTYPES unless ``compact`` is False.
     Raises Exception if required features cannot be fulfilled.
     """
     global predictor
@@ -98,8 +204,8 @@ def prepare_input(df: pd.DataFrame) -> pd.DataFrame:
     expected = list(predictor['feature_columns'])
     encoders = predictor.get('encoders', {}) or {}
 
-    # Work on a copy
-    df_work = df.copy()
+    # Work on a compact copy: categorical text columns are encoded once per category
+    df_work = compact_frame(df, FEATURE_DTYPES) if compact else df.copy()
 
     # For each expected column try to produce it
     produced = {}
@@ -116,7 +222,8 @@ def prepare_input(df: pd.DataFrame) -> pd.DataFrame:
                 # handle NPLStatus mapping (likely saved as dict)
                 if src == 'NPLStatus' and isinstance(encoders.get('NPLStatus'), dict):
                     mapping = encoders['NPLStatus'].get('mapping', {})
-                    produced[col] = df_work[src].astype(str).str.upper().map(mapping).fillna(0).astype(int)
+                    produced[col] = pd.Series(encode_categories(df_work[src], mapping, normalize=str.upper),
+                                              index=df_work.index)
                 else:
                     enc = encoders.get(src)
                     if enc is not None and hasattr(enc, 'classes_'):
@@ -124,7 +231,7 @@ def prepare_input(df: pd.DataFrame) -> pd.DataFrame:
                         # unknown values fallback to index 0 (most-common fallback)
                         classes = list(enc.classes_)
                         mapping = {str(c): i for i, c in enumerate(classes)}
-                        produced[col] = df_work[src].astype(str).map(mapping).fillna(0).astype(int)
+                        produced[col] = pd.Series(encode_categories(df_work[src], mapping), index=df_work.index)
                     else:
                         # try normalization match
                         # if column already present under variant
@@ -218,8 +325,9 @@ def prepare_input(df: pd.DataFrame) -> pd.DataFrame:
                 raise Exception(f"Missing required input column for prediction: '{col}'")
 
     # Build final DataFrame
-    # If Arrears_Ratio is expected but not produced, compute from available fields
-    if 'Arrears_Ratio' in expected and (produced.get('Arrears_Ratio') is None):
+    # If Arrears_Ratio is expected but not produced (or left null), compute from available fields
+    supplied_ratio = produced.get('Arrears_Ratio')
+    if 'Arrears_Ratio' in expected and (supplied_ratio is None or supplied_ratio.isna().any()):
         def _find_col(name):
             # try exact
             if name in df_work.columns:
@@ -254,10 +362,105 @@ def prepare_input(df: pd.DataFrame) -> pd.DataFrame:
         except Exception:
             ratio = pd.Series([0] * len(df_work), index=df_work.index)
 
-        produced['Arrears_Ratio'] = ratio
+        # A supplied ratio is kept where given
+        produced['Arrears_Ratio'] = ratio if supplied_ratio is None else supplied_ratio.astype(float).fillna(ratio)
 
     final_df = pd.DataFrame({k: (v if isinstance(v, pd.Series) else pd.Series(v, index=df_work.index)) for k, v in produced.items()})
-    return final_df[expected]
+    final_df = final_df[expected]
+    return compact_frame(final_df, FEATURE_DTYPES) if compact else final_df
+
+
+def decode_labels(preds: Any, package: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Class labels of encoded model outputs."""
+    encoder = (package or predictor).get('target_label_encoder')
+    if encoder is not None and hasattr(encoder, 'inverse_transform'):
+        return [str(l) for l in encoder.inverse_transform(np.asarray(preds, dtype=int))]
+    return ['Good' if int(p) == 0 else 'Poor' for p in preds]
+
+
+def predict_prepared(X: pd.DataFrame, model_name: str, model: Any) -> List[tuple]:
+    """(label, confidence) per prepared row, scoring only rows missing from the cache."""
+    def compute(rows: np.ndarray) -> List[tuple]:
+        # Scale in float64 like training; compact float32 scaling shifts values sitting on tree cuts
+        with metrics.stage('scaling'):
+            X_scaled = predictor['scaler'].transform(X.iloc[rows].astype(np.float64))
+        with metrics.stage('inference'):
+            preds = model.predict(X_scaled)
+            # one predict_proba call for the whole batch instead of one per row
+            probas = model.predict_proba(X_scaled) if hasattr(model, 'predict_proba') else None
+        metrics.count_model(model_name, len(rows))
+        labels = decode_labels(preds)
+
+        if probas is not None:
+            confs = probas.max(axis=1).astype(float).tolist()
+        else:
+            confs = [None] * len(labels)
+        return list(zip(labels, confs))
+
+    return prediction_cache.lookup(model_name, X.to_numpy(dtype=float), compute)
+
+
+def positive_class(model: Any, package: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """Label of the class a binary model's ``predict_proba[:, 1]`` scores (None for other models)"""
+    classes = getattr(model, 'classes_', None)
+    if classes is None or len(classes) != 2 or not hasattr(model, 'predict_proba'):
+        return None
+    return decode_labels([classes[1]], package)[0]
+
+
+def score_challenger(package: Dict[str, Any], name: str, X: pd.DataFrame) -> tuple:
+    """(labels, positive-class probabilities or None) of package model ``name`` on prepared rows, uncached"""
+    model = package['models'][name]
+    X_scaled = package['scaler'].transform(X.astype(np.float64))
+    labels = decode_labels(model.predict(X_scaled), package)
+    scores = model.predict_proba(X_scaled)[:, 1] if positive_class(model, package) is not None else None
+    return labels, scores
+
+
+def shadow_results(namespace: str, model: Any, X: pd.DataFrame, results: List[tuple]) -> None:
+    """Offer what the champion answered to the shadow evaluator; the challengers score later, off the request.
+
+    A student answering tier=fast is the champion under its cache
+    namespace, so its own teacher is among its challengers.
+    """
+    if not shadow.enabled:
+        return
+    labels = [label for label, _ in results]
+    positive = positive_class(model)
+    scores = None
+    if positive is not None and all(conf is not None for _, conf in results):
+        scores = [conf if label == positive else 1 - conf for label, conf in results]
+    shadow.offer(namespace, X, labels, scores, challengers(predictor['models'], namespace),
+                 partial(score_challenger, predictor), predictor.get('package_version', ''))
+
+
+def serving_model(model_name: Optional[str], tier: str = 'accurate', X: Optional[pd.DataFrame] = None) -> tuple:
+    """(model name, model, cache namespace, tier that answers); the package's best model when no name is given.
+
+    The fast tier uses the model's distilled student when there is one, without loading the model itself,
+    unless the prepared rows ``X`` have missing values the student was not fitted on (Student.accepts).
+    """
+    if model_name is None:
+        model_name = predictor['best_model_name']
+    student = predictor.get('students', {}).get(model_name) if tier == 'fast' else None
+    if student is not None and (X is None or student.accepts(X)):
+        return model_name, student, f"{model_name}:fast", 'fast'
+    model = predictor['models'].get(model_name)
+    if model is None:
+        raise HTTPException(status_code=400, detail=f"Model '{model_name}' not available")
+    return model_name, model, model_name, 'accurate'
+
+
+def score_branch(record: Dict[str, Any], model_name: Optional[str] = None, tier: str = 'accurate') -> Dict[str, Any]:
+    """Prediction for one BranchInput record (by alias) with ``model_name`` or the package's best model."""
+    with metrics.stage('features'):
+        X = prepare_input(pd.DataFrame([record]))
+
+    model_name, model, namespace, served = serving_model(model_name, tier, X)
+    results = predict_prepared(X, namespace, model)
+    shadow_results(namespace, model, X, results)
+    pred_label, confidence = results[0]
+    return {"prediction": pred_label, "confidence": confidence, "model_used": model_name, "tier": served}
 
 
 @app.get('/', tags=['General'])
@@ -267,40 +470,29 @@ async def root():
 
 @app.get('/health', tags=['General'])
 async def health():
-    loaded = predictor is not None
-    return {"status": "healthy" if loaded else "no_models", "models_loaded": loaded, "timestamp": datetime.now().isoformat()}
+    # Not loaded yet is still healthy: the models load on first use
+    status = "no_models" if model_loader.state == warmup.FAILED else "healthy"
+    return {"status": status, "models_loaded": model_loader.loaded, "models": model_loader.state,
+            "timestamp": datetime.now().isoformat()}
 
 
 @app.post('/predict', tags=['Prediction'])
-async def predict_single(payload: BranchInput, model_name: Optional[str] = None):
-    """Accepts a single JSON object with feature values and returns prediction."""
-    if predictor is None:
+@metrics.timed
+async def predict_single(payload: BranchInput, model_name: Optional[str] = None,
+                         tier: Optional[str] = Query(None, description=TIER_QUERY)):
+    """Accepts a single JSON object with feature values and returns prediction.
+
+    `tier=fast` scores with the model's distilled student when one is
+    installed; `tier` in the body and the `X-Serving-Tier` header name the
+    tier that answered."""
+    tier = check_tier(tier)
+    if not await model_loader.ready():
         raise HTTPException(status_code=503, detail="Models not loaded. Run training script first.")
 
     try:
         # use aliases so field names match original data columns (e.g. 'Facility Type')
-        df = pd.DataFrame([payload.dict(by_alias=True)])
-        X = prepare_input(df)
-        X_scaled = predictor['scaler'].transform(X)
-
-        if model_name is None:
-            model_name = predictor['best_model_name']
-        model = predictor['models'].get(model_name)
-        if model is None:
-            raise HTTPException(status_code=400, detail=f"Model '{model_name}' not available")
-
-        pred_num = int(model.predict(X_scaled)[0])
-        if predictor.get('target_label_encoder') is not None and hasattr(predictor['target_label_encoder'], 'inverse_transform'):
-            pred_label = predictor['target_label_encoder'].inverse_transform([pred_num])[0]
-        else:
-            pred_label = 'Good' if pred_num == 0 else 'Poor'
-
-        confidence = None
-        if hasattr(model, 'predict_proba'):
-            proba = model.predict_proba(X_scaled)[0]
-            confidence = float(max(proba))
-
-        return {"prediction": pred_label, "confidence": confidence, "model_used": model_name}
+        result = score_branch(payload.dict(by_alias=True), model_name, tier)
+        return with_tier(FastJSONResponse(result), result['tier'])
 
     except HTTPException:
         raise
@@ -308,38 +500,52 @@ async def predict_single(payload: BranchInput, model_name: Optional[str] = None)
         raise HTTPException(status_code=500, detail=f"Prediction error: {e}")
 
 
-@app.post('/predict/batch', tags=['Prediction'])
-async def predict_batch(payload: BatchBranchRequest, model_name: Optional[str] = None):
-    if predictor is None:
+@app.post('/predict/batch', tags=['Prediction'], openapi_extra=batch_openapi(BatchBranchRequest))
+@metrics.timed
+async def predict_batch(
+    request: Request,
+    df: pd.DataFrame = Depends(branch_batch_frame),
+    model_name: Optional[str] = None,
+    response_format: str = Query("rows", alias="format", description="rows | compact | columnar"),
+    fields: Optional[str] = Query(None, description="Comma separated per-record fields, e.g. prediction"),
+    tier: Optional[str] = Query(None, description=TIER_QUERY)
+):
+    """Score many facilities. The body may be JSON, an Arrow IPC stream or a `.npy`
+    array; `Accept` selects a binary response in the same formats. `tier=fast`
+    works as on `/predict`."""
+    check_format(response_format, BATCH_FORMATS)
+    selected = parse_fields(fields, BATCH_RESULT_FIELDS)
+    tier = check_tier(tier)
+    if not await model_loader.ready():
         raise HTTPException(status_code=503, detail="Models not loaded. Run training script first.")
+    metrics.observe_batch(len(df))
     try:
-        # build DataFrame from Pydantic models using aliases
-        df = pd.DataFrame([item.dict(by_alias=True) for item in payload.data])
-        X = prepare_input(df)
-        X_scaled = predictor['scaler'].transform(X)
-
-        if model_name is None:
-            model_name = predictor['best_model_name']
-        model = predictor['models'].get(model_name)
-        if model is None:
-            raise HTTPException(status_code=400, detail=f"Model '{model_name}' not available")
-
-        preds = model.predict(X_scaled)
-        results = []
-        for i, p in enumerate(preds):
-            pnum = int(p)
-            if predictor.get('target_label_encoder') is not None and hasattr(predictor['target_label_encoder'], 'inverse_transform'):
-                plabel = predictor['target_label_encoder'].inverse_transform([pnum])[0]
-            else:
-                plabel = 'Good' if pnum == 0 else 'Poor'
-
-            conf = None
-            if hasattr(model, 'predict_proba'):
-                conf = float(max(model.predict_proba(X_scaled[i:i+1])[0]))
-
-            results.append({"record_id": i, "prediction": plabel, "confidence": conf})
-
-        return {"predictions": results, "total_records": len(results), "model_used": model_name}
+        with metrics.stage('features'):
+            X = prepare_input(df)
+
+        model_name, model, namespace, served = serving_model(model_name, tier, X)
+        results = predict_prepared(X, namespace, model)
+        shadow_results(namespace, model, X, results)
+        labels = [label for label, _ in results]
+        confs = [conf for _, conf in results]
+
+        binary = accepts_binary(request.headers.get("accept"))
+        with metrics.stage('serialization'):
+            if binary:
+                return with_tier(write_frame(
+                    pd.DataFrame({"record_id": np.arange(len(labels)), "prediction": labels,
+                                  "confidence": np.asarray(confs, dtype=float)}),
+                    binary
+                ), served)
+
+            return with_tier(FastJSONResponse(batch_payload(
+                columns={"record_id": list(range(len(labels))), "prediction": labels, "confidence": confs},
+                constants={},
+                fmt=response_format,
+                fields=selected,
+                key="predictions",
+                summary={"total_records": len(labels), "model_used": model_name, "tier": served}
+            )), served)
 
     except HTTPException:
         raise
@@ -349,7 +555,7 @@ async def predict_batch(payload: BatchBranchRequest, model_name: Optional[str] =
 
 @app.post('/predict/upload', tags=['Prediction'])
 async def predict_from_file(file: UploadFile = File(...), model_name: Optional[str] = None):
-    if predictor is None:
+    if not await model_loader.ready():
         raise HTTPException(status_code=503, detail="Models not loaded. Run training script first.")
     try:
         contents = await file.read()
@@ -361,7 +567,7 @@ async def predict_from_file(file: UploadFile = File(...), model_name: Optional[s
             raise HTTPException(status_code=400, detail="File must be CSV or Excel")
 
         X = prepare_input(df)
-        X_scaled = predictor['scaler'].transform(X)
+        X_scaled = predictor['scaler'].transform(X.astype(np.float64))
 
         if model_name is None:
             model_name = predictor['best_model_name']
@@ -400,20 +606,45 @@ async def predict_from_file(file: UploadFile = File(...), model_name: Optional[s
         raise HTTPException(status_code=500, detail=f"File processing error: {e}")
 
 
+@app.get('/cache/stats', tags=['Model'])
+async def cache_stats():
+    """Prediction cache size, hit ratio and eviction counters."""
+    return prediction_cache.stats()
+
+
 @app.get('/model/info', tags=['Model'])
 async def model_info():
-    if predictor is None:
+    if not await model_loader.ready():
         raise HTTPException(status_code=503, detail="Models not loaded")
     return {
         'available_models': list(predictor['models'].keys()),
+        'loaded_models': getattr(predictor['models'], 'loaded', list(predictor['models'].keys())),
         'best_model': predictor.get('best_model_name'),
         'feature_columns': predictor.get('feature_columns'),
-        'timestamp': predictor.get('timestamp')
+        'timestamp': predictor.get('timestamp'),
+        'version': predictor.get('version'),
+        # Measured by the trainer: single-row/batch latency and memory per model, and why best_model was picked
+        'inference_costs': predictor.get('inference_costs', {}),
+        'selection': predictor.get('selection'),
+        # Distilled students answering tier=fast: fidelity and serving costs against their model
+        'fast_tier': {name: student.info() for name, student in predictor.get('students', {}).items()}
     }
 
+@app.get('/shadow/stats', tags=['Model'])
+async def shadow_stats(all_versions: bool = False):
+    """Challengers against the champion on shadowed requests: label agreement and score deltas.
+
+    Score deltas are in positive-class probability (challenger minus
+    champion). Only the loaded package's comparisons unless `all_versions`.
+    """
+    if not await model_loader.ready():
+        raise HTTPException(status_code=503, detail="Models not loaded")
+    return await run_in_threadpool(shadow.summary, None if all_versions else predictor.get('package_version'))
+
+
 @app.get('/model/feature_importance', tags=['Model'])
 async def feature_importance(model_name: Optional[str] = None):
-    if predictor is None:
+    if not await model_loader.ready():
         raise HTTPException(status_code=503, detail="Models not loaded")
     
     if model_name is None:
@@ -0,0 +1,191 @@
+"""
+Distil the prediction models into lightweight students for the ``fast`` serving tier.
+
+Teachers, each distilled on the feature matrix it is served with:
+
+    manuji     the package's branch performance models (forests, boosting, ...)
+    kaveesha   the Random Forest PD model (other models with --models)
+    lasindu    the stacking ensemble behind the 1 yr ECL
+
+The transfer set is unlabelled inputs in the service's request columns: a
+CSV/Excel extract (``--data``; Manuji reads the raw training spreadsheet as
+/predict/upload does) or ``--synthetic N`` rows from ``benchmarks.data``,
+which only cover the input ranges and are meant for trying the pipeline.
+Students and their fidelity are described in ``common/distill.py``; this
+script also measures the teacher's and the student's serving costs
+(serving_costs.measure_inference_costs), prints the report, writes each
+student to ``<models>/students/`` and, with ``--report``, the report as
+JSON. The services pick students up the next time their models load.
+
+Run from this directory::
+
+    python distill.py manuji --data daily_summary.xlsx
+    python distill.py kaveesha --model-dir ../Kaveesha/models --data customers.csv
+    python distill.py lasindu --model-dir ../../models/Lasindu --data book.csv
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Make the shared backend helpers importable when run from this directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.distill import CANDIDATES, distill, student_path  # noqa: E402
+from common.services import use_model_dir  # noqa: E402
+from serving_costs import measure_inference_costs  # noqa: E402
+
+SERVICES = ('manuji', 'kaveesha', 'lasindu')
+DEFAULT_MODEL_DIRS = {'manuji': '.', 'kaveesha': '../Kaveesha/models', 'lasindu': '.'}
+# Rows the serving costs are measured on
+COST_ROWS = 2000
+# Fidelity a student needs (common.distill.within_bounds): Manuji answers with a label and its
+# confidence, Kaveesha with the PD itself, Lasindu with the ECL amount
+DEFAULT_BOUNDS = {
+    'manuji': {'min_agreement': 0.98, 'max_prob_error': 0.05},
+    'kaveesha': {'min_agreement': 0.99, 'max_prob_error': 0.02},
+    'lasindu': {'min_r2': 0.99},
+}
+
+# name -> (teacher, kind, teacher version, feature matrix)
+Teachers = Dict[str, Tuple[Any, str, str, np.ndarray]]
+
+
+def manuji_teachers(model_dir: str, df: pd.DataFrame, names: Optional[List[str]]) -> Tuple[Teachers, Path]:
+    api = use_model_dir('manuji', model_dir)
+    if not api.model_loader.ensure():
+        raise SystemExit(f"No Manuji model package under {api.MODEL_DIR}")
+    # Through the request schema like /predict/batch: columns a request may leave null (Arrears_Ratio) are
+    # null here too, so the fidelity check sees the missing values served requests have
+    X = api.predictor['scaler'].transform(api.prepare_input(api.BRANCH_SCHEMA.validate_frame(df)).astype(np.float64))
+    teachers = {}
+    for name in names or list(api.predictor['models']):
+        model = api.predictor['models'][name]
+        if not hasattr(model, 'predict_proba'):
+            print(f"⚠️ Skipping {name}: no predict_proba to distil")
+            continue
+        teachers[name] = (model, 'classifier', api.predictor['model_versions'][name], X)
+    return teachers, Path(api.MODEL_DIR)
+
+
+def kaveesha_teachers(model_dir: str, df: pd.DataFrame, names: Optional[List[str]]) -> Tuple[Teachers, Path]:
+    api = use_model_dir('kaveesha', model_dir)
+    models = api.prediction_models
+    if not models.loader.ensure():
+        raise SystemExit(f"No Kaveesha models in {model_dir}")
+    frame = api.calculate_derived_features_frame(api.PREDICTION_SCHEMA.validate_frame(df))
+    teachers = {}
+    for name in names or ['random_forest']:
+        if name not in models.model_versions:
+            raise SystemExit(f"Model '{name}' is not loaded. Loaded: {', '.join(models.model_versions)}")
+        teachers[name] = (models.models[name], 'classifier', models.model_versions[name],
+                          models.feature_matrix(frame, name))
+    return teachers, models.model_dir
+
+
+def lasindu_teachers(model_dir: str, df: pd.DataFrame, names: Optional[List[str]]) -> Tuple[Teachers, Path]:
+    api = use_model_dir('lasindu', model_dir)
+    if not api.model_loader.ensure():
+        raise SystemExit(f"Lasindu models could not be loaded from {model_dir}")
+    engineered = api.engineer_features(api.LOAN_SCHEMA.validate_frame(df))
+    X = api.scaler.transform(engineered.astype(np.float64))
+    return {'ecl': (api.ecl_model, 'regressor', api.full_model_version, X)}, Path(api.MODEL_DIR)
+
+
+TEACHERS = {'manuji': manuji_teachers, 'kaveesha': kaveesha_teachers, 'lasindu': lasindu_teachers}
+
+
+def transfer_rows(service: str, data: Optional[str], synthetic: int, seed: int) -> pd.DataFrame:
+    if data:
+        return pd.read_excel(data) if data.lower().endswith(('.xlsx', '.xls')) else pd.read_csv(data)
+    from benchmarks.data import synthetic_branch_rows, synthetic_loans, synthetic_requests
+    generate = {'manuji': synthetic_branch_rows, 'kaveesha': synthetic_requests, 'lasindu': synthetic_loans}[service]
+    return generate(synthetic, seed)
+
+
+def serving_costs(teacher: Any, student: Any, X: np.ndarray) -> Dict[str, Any]:
+    """Teacher and student latency/memory on the same rows, and the teacher/student ratios"""
+    costs = measure_inference_costs({'teacher': teacher, 'student': student}, X[:COST_ROWS])
+    teacher_costs, student_costs = costs['teacher'], costs['student']
+    ratios = {
+        key: round(teacher_costs[key] / student_costs[key], 2) if student_costs[key] else None
+        for key in ('single_row_p95_ms', 'batch_ms', 'memory_bytes', 'serialized_bytes')
+    }
+    return {'costs': costs, 'teacher_over_student': ratios}
+
+
+def print_report(name: str, report: Dict[str, Any], path: Path) -> None:
+    status = "within bounds" if report['within_bounds'] else "OUTSIDE the bounds (closest candidate kept)"
+    print(f"\n🎓 {name}: {report['student']} student, {status}" + (f" -> {path}" if report['saved'] else ""))
+    for candidate, scores in report['candidates'].items():
+        marker = '  ⭐' if candidate == report['student'] else ''
+        print(f"   {candidate:<8}" + "  ".join(f"{key} {value:.4f}" for key, value in scores.items()) + marker)
+    costs, ratios = report['costs'], report['teacher_over_student']
+    for role in ('teacher', 'student'):
+        cost = costs[role]
+        print(f"   {role:<8}1 row p95 {cost['single_row_p95_ms']:.3f} ms   batch {cost['batch_ms']:.1f} ms/"
+              f"{cost['batch_rows']}   memory {cost['memory_bytes'] / 2**20:.2f} MB   "
+              f"pickled {cost['serialized_bytes'] / 2**20:.2f} MB")
+    print(f"   savings 1 row p95 x{ratios['single_row_p95_ms']}, batch x{ratios['batch_ms']}, "
+          f"memory x{ratios['memory_bytes']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Distil the prediction models into fast-tier students")
+    parser.add_argument('service', choices=SERVICES)
+    parser.add_argument('--model-dir', help="Manuji: directory holding models/; Kaveesha: its models directory; "
+                                            "Lasindu: directory of the .pkl files")
+    parser.add_argument('--models', nargs='+', help="Teachers to distil (Manuji: every package model; "
+                                                    "Kaveesha: random_forest)")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--data', help="Transfer inputs (CSV or Excel with the service's request columns)")
+    source.add_argument('--synthetic', type=int, help="Use this many synthetic rows instead")
+    parser.add_argument('--candidates', nargs='+', choices=CANDIDATES, default=list(CANDIDATES),
+                        help="Student types to try, lightest first")
+    parser.add_argument('--min-r2', type=float, help="Regressors: minimum R^2 against the teacher")
+    parser.add_argument('--min-agreement', type=float, help="Classifiers: minimum label agreement")
+    parser.add_argument('--max-prob-error', type=float,
+                        help="Classifiers: maximum p99 absolute probability error")
+    parser.add_argument('--min-speedup', type=float, default=1.5,
+                        help="Single-row p95 speedup over the teacher a student needs to be saved")
+    parser.add_argument('--force', action='store_true',
+                        help="Save students outside the bounds or below --min-speedup")
+    parser.add_argument('--max-fit-rows', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--report', help="Also write the fidelity report (JSON) here")
+    args = parser.parse_args()
+
+    df = transfer_rows(args.service, args.data, args.synthetic, args.seed)
+    model_dir = args.model_dir or DEFAULT_MODEL_DIRS[args.service]
+    teachers, students_dir = TEACHERS[args.service](model_dir, df, args.models)
+    bounds = dict(DEFAULT_BOUNDS[args.service])
+    bounds.update({key: value for key, value in (('min_r2', args.min_r2), ('min_agreement', args.min_agreement),
+                                                 ('max_prob_error', args.max_prob_error)) if value is not None})
+
+    reports = {}
+    for name, (teacher, kind, version, X) in teachers.items():
+        student = distill(teacher, X, kind, name, version, candidates=tuple(args.candidates), bounds=bounds,
+                          max_fit_rows=args.max_fit_rows, seed=args.seed)
+        student.report.update(serving_costs(teacher, student, X))
+        path = student_path(students_dir, name)
+        faster = (student.report['teacher_over_student']['single_row_p95_ms'] or 0) >= args.min_speedup
+        student.report['saved'] = bool(args.force or (student.report['within_bounds'] and faster))
+        reports[name] = student.info()
+        print_report(name, reports[name], path)
+        if student.report['saved']:
+            student.save(path)
+        else:
+            reason = ("outside the fidelity bounds" if not student.report['within_bounds']
+                      else f"under {args.min_speedup}x faster than the teacher")
+            print(f"   ⏭️ Not saved: {reason} (--force saves it anyway)")
+
+    if args.report:
+        Path(args.report).write_text(json.dumps(reports, indent=2))
+        print(f"\n📝 Fidelity report written to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Cached ingestion of the daily summary workbook for training.
+
+Parsing ``daily_summary.xlsx`` dominates training start-up, and the trainer
+only needs a handful of its columns. The first run reads just those columns
+from the workbook and writes them to a typed Parquet file under
+``.ingest_cache/``. Later runs memory-map the Parquet file and read only the
+columns they ask for.
+
+The cache file name carries a hash of the workbook contents, so editing or
+replacing the workbook produces a new cache entry. The file is re-hashed only
+when its size or mtime changes. Without pyarrow the workbook is read
+directly every time.
+
+``iter_chunks`` serves the out-of-core trainer: it streams the same cache in
+fixed-size row batches, building it row by row from the workbook (openpyxl
+read-only mode) when needed so the full sheet is never held in memory.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+CACHE_DIR = '.ingest_cache'
+
+
+def _file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def source_key(path: Path, cache_dir: Path) -> str:
+    """Content hash of ``path``, reusing the last hash while size and mtime are unchanged."""
+    stat = path.stat()
+    index_path = cache_dir / 'index.json'
+    index = json.loads(index_path.read_text()) if index_path.exists() else {}
+    entry = index.get(str(path.resolve()))
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['hash']
+    key = _file_hash(path)
+    index[str(path.resolve())] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': key}
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    index_path.write_text(json.dumps(index, indent=2))
+    return key
+
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Make object columns Parquet-safe: non-null values become strings, nulls stay null."""
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].map(lambda v: v if v is None or pd.isna(v) else str(v)).astype(object)
+    return df
+
+
+def load_training_data(source: str, columns: Sequence[str], cache_dir: Optional[str] = None) -> pd.DataFrame:
+    """Return the ``columns`` of the workbook at ``source`` that exist, via the Parquet cache."""
+    source_path = Path(source)
+    wanted = list(columns)
+    if not PYARROW_AVAILABLE:
+        print("⚠️ pyarrow not installed; reading the workbook without the Parquet cache")
+        start = time.perf_counter()
+        df = pd.read_excel(source_path, usecols=lambda c: c in wanted)
+        print(f"   Cold load (Excel): {time.perf_counter() - start:.2f}s")
+        return df
+
+    cache_root = Path(cache_dir or source_path.parent / CACHE_DIR)
+    key = source_key(source_path, cache_root)
+    cache_path = cache_root / f"{source_path.stem}.{key}.parquet"
+
+    available = set()
+    if cache_path.exists():
+        start = time.perf_counter()
+        available = set(pq.read_schema(cache_path).names)
+        projected = [c for c in wanted if c in available]
+        missing = [c for c in wanted if c not in available]
+        if not missing or _workbook_lacks(cache_root, key, missing):
+            table = pq.read_table(cache_path, columns=projected, memory_map=True)
+            df = table.to_pandas()
+            print(f"   Warm load (Parquet cache {cache_path.name}): {time.perf_counter() - start:.2f}s")
+            return df
+
+    # Cold path: parse only the wanted (and previously cached) columns, then cache them
+    start = time.perf_counter()
+    parse = set(wanted) | available
+    df = _typed(pd.read_excel(source_path, usecols=lambda c: c in parse))
+    elapsed = time.perf_counter() - start
+    cache_root.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix('.parquet.tmp')
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+    os.replace(tmp_path, cache_path)
+    _record_missing(cache_root, key, [c for c in wanted if c not in df.columns])
+    print(f"   Cold load (Excel, {len(df.columns)} columns): {elapsed:.2f}s -> cached to {cache_path}")
+    return df[[c for c in wanted if c in df.columns]]
+
+
+def _missing_path(cache_root: Path, key: str) -> Path:
+    return cache_root / f"{key}.missing.json"
+
+
+def _record_missing(cache_root: Path, key: str, missing: List[str]) -> None:
+    """Remember requested columns the workbook does not have, so they don't force a re-parse."""
+    path = _missing_path(cache_root, key)
+    known = set(json.loads(path.read_text())) if path.exists() else set()
+    path.write_text(json.dumps(sorted(known | set(missing))))
+
+
+def _workbook_lacks(cache_root: Path, key: str, columns: List[str]) -> bool:
+    path = _missing_path(cache_root, key)
+    return path.exists() and set(columns) <= set(json.loads(path.read_text()))
+
+
+def iter_chunks(source: str, columns: Sequence[str], chunk_rows: int,
+                string_columns: Sequence[str] = (), cache_dir: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """Yield the ``columns`` of ``source`` that exist in DataFrames of at most ``chunk_rows`` rows.
+
+    Accepts .xlsx workbooks (streamed into the Parquet cache first), .csv and
+    .parquet files. Row order is stable, so repeated passes see the same rows
+    at the same positions.
+    """
+    source_path = Path(source)
+    wanted = list(columns)
+    suffix = source_path.suffix.lower()
+    if suffix == '.csv':
+        header = pd.read_csv(source_path, nrows=0).columns
+        yield from pd.read_csv(source_path, usecols=[c for c in wanted if c in header], chunksize=chunk_rows)
+        return
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Out-of-core loading of Excel/Parquet sources needs pyarrow installed")
+
+    if suffix == '.parquet':
+        parquet_path = source_path
+    else:
+        cache_root = Path(cache_dir or source_path.parent / CACHE_DIR)
+        key = source_key(source_path, cache_root)
+        parquet_path = cache_root / f"{source_path.stem}.{key}.parquet"
+        available = set(pq.read_schema(parquet_path).names) if parquet_path.exists() else set()
+        missing = [c for c in wanted if c not in available]
+        if not parquet_path.exists() or (missing and not _workbook_lacks(cache_root, key, missing)):
+            _stream_workbook_to_parquet(source_path, parquet_path, set(wanted) | available,
+                                        set(string_columns), chunk_rows)
+            _record_missing(cache_root, key, [c for c in wanted if c not in pq.read_schema(parquet_path).names])
+
+    parquet = pq.ParquetFile(parquet_path, memory_map=True)
+    projected = [c for c in wanted if c in parquet.schema_arrow.names]
+    for batch in parquet.iter_batches(batch_size=chunk_rows, columns=projected):
+        yield batch.to_pandas()
+
+
+def _stream_workbook_to_parquet(source_path: Path, parquet_path: Path, columns: set,
+                                string_columns: set, chunk_rows: int) -> None:
+    """Copy ``columns`` of the first sheet into Parquet one chunk at a time."""
+    from openpyxl import load_workbook
+
+    start = time.perf_counter()
+    workbook = load_workbook(source_path, read_only=True, data_only=True)
+    rows = workbook.worksheets[0].iter_rows(values_only=True)
+    header = next(rows)
+    indices = [i for i, name in enumerate(header) if name in columns]
+    names = [header[i] for i in indices]
+    schema = pa.schema([(n, pa.string() if n in string_columns else pa.float64()) for n in names])
+
+    def flush(buffer):
+        df = pd.DataFrame(buffer, columns=names)
+        for n in names:
+            if n in string_columns:
+                df[n] = df[n].map(lambda v: None if v is None else str(v))
+            else:
+                df[n] = pd.to_numeric(df[n], errors='coerce')
+        writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+
+    parquet_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = parquet_path.with_suffix('.parquet.tmp')
+    total = 0
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        buffer = []
+        for row in rows:
+            values = [row[i] if i < len(row) else None for i in indices]
+            if all(v is None for v in values):
+                continue  # blank rows, e.g. trailing formatting
+            buffer.append(values)
+            if len(buffer) >= chunk_rows:
+                flush(buffer)
+                total += len(buffer)
+                buffer = []
+        if buffer:
+            flush(buffer)
+            total += len(buffer)
+    workbook.close()
+    os.replace(tmp_path, parquet_path)
+    print(f"   Streamed {total} rows x {len(names)} columns from {source_path.name} "
+          f"into {parquet_path} in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,110 @@
+"""
+Column lists and labeling rules shared by the in-memory trainer (test.py)
+and the out-of-core trainer (out_of_core.py).
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Make the shared backend helpers importable when run from this directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.dtypes import encode_categories
+
+# Raw workbook columns used for training
+SELECTED_COLUMNS = [
+    'Branch', 'Facility Type', 'FacilityAmount', 'Effective Rate',
+    'No of Rental in arrears', 'Age', 'ArrearsCapital', 'ArrearsInterest',
+    'ArrearsVat', 'ArrearsOD', 'FutureCapital', 'FutureInterest',
+    'NET-OUTSTANDING', 'Status', 'NPLStatus', 'Last Receipt Paid Amount',
+    'CD_Collection_Rental', 'ClaimablePercentage'
+]
+
+# Text columns label-encoded per column; NPLStatus uses an explicit mapping
+CATEGORICAL_LABEL_COLUMNS = ['Branch', 'Facility Type', 'Status']
+NPL_STATUS_MAPPING = {'N': 1, 'P': 0}
+
+# Model inputs, in the order stored in the package's 'feature_columns'
+FEATURE_COLUMNS = [
+    'Branch_encoded', 'Facility Type_encoded', 'FacilityAmount',
+    'Effective Rate', 'No of Rental in arrears', 'Age',
+    'ArrearsCapital', 'ArrearsInterest', 'ArrearsVat', 'ArrearsOD',
+    'FutureCapital', 'FutureInterest', 'NET-OUTSTANDING',
+    'Status_encoded', 'NPLStatus_encoded', 'Last Receipt Paid Amount',
+    'CD_Collection_Rental', 'ClaimablePercentage', 'Arrears_Ratio'
+]
+
+# Compact storage (common.dtypes) for the raw columns and the model inputs,
+# applied by the trainers and by the API's prepare_input
+FEATURE_DTYPES = {
+    'Branch': 'category', 'Facility Type': 'category', 'Status': 'category', 'NPLStatus': 'category',
+    'Branch_encoded': 'int16', 'Facility Type_encoded': 'int16', 'Status_encoded': 'int16',
+    'NPLStatus_encoded': 'int8',
+    'No of Rental in arrears': 'int16', 'Age': 'int16',
+    'FacilityAmount': 'float32', 'Effective Rate': 'float32',
+    'ArrearsCapital': 'float32', 'ArrearsInterest': 'float32', 'ArrearsVat': 'float32', 'ArrearsOD': 'float32',
+    'FutureCapital': 'float32', 'FutureInterest': 'float32', 'NET-OUTSTANDING': 'float32',
+    'Last Receipt Paid Amount': 'float32', 'CD_Collection_Rental': 'float32', 'ClaimablePercentage': 'float32',
+    'Arrears_Ratio': 'float32'
+}
+
+
+def add_arrears_ratio(df: pd.DataFrame) -> pd.DataFrame:
+    """Capital + interest arrears as a share of the facility amount (in place)."""
+    df['Arrears_Ratio'] = (
+        df['ArrearsCapital'] + df['ArrearsInterest']
+    ) / (df['FacilityAmount'] + 1)
+    return df
+
+
+def poor_performance(df: pd.DataFrame) -> pd.Series:
+    """Boolean mask of facilities labelled 'Poor' under the stricter criteria."""
+    return (
+        (df['Arrears_Ratio'] > 0.10) |  # >10% arrears
+        (df['No of Rental in arrears'] > 4) |  # >4 rentals
+        (df['NPLStatus'].astype(str).str.upper() == 'N') |  # NPLStatus 'N' means non-performing
+        ((df['Last Receipt Paid Amount'] == 0) &
+         (df['No of Rental in arrears'] > 2)) |  # No payment + arrears
+        (df['ArrearsCapital'] > df['FacilityAmount'] * 0.15)  # >15% capital arrears
+    )
+
+
+def encode_npl_status(values: pd.Series) -> np.ndarray:
+    return encode_categories(values, NPL_STATUS_MAPPING, normalize=str.upper).astype(np.int8)
+
+
+def is_imbalanced(good_count: int, poor_count: int) -> bool:
+    """Good is undersampled when Poor is under 30% of Good (and has more than 100 rows)."""
+    return poor_count < good_count * 0.3 and poor_count > 100
+
+
+def undersample_good(df: pd.DataFrame, label_column: str = 'Performance_Label', seed: int = 42) -> pd.DataFrame:
+    """Good rows undersampled to a 2:1 Good:Poor ratio, then shuffled."""
+    # scikit-learn is imported by the trainers only, not by the API's import of this module
+    from sklearn.utils import resample
+    df_good = df[df[label_column] == 'Good']
+    df_poor = df[df[label_column] == 'Poor']
+    target_good = min(len(df_poor) * 2, len(df_good))
+    df_good_downsampled = resample(df_good, replace=False, n_samples=target_good, random_state=seed)
+    return pd.concat([df_good_downsampled, df_poor]).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def encode_categoricals(df: pd.DataFrame) -> dict:
+    """Add the ``*_encoded`` columns to ``df`` (categorical dtype) and return the encoders.
+
+    Label encoders are fitted on the category labels and applied once per
+    category instead of per row; NPLStatus uses the explicit mapping.
+    """
+    from sklearn.preprocessing import LabelEncoder
+    encoders = {}
+    for col in CATEGORICAL_LABEL_COLUMNS:
+        if col in df.columns:
+            values = df[col].cat.remove_unused_categories()
+            encoder = LabelEncoder().fit(values.cat.categories.astype(str))
+            df[f'{col}_encoded'] = encode_categories(values, {c: i for i, c in enumerate(encoder.classes_)})
+            encoders[col] = encoder
+    if 'NPLStatus' in df.columns:
+        df['NPLStatus_encoded'] = encode_npl_status(df['NPLStatus'])
+        encoders['NPLStatus'] = {'mapping': NPL_STATUS_MAPPING}
+    return encoders
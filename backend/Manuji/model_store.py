@@ -0,0 +1,269 @@
+"""
+Versioned model packages for the branch performance models.
+
+A package is a directory ``models/packages/v0001/`` holding:
+
+    manifest.json          format/package version, schema, feature columns,
+                           metrics, library versions and artifact hashes
+    preprocessing.joblib   scaler, encoders and target label encoder
+    models/<name>.joblib   one compressed artifact per model
+
+Metadata comes from the manifest alone, with no unpickling. Models load one
+at a time, on first use, and each artifact is checked against the SHA-256
+recorded in the manifest. The latest package is the one with the highest
+version number. A package is written to a temporary directory and renamed
+into place, so a half-written package is never picked up.
+
+Legacy ``all_models_package_*.pkl`` files can be converted with:
+
+    python model_store.py convert models/all_models_package_20240101_120000.pkl
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import platform
+import re
+import shutil
+import tempfile
+import time
+from collections.abc import Mapping
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from labeling import FEATURE_DTYPES
+
+FORMAT_VERSION = 1
+PACKAGE_NAME = 'branch_performance'
+PACKAGES_DIR = 'packages'
+MANIFEST = 'manifest.json'
+PREPROCESSING = 'preprocessing.joblib'
+COMPRESSION = ('zlib', 3)
+
+_VERSION_DIR = re.compile(r'^v(\d+)$')
+
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _artifact(package_dir: Path, relative: str) -> Dict[str, Any]:
+    data = (package_dir / relative).read_bytes()
+    return {'path': relative, 'sha256': _sha256(data), 'bytes': len(data)}
+
+
+def _library_versions() -> Dict[str, str]:
+    import joblib
+    versions = {'python': platform.python_version(), 'joblib': joblib.__version__}
+    for module in ('numpy', 'pandas', 'sklearn', 'xgboost'):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            pass
+    return versions
+
+
+def _encoder_schema(encoders: Dict[str, Any]) -> Dict[str, Any]:
+    schema = {}
+    for name, encoder in (encoders or {}).items():
+        if hasattr(encoder, 'classes_'):
+            schema[name] = {'type': 'label', 'classes': [str(c) for c in encoder.classes_]}
+        elif isinstance(encoder, dict) and 'mapping' in encoder:
+            schema[name] = {'type': 'mapping', 'mapping': encoder['mapping']}
+    return schema
+
+
+def list_packages(root: str = 'models') -> List[Path]:
+    """Package directories under ``root``, oldest version first."""
+    packages_dir = Path(root) / PACKAGES_DIR
+    if not packages_dir.is_dir():
+        return []
+    found = [p for p in packages_dir.iterdir()
+             if p.is_dir() and _VERSION_DIR.match(p.name) and (p / MANIFEST).exists()]
+    return sorted(found, key=lambda p: int(_VERSION_DIR.match(p.name).group(1)))
+
+
+def latest_package(root: str = 'models') -> Optional[Path]:
+    packages = list_packages(root)
+    return packages[-1] if packages else None
+
+
+def save_package(root: str, models: Dict[str, Any], scaler: Any, feature_columns: List[str],
+                 best_model_name: str, encoders: Dict[str, Any], target_label_encoder: Any,
+                 metrics: Dict[str, Any], feature_dtypes: Optional[Dict[str, str]] = None,
+                 training_mode: str = 'in_memory', created: Optional[str] = None) -> Path:
+    """Write a new package version under ``root`` and return its directory."""
+    packages_dir = Path(root) / PACKAGES_DIR
+    packages_dir.mkdir(parents=True, exist_ok=True)
+    existing = list_packages(root)
+    version = int(_VERSION_DIR.match(existing[-1].name).group(1)) + 1 if existing else 1
+    staging = Path(tempfile.mkdtemp(prefix=f'.v{version:04d}-', dir=packages_dir))
+
+    import joblib
+    try:
+        joblib.dump({'scaler': scaler, 'encoders': encoders, 'target_label_encoder': target_label_encoder},
+                    staging / PREPROCESSING, compress=COMPRESSION)
+        (staging / 'models').mkdir()
+        model_artifacts = {}
+        for name, model in models.items():
+            relative = f"models/{_slug(name)}.joblib"
+            joblib.dump(model, staging / relative, compress=COMPRESSION)
+            model_artifacts[name] = {**_artifact(staging, relative),
+                                     'class': f"{type(model).__module__}.{type(model).__name__}"}
+
+        target_classes = getattr(target_label_encoder, 'classes_', ['Good', 'Poor'])
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'package': PACKAGE_NAME,
+            'version': version,
+            'created': created or datetime.now().strftime("%Y%m%d_%H%M%S"),
+            'training_mode': training_mode,
+            'best_model_name': best_model_name,
+            'schema': {
+                'feature_columns': list(feature_columns),
+                'feature_dtypes': {c: feature_dtypes[c] for c in feature_columns if c in (feature_dtypes or {})},
+                'encoders': _encoder_schema(encoders),
+                'target_classes': [str(c) for c in target_classes],
+            },
+            'metrics': metrics,
+            'library_versions': _library_versions(),
+            'artifacts': {
+                'preprocessing': _artifact(staging, PREPROCESSING),
+                'models': model_artifacts,
+            },
+        }
+        (staging / MANIFEST).write_text(json.dumps(manifest, indent=2, default=float))
+        final = packages_dir / f"v{version:04d}"
+        os.rename(staging, final)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    total = sum(f.stat().st_size for f in final.rglob('*') if f.is_file())
+    print(f"✅ Model package v{version} saved: {final} ({total / 2**20:.2f} MB)")
+    for name, artifact in model_artifacts.items():
+        print(f"   {name:<22} {artifact['bytes'] / 2**20:8.2f} MB")
+    return final
+
+
+class ModelPackage:
+    """A package on disk: manifest fields up front, artifacts loaded on request."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        start = time.perf_counter()
+        self.manifest = json.loads((self.path / MANIFEST).read_text())
+        self.load_seconds = {'manifest': time.perf_counter() - start}
+        if self.manifest.get('format_version', 0) > FORMAT_VERSION:
+            raise ValueError(f"{self.path} uses package format {self.manifest['format_version']}, "
+                             f"this code reads up to {FORMAT_VERSION}")
+
+    @property
+    def version(self) -> int:
+        return self.manifest['version']
+
+    @property
+    def feature_columns(self) -> List[str]:
+        return self.manifest['schema']['feature_columns']
+
+    @property
+    def best_model_name(self) -> str:
+        return self.manifest['best_model_name']
+
+    @property
+    def model_names(self) -> List[str]:
+        return list(self.manifest['artifacts']['models'])
+
+    def _load(self, artifact: Dict[str, Any], label: str) -> Any:
+        start = time.perf_counter()
+        data = (self.path / artifact['path']).read_bytes()
+        if _sha256(data) != artifact['sha256']:
+            raise ValueError(f"Checksum mismatch for {self.path / artifact['path']}")
+        import joblib  # here: the API imports this module long before a model is needed
+        obj = joblib.load(io.BytesIO(data))
+        self.load_seconds[label] = time.perf_counter() - start
+        return obj
+
+    def load_preprocessing(self) -> Dict[str, Any]:
+        """``{'scaler', 'encoders', 'target_label_encoder'}``"""
+        return self._load(self.manifest['artifacts']['preprocessing'], 'preprocessing')
+
+    def load_model(self, name: str) -> Any:
+        artifact = self.manifest['artifacts']['models'].get(name)
+        if artifact is None:
+            raise KeyError(name)
+        return self._load(artifact, name)
+
+
+class LazyModels(Mapping):
+    """Read-only ``{name: model}`` view of a package that loads each model on first access."""
+
+    def __init__(self, package: ModelPackage):
+        self.package = package
+        self._loaded: Dict[str, Any] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._loaded:
+            self._loaded[name] = self.package.load_model(name)
+        return self._loaded[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.package.model_names)
+
+    def __len__(self) -> int:
+        return len(self.package.model_names)
+
+    @property
+    def loaded(self) -> List[str]:
+        return list(self._loaded)
+
+
+def convert_legacy(pkl_path: str, root: str = 'models') -> Path:
+    """Write a legacy ``all_models_package_*.pkl`` dict as a new package version."""
+    import joblib
+    legacy = joblib.load(pkl_path)
+    return save_package(
+        root,
+        models=legacy.get('models', {}),
+        scaler=legacy.get('scaler'),
+        feature_columns=legacy.get('feature_columns', []),
+        best_model_name=legacy.get('best_model_name'),
+        encoders=legacy.get('encoders', {}),
+        target_label_encoder=legacy.get('target_label_encoder'),
+        metrics={'model_comparison': legacy.get('model_comparison', {}),
+                 'training_times': legacy.get('training_times', {})},
+        feature_dtypes=FEATURE_DTYPES,
+        training_mode=legacy.get('training_mode', 'in_memory'),
+        created=legacy.get('timestamp'),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Branch performance model packages")
+    parser.add_argument('--root', default='models', help="Directory holding packages/")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="List package versions")
+    convert = commands.add_parser('convert', help="Convert a legacy all_models_package_*.pkl")
+    convert.add_argument('pkl_path')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        convert_legacy(args.pkl_path, args.root)
+        return
+    for path in list_packages(args.root):
+        manifest = json.loads((path / MANIFEST).read_text())
+        accuracy = manifest['metrics'].get('model_comparison', {}).get(manifest['best_model_name'])
+        cost = manifest['metrics'].get('inference_costs', {}).get(manifest['best_model_name'])
+        latency = f", p95 {cost['single_row_p95_ms']} ms" if cost else ''
+        print(f"v{manifest['version']:<5} {manifest['created']}  {manifest['training_mode']:<12} "
+              f"best={manifest['best_model_name']} ({accuracy}{latency})")
+
+
+if __name__ == '__main__':
+    main()
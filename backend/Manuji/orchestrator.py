@@ -0,0 +1,159 @@
+"""
+Parallel training orchestrator for the branch performance models.
+
+Candidate models are fitted concurrently in a process pool instead of one
+after another. Each model gets a CPU budget so the pool never runs more
+threads than the machine has cores:
+
+* models that only use one core (Gradient Boosting, liblinear Logistic
+  Regression) get a budget of 1
+* ensembles with an ``n_jobs`` parameter (Random Forest, XGBoost) share the
+  remaining cores, and their ``n_jobs`` is set to their budget
+
+Inside a worker the budget is also applied to BLAS/OpenMP pools with
+threadpoolctl (when installed) so numpy-heavy models don't oversubscribe.
+With enough cores the wall time drops to roughly that of the slowest model.
+"""
+import os
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+import xgboost as xgb
+
+try:
+    from threadpoolctl import threadpool_limits
+    THREADPOOLCTL_AVAILABLE = True
+except ImportError:
+    THREADPOOLCTL_AVAILABLE = False
+
+
+def _is_multithreaded(model: Any) -> bool:
+    # Ensembles with n_jobs build trees in parallel; LogisticRegression also has
+    # n_jobs but ignores it for binary liblinear fits, so it counts as one core
+    params = model.get_params()
+    return 'n_jobs' in params and 'n_estimators' in params
+
+
+def allocate_cpus(models: Dict[str, Any], total_cpus: Optional[int] = None) -> Dict[str, int]:
+    """CPU budget per model; budgets add up to at most ``total_cpus`` when there are enough cores."""
+    total_cpus = total_cpus or os.cpu_count() or 1
+    budgets = {name: 1 for name in models}
+    parallel = [name for name, model in models.items() if _is_multithreaded(model)]
+    spare = total_cpus - len(models)
+    if parallel and spare > 0:
+        share, extra = divmod(spare, len(parallel))
+        for i, name in enumerate(parallel):
+            budgets[name] += share + (1 if i < extra else 0)
+    return budgets
+
+
+def candidate_models(class_weight_ratio: float = 1.0) -> Dict[str, Any]:
+    """The four unfitted branch performance candidates with their default settings.
+
+    ``class_weight_ratio`` is Good/Poor after balancing and sets XGBoost's
+    ``scale_pos_weight``.
+    """
+    return {
+        'Random Forest': RandomForestClassifier(
+            n_estimators=100,
+            max_depth=10,
+            min_samples_split=5,
+            min_samples_leaf=2,
+            class_weight='balanced',  # Handles imbalance
+            random_state=42,
+            n_jobs=-1  # replaced by the orchestrator's CPU budget
+        ),
+        'XGBoost': xgb.XGBClassifier(
+            n_estimators=100,
+            max_depth=6,
+            learning_rate=0.1,
+            scale_pos_weight=class_weight_ratio,  # Balance classes
+            random_state=42,
+            eval_metric='logloss'
+        ),
+        'Gradient Boosting': GradientBoostingClassifier(
+            n_estimators=100,
+            max_depth=5,
+            learning_rate=0.1,
+            min_samples_split=5,
+            min_samples_leaf=2,
+            random_state=42
+        ),
+        'Logistic Regression': LogisticRegression(
+            max_iter=1000,
+            class_weight='balanced',  # Handles imbalance
+            random_state=42,
+            solver='liblinear'
+        )
+    }
+
+
+def _fit_one(name: str, model: Any, cpus: int, X_train, y_train, X_test, y_test) -> Dict[str, Any]:
+    """Fit and score one model inside a worker, limited to ``cpus`` threads."""
+    if _is_multithreaded(model):
+        model.set_params(n_jobs=cpus)
+    start = time.perf_counter()
+    if THREADPOOLCTL_AVAILABLE:
+        with threadpool_limits(limits=cpus):
+            model.fit(X_train, y_train)
+    else:
+        model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    y_pred = model.predict(X_test)
+    return {
+        'name': name,
+        'model': model,
+        'accuracy': accuracy_score(y_test, y_pred),
+        'predictions': y_pred,
+        'fit_seconds': fit_seconds,
+        'cpus': cpus
+    }
+
+
+def train_models(models: Dict[str, Any], X_train, y_train, X_test, y_test,
+                 total_cpus: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Fit every candidate in ``models`` concurrently and score it on the test split.
+
+    Returns ``{name: {'model', 'accuracy', 'predictions', 'fit_seconds', 'cpus'}}``
+    in the same order as ``models``. The fitted estimators are copies; the
+    instances passed in are left unfitted.
+    """
+    total_cpus = total_cpus or os.cpu_count() or 1
+    budgets = allocate_cpus(models, total_cpus)
+    workers = min(len(models), total_cpus)
+
+    # Multi-threaded models first: they are usually the longest and their budgets are the largest
+    order = sorted(models, key=lambda name: -budgets[name])
+
+    start = time.perf_counter()
+    fitted = Parallel(n_jobs=workers, backend='loky')(
+        delayed(_fit_one)(name, clone(models[name]), budgets[name], X_train, y_train, X_test, y_test)
+        for name in order
+    )
+    wall_seconds = time.perf_counter() - start
+
+    by_name = {result['name']: result for result in fitted}
+    results = {name: by_name[name] for name in models}
+    slowest = max(r['fit_seconds'] for r in results.values()) if results else 0.0
+    serial = sum(r['fit_seconds'] for r in results.values())
+    print(f"\n⏱️ Trained {len(models)} models on {workers} workers / {total_cpus} CPUs in {wall_seconds:.1f}s "
+          f"(sum of fits {serial:.1f}s, slowest model {slowest:.1f}s)")
+    for name, result in results.items():
+        print(f"   {name:<22} {result['fit_seconds']:8.1f}s  on {result['cpus']} CPU(s)")
+    return results
+
+
+def training_times(results: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Per-model fit time and CPU budget, for storing alongside the model package."""
+    return {
+        name: {'fit_seconds': float(np.round(r['fit_seconds'], 3)), 'cpus': int(r['cpus'])}
+        for name, r in results.items()
+    }
@@ -0,0 +1,372 @@
+"""
+OUT-OF-CORE TRAINING FOR THE BRANCH PERFORMANCE MODEL
+
+For daily summaries that don't fit in RAM. Produces the same
+versioned model package (model_store.py) as test.py, but never loads the
+whole dataset:
+
+1. Pass 1 streams the data in chunks, labels every row with the same rules
+   as test.py, collects the categorical vocabularies and keeps a per-class
+   (stratified) reservoir of row positions.
+2. The reservoirs are cut down to the 2:1 Good:Poor undersampling target and
+   split 80/20 per class.
+3. Pass 2 streams the data again, writes the sampled rows to on-disk
+   ``.npy`` memmaps (training rows in shuffled order) and fits the
+   StandardScaler with ``partial_fit``.
+4. Logistic regression is trained as an ``SGDClassifier`` (log loss) with
+   ``partial_fit`` over mini-batches; XGBoost trains from an external-memory
+   ``DMatrix`` fed batch by batch through a ``DataIter``.
+
+Peak memory is governed by ``--memory-mb`` (chunk size and reservoir size
+are derived from it) and can be tightened with ``--chunk-rows``.
+
+Usage:
+    python out_of_core.py --source daily_summary.xlsx --memory-mb 512
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from ingestion import iter_chunks
+from model_store import save_package
+from serving_costs import add_selection_arguments, choose_and_report
+from labeling import (
+    CATEGORICAL_LABEL_COLUMNS, FEATURE_COLUMNS, FEATURE_DTYPES, NPL_STATUS_MAPPING, SELECTED_COLUMNS,
+    add_arrears_ratio, encode_npl_status, is_imbalanced, poor_performance
+)
+from common.dtypes import compact_frame, encode_categories
+
+try:
+    import xgboost as xgb
+    XGBOOST_AVAILABLE = True
+except ImportError:
+    XGBOOST_AVAILABLE = False
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Rough in-memory cost of one raw cell while a chunk is being processed
+# (pandas copies, string objects, derived columns)
+BYTES_PER_CELL = 64
+
+GOOD, POOR = 0, 1  # target_label_encoder order: ['Good', 'Poor']
+
+
+def chunk_rows_for(memory_mb: int, n_columns: int) -> int:
+    """Rows per chunk so a chunk's working set uses about half the memory budget."""
+    return max(1000, int(memory_mb * 2**20 * 0.5 // (n_columns * BYTES_PER_CELL)))
+
+
+def reservoir_capacity_for(memory_mb: int) -> int:
+    """Sampled row positions (int64) per class within a quarter of the memory budget."""
+    return max(10000, int(memory_mb * 2**20 * 0.25 // 8 // 2))
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def _prepare(chunk: pd.DataFrame) -> pd.DataFrame:
+    """fillna(0), Arrears_Ratio and the Poor flag exactly as test.py does, then compact dtypes."""
+    for col in chunk.columns:
+        if col in CATEGORICAL_LABEL_COLUMNS or col == 'NPLStatus':
+            chunk[col] = chunk[col].astype(object).where(chunk[col].notna(), 0).astype(str)
+        else:
+            chunk[col] = pd.to_numeric(chunk[col], errors='coerce').fillna(0)
+    add_arrears_ratio(chunk)
+    chunk['_poor'] = poor_performance(chunk).to_numpy()
+    return compact_frame(chunk, FEATURE_DTYPES)
+
+
+class StratifiedReservoir:
+    """Uniform reservoir sample (Algorithm R) of row positions, one reservoir per class."""
+
+    def __init__(self, capacity: int, seed: int = 42):
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)
+        self.samples = {GOOD: np.empty(0, dtype=np.int64), POOR: np.empty(0, dtype=np.int64)}
+        self.seen = {GOOD: 0, POOR: 0}
+
+    def add(self, label: int, positions: np.ndarray) -> None:
+        sample, seen = self.samples[label], self.seen[label]
+        room = max(0, self.capacity - len(sample))
+        if room:
+            sample = np.concatenate([sample, positions[:room]])
+        rest = positions[room:]
+        if len(rest):
+            # Item number m (1-based) replaces a random slot with probability capacity / m
+            m = seen + room + np.arange(1, len(rest) + 1)
+            slots = (self.rng.random(len(rest)) * m).astype(np.int64)
+            keep = slots < self.capacity
+            sample[slots[keep]] = rest[keep]
+        self.samples[label] = sample
+        self.seen[label] = seen + len(positions)
+
+    def take(self, label: int, n: int) -> np.ndarray:
+        """``n`` positions drawn uniformly from the class reservoir."""
+        sample = self.samples[label]
+        return self.rng.choice(sample, size=min(n, len(sample)), replace=False)
+
+
+def _encode(chunk: pd.DataFrame, encoders: Dict[str, object], feature_columns: List[str]) -> np.ndarray:
+    for col in CATEGORICAL_LABEL_COLUMNS:
+        if col in chunk.columns:
+            mapping = {c: i for i, c in enumerate(encoders[col].classes_)}
+            chunk[f'{col}_encoded'] = encode_categories(chunk[col], mapping)
+    if 'NPLStatus' in chunk.columns:
+        chunk['NPLStatus_encoded'] = encode_npl_status(chunk['NPLStatus'])
+    return chunk[feature_columns].to_numpy(dtype=np.float32)
+
+
+def _scaled(scaler: StandardScaler, X: np.ndarray) -> np.ndarray:
+    """Scale a float32 block in float64, matching test.py and the API."""
+    return scaler.transform(X.astype(np.float64))
+
+
+def _blocks(n_rows: int, block_rows: int) -> Iterator[slice]:
+    for start in range(0, n_rows, block_rows):
+        yield slice(start, min(start + block_rows, n_rows))
+
+
+if XGBOOST_AVAILABLE:
+    class MemmapBatches(xgb.DataIter):
+        """Feeds scaled row blocks of an on-disk matrix to XGBoost one at a time."""
+
+        def __init__(self, X: np.ndarray, y: np.ndarray, scaler: StandardScaler, block_rows: int, cache_prefix: str):
+            self.X, self.y, self.scaler = X, y, scaler
+            self.slices = list(_blocks(len(y), block_rows))
+            self.index = 0
+            super().__init__(cache_prefix=cache_prefix)
+
+        def next(self, input_data) -> int:
+            if self.index >= len(self.slices):
+                return 0
+            block = self.slices[self.index]
+            input_data(data=_scaled(self.scaler, self.X[block]), label=self.y[block])
+            self.index += 1
+            return 1
+
+        def reset(self) -> None:
+            self.index = 0
+
+
+def train_out_of_core(source: str, memory_mb: int = 512, chunk_rows: Optional[int] = None,
+                      epochs: int = 5, max_sample_rows: Optional[int] = None, seed: int = 42,
+                      output_dir: str = 'models', selection_policy: str = 'accuracy',
+                      latency_budget_ms: Optional[float] = None, accuracy_tolerance: float = 0.0) -> Path:
+    """Train from ``source`` within roughly ``memory_mb`` and save a model package; returns its directory."""
+    start = time.perf_counter()
+    chunk_rows = chunk_rows or chunk_rows_for(memory_mb, len(SELECTED_COLUMNS))
+    capacity = max_sample_rows or reservoir_capacity_for(memory_mb)
+    print(f"\n1. Pass 1: labeling and sampling in chunks of {chunk_rows} rows "
+          f"(reservoir capacity {capacity} rows per class)")
+
+    reservoir = StratifiedReservoir(capacity, seed)
+    vocab = {col: set() for col in CATEGORICAL_LABEL_COLUMNS}
+    columns_present: List[str] = []
+    offset = 0
+    for chunk in iter_chunks(source, SELECTED_COLUMNS, chunk_rows, string_columns=CATEGORICAL_LABEL_COLUMNS + ['NPLStatus']):
+        chunk = _prepare(chunk)
+        columns_present = list(chunk.columns)
+        positions = offset + np.arange(len(chunk))
+        poor = chunk['_poor'].to_numpy()
+        reservoir.add(POOR, positions[poor])
+        reservoir.add(GOOD, positions[~poor])
+        for col in vocab:
+            if col in chunk.columns:
+                vocab[col].update(chunk[col].unique())
+        offset += len(chunk)
+
+    good_count, poor_count = reservoir.seen[GOOD], reservoir.seen[POOR]
+    print(f"✅ {offset} records: Good={good_count}, Poor={poor_count}")
+    if offset == 0 or min(good_count, poor_count) == 0:
+        raise ValueError("Need both Good and Poor records to train")
+
+    # Same undersampling rule as test.py (2:1 Good:Poor when Poor < 30%), bounded by the reservoirs
+    target_poor = min(poor_count, capacity)
+    target_good = min(good_count, capacity)
+    if is_imbalanced(good_count, poor_count):
+        target_good = min(target_poor * 2, target_good)
+        print(f"⚠️ Class imbalance: undersampling Good to {target_good}")
+
+    # Stratified 80/20 split; training rows get shuffled slots in the memmap
+    rng = np.random.default_rng(seed)
+    train_positions, test_positions = [], []
+    for label, target in ((GOOD, target_good), (POOR, target_poor)):
+        chosen = reservoir.take(label, target)
+        n_test = int(round(len(chosen) * 0.2))
+        test_positions.append(chosen[:n_test])
+        train_positions.append(chosen[n_test:])
+    train_positions = np.concatenate(train_positions)
+    test_positions = np.concatenate(test_positions)
+    train_slots = rng.permutation(len(train_positions))
+    del reservoir
+
+    # position -> (split, slot), sorted for searchsorted lookups per chunk
+    positions = np.concatenate([train_positions, test_positions])
+    split = np.concatenate([np.zeros(len(train_positions), dtype=bool), np.ones(len(test_positions), dtype=bool)])
+    slots = np.concatenate([train_slots, np.arange(len(test_positions))])
+    order = np.argsort(positions)
+    positions, split, slots = positions[order], split[order], slots[order]
+
+    encoders = {}
+    for col, values in vocab.items():
+        if col in columns_present:
+            encoders[col] = LabelEncoder().fit(sorted(values))
+    if 'NPLStatus' in columns_present:
+        encoders['NPLStatus'] = {'mapping': NPL_STATUS_MAPPING}
+    feature_columns = [c for c in FEATURE_COLUMNS
+                       if c in columns_present or c.replace('_encoded', '') in columns_present]
+
+    workdir = tempfile.mkdtemp(prefix='branch_ooc_')
+    n_features = len(feature_columns)
+    X_train = np.lib.format.open_memmap(os.path.join(workdir, 'X_train.npy'), mode='w+',
+                                        dtype=np.float32, shape=(len(train_positions), n_features))
+    y_train = np.lib.format.open_memmap(os.path.join(workdir, 'y_train.npy'), mode='w+',
+                                        dtype=np.int8, shape=(len(train_positions),))
+    X_test = np.lib.format.open_memmap(os.path.join(workdir, 'X_test.npy'), mode='w+',
+                                       dtype=np.float32, shape=(len(test_positions), n_features))
+    y_test = np.lib.format.open_memmap(os.path.join(workdir, 'y_test.npy'), mode='w+',
+                                       dtype=np.int8, shape=(len(test_positions),))
+
+    print(f"\n2. Pass 2: writing {len(train_positions)} training / {len(test_positions)} test rows to {workdir}")
+    scaler = StandardScaler()
+    offset = 0
+    for chunk in iter_chunks(source, SELECTED_COLUMNS, chunk_rows, string_columns=CATEGORICAL_LABEL_COLUMNS + ['NPLStatus']):
+        lo, hi = np.searchsorted(positions, [offset, offset + len(chunk)])
+        if hi > lo:
+            local = positions[lo:hi] - offset
+            rows = _prepare(chunk.iloc[local].reset_index(drop=True))
+            X = _encode(rows, encoders, feature_columns)
+            y = rows['_poor'].to_numpy().astype(np.int8)
+            # test.py fits the scaler on the whole sampled set before splitting
+            scaler.partial_fit(X.astype(np.float64))
+            is_test = split[lo:hi]
+            X_train[slots[lo:hi][~is_test]] = X[~is_test]
+            y_train[slots[lo:hi][~is_test]] = y[~is_test]
+            X_test[slots[lo:hi][is_test]] = X[is_test]
+            y_test[slots[lo:hi][is_test]] = y[is_test]
+        offset += len(chunk)
+    for array in (X_train, y_train, X_test, y_test):
+        array.flush()
+
+    block_rows = chunk_rows
+    train_good = int((np.asarray(y_train) == GOOD).sum())
+    train_poor = len(y_train) - train_good
+    print(f"   Training class distribution: Good={train_good}, Poor={train_poor}")
+
+    print("\n3. Training incrementally")
+    models, fit_seconds = {}, {}
+
+    # Logistic regression via SGD, balanced like class_weight='balanced' in test.py
+    fit_start = time.perf_counter()
+    weights = {GOOD: len(y_train) / (2 * max(train_good, 1)), POOR: len(y_train) / (2 * max(train_poor, 1))}
+    sgd = SGDClassifier(loss='log_loss', alpha=1e-4, class_weight=weights, random_state=seed)
+    for epoch in range(epochs):
+        for block in rng.permutation(len(list(_blocks(len(y_train), block_rows)))):
+            sl = slice(block * block_rows, min((block + 1) * block_rows, len(y_train)))
+            sgd.partial_fit(_scaled(scaler, X_train[sl]), y_train[sl], classes=np.array([GOOD, POOR]))
+    models['Logistic Regression'] = sgd
+    fit_seconds['Logistic Regression'] = time.perf_counter() - fit_start
+
+    if XGBOOST_AVAILABLE:
+        fit_start = time.perf_counter()
+        batches = MemmapBatches(X_train, y_train, scaler, block_rows, os.path.join(workdir, 'xgb_cache'))
+        dtrain = xgb.DMatrix(batches)
+        booster = xgb.train(
+            {
+                'objective': 'binary:logistic',
+                'tree_method': 'hist',
+                'max_depth': 6,
+                'eta': 0.1,
+                'scale_pos_weight': train_good / max(train_poor, 1),
+                'eval_metric': 'logloss',
+                'seed': seed
+            },
+            dtrain,
+            num_boost_round=100
+        )
+        xgb_model = xgb.XGBClassifier()
+        xgb_model.load_model(bytearray(booster.save_raw('json')))
+        models['XGBoost'] = xgb_model
+        fit_seconds['XGBoost'] = time.perf_counter() - fit_start
+        del dtrain, batches  # releases the external-memory cache pages
+    else:
+        print("⚠️ xgboost not installed; training the linear model only")
+
+    # Evaluate on the held-out rows, block by block
+    results = {}
+    for name, model in models.items():
+        correct = 0
+        for sl in _blocks(len(y_test), block_rows):
+            correct += int((model.predict(_scaled(scaler, X_test[sl])) == y_test[sl]).sum())
+        results[name] = correct / max(len(y_test), 1)
+        print(f"   {name:<22} accuracy {results[name]:.4f}  (fit {fit_seconds[name]:.1f}s)")
+    best_model_name, serving_metrics = choose_and_report(models, results, _scaled(scaler, X_test[:block_rows]),
+                                                         selection_policy, latency_budget_ms, accuracy_tolerance)
+
+    # The API scales DataFrames, as with the scaler test.py fits on one
+    scaler.feature_names_in_ = np.asarray(feature_columns, dtype=object)
+
+    package_dir = save_package(
+        output_dir,
+        models=models,
+        scaler=scaler,
+        feature_columns=feature_columns,
+        best_model_name=best_model_name,
+        encoders=encoders,
+        target_label_encoder=LabelEncoder().fit(['Good', 'Poor']),
+        metrics={
+            'model_comparison': results,
+            'training_times': {name: {'fit_seconds': round(s, 3), 'cpus': 1} for name, s in fit_seconds.items()},
+            **serving_metrics
+        },
+        feature_dtypes=FEATURE_DTYPES,
+        training_mode='out_of_core'
+    )
+
+    del X_train, y_train, X_test, y_test
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    peak = _peak_rss_mb()
+    print(f"🏆 Best Model: {best_model_name} ({results[best_model_name]:.4f})")
+    print(f"⏱️ Total {time.perf_counter() - start:.1f}s" + (f", peak RSS {peak:.0f} MB" if peak else ""))
+    return package_dir
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Out-of-core training for the branch performance model")
+    parser.add_argument('--source', default='daily_summary.xlsx', help=".xlsx, .csv or .parquet daily summary")
+    parser.add_argument('--memory-mb', type=int, default=512, help="Approximate peak memory budget")
+    parser.add_argument('--chunk-rows', type=int, default=None, help="Rows per chunk (default: from --memory-mb)")
+    parser.add_argument('--epochs', type=int, default=5, help="SGD passes over the training rows")
+    parser.add_argument('--max-sample-rows', type=int, default=None,
+                        help="Cap on sampled rows per class (default: from --memory-mb)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output-dir', default='models')
+    add_selection_arguments(parser)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("🔧 OUT-OF-CORE MODEL TRAINING")
+    print("=" * 80)
+    train_out_of_core(args.source, args.memory_mb, args.chunk_rows, args.epochs,
+                      args.max_sample_rows, args.seed, args.output_dir, args.selection_policy,
+                      args.latency_budget_ms, args.accuracy_tolerance)
+
+
+if __name__ == '__main__':
+    main()
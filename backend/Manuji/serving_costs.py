@@ -0,0 +1,140 @@
+"""
+Serving cost of the branch performance models and cost-aware model selection.
+
+The trainers measure, for each fitted model, what the API pays per request:
+``predict`` plus ``predict_proba`` on already scaled rows (api.predict_prepared)
+
+* single-row latency: p50/p95 over ``single_rows`` different rows
+* batch latency: best of ``repeat`` calls on ``batch_rows`` rows
+* memory: Python-heap peak while unpickling the model (tracemalloc; numpy
+  buffers are counted, native xgboost memory only through its raw buffer)
+  and the pickled size
+
+The numbers are stored in the package manifest (``metrics['inference_costs']``)
+and the default model is picked by a selection policy:
+
+``accuracy``
+    highest test accuracy, first model on ties (the original behaviour)
+``latency_budget``
+    highest accuracy among models whose single-row p95 fits
+    ``latency_budget_ms``; models within ``accuracy_tolerance`` of that
+    accuracy count as equal and the fastest of them wins. When nothing fits
+    the budget, the fastest model is used.
+"""
+import pickle
+import time
+import tracemalloc
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+SELECTION_POLICIES = ('accuracy', 'latency_budget')
+
+
+def _serve(model: Any, X: np.ndarray) -> None:
+    model.predict(X)
+    if hasattr(model, 'predict_proba'):
+        model.predict_proba(X)
+
+
+def measure_inference_costs(models: Dict[str, Any], X: np.ndarray, single_rows: int = 50,
+                            batch_rows: int = 1000, repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """Per-model latency and memory on scaled rows ``X`` (e.g. the test split)."""
+    X = np.asarray(X)
+    rows = X[:max(1, min(single_rows, len(X)))]
+    batch = X[np.arange(batch_rows) % len(X)] if len(X) else X
+
+    costs = {}
+    for name, model in models.items():
+        _serve(model, rows[:1])  # warm-up: lazy initialisation, thread pools
+        single = []
+        for i in range(len(rows)):
+            start = time.perf_counter()
+            _serve(model, rows[i:i + 1])
+            single.append(time.perf_counter() - start)
+        batch_seconds = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _serve(model, batch)
+            batch_seconds = min(batch_seconds, time.perf_counter() - start)
+
+        blob = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+        tracemalloc.start()
+        try:
+            pickle.loads(blob)
+            memory_bytes = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        costs[name] = {
+            'single_row_p50_ms': round(float(np.percentile(single, 50)) * 1000, 3),
+            'single_row_p95_ms': round(float(np.percentile(single, 95)) * 1000, 3),
+            'batch_rows': int(len(batch)),
+            'batch_ms': round(batch_seconds * 1000, 3),
+            'rows_per_second': round(len(batch) / batch_seconds) if batch_seconds > 0 else None,
+            'memory_bytes': int(memory_bytes),
+            'serialized_bytes': len(blob),
+        }
+    return costs
+
+
+def select_model(accuracies: Dict[str, float], costs: Dict[str, Dict[str, float]], policy: str = 'accuracy',
+                 latency_budget_ms: Optional[float] = None, accuracy_tolerance: float = 0.0) -> Tuple[str, str]:
+    """``(model name, reason)`` chosen from ``accuracies`` by ``policy``."""
+    if policy not in SELECTION_POLICIES:
+        raise ValueError(f"Unknown selection policy '{policy}', expected one of {SELECTION_POLICIES}")
+    best_accuracy = max(accuracies, key=accuracies.get)
+    if policy == 'accuracy':
+        return best_accuracy, f"highest accuracy ({accuracies[best_accuracy]:.4f})"
+
+    if latency_budget_ms is None:
+        raise ValueError("The latency_budget policy needs latency_budget_ms")
+    latency = {name: costs[name]['single_row_p95_ms'] for name in accuracies}
+    within = [name for name in accuracies if latency[name] <= latency_budget_ms]
+    if not within:
+        fastest = min(accuracies, key=latency.get)
+        return fastest, (f"no model within {latency_budget_ms} ms p95; fastest is {fastest} "
+                         f"({latency[fastest]:.2f} ms)")
+    top = max(accuracies[name] for name in within)
+    contenders = [name for name in within if accuracies[name] >= top - accuracy_tolerance]
+    chosen = min(contenders, key=latency.get)
+    reason = (f"best accuracy within {latency_budget_ms} ms p95 "
+              f"({accuracies[chosen]:.4f}, {latency[chosen]:.2f} ms)")
+    if chosen != best_accuracy:
+        reason += (f"; {best_accuracy} scores {accuracies[best_accuracy]:.4f} "
+                   f"at {latency[best_accuracy]:.2f} ms")
+    return chosen, reason
+
+
+def print_costs(accuracies: Dict[str, float], costs: Dict[str, Dict[str, float]], chosen: str) -> None:
+    print(f"\n{'model':<22}{'accuracy':>9}{'1 row p50':>11}{'1 row p95':>11}{'batch':>18}{'memory':>10}")
+    for name, cost in costs.items():
+        marker = '  ⭐' if name == chosen else ''
+        batch = f"{cost['batch_ms']:.1f} ms/{cost['batch_rows']}"
+        print(f"{name:<22}{accuracies[name]:>9.4f}{cost['single_row_p50_ms']:>8.2f} ms"
+              f"{cost['single_row_p95_ms']:>8.2f} ms{batch:>18}{cost['memory_bytes'] / 2**20:>7.2f} MB{marker}")
+
+
+def add_selection_arguments(parser) -> None:
+    """``--selection-policy``, ``--latency-budget-ms`` and ``--accuracy-tolerance`` for the trainer CLIs."""
+    parser.add_argument('--selection-policy', choices=SELECTION_POLICIES, default='accuracy',
+                        help="How the package's default model is picked")
+    parser.add_argument('--latency-budget-ms', type=float, default=5.0,
+                        help="Single-row p95 budget for the latency_budget policy")
+    parser.add_argument('--accuracy-tolerance', type=float, default=0.002,
+                        help="Accuracy gap treated as a tie under the latency_budget policy")
+
+
+def choose_and_report(models: Dict[str, Any], accuracies: Dict[str, float], X: np.ndarray,
+                      policy: str = 'accuracy', latency_budget_ms: Optional[float] = None,
+                      accuracy_tolerance: float = 0.0) -> Tuple[str, Dict[str, Any]]:
+    """Measure, select and print; returns the chosen name and the package metrics to store."""
+    costs = measure_inference_costs(models, X)
+    chosen, reason = select_model(accuracies, costs, policy, latency_budget_ms, accuracy_tolerance)
+    print_costs(accuracies, costs, chosen)
+    print(f"\n🎯 Policy '{policy}': {chosen} - {reason}")
+    return chosen, {
+        'inference_costs': costs,
+        'selection': {'policy': policy, 'latency_budget_ms': latency_budget_ms,
+                      'accuracy_tolerance': accuracy_tolerance, 'reason': reason},
+    }
@@ -2,19 +2,24 @@ import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-from sklearn.utils import resample
-import xgboost as xgb
+from sklearn.metrics import classification_report, confusion_matrix
 import matplotlib.pyplot as plt
 import seaborn as sns
-import joblib
 from datetime import datetime
 import os
 import warnings
 warnings.filterwarnings('ignore')
 
+from ingestion import load_training_data
+from labeling import (
+    FEATURE_COLUMNS, FEATURE_DTYPES, SELECTED_COLUMNS,
+    add_arrears_ratio, encode_categoricals, is_imbalanced, poor_performance, undersample_good
+)
+from common.dtypes import compact_frame, memory_report
+from model_store import save_package
+from orchestrator import candidate_models, train_models, training_times
+from serving_costs import choose_and_report
+
 """
 IMPROVED TRAINING SCRIPT - FIXES THE "ALWAYS GOOD" PREDICTION ISSUE
 
@@ -24,24 +29,24 @@ Key improvements:
 3. Detailed evaluation metrics
 """
 
+# Default model selection: 'accuracy' (highest test accuracy) or 'latency_budget'
+# (highest accuracy whose single-row p95 latency fits LATENCY_BUDGET_MS)
+SELECTION_POLICY = os.environ.get('SELECTION_POLICY', 'accuracy')
+LATENCY_BUDGET_MS = float(os.environ.get('LATENCY_BUDGET_MS', '5'))
+ACCURACY_TOLERANCE = float(os.environ.get('ACCURACY_TOLERANCE', '0.002'))
+
 print("="*80)
 print("🔧 IMPROVED MODEL TRAINING")
 print("="*80)
 
-# Load data
+# Select necessary columns
+selected_columns = SELECTED_COLUMNS
+
+# Load data (only the selected columns, via the Parquet cache after the first run)
 print("\n1. Loading data...")
-df = pd.read_excel('daily_summary.xlsx')
+df = load_training_data('daily_summary.xlsx', selected_columns)
 print(f"✅ Loaded {len(df)} records")
 
-# Select necessary columns
-selected_columns = [
-    'Branch', 'Facility Type', 'FacilityAmount', 'Effective Rate',
-    'No of Rental in arrears', 'Age', 'ArrearsCapital', 'ArrearsInterest',
-    'ArrearsVat', 'ArrearsOD', 'FutureCapital', 'FutureInterest',
-    'NET-OUTSTANDING', 'Status', 'NPLStatus', 'Last Receipt Paid Amount',
-    'CD_Collection_Rental', 'ClaimablePercentage'
-]
-
 existing_columns = [col for col in selected_columns if col in df.columns]
 df_filtered = df[existing_columns].copy()
 
@@ -49,9 +54,7 @@ df_filtered = df[existing_columns].copy()
 df_filtered.fillna(0, inplace=True)
 
 # Calculate arrears ratio
-df_filtered['Arrears_Ratio'] = (
-    df_filtered['ArrearsCapital'] + df_filtered['ArrearsInterest']
-) / (df_filtered['FacilityAmount'] + 1)
+add_arrears_ratio(df_filtered)
 
 # IMPROVED LABELING - Stricter criteria
 print("\n2. Creating performance labels with improved criteria...")
@@ -65,17 +68,19 @@ print("   • Capital arrears > 15% of facility")
 df_filtered['Performance_Label'] = 'Good'
 
 # Multiple conditions to mark as Poor
-poor_conditions = (
-    (df_filtered['Arrears_Ratio'] > 0.10) |  # >10% arrears
-    (df_filtered['No of Rental in arrears'] > 4) |  # >4 rentals
-    (df_filtered['NPLStatus'].astype(str).str.upper() == 'N') |  # NPLStatus 'N' means non-performing
-    ((df_filtered['Last Receipt Paid Amount'] == 0) & 
-     (df_filtered['No of Rental in arrears'] > 2)) |  # No payment + arrears
-    (df_filtered['ArrearsCapital'] > df_filtered['FacilityAmount'] * 0.15)  # >15% capital arrears
-)
+poor_conditions = poor_performance(df_filtered)
 
 df_filtered.loc[poor_conditions, 'Performance_Label'] = 'Poor'
 
+# Compact dtypes (after labeling, so the thresholds see full precision):
+# float32 amounts, small-int counts, categorical text columns
+df_compact = compact_frame(df_filtered, FEATURE_DTYPES)
+memory = memory_report(df_filtered, df_compact)
+print(f"   Memory: {memory['before_mb_per_million']} -> {memory['after_mb_per_million']} MB "
+      f"per million rows ({memory['saved_pct']}% smaller)")
+df_filtered = df_compact
+del df_compact
+
 print(f"\n✅ Label Distribution:")
 label_counts = df_filtered['Performance_Label'].value_counts()
 print(label_counts)
@@ -86,66 +91,33 @@ print(f"   Poor percentage: {poor_pct:.2f}%")
 good_count = (df_filtered['Performance_Label'] == 'Good').sum()
 poor_count = (df_filtered['Performance_Label'] == 'Poor').sum()
 
-if poor_count < good_count * 0.3 and poor_count > 100:  # If Poor < 30%
+if is_imbalanced(good_count, poor_count):  # If Poor < 30%
     print(f"\n⚠️ Class imbalance detected (Good: {good_count}, Poor: {poor_count})")
     print("   Balancing classes using undersampling...")
     
-    df_good = df_filtered[df_filtered['Performance_Label'] == 'Good']
-    df_poor = df_filtered[df_filtered['Performance_Label'] == 'Poor']
-    
     # Undersample Good to create 2:1 ratio
-    target_good = min(poor_count * 2, good_count)
-    df_good_downsampled = resample(df_good, 
-                                   replace=False,
-                                   n_samples=target_good,
-                                   random_state=42)
-    
-    df_filtered = pd.concat([df_good_downsampled, df_poor])
-    df_filtered = df_filtered.sample(frac=1, random_state=42).reset_index(drop=True)
+    df_filtered = undersample_good(df_filtered)
     
     print(f"✅ Balanced dataset:")
     print(df_filtered['Performance_Label'].value_counts())
 
 # Encode categorical variables
 print("\n3. Encoding categorical variables...")
-# Use per-column encoders and explicit mapping for NPLStatus
-encoders = {}
-categorical_label_cols = ['Branch', 'Facility Type', 'Status']
-
-for col in categorical_label_cols:
-    if col in df_filtered.columns:
-        le_col = LabelEncoder()
-        df_filtered[f'{col}_encoded'] = le_col.fit_transform(df_filtered[col].astype(str))
-        encoders[col] = le_col
-
-# Explicit mapping for NPLStatus: 'N' => non-performing (1), 'P' => performing (0)
-if 'NPLStatus' in df_filtered.columns:
-    df_filtered['NPLStatus_encoded'] = (
-        df_filtered['NPLStatus'].astype(str).str.upper().map({'N': 1, 'P': 0})
-    ).fillna(0).astype(int)
-    # Save mapping as a simple dict for later use
-    encoders['NPLStatus'] = {'mapping': {'N': 1, 'P': 0}}
+# Per-column label encoders and explicit mapping for NPLStatus ('N' => 1, 'P' => 0)
+encoders = encode_categoricals(df_filtered)
 
 # Prepare features
-feature_columns = [
-    'Branch_encoded', 'Facility Type_encoded', 'FacilityAmount',
-    'Effective Rate', 'No of Rental in arrears', 'Age',
-    'ArrearsCapital', 'ArrearsInterest', 'ArrearsVat', 'ArrearsOD',
-    'FutureCapital', 'FutureInterest', 'NET-OUTSTANDING',
-    'Status_encoded', 'NPLStatus_encoded', 'Last Receipt Paid Amount',
-    'CD_Collection_Rental', 'ClaimablePercentage', 'Arrears_Ratio'
-]
+feature_columns = [col for col in FEATURE_COLUMNS if col in df_filtered.columns]
 
-feature_columns = [col for col in feature_columns if col in df_filtered.columns]
-
-X = df_filtered[feature_columns]
+X = compact_frame(df_filtered[feature_columns], FEATURE_DTYPES)
 # Encode the target labels separately
 target_le = LabelEncoder()
 y = target_le.fit_transform(df_filtered['Performance_Label'])
 
 # Scale features
 scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
+# Scale in float64 (the API does the same): scaled values often sit exactly on tree cut points
+X_scaled = scaler.fit_transform(X.astype(np.float64))
 
 # Split data with stratification
 X_train, X_test, y_train, y_test = train_test_split(
@@ -169,62 +141,17 @@ print("\n" + "="*80)
 print("4. TRAINING MODELS WITH CLASS BALANCING")
 print("="*80)
 
-models = {
-    'Random Forest': RandomForestClassifier(
-        n_estimators=100,
-        max_depth=10,
-        min_samples_split=5,
-        min_samples_leaf=2,
-        class_weight='balanced',  # Handles imbalance
-        random_state=42,
-        n_jobs=-1
-    ),
-    'XGBoost': xgb.XGBClassifier(
-        n_estimators=100,
-        max_depth=6,
-        learning_rate=0.1,
-        scale_pos_weight=class_weight_ratio,  # Balance classes
-        random_state=42,
-        eval_metric='logloss'
-    ),
-    'Gradient Boosting': GradientBoostingClassifier(
-        n_estimators=100,
-        max_depth=5,
-        learning_rate=0.1,
-        min_samples_split=5,
-        min_samples_leaf=2,
-        random_state=42
-    ),
-    'Logistic Regression': LogisticRegression(
-        max_iter=1000,
-        class_weight='balanced',  # Handles imbalance
-        random_state=42,
-        solver='liblinear'
-    )
-}
-
-results = {}
-best_accuracy = 0
-best_model_name = ''
-
-for name, model in models.items():
+models = candidate_models(class_weight_ratio)
+
+# Fit all candidates concurrently, each within its own CPU budget
+results = train_models(models, X_train, y_train, X_test, y_test)
+
+for name, result in results.items():
     print(f"\n{'-'*80}")
-    print(f"Training {name}...")
-    
-    model.fit(X_train, y_train)
-    
-    y_pred = model.predict(X_test)
-    accuracy = accuracy_score(y_test, y_pred)
-    
-    results[name] = {
-        'model': model,
-        'accuracy': accuracy,
-        'predictions': y_pred
-    }
+    print(f"{name} (trained in {result['fit_seconds']:.1f}s on {result['cpus']} CPU(s))")
     
-    if accuracy > best_accuracy:
-        best_accuracy = accuracy
-        best_model_name = name
+    y_pred = result['predictions']
+    accuracy = result['accuracy']
     
     print(f"\nAccuracy: {accuracy:.4f}")
     
@@ -245,6 +172,17 @@ for name, model in models.items():
         poor_recall = cm[1][1] / (cm[1][1] + cm[1][0])
         print(f"\n🎯 Poor Detection Rate: {poor_recall:.2%} (of actual Poor cases)")
 
+# Serving cost per model (what the API pays per request) and the default model
+print("\n" + "="*80)
+print("4b. INFERENCE COST AND MODEL SELECTION")
+print("="*80)
+model_accuracies = {name: results[name]['accuracy'] for name in results.keys()}
+best_model_name, serving_metrics = choose_and_report(
+    {name: results[name]['model'] for name in results.keys()}, model_accuracies, X_test,
+    SELECTION_POLICY, LATENCY_BUDGET_MS, ACCURACY_TOLERANCE
+)
+best_accuracy = model_accuracies[best_model_name]
+
 # Create visualization
 print("\n5. Creating visualizations...")
 
@@ -302,31 +240,25 @@ print("\n" + "="*80)
 print("6. SAVING MODELS")
 print("="*80)
 
-if not os.path.exists('models'):
-    os.makedirs('models')
-
 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-# Save all models package
-all_models_data = {
-    'models': {name: results[name]['model'] for name in results.keys()},
-    'scaler': scaler,
-    'feature_columns': feature_columns,
-    'best_model_name': best_model_name,
-    'encoders': encoders,
-    'target_label_encoder': target_le,
-    'model_comparison': {name: results[name]['accuracy'] for name in results.keys()},
-    'timestamp': timestamp
-}
-
-filename = f"models/all_models_package_{timestamp}.pkl"
-joblib.dump(all_models_data, filename)
-print(f"✅ Models saved: {filename}")
-
-# Save individual best model
-best_filename = f"models/best_model_{timestamp}.pkl"
-joblib.dump(results[best_model_name]['model'], best_filename)
-print(f"✅ Best model saved: {best_filename}")
+# Versioned package: JSON manifest plus one compressed artifact per model
+package_dir = save_package(
+    'models',
+    models={name: results[name]['model'] for name in results.keys()},
+    scaler=scaler,
+    feature_columns=feature_columns,
+    best_model_name=best_model_name,
+    encoders=encoders,
+    target_label_encoder=target_le,
+    metrics={
+        'model_comparison': model_accuracies,
+        'training_times': training_times(results),
+        **serving_metrics
+    },
+    feature_dtypes=FEATURE_DTYPES,
+    created=timestamp
+)
 
 # Test with sample data
 print("\n" + "="*80)
@@ -359,7 +291,7 @@ print("="*80)
 print(f"\n🏆 Best Model: {best_model_name}")
 print(f"📊 Accuracy: {best_accuracy:.4f}")
 print(f"\n📁 Files saved:")
-print(f"   • {filename}")
+print(f"   • {package_dir}")
 print(f"   • improved_model_analysis.png")
 print(f"\n🚀 Next steps:")
 print(f"   1. Restart your API: python api.py")
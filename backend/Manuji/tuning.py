@@ -0,0 +1,477 @@
+"""
+HYPERPARAMETER SEARCH FOR THE BRANCH PERFORMANCE MODELS
+
+Tunes the candidates of test.py (orchestrator.candidate_models) on the same
+prepared data and the same 80/20 split, then saves the winners as a new
+versioned model package (model_store.py, training_mode 'tuned').
+
+For each model:
+
+1. ``--candidates`` configurations are drawn from SEARCH_SPACES; candidate 0
+   is always test.py's hand-picked configuration (the baseline).
+2. Successive halving: every configuration is scored with stratified
+   ``--folds``-fold cross-validation on a small stratified subsample of the
+   training rows; the best 1/``--factor`` go on to a ``--factor`` times
+   larger subsample, until the last rung uses all training rows. Trials are
+   ranked by mean CV accuracy, ties broken by log loss.
+3. XGBoost stops adding trees once the log loss on a 10% slice of each
+   fold's training rows hasn't improved for 20 rounds; Gradient Boosting
+   uses its built-in ``n_iter_no_change``. The final XGBoost refit uses the
+   median best iteration of the last rung.
+4. The (configuration, fold) fits of a rung run in parallel with joblib,
+   one thread each.
+
+Every finished trial is appended to ``<store>/trials.jsonl``, keyed by the
+data, model, parameters and subsample size, so an interrupted search picks
+up where it stopped and a repeated search costs nothing.
+
+The report compares search cost (trials, fit seconds, wall time) with the
+quality gained over the baseline on CV and on the test split.
+
+Usage:
+    python tuning.py --source daily_summary.xlsx --candidates 16 --folds 3
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.metrics import accuracy_score, log_loss
+from sklearn.model_selection import ParameterSampler, StratifiedKFold, train_test_split
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+try:
+    from threadpoolctl import threadpool_limits
+    THREADPOOLCTL_AVAILABLE = True
+except ImportError:
+    THREADPOOLCTL_AVAILABLE = False
+
+from ingestion import load_training_data
+from labeling import (
+    FEATURE_COLUMNS, FEATURE_DTYPES, SELECTED_COLUMNS,
+    add_arrears_ratio, encode_categoricals, is_imbalanced, poor_performance, undersample_good
+)
+from common.dtypes import compact_frame
+from model_store import save_package
+from orchestrator import _is_multithreaded, candidate_models, train_models, training_times
+from serving_costs import add_selection_arguments, choose_and_report
+
+TRIALS_FILE = 'trials.jsonl'
+
+# Sampled on top of candidate_models(); lists are sampled uniformly without replacement
+SEARCH_SPACES = {
+    'Random Forest': {
+        'n_estimators': [100, 200, 400],
+        'max_depth': [6, 10, 14, None],
+        'min_samples_split': [2, 5, 10],
+        'min_samples_leaf': [1, 2, 4],
+        'max_features': ['sqrt', 0.5, None],
+    },
+    'XGBoost': {
+        'max_depth': [3, 4, 6, 8],
+        'learning_rate': [0.03, 0.05, 0.1, 0.2],
+        'subsample': [0.7, 0.85, 1.0],
+        'colsample_bytree': [0.7, 0.85, 1.0],
+        'min_child_weight': [1, 3, 5],
+        'reg_lambda': [0.5, 1.0, 2.0],
+    },
+    'Gradient Boosting': {
+        'learning_rate': [0.05, 0.1, 0.2],
+        'max_depth': [3, 4, 5],
+        'subsample': [0.7, 0.85, 1.0],
+        'min_samples_leaf': [1, 2, 4],
+    },
+    'Logistic Regression': {
+        'C': [0.001, 0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0, 30.0, 100.0],
+    },
+}
+
+# Applied to sampled candidates only; the baseline keeps test.py's settings.
+# n_estimators becomes an upper bound once early stopping is on.
+EARLY_STOPPING = {
+    'XGBoost': {'n_estimators': 500, 'early_stopping_rounds': 20},
+    'Gradient Boosting': {'n_estimators': 500, 'n_iter_no_change': 10, 'validation_fraction': 0.1},
+}
+XGB_EVAL_FRACTION = 0.1
+
+# Smallest subsample a rung may use, per CV fold
+MIN_ROWS_PER_FOLD = 50
+
+
+def prepare_data(source: str, seed: int = 42) -> Dict[str, Any]:
+    """Load, label, balance, encode and scale ``source`` exactly as test.py does."""
+    df = load_training_data(source, SELECTED_COLUMNS)
+    df = df[[col for col in SELECTED_COLUMNS if col in df.columns]].copy()
+    df.fillna(0, inplace=True)
+    add_arrears_ratio(df)
+    df['Performance_Label'] = 'Good'
+    df.loc[poor_performance(df), 'Performance_Label'] = 'Poor'
+    df = compact_frame(df, FEATURE_DTYPES)
+
+    good_count = (df['Performance_Label'] == 'Good').sum()
+    poor_count = (df['Performance_Label'] == 'Poor').sum()
+    if is_imbalanced(good_count, poor_count):
+        df = undersample_good(df, seed=seed)
+        good_count = (df['Performance_Label'] == 'Good').sum()
+        poor_count = (df['Performance_Label'] == 'Poor').sum()
+    encoders = encode_categoricals(df)
+
+    feature_columns = [col for col in FEATURE_COLUMNS if col in df.columns]
+    X = compact_frame(df[feature_columns], FEATURE_DTYPES)
+    target_le = LabelEncoder()
+    y = target_le.fit_transform(df['Performance_Label'])
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X.astype(np.float64))
+    X_train, X_test, y_train, y_test = train_test_split(
+        X_scaled, y, test_size=0.2, random_state=seed, stratify=y
+    )
+    return {
+        'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test,
+        'scaler': scaler, 'encoders': encoders, 'target_label_encoder': target_le,
+        'feature_columns': feature_columns,
+        'class_weight_ratio': good_count / max(poor_count, 1) if poor_count > 0 else 1,
+    }
+
+
+def data_fingerprint(X: np.ndarray, y: np.ndarray) -> str:
+    digest = hashlib.sha256(np.ascontiguousarray(X).tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def nested_order(y: np.ndarray, seed: int) -> np.ndarray:
+    """Row order whose every prefix keeps the class ratio, so rungs are nested stratified subsamples."""
+    rng = np.random.default_rng(seed)
+    rank = np.empty(len(y))
+    for label in np.unique(y):
+        rows = np.flatnonzero(y == label)
+        rank[rng.permutation(rows)] = (np.arange(len(rows)) + rng.random()) / len(rows)
+    return np.argsort(rank, kind='stable')
+
+
+def rung_sizes(n_rows: int, n_candidates: int, factor: int, folds: int) -> List[int]:
+    """Subsample size per rung; the last rung uses all ``n_rows``."""
+    n_rungs = 1 + int(math.floor(math.log(max(n_candidates, 1), factor)))
+    min_rows = min(n_rows, MIN_ROWS_PER_FOLD * folds)
+    sizes = [max(min_rows, n_rows // factor ** (n_rungs - 1 - i)) for i in range(n_rungs)]
+    return sorted(set(sizes))
+
+
+class TrialStore:
+    """Append-only JSONL of finished trials, read back on start to resume a search."""
+
+    def __init__(self, directory: str):
+        self.path = Path(directory) / TRIALS_FILE
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.trials: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:  # a trial cut off mid-write
+                        continue
+                    self.trials[record['key']] = record
+
+    @staticmethod
+    def key(fingerprint: str, model: str, params: Dict[str, Any], n_rows: int, folds: int, seed: int) -> str:
+        payload = json.dumps([fingerprint, model, params, n_rows, folds, seed], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:20]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.trials.get(key)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        self.trials[record['key']] = record
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def build_model(name: str, params: Dict[str, Any], class_weight_ratio: float) -> Any:
+    """candidate_models()[name] with ``params``; sampled configurations also get early stopping."""
+    model = candidate_models(class_weight_ratio)[name]
+    if params:
+        model.set_params(**EARLY_STOPPING.get(name, {}), **params)
+    return model
+
+
+def _fit(model: Any, X: np.ndarray, y: np.ndarray, seed: int) -> Optional[int]:
+    """Fit with early stopping where configured; returns the number of boosting rounds used."""
+    params = model.get_params()
+    if params.get('early_stopping_rounds'):
+        X_fit, X_eval, y_fit, y_eval = train_test_split(
+            X, y, test_size=XGB_EVAL_FRACTION, random_state=seed, stratify=y
+        )
+        model.fit(X_fit, y_fit, eval_set=[(X_eval, y_eval)], verbose=False)
+        return int(model.best_iteration) + 1
+    model.fit(X, y)
+    if params.get('n_iter_no_change'):
+        return int(model.n_estimators_)
+    return None
+
+
+def _evaluate_fold(model: Any, X: np.ndarray, y: np.ndarray, train_idx: np.ndarray,
+                   val_idx: np.ndarray, seed: int) -> Dict[str, Any]:
+    """Fit one fold on a single thread and score it on the held-out rows."""
+    if _is_multithreaded(model):
+        model.set_params(n_jobs=1)
+    start = time.perf_counter()
+    if THREADPOOLCTL_AVAILABLE:
+        with threadpool_limits(limits=1):
+            rounds = _fit(model, X[train_idx], y[train_idx], seed)
+    else:
+        rounds = _fit(model, X[train_idx], y[train_idx], seed)
+    fit_seconds = time.perf_counter() - start
+    proba = model.predict_proba(X[val_idx])[:, 1]
+    return {
+        'accuracy': accuracy_score(y[val_idx], (proba >= 0.5).astype(int)),
+        'log_loss': log_loss(y[val_idx], proba, labels=[0, 1]),
+        'fit_seconds': fit_seconds,
+        'rounds': rounds,
+    }
+
+
+def _rank(trial: Dict[str, Any]):
+    return (-trial['accuracy'], trial['log_loss'])
+
+
+class Search:
+    """Successive halving for every requested model, sharing one trial store and worker pool."""
+
+    def __init__(self, data: Dict[str, Any], store: TrialStore, candidates: int, folds: int,
+                 factor: int, n_jobs: int, seed: int):
+        self.data = data
+        self.store = store
+        self.candidates = candidates
+        self.folds = folds
+        self.factor = factor
+        self.n_jobs = n_jobs
+        self.seed = seed
+        self.fingerprint = data_fingerprint(data['X_train'], data['y_train'])
+        self.order = nested_order(data['y_train'], seed)
+        self.sizes = rung_sizes(len(self.order), candidates, factor, folds)
+        self.new_trials = 0
+        self.resumed_trials = 0
+        self.fit_seconds = 0.0
+
+    def configurations(self, name: str) -> List[Dict[str, Any]]:
+        sampled = ParameterSampler(SEARCH_SPACES[name], n_iter=self.candidates - 1, random_state=self.seed)
+        configs = [{}]  # the baseline
+        for params in sampled:
+            if params not in configs:
+                configs.append(params)
+        return configs
+
+    def evaluate(self, name: str, configs: List[Dict[str, Any]], n_rows: int) -> List[Dict[str, Any]]:
+        """CV trials for ``configs`` on the first ``n_rows`` of the nested order, from the store when present."""
+        rows = np.sort(self.order[:n_rows])
+        X, y = self.data['X_train'][rows], self.data['y_train'][rows]
+        splits = list(StratifiedKFold(self.folds, shuffle=True, random_state=self.seed).split(X, y))
+
+        trials, pending = {}, []
+        for i, params in enumerate(configs):
+            key = TrialStore.key(self.fingerprint, name, params, n_rows, self.folds, self.seed)
+            stored = self.store.get(key)
+            if stored:
+                trials[i] = stored
+                self.resumed_trials += 1
+            else:
+                pending.append((i, key, params))
+
+        tasks = (
+            delayed(_evaluate_fold)(build_model(name, params, self.data['class_weight_ratio']),
+                                    X, y, train_idx, val_idx, self.seed)
+            for _, _, params in pending for train_idx, val_idx in splits
+        )
+        folds_done: List[Dict[str, Any]] = []
+        finished = iter(pending)
+        # Results arrive in submission order: every `folds` results complete the next pending trial
+        for fold in Parallel(n_jobs=self.n_jobs, backend='loky', return_as='generator')(tasks):
+            folds_done.append(fold)
+            if len(folds_done) < self.folds:
+                continue
+            i, key, params = next(finished)
+            rounds = [f['rounds'] for f in folds_done if f['rounds'] is not None]
+            trial = {
+                'key': key, 'model': name, 'params': params, 'n_rows': n_rows, 'folds': self.folds,
+                'accuracy': float(np.mean([f['accuracy'] for f in folds_done])),
+                'log_loss': float(np.mean([f['log_loss'] for f in folds_done])),
+                'fold_accuracy': [float(f['accuracy']) for f in folds_done],
+                'fit_seconds': float(sum(f['fit_seconds'] for f in folds_done)),
+                'rounds': rounds or None,
+                'created': datetime.now().isoformat(timespec='seconds'),
+            }
+            self.store.add(trial)
+            trials[i] = trial
+            self.new_trials += 1
+            self.fit_seconds += trial['fit_seconds']
+            folds_done = []
+        return [trials[i] for i in range(len(configs))]
+
+    def run(self, name: str) -> Dict[str, Any]:
+        configs = self.configurations(name)
+        print(f"\n🔎 {name}: {len(configs)} configurations, rungs of {self.sizes} rows, {self.folds}-fold CV")
+        survivors = list(range(len(configs)))
+        history = []
+        for rung, n_rows in enumerate(self.sizes):
+            trials = self.evaluate(name, [configs[i] for i in survivors], n_rows)
+            ranked = sorted(zip(survivors, trials), key=lambda item: _rank(item[1]))
+            best_i, best = ranked[0]
+            print(f"   rung {rung}: {len(survivors):>3} configs x {n_rows:>6} rows  "
+                  f"best acc {best['accuracy']:.4f}  log loss {best['log_loss']:.4f}")
+            history.append({'n_rows': n_rows, 'configs': len(survivors)})
+            if rung < len(self.sizes) - 1:
+                keep = max(1, math.ceil(len(survivors) / self.factor))
+                survivors = [i for i, _ in ranked[:keep]]
+
+        # Score the baseline at full budget too, so the gain is measured like for like;
+        # it is kept when the search found nothing better
+        baseline = self.evaluate(name, [configs[0]], self.sizes[-1])[0]
+        if _rank(baseline) <= _rank(best):
+            best_i, best = 0, baseline
+        return {'params': configs[best_i], 'trial': best, 'baseline': baseline, 'rungs': history}
+
+
+def refit(name: str, result: Dict[str, Any], data: Dict[str, Any], seed: int) -> Any:
+    """Final model on all training rows; XGBoost gets a fixed tree count from the CV early stopping."""
+    params = dict(result['params'])
+    model = build_model(name, params, data['class_weight_ratio'])
+    rounds = result['trial'].get('rounds')
+    if params and rounds and model.get_params().get('early_stopping_rounds'):
+        model.set_params(n_estimators=int(np.median(rounds)), early_stopping_rounds=None)
+    if _is_multithreaded(model):
+        model.set_params(n_jobs=-1)
+    _fit(model, data['X_train'], data['y_train'], seed)
+    return model
+
+
+def tune(source: str = 'daily_summary.xlsx', model_names: Optional[List[str]] = None, candidates: int = 16,
+         folds: int = 3, factor: int = 3, n_jobs: Optional[int] = None, store_dir: str = '.tuning',
+         seed: int = 42, output_dir: Optional[str] = 'models', selection_policy: str = 'accuracy',
+         latency_budget_ms: Optional[float] = None, accuracy_tolerance: float = 0.0) -> Dict[str, Any]:
+    """Run the search, print the cost/quality report and save a 'tuned' package unless ``output_dir`` is None."""
+    start = time.perf_counter()
+    data = prepare_data(source, seed)
+    print(f"✅ {len(data['y_train'])} training / {len(data['y_test'])} test rows")
+
+    model_names = model_names or list(SEARCH_SPACES)
+    search = Search(data, TrialStore(store_dir), candidates, folds, factor, n_jobs or os.cpu_count() or 1, seed)
+    if search.store.trials:
+        print(f"♻️ {len(search.store.trials)} stored trials in {search.store.path}")
+    results = {name: search.run(name) for name in model_names}
+    search_seconds = time.perf_counter() - start
+
+    # Baseline: test.py's models, trained the same way test.py trains them
+    print("\n⚖️ Baseline (hand-picked configurations)")
+    baseline_fits = train_models(candidate_models(data['class_weight_ratio']), data['X_train'], data['y_train'],
+                                 data['X_test'], data['y_test'])
+    baseline_seconds = sum(r['fit_seconds'] for r in baseline_fits.values())
+
+    models, comparison, fit_seconds = {}, {}, {}
+    report = {}
+    for name, fitted in baseline_fits.items():
+        if name not in results:
+            models[name], comparison[name] = fitted['model'], fitted['accuracy']
+            fit_seconds[name] = fitted['fit_seconds']
+            continue
+        result = results[name]
+        fit_start = time.perf_counter()
+        model = refit(name, result, data, seed)
+        fit_seconds[name] = time.perf_counter() - fit_start
+        tuned_accuracy = accuracy_score(data['y_test'], model.predict(data['X_test']))
+        models[name], comparison[name] = model, tuned_accuracy
+        report[name] = {
+            'params': result['params'] or 'baseline',
+            'rungs': result['rungs'],
+            'cv_accuracy': {'baseline': result['baseline']['accuracy'], 'tuned': result['trial']['accuracy']},
+            'cv_log_loss': {'baseline': result['baseline']['log_loss'], 'tuned': result['trial']['log_loss']},
+            'test_accuracy': {'baseline': fitted['accuracy'], 'tuned': tuned_accuracy},
+            'refit_seconds': round(fit_seconds[name], 3),
+        }
+    best_model_name, serving_metrics = choose_and_report(models, comparison, data['X_test'], selection_policy,
+                                                         latency_budget_ms, accuracy_tolerance)
+    total_seconds = time.perf_counter() - start
+
+    print("\n" + "=" * 80)
+    print("📊 SEARCH COST VS QUALITY GAINED")
+    print("=" * 80)
+    print(f"{'model':<22}{'CV acc base':>12}{'CV acc tuned':>13}{'CV logloss':>18}{'test base':>11}{'test tuned':>11}")
+    for name, r in report.items():
+        logloss = f"{r['cv_log_loss']['baseline']:.4f}->{r['cv_log_loss']['tuned']:.4f}"
+        print(f"{name:<22}{r['cv_accuracy']['baseline']:>12.4f}{r['cv_accuracy']['tuned']:>13.4f}{logloss:>18}"
+              f"{r['test_accuracy']['baseline']:>11.4f}{r['test_accuracy']['tuned']:>11.4f}")
+        print(f"{'':<22}params: {r['params']}")
+    print(f"\nTrials: {search.new_trials} run, {search.resumed_trials} from {search.store.path}")
+    print(f"Search: {search.fit_seconds:.1f}s of fits, {search_seconds:.1f}s wall on {search.n_jobs} worker(s)")
+    print(f"Baseline training: {baseline_seconds:.1f}s of fits "
+          f"(search costs {search.fit_seconds / max(baseline_seconds, 1e-9):.0f}x)")
+    print(f"🏆 Best Model: {best_model_name} ({comparison[best_model_name]:.4f})")
+
+    tuning = {
+        'candidates': candidates, 'folds': folds, 'factor': factor, 'seed': seed,
+        'data_fingerprint': search.fingerprint,
+        'trials_run': search.new_trials, 'trials_resumed': search.resumed_trials,
+        'search_fit_seconds': round(search.fit_seconds, 3), 'search_wall_seconds': round(search_seconds, 3),
+        'baseline_fit_seconds': round(baseline_seconds, 3), 'total_seconds': round(total_seconds, 3),
+        'models': report,
+    }
+    if output_dir:
+        save_package(
+            output_dir,
+            models=models,
+            scaler=data['scaler'],
+            feature_columns=data['feature_columns'],
+            best_model_name=best_model_name,
+            encoders=data['encoders'],
+            target_label_encoder=data['target_label_encoder'],
+            metrics={
+                'model_comparison': comparison,
+                'training_times': {**training_times(baseline_fits),
+                                   **{name: {'fit_seconds': round(fit_seconds[name], 3), 'cpus': 1}
+                                      for name in report}},
+                'tuning': tuning,
+                **serving_metrics
+            },
+            feature_dtypes=FEATURE_DTYPES,
+            training_mode='tuned'
+        )
+    return tuning
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hyperparameter search for the branch performance models")
+    parser.add_argument('--source', default='daily_summary.xlsx', help=".xlsx, .csv or .parquet daily summary")
+    parser.add_argument('--models', nargs='+', choices=list(SEARCH_SPACES), help="Models to tune (default: all)")
+    parser.add_argument('--candidates', type=int, default=16, help="Configurations per model, baseline included")
+    parser.add_argument('--folds', type=int, default=3)
+    parser.add_argument('--factor', type=int, default=3, help="Successive halving keeps 1/factor per rung")
+    parser.add_argument('--n-jobs', type=int, default=None, help="Parallel fits (default: all CPUs)")
+    parser.add_argument('--store', default='.tuning', help="Directory of the resumable trial store")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output-dir', default='models')
+    parser.add_argument('--no-save', action='store_true', help="Report only, don't write a package")
+    add_selection_arguments(parser)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("🔧 HYPERPARAMETER SEARCH")
+    print("=" * 80)
+    tune(args.source, args.models, args.candidates, args.folds, args.factor, args.n_jobs, args.store,
+         args.seed, None if args.no_save else args.output_dir, args.selection_policy, args.latency_budget_ms,
+         args.accuracy_tolerance)
+
+
+if __name__ == '__main__':
+    main()
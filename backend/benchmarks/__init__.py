@@ -0,0 +1,7 @@
+"""Offline benchmarks for the prediction services.
+
+Run from the ``backend`` directory, e.g. ``python -m benchmarks.serialization``.
+``python -m benchmarks.suite`` runs the stage and HTTP benchmarks of all
+three services and compares them with a stored baseline.
+"""
+from common.services import BACKEND_DIR, SERVICE_PATHS, load_service, use_model_dir  # noqa: F401
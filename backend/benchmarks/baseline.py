@@ -0,0 +1,120 @@
+"""Stored benchmark baselines and regression checks between commits.
+
+A baseline is a JSON file with the metrics of one ``benchmarks.suite`` run
+plus the commit and machine it ran on. ``compare`` matches metrics by name
+and flags a regression when a metric got worse by more than its unit's
+threshold (relative change):
+
+    ms       lower is better, default 25%
+    req/s    higher is better, default 20%
+    rows/s   higher is better, default 20%
+    errors   any increase is a regression
+
+Timing changes smaller than NOISE_FLOOR_MS are never flagged, so
+sub-millisecond stages don't fail on scheduler jitter. Timings only compare
+meaningfully on the same machine; a different machine is reported before
+the table.
+"""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_BASELINE = ".benchmarks/baseline.json"
+DEFAULT_THRESHOLDS = {"ms": 0.25, "req/s": 0.20, "rows/s": 0.20, "errors": 0.0}
+HIGHER_IS_BETTER = {"req/s", "rows/s"}
+NOISE_FLOOR_MS = 0.5
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.node(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save(path: str, metrics: List[Dict[str, Any]], config: Dict[str, Any]) -> Path:
+    """Write ``metrics`` (``{"name", "unit", "value"}``) and the run's context to ``path``."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "config": config,
+        "metrics": {m["name"]: {"unit": m["unit"], "value": m["value"]} for m in metrics},
+    }, indent=2))
+    return path
+
+
+def load(path: str) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text())
+
+
+def _status(unit: str, old: float, new: float, threshold: float) -> str:
+    if unit == "errors":
+        return "regression" if new > old else "ok"
+    if not old or (unit == "ms" and abs(new - old) < NOISE_FLOOR_MS):
+        return "ok"
+    change = (new - old) / old
+    if unit in HIGHER_IS_BETTER:
+        change = -change
+    if change > threshold:
+        return "regression"
+    if change < -threshold:
+        return "improved"
+    return "ok"
+
+
+def compare(baseline: Dict[str, Any], metrics: List[Dict[str, Any]],
+            thresholds: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    """One row per metric: baseline and current value, relative change and status."""
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    stored = baseline["metrics"]
+    rows = []
+    for metric in metrics:
+        name, unit, new = metric["name"], metric["unit"], metric["value"]
+        old = stored.get(name, {}).get("value")
+        if old is None or new is None:
+            rows.append({"name": name, "unit": unit, "baseline": old, "current": new, "change": None,
+                         "status": "new" if old is None else "missing"})
+            continue
+        rows.append({"name": name, "unit": unit, "baseline": old, "current": new,
+                     "change": (new - old) / old if old else None,
+                     "status": _status(unit, old, new, thresholds.get(unit, DEFAULT_THRESHOLDS["ms"]))})
+    return rows
+
+
+def print_comparison(baseline: Dict[str, Any], rows: List[Dict[str, Any]]) -> None:
+    """Comparison table; baseline metrics this run didn't measure (other services, no --http) are counted."""
+    before, now = baseline.get("environment", {}), environment()
+    print(f"\nBaseline {baseline.get('created')} at {before.get('commit')}, now {now['commit']}")
+    if (before.get("machine"), before.get("cpus")) != (now["machine"], now["cpus"]):
+        print(f"⚠️ Baseline ran on {before.get('machine')} ({before.get('cpus')} CPUs), "
+              f"this run on {now['machine']} ({now['cpus']} CPUs): timings may not be comparable")
+    print(f"{'metric':<64}{'baseline':>12}{'current':>12}{'change':>9}  status")
+    for r in rows:
+        old = f"{r['baseline']:.2f}" if r["baseline"] is not None else "-"
+        new = f"{r['current']:.2f}" if r["current"] is not None else "-"
+        change = f"{r['change'] * 100:+.1f}%" if r["change"] is not None else ""
+        marker = {"regression": "❌", "improved": "✅"}.get(r["status"], "")
+        print(f"{r['name']:<64}{old:>12}{new:>12}{change:>9}  {r['status']} {marker}")
+    not_measured = len(set(baseline["metrics"]) - {r["name"] for r in rows})
+    if not_measured:
+        print(f"({not_measured} baseline metrics not measured in this run)")
@@ -0,0 +1,99 @@
+"""Cold-start benchmarks: import time, time to the first health answer and first prediction.
+
+``import`` runs ``python -X importtime`` importing each service in a fresh
+interpreter and sums the top-level imports. ``health`` launches the service
+(``benchmarks.serve``, MODEL_WARMUP=lazy as a new replica would start) and
+times process start to the first answered health probe; ``first_predict`` is
+the first ``/predict`` after that, which loads the models (``common.warmup``).
+Each is the best of ``--repeat`` fresh processes.
+Usage::
+
+    python -m benchmarks.cold_start --lasindu-dir ../models/Lasindu --manuji-dir Manuji --top 15
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks import BACKEND_DIR, SERVICE_PATHS
+from benchmarks.http_load import JSON_HEADERS, PAYLOADS, READY_PATHS, launch
+from common.responses import dumps
+
+# "import time: self [us] | cumulative | imported package", nesting shown by indentation
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_profile(service: str) -> List[Tuple[str, float]]:
+    """``(package, cumulative ms)`` of every top-level import made by importing ``service``."""
+    code = f"from common.services import load_service; load_service({service!r})"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, env={**os.environ, "MODEL_WARMUP": "lazy"})
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {service} failed:\n{result.stderr[-2000:]}")
+    imports = []
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match and len(match.group(3)) == 1:
+            imports.append((match.group(4), int(match.group(2)) / 1000))
+    return imports
+
+
+def first_requests(service: str, model_dir: Optional[str], seed: int = 42) -> Dict[str, float]:
+    """ms from process start to the first health answer, and for the first ``/predict`` after it."""
+    records, _ = PAYLOADS[service]
+    body = dumps(records(1, seed)[0])
+    started = time.perf_counter()
+    with launch(service, model_dir, model_warmup="lazy", poll_interval=0.01) as base_url:
+        timings = {"health": (time.perf_counter() - started) * 1000}
+        with httpx.Client(base_url=base_url, timeout=120.0) as client:
+            start = time.perf_counter()
+            response = client.post("/predict", content=body, headers=JSON_HEADERS)
+            timings["first_predict"] = (time.perf_counter() - start) * 1000
+            if response.status_code != 200:
+                raise RuntimeError(f"{service}: first /predict returned {response.status_code}: {response.text[:200]}")
+            # The health probe itself, now that the process is up
+            start = time.perf_counter()
+            client.get(READY_PATHS[service])
+            timings["health_probe"] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+def run_service(service: str, model_dir: Optional[str], repeat: int = 3) -> List[Dict[str, Any]]:
+    """Best-of-``repeat`` cold-start ``{"name", "unit", "value"}`` metrics for ``service``."""
+    best: Dict[str, float] = {}
+    for _ in range(repeat):
+        timings = {"import": sum(ms for _, ms in import_profile(service))}
+        if model_dir or service == "kaveesha":
+            timings.update(first_requests(service, model_dir))
+        for key, value in timings.items():
+            best[key] = min(best.get(key, float("inf")), value)
+    return [{"name": f"{service}/cold/{key}", "unit": "ms", "value": value} for key, value in best.items()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lasindu-dir", help="Directory holding the Lasindu .pkl files")
+    parser.add_argument("--manuji-dir", help="Directory holding models/ for Manuji")
+    parser.add_argument("--kaveesha-dir", help="Kaveesha models directory (default: the service's own)")
+    parser.add_argument("--services", nargs="+", choices=list(SERVICE_PATHS), default=list(SERVICE_PATHS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to list per service")
+    args = parser.parse_args()
+
+    model_dirs = {"lasindu": args.lasindu_dir, "manuji": args.manuji_dir, "kaveesha": args.kaveesha_dir}
+    for service in args.services:
+        imports = sorted(import_profile(service), key=lambda item: item[1], reverse=True)
+        print(f"\n⏱️ {service}: slowest top-level imports")
+        for name, ms in imports[:args.top]:
+            print(f"   {name:<40}{ms:>10.1f} ms")
+        for metric in run_service(service, model_dirs[service], args.repeat):
+            print(f"{metric['name']:<64}{metric['value']:>12.1f} {metric['unit']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Synthetic inputs matching each service's request schema.
+
+``synthetic_loans`` has the Lasindu ``LoanInput`` columns,
+``synthetic_branch_rows`` the Manuji ``BranchInput`` columns (by alias) and
+``synthetic_requests`` the flattened Kaveesha ``PredictionRequest`` fields.
+The ``*_payloads`` helpers turn a frame into JSON request bodies.
+"""
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+BRANCHES = ['KANDY', 'MATARA', 'BADULLA', 'GODAGAMA', 'HEAD OFFICE', 'HYDE PARK', 'NARAMMALA']
+FACILITY_TYPES = ['LEASE', 'HIRE PURCHASE', 'LOAN']
+STATUSES = ['Current Running', 'Activated / Not Printed', 'Closed']
+
+
+def synthetic_loans(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Random loans with the ``LoanInput`` columns."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "facility_amount": rng.uniform(1e5, 5e6, n_rows),
+        "tenor": rng.integers(12, 72, n_rows),
+        "effec_rate": rng.uniform(8, 30, n_rows),
+        "flat_rate": rng.uniform(5, 18, n_rows),
+        "net_rental": rng.uniform(3e3, 2e5, n_rows),
+        "no_of_rental_in_arrears": rng.choice([0.0, 0.0, 0.0, 1.0, 2.0, 6.0], n_rows),
+        "age": rng.uniform(1, 60, n_rows),
+        "due_date": rng.integers(0, 2000, n_rows),
+    })
+
+
+def synthetic_branch_rows(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Random rows with the Manuji ``BranchInput`` columns."""
+    rng = np.random.default_rng(seed)
+    amount = rng.uniform(2e5, 5e6, n_rows)
+    arrears_capital = amount * rng.choice([0, 0, 0, 0.02, 0.2], n_rows)
+    return pd.DataFrame({
+        'Branch': rng.choice(BRANCHES, n_rows),
+        'Facility Type': rng.choice(FACILITY_TYPES, n_rows),
+        'FacilityAmount': amount,
+        'Effective Rate': rng.uniform(8, 30, n_rows),
+        'No of Rental in arrears': rng.choice([0, 0, 0, 1, 3, 7], n_rows),
+        'Age': rng.integers(1, 72, n_rows),
+        'ArrearsCapital': arrears_capital,
+        'ArrearsInterest': arrears_capital * 0.1,
+        'ArrearsVat': arrears_capital * 0.01,
+        'ArrearsOD': rng.choice([0.0, 0.0, 5000.0], n_rows),
+        'FutureCapital': amount * rng.uniform(0.1, 0.9, n_rows),
+        'FutureInterest': amount * rng.uniform(0.01, 0.2, n_rows),
+        'NET-OUTSTANDING': amount * rng.uniform(0.1, 1.0, n_rows),
+        'Status': rng.choice(STATUSES, n_rows),
+        'NPLStatus': rng.choice(['P', 'P', 'P', 'N'], n_rows),
+        'Last Receipt Paid Amount': rng.choice([0.0, 25000.0, 50000.0], n_rows),
+        'CD_Collection_Rental': rng.uniform(0, 1e5, n_rows),
+        'ClaimablePercentage': rng.choice([40.0, 70.0, 100.0], n_rows),
+    })
+
+
+def synthetic_requests(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Random flattened Kaveesha prediction requests."""
+    rng = np.random.default_rng(seed)
+    amount = rng.uniform(2e5, 5e6, n_rows)
+    ids = np.char.add('C', np.arange(n_rows).astype(str))
+    return pd.DataFrame({
+        'name': ids, 'customerId': ids,
+        'branch': rng.choice(BRANCHES, n_rows),
+        'status': 'Active',
+        'equipmentType': rng.choice(['MOTOR CARS', 'VAN', 'LORRY', 'THREE WHEELERS'], n_rows),
+        'schemeType': rng.choice(['NORMAL', 'STEP-UP'], n_rows),
+        'rentalPaymentType': 'Monthly',
+        'grantedDate': rng.choice(['2022-03-01', '2023-01-15', '2024-06-30'], n_rows),
+        'occupation': rng.choice(['Driver', 'Teacher', 'Farmer', 'Trader'], n_rows),
+        'monthlyIncome': rng.uniform(5e4, 5e5, n_rows),
+        'maritalStatus': rng.choice(['Single', 'Married'], n_rows),
+        'dependents': rng.integers(0, 5, n_rows),
+        'Age': rng.uniform(20, 65, n_rows),
+        'FacilityAmount': amount,
+        'Tenor': rng.choice([24.0, 36.0, 48.0, 60.0], n_rows),
+        'EffectiveRate': rng.uniform(8, 30, n_rows),
+        'FlatRate': rng.uniform(5, 18, n_rows),
+        'NetRental': amount / 40,
+        'DownPayment': amount * 0.2,
+        'NoOfRentalInArrears': rng.choice([0.0, 0.0, 1.0, 2.0, 6.0], n_rows),
+        'ArrearsCapital': amount * rng.choice([0, 0, 0.01, 0.1], n_rows),
+        'ArrearsInterest': rng.uniform(0, 2e4, n_rows),
+        'ArrearsVat': rng.uniform(0, 2e3, n_rows),
+        'ArrearsOD': rng.choice([0.0, 5000.0], n_rows),
+        'LastReceiptPaidAmount': rng.uniform(0, 1e5, n_rows),
+        'Prepayment': rng.choice([0.0, 0.0, 1e4], n_rows),
+        'onTimePaymentPercentage': rng.uniform(30, 100, n_rows),
+        'latePaymentFrequency': rng.integers(0, 10, n_rows).astype(float),
+        'previousDefaults': rng.choice([0.0, 0.0, 1.0], n_rows),
+        'earlySettlementHistory': rng.random(n_rows) < 0.1,
+    })
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    # to_dict keeps numpy scalars out of the result for float/int/bool columns
+    return df.to_dict("records")
+
+
+def loan_payloads(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """One ``LoanInput`` body per row."""
+    return _records(df)
+
+
+def branch_payloads(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """One ``BranchInput`` body (aliased keys) per row."""
+    return _records(df)
+
+
+def prediction_requests(df: pd.DataFrame, schema) -> List[Dict[str, Any]]:
+    """One nested ``PredictionRequest`` body per row.
+
+    ``schema`` is any module exposing the Kaveesha ``CustomerInfo``,
+    ``FinancialData`` and ``BehavioralData`` models (e.g. the service module).
+    """
+    groups = {
+        "customer_info": [f for f in schema.CustomerInfo.model_fields if f in df.columns],
+        "financial_data": [f for f in schema.FinancialData.model_fields if f in df.columns],
+        "behavioral_data": [f for f in schema.BehavioralData.model_fields if f in df.columns],
+    }
+    return [{group: {f: row[f] for f in fields} for group, fields in groups.items()} for row in _records(df)]
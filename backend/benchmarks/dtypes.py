@@ -0,0 +1,115 @@
+"""Memory and prediction drift of compact feature frames (``common.dtypes``).
+
+For each service the same synthetic batch is prepared twice: with the
+default float64/int64/object columns (``compact=False``) and with the
+service's compact dtype map. The benchmark reports MB per million rows of
+the prepared frame and, for every service whose model directory is given,
+how far predictions move. Usage::
+
+    python -m benchmarks.dtypes --rows 100000 --lasindu-dir ../models/Lasindu \\
+        --manuji-dir Manuji --kaveesha-dir Kaveesha/models
+"""
+import argparse
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from benchmarks import load_service
+from benchmarks.data import synthetic_branch_rows, synthetic_loans, synthetic_requests
+from common.dtypes import compact_frame, memory_report
+
+
+def _drift(before: np.ndarray, after: np.ndarray) -> Dict[str, float]:
+    before, after = np.asarray(before, dtype=float), np.asarray(after, dtype=float)
+    return {
+        "max_abs_delta": float(np.max(np.abs(before - after))) if len(before) else 0.0,
+        "changed_pct": float(100 * np.mean(before != after)) if len(before) else 0.0,
+    }
+
+
+def lasindu(n_rows: int, model_dir: Optional[str]) -> List[dict]:
+    api = load_service("lasindu")
+    loans = synthetic_loans(n_rows)
+    wide = api.engineer_features(loans.copy())
+    compact = api.engineer_features(loans.copy(), compact=True)
+    results = [{"service": "lasindu", "check": "engineered frame", **memory_report(wide, compact)}]
+    if model_dir:
+        os.chdir(model_dir)
+        api.load_models()
+        for name, model in (("impairment", api.impairment_model), ("ecl_1yr", api.ecl_model)):
+            before = model.predict(api.scaler.transform(wide))
+            after = model.predict(api.scaler.transform(compact))
+            results.append({"service": "lasindu", "check": name, **_drift(before, after)})
+    return results
+
+
+def manuji(n_rows: int, model_dir: Optional[str]) -> List[dict]:
+    api = load_service("manuji")
+    rows = synthetic_branch_rows(n_rows)
+    results = [{"service": "manuji", "check": "raw frame",
+                **memory_report(rows, compact_frame(rows, api.FEATURE_DTYPES))}]
+    if not model_dir:
+        return results
+    os.chdir(model_dir)
+    with TestClient(api.app):  # runs the lifespan that loads the latest package
+        if api.predictor is None:
+            return results
+        wide = api.prepare_input(rows, compact=False)
+        compact = api.prepare_input(rows)
+        results.append({"service": "manuji", "check": "prepared frame", **memory_report(wide, compact)})
+        scaler = api.predictor['scaler']
+        for name, model in api.predictor['models'].items():
+            before = model.predict_proba(scaler.transform(wide))[:, 1]
+            after = model.predict_proba(scaler.transform(compact))[:, 1]
+            labels = _drift(before >= 0.5, after >= 0.5)
+            results.append({"service": "manuji", "check": f"{name} P(Poor)", **_drift(before, after),
+                            "label_changed_pct": labels["changed_pct"]})
+    return results
+
+
+def kaveesha(n_rows: int, model_dir: Optional[str]) -> List[dict]:
+    api = load_service("kaveesha")
+    requests = synthetic_requests(n_rows)
+    wide = api.calculate_derived_features_frame(requests, compact=False)
+    compact = api.calculate_derived_features_frame(requests)
+    results = [{"service": "kaveesha", "check": "derived frame", **memory_report(wide, compact)}]
+    if model_dir:
+        models = api.PredictionModels(model_dir)
+        for name in api.MODEL_KEYS:
+            before = models._predict_frame(wide, name)
+            after = models._predict_frame(compact, name)
+            categories = np.mean(np.asarray(before['risk_category']) != np.asarray(after['risk_category']))
+            results.append({"service": "kaveesha", "check": f"{name} pd", **_drift(before['pd'], after['pd']),
+                            "label_changed_pct": float(100 * categories)})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--lasindu-dir", help="Directory holding the Lasindu .pkl files")
+    parser.add_argument("--manuji-dir", help="Directory holding models/all_models_package_*.pkl")
+    parser.add_argument("--kaveesha-dir", help="Kaveesha models directory")
+    args = parser.parse_args()
+
+    start_dir = os.getcwd()
+    results = []
+    for run, model_dir in ((lasindu, args.lasindu_dir), (manuji, args.manuji_dir), (kaveesha, args.kaveesha_dir)):
+        results.extend(run(args.rows, model_dir and os.path.abspath(model_dir)))
+        os.chdir(start_dir)
+
+    print(f"\nCompact feature frames, {args.rows} rows")
+    print(f"{'service':<10}{'check':<32}{'MB/1M before':>14}{'MB/1M after':>13}{'saved':>8}"
+          f"{'max |delta|':>14}{'changed':>10}{'label chg':>11}")
+    for r in results:
+        memory = (f"{r['before_mb_per_million']:>14.1f}{r['after_mb_per_million']:>13.1f}{r['saved_pct']:>7.1f}%"
+                  if "saved_pct" in r else " " * 35)
+        drift = (f"{r['max_abs_delta']:>14.3g}{r['changed_pct']:>9.2f}%" if "max_abs_delta" in r else " " * 24)
+        label = f"{r['label_changed_pct']:>10.3f}%" if "label_changed_pct" in r else ""
+        print(f"{r['service']:<10}{r['check']:<32}{memory}{drift}{label}")
+
+
+if __name__ == "__main__":
+    main()
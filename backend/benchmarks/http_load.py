@@ -0,0 +1,209 @@
+"""End-to-end HTTP load tests against locally launched services.
+
+Each service runs in its own uvicorn process (``benchmarks.serve``) on a free
+local port. ``--concurrency`` client threads then send ``--requests``
+requests to ``/predict`` (one record each) and to ``/predict/batch``
+(``--batch-rows`` records each). Every request carries different synthetic
+records, so the prediction caches never answer from memory. Bodies are
+encoded before the clock starts.
+
+Reported per endpoint: p50/p95/p99 latency, requests/s, rows/s and errors.
+Client and server share the machine, so run it on an otherwise idle host.
+``--workers`` serves the app from that many pre-forked processes
+(``common.prefork``); compare runs with 1..N workers for throughput scaling.
+Usage::
+
+    python -m benchmarks.http_load --manuji-dir Manuji --requests 200 --concurrency 4 --workers 2
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+import numpy as np
+
+from benchmarks import BACKEND_DIR, load_service
+from benchmarks.data import (
+    branch_payloads, loan_payloads, prediction_requests,
+    synthetic_branch_rows, synthetic_loans, synthetic_requests
+)
+from common.responses import dumps
+
+# Endpoint polled until the service answers, per service
+READY_PATHS = {"lasindu": "/", "manuji": "/health", "kaveesha": "/health"}
+JSON_HEADERS = {"content-type": "application/json"}
+WARMUP_REQUESTS = 5
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def launch(service: str, model_dir: Optional[str] = None, timeout: float = 120.0, workers: int = 1,
+           model_warmup: str = "startup", poll_interval: float = 0.2) -> Iterator[str]:
+    """Run ``service`` in a uvicorn subprocess; yields its base URL and stops it on exit.
+
+    ``model_warmup`` is the server's MODEL_WARMUP (``common.warmup``): by default
+    the models load before the server answers, so they are not timed as requests.
+    """
+    port = _free_port()
+    command = [sys.executable, "-m", "benchmarks.serve", service, "--port", str(port), "--workers", str(workers)]
+    if model_dir:
+        command += ["--model-dir", os.path.abspath(model_dir)]
+    env = {**os.environ, "MODEL_WARMUP": model_warmup}
+    with tempfile.TemporaryFile() as log:
+        process = subprocess.Popen(command, cwd=BACKEND_DIR, stdout=log, stderr=subprocess.STDOUT, env=env)
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            deadline = time.monotonic() + timeout
+            # One client for all polls: a new one per poll costs more CPU than the server's startup steps
+            with httpx.Client(base_url=base_url, timeout=1.0) as client:
+                while True:
+                    if process.poll() is not None or time.monotonic() > deadline:
+                        log.seek(0)
+                        tail = log.read().decode(errors="replace")[-2000:]
+                        raise RuntimeError(f"{service} did not start on port {port}:\n{tail}")
+                    try:
+                        if client.get(READY_PATHS[service]).status_code < 500:
+                            break
+                    except httpx.TransportError:
+                        pass
+                    time.sleep(poll_interval)
+            yield base_url
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def run_load(base_url: str, path: str, bodies: List[bytes], concurrency: int,
+             rows_per_request: int = 1, warmup: int = WARMUP_REQUESTS) -> Dict[str, Any]:
+    """Closed-loop load: ``concurrency`` threads each send their share of ``bodies`` back to back.
+
+    The first ``warmup`` bodies are sent before timing starts and are not counted.
+    """
+    with httpx.Client(base_url=base_url, timeout=120.0) as client:
+        for body in bodies[:warmup]:
+            client.post(path, content=body, headers=JSON_HEADERS)
+    bodies = bodies[warmup:]
+
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    start_gate = threading.Barrier(concurrency + 1)
+
+    def worker(share: List[bytes]) -> None:
+        local, failed = [], 0
+        with httpx.Client(base_url=base_url, timeout=120.0) as client:
+            start_gate.wait()
+            for body in share:
+                start = time.perf_counter()
+                try:
+                    ok = client.post(path, content=body, headers=JSON_HEADERS).status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                local.append(time.perf_counter() - start)
+                failed += not ok
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(bodies[i::concurrency],)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    start_gate.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    ms = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "p50_ms": float(np.percentile(ms, 50)) if len(ms) else None,
+        "p95_ms": float(np.percentile(ms, 95)) if len(ms) else None,
+        "p99_ms": float(np.percentile(ms, 99)) if len(ms) else None,
+        "requests_per_second": len(latencies) / wall if wall > 0 else None,
+        "rows_per_second": len(latencies) * rows_per_request / wall if wall > 0 else None,
+    }
+
+
+# JSON records per service and the batch body's root key
+PAYLOADS = {
+    "lasindu": (lambda n, seed: loan_payloads(synthetic_loans(n, seed)), "loans"),
+    "manuji": (lambda n, seed: branch_payloads(synthetic_branch_rows(n, seed)), "data"),
+    "kaveesha": (lambda n, seed: prediction_requests(synthetic_requests(n, seed), load_service("kaveesha")),
+                 "requests"),
+}
+
+
+def _bodies(service: str, n_requests: int, rows_per_request: int, seed: int) -> Dict[str, List[bytes]]:
+    """Pre-encoded ``/predict`` and ``/predict/batch`` bodies with distinct records."""
+    records, root = PAYLOADS[service]
+    batch = records(n_requests * rows_per_request, seed + 1)
+    return {
+        "/predict": [dumps(record) for record in records(n_requests, seed)],
+        "/predict/batch": [dumps({root: batch[i:i + rows_per_request]})
+                           for i in range(0, len(batch), rows_per_request)],
+    }
+
+
+def run_service(service: str, model_dir: Optional[str], n_requests: int, concurrency: int,
+                rows_per_request: int, seed: int = 42, workers: int = 1) -> List[Dict[str, Any]]:
+    """Launch ``service``, load both endpoints and return ``{"name", "unit", "value"}`` metrics."""
+    bodies = _bodies(service, n_requests + WARMUP_REQUESTS, rows_per_request, seed)
+    metrics = []
+    # Single-worker names stay as they were so older baselines still compare
+    worker_label = f",w={workers}" if workers > 1 else ""
+    with launch(service, model_dir, workers=workers) as base_url:
+        for path, endpoint_bodies in bodies.items():
+            rows = rows_per_request if path.endswith("batch") else 1
+            result = run_load(base_url, path, endpoint_bodies, concurrency, rows)
+            prefix = f"{service}/http{path}[c={concurrency},rows={rows}{worker_label}]"
+            metrics += [
+                {"name": f"{prefix}/p50", "unit": "ms", "value": result["p50_ms"]},
+                {"name": f"{prefix}/p95", "unit": "ms", "value": result["p95_ms"]},
+                {"name": f"{prefix}/p99", "unit": "ms", "value": result["p99_ms"]},
+                {"name": f"{prefix}/throughput", "unit": "req/s", "value": result["requests_per_second"]},
+                {"name": f"{prefix}/rows", "unit": "rows/s", "value": result["rows_per_second"]},
+                {"name": f"{prefix}/errors", "unit": "errors", "value": result["errors"]},
+            ]
+    return metrics
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lasindu-dir", help="Directory holding the Lasindu .pkl files")
+    parser.add_argument("--manuji-dir", help="Directory holding models/ for Manuji")
+    parser.add_argument("--kaveesha-dir", help="Kaveesha models directory")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--batch-rows", type=int, default=100)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1], help="Worker counts to compare")
+    args = parser.parse_args()
+
+    for service, model_dir in (("lasindu", args.lasindu_dir), ("manuji", args.manuji_dir),
+                               ("kaveesha", args.kaveesha_dir)):
+        if not model_dir:
+            continue
+        for workers in args.workers:
+            for metric in run_service(service, model_dir, args.requests, args.concurrency, args.batch_rows,
+                                      workers=workers):
+                print(f"{metric['name']:<64}{metric['value']:>12.1f} {metric['unit']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Size and load time of a legacy Manuji ``.pkl`` package vs a versioned package.
+
+Converts a legacy ``all_models_package_*.pkl`` into a versioned package in a
+temporary directory, then compares bytes on disk and the time to read the
+metadata, to get the best model ready and to load everything. Usage::
+
+    python -m benchmarks.model_package Manuji/models/all_models_package_20240101_120000.pkl
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+import joblib
+
+from benchmarks import BACKEND_DIR
+
+sys.path.insert(0, str(BACKEND_DIR / "Manuji"))
+from model_store import LazyModels, ModelPackage, convert_legacy  # noqa: E402
+
+
+def _best_ms(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _dir_bytes(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pkl_path", help="Legacy all_models_package_*.pkl")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    legacy_path = Path(args.pkl_path)
+    with tempfile.TemporaryDirectory() as root:
+        package_dir = convert_legacy(str(legacy_path), root)
+
+        def best_model_ready() -> None:
+            package = ModelPackage(package_dir)
+            package.load_preprocessing()
+            LazyModels(package)[package.best_model_name]
+
+        def load_all() -> None:
+            package = ModelPackage(package_dir)
+            package.load_preprocessing()
+            models = LazyModels(package)
+            for name in models:
+                models[name]
+
+        def legacy_best_model() -> None:
+            package = joblib.load(legacy_path)
+            package["models"][package["best_model_name"]]
+
+        rows = [
+            ("bytes on disk", f"{os.path.getsize(legacy_path):,}", f"{_dir_bytes(package_dir):,}"),
+            ("read metadata (ms)", f"{_best_ms(lambda: joblib.load(legacy_path)['feature_columns'], args.repeat):.1f}",
+             f"{_best_ms(lambda: ModelPackage(package_dir).feature_columns, args.repeat):.2f}"),
+            ("best model ready (ms)", f"{_best_ms(legacy_best_model, args.repeat):.1f}",
+             f"{_best_ms(best_model_ready, args.repeat):.1f}"),
+            ("load everything (ms)", f"{_best_ms(lambda: joblib.load(legacy_path), args.repeat):.1f}",
+             f"{_best_ms(load_all, args.repeat):.1f}"),
+        ]
+
+    print(f"\n{legacy_path.name}")
+    print(f"{'':<24}{'legacy .pkl':>16}{'versioned':>16}")
+    for label, legacy, versioned in rows:
+        print(f"{label:<24}{legacy:>16}{versioned:>16}")
+
+
+if __name__ == "__main__":
+    main()
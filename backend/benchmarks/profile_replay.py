@@ -0,0 +1,59 @@
+"""Replay a request saved by the profiling middleware under the profiler, offline.
+
+Takes the ``<id>.request.json`` written next to a profile (``common.profiling``),
+loads the same service in-process from ``--model-dir`` and sends the saved
+method, path, query and body ``--repeat`` times, each one profiled. New profiles
+go to ``--output-dir`` (default: the directory of the saved request).
+Usage::
+
+    python -m benchmarks.profile_replay .profiles/20240101-120000-manuji-1a2b3c4d.request.json --model-dir Manuji
+"""
+import argparse
+import json
+import secrets
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from benchmarks import load_service, use_model_dir
+from common import profiling, warmup
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("request", help="Saved <id>.request.json")
+    parser.add_argument("--model-dir", help="Model directory (default: the service's own)")
+    parser.add_argument("--output-dir", help="Where to write the new profiles")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--interval-ms", type=float, default=1.0, help="Sampling interval")
+    args = parser.parse_args()
+
+    request_file = Path(args.request).resolve()
+    saved = json.loads(request_file.read_text())
+    body = (request_file.parent / saved["body_file"]).read_bytes()
+    output_dir = Path(args.output_dir).resolve() if args.output_dir else request_file.parent
+
+    # A one-off token and no rate limit: every replay is profiled
+    token = secrets.token_hex(16)
+    profiling.configure(token=token, directory=str(output_dir), min_interval=0.0,
+                        interval=args.interval_ms / 1000)
+    service = saved["service"]
+    api = use_model_dir(service, args.model_dir) if args.model_dir else load_service(service)
+
+    headers = {"x-profile": token}
+    for name in ("content_type", "accept"):
+        if saved.get(name):
+            headers[name.replace("_", "-")] = saved[name]
+    url = saved["path"] + (f"?{saved['query_string']}" if saved.get("query_string") else "")
+    print(f"🔁 Replaying {saved['method']} {url} on {service} ({len(body)} byte body, "
+          f"originally {saved['duration_ms']:.1f} ms, status {saved['status']})")
+    with TestClient(api.app) as client:
+        warmup.warm_up_all()  # model loading stays out of the profiles
+        for _ in range(args.repeat):
+            response = client.request(saved["method"], url, content=body, headers=headers)
+            profile_id = response.headers.get("x-profile-id")
+            print(f"   status {response.status_code}: {output_dir / f'{profile_id}.speedscope.json'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Bytes on the wire and serialization CPU per response mode.
+
+Compares FastAPI's default path (``response_model`` validation, then
+``jsonable_encoder``, then ``json.dumps``) against ``FastJSONResponse`` in each
+payload format. Usage::
+
+    python -m benchmarks.serialization --rows 100 1000 10000
+"""
+import argparse
+import json
+import time
+from typing import Callable, List
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks import load_service
+from common.responses import BATCH_FORMATS, batch_payload, dumps
+
+
+def _time_call(fn: Callable[[], bytes], repeat: int) -> float:
+    """Best-of-``repeat`` wall time of ``fn`` in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _default_fastapi(model_cls, payload) -> bytes:
+    validated = model_cls.model_validate(payload)
+    encoded = jsonable_encoder(validated)
+    return json.dumps(encoded, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def bench_lasindu_batch(n_rows: int, repeat: int) -> List[dict]:
+    api = load_service("lasindu")
+    rng = np.random.default_rng(42)
+    impairment = rng.gamma(2.0, 5000.0, n_rows)
+    ecl = rng.gamma(2.0, 2000.0, n_rows)
+    summary = {
+        "total_loans": n_rows,
+        "average_impairment": float(impairment.mean()),
+        "average_ecl": float(ecl.mean()),
+        "total_impairment": float(impairment.sum()),
+        "total_ecl": float(ecl.sum()),
+    }
+    columns = {"impairment": impairment.tolist(), "ecl_1yr": ecl.tolist()}
+
+    results = []
+    rows_payload = batch_payload(columns, api.MODEL_METADATA, "rows", summary=summary)
+    default_fn = lambda: _default_fastapi(api.BatchPredictionResponse, rows_payload)
+    results.append({
+        "mode": "default (pydantic + json)",
+        "bytes": len(default_fn()),
+        "ms": _time_call(default_fn, repeat),
+    })
+    for fmt in BATCH_FORMATS:
+        fn = lambda fmt=fmt: dumps(batch_payload(columns, api.MODEL_METADATA, fmt, summary=summary))
+        results.append({"mode": f"fast/{fmt}", "bytes": len(fn()), "ms": _time_call(fn, repeat)})
+    return results
+
+
+def bench_kaveesha_single(repeat: int) -> List[dict]:
+    api = load_service("kaveesha")
+    data = api.calculate_derived_features({
+        "FacilityAmount": 1500000.0, "Tenor": 48.0, "EffectiveRate": 14.5, "NetRental": 42000.0,
+        "ArrearsCapital": 25000.0, "ArrearsOD": 1200.0, "NoOfRentalInArrears": 2.0,
+        "onTimePaymentPercentage": 78.0, "previousDefaults": 0.0, "employmentStability": 3.0,
+        "grantedDate": "2023-06-01", "Age": 38.0,
+    })
+    contributions = api.prediction_models.get_feature_contributions(data)
+    full = {
+        "pd": 0.4123, "risk_category": "Medium Risk", "confidence": 0.85,
+        "timestamp": "2024-01-15T10:00:00", "top_features": contributions[:5],
+        "recommendations": ["🟡 MEDIUM RISK: Close monitoring needed (20-50% PD)"] * 5,
+        "model_info": {**api.RANDOM_FOREST_INFO, "features_used": len(data)},
+        "feature_contributions": contributions, "model_used": "Random Forest",
+        "model_performance": api.MODEL_PERFORMANCE["random_forest"],
+    }
+    compact = {k: v for k, v in full.items() if k not in api.COMPACT_EXCLUDED_FIELDS}
+    selected = {k: full[k] for k in ("pd", "risk_category")}
+
+    default_fn = lambda: _default_fastapi(api.PredictionResponse, full)
+    return [
+        {"mode": "default (pydantic + json)", "bytes": len(default_fn()), "ms": _time_call(default_fn, repeat)},
+        {"mode": "fast/full", "bytes": len(dumps(full)), "ms": _time_call(lambda: dumps(full), repeat)},
+        {"mode": "fast/compact", "bytes": len(dumps(compact)), "ms": _time_call(lambda: dumps(compact), repeat)},
+        {"mode": "fast/fields=pd,risk_category", "bytes": len(dumps(selected)),
+         "ms": _time_call(lambda: dumps(selected), repeat)},
+    ]
+
+
+def _print_table(title: str, rows: List[dict]) -> None:
+    print(f"\n{title}")
+    print(f"{'mode':<32}{'bytes':>12}{'ms':>12}")
+    for r in rows:
+        print(f"{r['mode']:<32}{r['bytes']:>12,}{r['ms']:>12.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for n in args.rows:
+        _print_table(f"Lasindu /predict/batch, {n} loans", bench_lasindu_batch(n, args.repeat))
+    _print_table("Kaveesha /predict, single customer", bench_kaveesha_single(args.repeat * 50))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Start one prediction service with uvicorn, loading its models from ``--model-dir``.
+
+Used by ``benchmarks.http_load`` to launch the apps locally (see
+``benchmarks.use_model_dir`` for how each service finds its models). With
+``--workers`` above 1 the app is served by ``common.prefork``.
+Usage::
+
+    python -m benchmarks.serve manuji --model-dir Manuji --port 8101 --workers 2
+"""
+import argparse
+
+import uvicorn
+
+from benchmarks import SERVICE_PATHS, load_service, use_model_dir
+from common import prefork
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("service", choices=list(SERVICE_PATHS))
+    parser.add_argument("--model-dir", help="Model directory (default: the service's own)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    api = use_model_dir(args.service, args.model_dir) if args.model_dir else load_service(args.service)
+    if args.workers > 1:
+        prefork.serve(api.app, args.host, args.port, args.workers)
+    else:
+        uvicorn.run(api.app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
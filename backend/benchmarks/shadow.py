@@ -0,0 +1,139 @@
+"""User-facing latency with shadow evaluation off, on, and on without its idle gate.
+
+Each service runs in a uvicorn process (``benchmarks.http_load.launch``)
+once per mode:
+
+    off        SHADOW_SAMPLE_RATE=0
+    shadow     requests shadowed at ``--sample-rate`` with the default load shedding
+    ungated    the same without the idle gate (no in-flight limit, no quiet period),
+               so challengers run whenever a job is queued
+
+Two ``/predict`` loads run per mode, with distinct records so the caches
+never answer: ``paced``, one request every 1/``--rate`` seconds (spare
+capacity between requests), then ``saturated``, ``--concurrency`` clients
+back to back. Reported: p50/p99 per load, and the requests compared and
+shed and the challenger errors per ``/shadow/stats``. Every run writes a fresh state database.
+Usage::
+
+    python -m benchmarks.shadow --manuji-dir Manuji --kaveesha-dir Kaveesha/models --concurrency 2
+"""
+import argparse
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+import httpx
+import numpy as np
+
+from benchmarks.http_load import JSON_HEADERS, PAYLOADS, WARMUP_REQUESTS, launch, run_load
+from common.responses import dumps
+
+STATE_DB_VARIABLES = {"manuji": "MANUJI_STATE_DB", "kaveesha": "KAVEESHA_STATE_DB"}
+# Seconds left for queued shadow jobs to finish (or go stale) before /shadow/stats is read
+DRAIN_SECONDS = 6.0
+
+
+@contextmanager
+def environment(**values: str) -> Iterator[None]:
+    """Set environment variables (inherited by launched services) for the block."""
+    saved = {key: os.environ.get(key) for key in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def paced_load(base_url: str, bodies: List[bytes], rate: float) -> Dict[str, Any]:
+    """Send ``bodies`` one every 1/``rate`` seconds (or at once when late); latency percentiles"""
+    latencies = []
+    with httpx.Client(base_url=base_url, timeout=120.0) as client:
+        for body in bodies[:WARMUP_REQUESTS]:
+            client.post("/predict", content=body, headers=JSON_HEADERS)
+        start = time.perf_counter()
+        for i, body in enumerate(bodies[WARMUP_REQUESTS:]):
+            time.sleep(max(0.0, start + i / rate - time.perf_counter()))
+            sent = time.perf_counter()
+            client.post("/predict", content=body, headers=JSON_HEADERS)
+            latencies.append((time.perf_counter() - sent) * 1000)
+    return {"p50_ms": float(np.percentile(latencies, 50)), "p99_ms": float(np.percentile(latencies, 99))}
+
+
+def _shadow_counts(base_url: str, before: Dict[str, int]) -> Dict[str, int]:
+    """Requests compared and shed, and challenger errors, so far per /shadow/stats, minus ``before``"""
+    time.sleep(DRAIN_SECONDS)
+    stats = httpx.get(f"{base_url}/shadow/stats", timeout=60.0).json()
+    process = stats["process"]
+    counts = {
+        "compared": max((c["requests"] for c in stats["comparisons"]), default=0),
+        "shed": process["shed_queue_full"] + process["shed_stale"],
+        "challenger_errors": process["errors"],
+    }
+    return {key: value - before.get(key, 0) for key, value in counts.items()}
+
+
+def run_service(service: str, model_dir: str, n_requests: int = 400, concurrency: int = 2, rate: float = 20.0,
+                sample_rate: float = 1.0, seed: int = 42) -> List[Dict[str, Any]]:
+    """``{"name", "unit", "value"}`` metrics for the off, shadow and ungated runs of ``service``"""
+    records, _ = PAYLOADS[service]
+    loads = {
+        "paced": [dumps(record) for record in records(n_requests + WARMUP_REQUESTS, seed)],
+        "saturated": [dumps(record) for record in records(n_requests + WARMUP_REQUESTS, seed + 1)],
+    }
+    modes = {
+        "off": {"SHADOW_SAMPLE_RATE": "0"},
+        "shadow": {"SHADOW_SAMPLE_RATE": str(sample_rate)},
+        "ungated": {"SHADOW_SAMPLE_RATE": str(sample_rate), "SHADOW_MAX_IN_FLIGHT": "1000000",
+                    "SHADOW_QUIET_MS": "0"},
+    }
+    metrics = []
+    with tempfile.TemporaryDirectory() as state_dir:
+        for mode, variables in modes.items():
+            state_db = os.path.join(state_dir, f"{mode}.db")
+            with environment(**variables, **{STATE_DB_VARIABLES[service]: state_db}), \
+                    launch(service, model_dir) as base_url:
+                counts: Dict[str, int] = {}
+                for load, bodies in loads.items():
+                    if load == "paced":
+                        result = paced_load(base_url, bodies, rate)
+                        prefix = f"{service}/shadow/{mode}/predict[paced={rate:g}/s]"
+                    else:
+                        result = run_load(base_url, "/predict", bodies, concurrency)
+                        prefix = f"{service}/shadow/{mode}/predict[c={concurrency}]"
+                    metrics += [
+                        {"name": f"{prefix}/p50", "unit": "ms", "value": result["p50_ms"]},
+                        {"name": f"{prefix}/p99", "unit": "ms", "value": result["p99_ms"]},
+                    ]
+                    if mode != "off":
+                        delta = _shadow_counts(base_url, counts)
+                        counts = {key: counts.get(key, 0) + value for key, value in delta.items()}
+                        metrics += [{"name": f"{prefix}/{key}", "unit": "requests", "value": value}
+                                    for key, value in delta.items()]
+    return metrics
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--manuji-dir", help="Directory holding models/ for Manuji")
+    parser.add_argument("--kaveesha-dir", help="Kaveesha models directory")
+    parser.add_argument("--requests", type=int, default=400, help="/predict requests per load")
+    parser.add_argument("--concurrency", type=int, default=2, help="Clients of the saturated load")
+    parser.add_argument("--rate", type=float, default=20.0, help="Requests/s of the paced load")
+    parser.add_argument("--sample-rate", type=float, default=1.0, help="SHADOW_SAMPLE_RATE of the shadowed runs")
+    args = parser.parse_args()
+
+    for service, model_dir in (("manuji", args.manuji_dir), ("kaveesha", args.kaveesha_dir)):
+        if not model_dir:
+            continue
+        for metric in run_service(service, model_dir, args.requests, args.concurrency, args.rate, args.sample_rate):
+            print(f"{metric['name']:<52}{metric['value']:>12.3f} {metric['unit']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""In-process stage microbenchmarks for the three prediction services.
+
+Each service's batch path is cut into the stages ``/predict/batch`` runs:
+
+    parse           JSON body -> validated DataFrame (``FrameSchema.parse_json``)
+    features        feature engineering / input preparation
+    scaling         scaler.transform of the model inputs
+    inference       model calls (uncached)
+    serialization   response payload -> JSON bytes
+
+Every stage is timed on its own, best of ``repeat``, on synthetic rows from
+``benchmarks.data``. Stages that need fitted models are skipped when the
+service has none. Results are ``{"name", "unit", "value"}`` metrics as used by
+``benchmarks.baseline``.
+"""
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from benchmarks import load_service
+from benchmarks.data import (
+    branch_payloads, loan_payloads, prediction_requests,
+    synthetic_branch_rows, synthetic_loans, synthetic_requests
+)
+from common.responses import batch_payload, dumps
+
+
+def best_ms(fn: Callable[[], Any], repeat: int) -> float:
+    """Best-of-``repeat`` wall time of ``fn`` in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+class _Stages:
+    """Times consecutive stages, feeding each stage's output to the next."""
+
+    def __init__(self, service: str, n_rows: int, repeat: int):
+        self.prefix = f"{service}/stage"
+        self.n_rows = n_rows
+        self.repeat = repeat
+        self.metrics: List[Dict[str, Any]] = []
+
+    def run(self, stage: str, fn: Callable[[], Any]) -> Any:
+        result = fn()
+        self.metrics.append({"name": f"{self.prefix}/{stage}[{self.n_rows}]", "unit": "ms",
+                             "value": best_ms(fn, self.repeat)})
+        return result
+
+
+def lasindu(rows: List[int], repeat: int, model_dir: Optional[str]) -> List[Dict[str, Any]]:
+    api = load_service("lasindu")
+    if model_dir:
+        os.chdir(model_dir)
+        api.model_loader.ensure()
+    metrics = []
+    for n in rows:
+        stages = _Stages("lasindu", n, repeat)
+        body = dumps({"loans": loan_payloads(synthetic_loans(n))})
+        frame = stages.run("parse", lambda: api.LOAN_SCHEMA.parse_json(body, "loans"))
+        engineered = stages.run("features", lambda: api.engineer_features(frame))
+        if api.models_loaded:
+            scaled = stages.run("scaling", lambda: api.scaler.transform(engineered.astype(np.float64)))
+            impairment, ecl = stages.run("inference", lambda: (
+                np.asarray(api.impairment_model.predict(scaled), dtype=float),
+                np.asarray(api.ecl_model.predict(scaled), dtype=float)))
+            columns = {"impairment": impairment.tolist(), "ecl_1yr": ecl.tolist()}
+            stages.run("serialization", lambda: dumps(batch_payload(
+                columns, api.MODEL_METADATA, "rows",
+                summary={"total_loans": n, "average_impairment": float(impairment.mean()),
+                         "average_ecl": float(ecl.mean())})))
+        metrics.extend(stages.metrics)
+    return metrics
+
+
+def manuji(rows: List[int], repeat: int, model_dir: Optional[str]) -> List[Dict[str, Any]]:
+    api = load_service("manuji")
+    if not model_dir:
+        return []
+    os.chdir(model_dir)
+    metrics = []
+    with TestClient(api.app):
+        if not api.model_loader.ensure():  # loads the latest package
+            return []
+        model_name = api.predictor["best_model_name"]
+        model = api.predictor["models"][model_name]
+        for n in rows:
+            stages = _Stages("manuji", n, repeat)
+            body = dumps({"data": branch_payloads(synthetic_branch_rows(n))})
+            frame = stages.run("parse", lambda: api.BRANCH_SCHEMA.parse_json(body, "data"))
+            X = stages.run("features", lambda: api.prepare_input(frame))
+            scaled = stages.run("scaling", lambda: api.predictor["scaler"].transform(X.astype(np.float64)))
+            preds, confs = stages.run("inference", lambda: (
+                model.predict(scaled), model.predict_proba(scaled).max(axis=1)))
+            labels = ["Good" if int(p) == 0 else "Poor" for p in preds]
+            stages.run("serialization", lambda: dumps(batch_payload(
+                {"record_id": list(range(n)), "prediction": labels, "confidence": confs.tolist()}, {}, "rows",
+                key="predictions", summary={"total_records": n, "model_used": model_name})))
+            metrics.extend(stages.metrics)
+    return metrics
+
+
+def kaveesha(rows: List[int], repeat: int, model_dir: Optional[str]) -> List[Dict[str, Any]]:
+    api = load_service("kaveesha")
+    if model_dir:
+        api.prediction_models = api.PredictionModels(model_dir)
+    models = api.prediction_models
+    metrics = []
+    for n in rows:
+        stages = _Stages("kaveesha", n, repeat)
+        body = dumps({"requests": prediction_requests(synthetic_requests(n), api)})
+        frame = stages.run("parse", lambda: api.PREDICTION_SCHEMA.parse_json(body, "requests"))
+        derived = stages.run("features", lambda: api.calculate_derived_features_frame(frame))
+        if "random_forest_scaler" in models.models:
+            features = derived.reindex(columns=models.model_columns("random_forest")).fillna(0.0).to_numpy(dtype=float)
+            stages.run("scaling", lambda: models.models["random_forest_scaler"].transform(features))
+        # Includes the Random Forest scaling above and PD calibration; scorecard when the model is missing
+        result = stages.run("inference", lambda: models._predict_frame(derived, "random_forest"))
+        columns = {"customer_id": derived["customerId"].astype(str).tolist(), **result}
+        stages.run("serialization", lambda: dumps(batch_payload(
+            columns, {}, "rows", summary={"total_records": n, "fallback_count": sum(result["fallback"])})))
+        metrics.extend(stages.metrics)
+    return metrics
+
+
+SERVICES = {"lasindu": lasindu, "manuji": manuji, "kaveesha": kaveesha}
@@ -0,0 +1,101 @@
+"""Benchmark suite for the three prediction services, with stored baselines.
+
+Runs the in-process stage microbenchmarks (``benchmarks.stages``), with
+``--cold-start`` the import time and first health/prediction timings
+(``benchmarks.cold_start``) and with ``--http`` the end-to-end load tests
+(``benchmarks.http_load``) for every service whose model directory is given
+(Kaveesha also runs on its default models/scorecard). ``--save-baseline`` stores the results;
+``--compare`` checks them against a stored baseline and exits with status 1
+on a regression (``benchmarks.baseline``). Typical use between commits::
+
+    python -m benchmarks.suite --lasindu-dir ../models/Lasindu --manuji-dir Manuji --http --save-baseline
+    git checkout my-branch
+    python -m benchmarks.suite --lasindu-dir ../models/Lasindu --manuji-dir Manuji --http --compare
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List
+
+from benchmarks import baseline, cold_start, http_load, stages
+
+
+def _thresholds(values: List[str]) -> Dict[str, float]:
+    thresholds = {}
+    for value in values or []:
+        unit, _, fraction = value.partition("=")
+        if unit not in baseline.DEFAULT_THRESHOLDS or not fraction:
+            raise SystemExit(f"--threshold expects UNIT=FRACTION with UNIT in {list(baseline.DEFAULT_THRESHOLDS)}")
+        thresholds[unit] = float(fraction)
+    return thresholds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lasindu-dir", help="Directory holding the Lasindu .pkl files")
+    parser.add_argument("--manuji-dir", help="Directory holding models/ for Manuji")
+    parser.add_argument("--kaveesha-dir", help="Kaveesha models directory (default: the service's own)")
+    parser.add_argument("--services", nargs="+", choices=list(stages.SERVICES), default=list(stages.SERVICES))
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 1000], help="Batch sizes for the stages")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cold-start", action="store_true",
+                        help="Also time imports (-X importtime), the first health answer and first prediction")
+    parser.add_argument("--http", action="store_true", help="Also run the HTTP load tests")
+    parser.add_argument("--requests", type=int, default=200, help="HTTP requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--batch-rows", type=int, default=100, help="Records per HTTP batch request")
+    parser.add_argument("--workers", type=int, default=1, help="Pre-forked server processes for --http")
+    parser.add_argument("--output", help="Also write this run's metrics as JSON")
+    parser.add_argument("--save-baseline", nargs="?", const=baseline.DEFAULT_BASELINE, metavar="PATH")
+    parser.add_argument("--compare", nargs="?", const=baseline.DEFAULT_BASELINE, metavar="PATH")
+    parser.add_argument("--threshold", nargs="+", metavar="UNIT=FRACTION",
+                        help="Override regression thresholds, e.g. ms=0.1 req/s=0.15")
+    args = parser.parse_args()
+    thresholds = _thresholds(args.threshold)
+
+    start_dir = os.getcwd()
+    model_dirs = {"lasindu": args.lasindu_dir, "manuji": args.manuji_dir, "kaveesha": args.kaveesha_dir}
+    model_dirs = {name: path and os.path.abspath(path) for name, path in model_dirs.items()}
+    metrics = []
+    for service in args.services:
+        print(f"⏱️ {service}: stages")
+        metrics += stages.SERVICES[service](args.rows, args.repeat, model_dirs[service])
+        os.chdir(start_dir)
+    if args.cold_start:
+        for service in args.services:
+            print(f"⏱️ {service}: cold start")
+            metrics += cold_start.run_service(service, model_dirs[service], args.repeat)
+    if args.http:
+        for service in args.services:
+            if service != "kaveesha" and not model_dirs[service]:
+                print(f"⚠️ {service}: no model directory, skipping the HTTP load test")
+                continue
+            print(f"⏱️ {service}: HTTP load")
+            metrics += http_load.run_service(service, model_dirs[service], args.requests, args.concurrency,
+                                             args.batch_rows, workers=args.workers)
+
+    print(f"\n{'metric':<64}{'value':>12}")
+    for metric in metrics:
+        print(f"{metric['name']:<64}{metric['value']:>12.2f} {metric['unit']}")
+
+    config = {k: getattr(args, k) for k in ("services", "rows", "repeat", "cold_start", "http", "requests",
+                                            "concurrency", "batch_rows", "workers")}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": baseline.environment(), "config": config, "metrics": metrics}, f, indent=2)
+    if args.compare:
+        stored = baseline.load(args.compare)
+        rows = baseline.compare(stored, metrics, thresholds)
+        baseline.print_comparison(stored, rows)
+        regressions = [r for r in rows if r["status"] == "regression"]
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) against {args.compare}")
+            sys.exit(1)
+        print(f"\n✅ No regressions against {args.compare}")
+    if args.save_baseline:
+        print(f"\n💾 Baseline saved: {baseline.save(args.save_baseline, metrics, config)}")
+
+
+if __name__ == "__main__":
+    main()
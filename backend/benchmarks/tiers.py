@@ -0,0 +1,112 @@
+"""Latency and memory of the ``accurate`` and ``fast`` (distilled student) serving tiers.
+
+For each service given a model directory with students installed
+(``Manuji/distill.py``), in-process ``/predict`` calls with one record each
+and ``/predict/batch`` calls with ``--batch-rows`` records are timed per
+tier. Every call carries different synthetic records, so the prediction
+caches never answer; the ``X-Serving-Tier`` header confirms the tier. The
+default model is used (Lasindu's ECL ensemble, Manuji's best model,
+Kaveesha's Random Forest); a service whose default model has no student is
+skipped. Memory (Python heap while unpickling) and pickled size of teacher
+and student come from the report the distillation measured. Usage::
+
+    python -m benchmarks.tiers --lasindu-dir ../models/Lasindu --manuji-dir Manuji --kaveesha-dir Kaveesha/models
+"""
+import argparse
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from benchmarks import use_model_dir
+from benchmarks.http_load import JSON_HEADERS, PAYLOADS
+from common.distill import TIER_HEADER, TIERS
+from common.responses import dumps
+
+
+def default_student(service: str, api: Any) -> Optional[Any]:
+    """The student of the model ``/predict`` uses by default, if installed"""
+    if service == "lasindu":
+        return api.ecl_student
+    if service == "manuji":
+        return api.predictor["students"].get(api.predictor["best_model_name"])
+    return api.prediction_models.students.get("random_forest")
+
+
+def _ensure(service: str, api: Any) -> bool:
+    loader = api.prediction_models.loader if service == "kaveesha" else api.model_loader
+    return loader.ensure()
+
+
+def run_service(service: str, model_dir: str, n_requests: int = 200, batch_rows: int = 1000,
+                repeat: int = 5, seed: int = 42) -> List[Dict[str, Any]]:
+    """``{"name", "unit", "value"}`` metrics per tier for ``service``; empty without a default student"""
+    api = use_model_dir(service, model_dir)
+    client = TestClient(api.app)
+    if not _ensure(service, api) or default_student(service, api) is None:
+        print(f"⚠️ {service}: no student for the default model in {model_dir}, skipped")
+        return []
+    records, root = PAYLOADS[service]
+    singles = [dumps(record) for record in records(n_requests * len(TIERS), seed)]
+    batch_records = records(batch_rows * repeat * len(TIERS), seed + 1)
+    batches = [dumps({root: batch_records[i:i + batch_rows]}) for i in range(0, len(batch_records), batch_rows)]
+
+    def post(path: str, body: bytes, tier: str) -> float:
+        start = time.perf_counter()
+        response = client.post(path, content=body, headers=JSON_HEADERS, params={"tier": tier})
+        elapsed = time.perf_counter() - start
+        if response.status_code != 200 or response.headers.get(TIER_HEADER) != tier:
+            raise RuntimeError(f"{service}{path}?tier={tier}: {response.status_code} "
+                               f"{response.headers.get(TIER_HEADER)} {response.text[:200]}")
+        return elapsed * 1000
+
+    metrics = []
+    for i, tier in enumerate(TIERS):
+        post("/predict", singles[0], tier)  # warm-up: model load, thread pools
+        single = [post("/predict", body, tier) for body in singles[i * n_requests:(i + 1) * n_requests]]
+        batch = min(post("/predict/batch", body, tier) for body in batches[i * repeat:(i + 1) * repeat])
+        prefix = f"{service}/tier/{tier}"
+        metrics += [
+            {"name": f"{prefix}/predict/p50", "unit": "ms", "value": float(np.percentile(single, 50))},
+            {"name": f"{prefix}/predict/p95", "unit": "ms", "value": float(np.percentile(single, 95))},
+            {"name": f"{prefix}/predict/batch[{batch_rows}]", "unit": "ms", "value": batch},
+        ]
+
+    costs = default_student(service, api).report.get("costs", {})
+    for tier, role in (("accurate", "teacher"), ("fast", "student")):
+        if role in costs:
+            metrics += [
+                {"name": f"{service}/tier/{tier}/model_memory", "unit": "MB", "value": costs[role]["memory_bytes"] / 2**20},
+                {"name": f"{service}/tier/{tier}/model_pickled", "unit": "MB",
+                 "value": costs[role]["serialized_bytes"] / 2**20},
+            ]
+    return metrics
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lasindu-dir", help="Directory holding the Lasindu .pkl files (and students/)")
+    parser.add_argument("--manuji-dir", help="Directory holding models/ for Manuji")
+    parser.add_argument("--kaveesha-dir", help="Kaveesha models directory")
+    parser.add_argument("--requests", type=int, default=200, help="/predict calls per tier")
+    parser.add_argument("--batch-rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5, help="/predict/batch calls per tier (best is kept)")
+    args = parser.parse_args()
+
+    for service, model_dir in (("lasindu", args.lasindu_dir), ("manuji", args.manuji_dir),
+                               ("kaveesha", args.kaveesha_dir)):
+        if not model_dir:
+            continue
+        metrics = {m["name"]: m for m in run_service(service, model_dir, args.requests, args.batch_rows, args.repeat)}
+        for metric in metrics.values():
+            print(f"{metric['name']:<52}{metric['value']:>12.3f} {metric['unit']}")
+        accurate, fast = f"{service}/tier/accurate", f"{service}/tier/fast"
+        for key in ("predict/p95", f"predict/batch[{args.batch_rows}]", "model_memory"):
+            if f"{accurate}/{key}" in metrics and f"{fast}/{key}" in metrics:
+                ratio = metrics[f"{accurate}/{key}"]["value"] / metrics[f"{fast}/{key}"]["value"]
+                print(f"   {service} {key}: fast tier x{ratio:.2f}")
+
+
+if __name__ == "__main__":
+    main()
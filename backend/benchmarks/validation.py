@@ -0,0 +1,75 @@
+"""Per-row pydantic validation vs column-wise ``FrameSchema.parse_json``.
+
+Times turning a JSON batch body into a validated DataFrame both ways, for
+valid bodies and for bodies where 1% of rows carry a bad value. Usage::
+
+    python -m benchmarks.validation --rows 1000 10000 100000
+"""
+import argparse
+import time
+from typing import Callable, List
+
+import pandas as pd
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+from benchmarks import load_service
+from benchmarks.data import synthetic_loans
+from common.responses import dumps
+
+
+def _best_ms(fn: Callable[[], None], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _pydantic(api, body: bytes) -> None:
+    try:
+        batch = api.BatchLoanInput.model_validate_json(body)
+    except ValidationError:
+        return
+    pd.DataFrame([loan.model_dump() for loan in batch.loans], columns=api.LOAN_SCHEMA.names)
+
+
+def _columnar(api, body: bytes) -> None:
+    try:
+        api.LOAN_SCHEMA.parse_json(body, "loans")
+    except RequestValidationError:
+        return
+
+
+def run(n_rows: int, repeat: int) -> List[dict]:
+    api = load_service("lasindu")
+    records = synthetic_loans(n_rows).to_dict("records")
+    broken = [dict(r, tenor=-1) if i % 100 == 0 else r for i, r in enumerate(records)]
+    results = []
+    for label, rows in (("valid", records), ("1% invalid", broken)):
+        body = dumps({"loans": rows})
+        results.append({
+            "body": label,
+            "pydantic_ms": _best_ms(lambda: _pydantic(api, body), repeat),
+            "columnar_ms": _best_ms(lambda: _columnar(api, body), repeat),
+        })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for n in args.rows:
+        print(f"\nLasindu batch body, {n} loans")
+        print(f"{'body':<14}{'pydantic ms':>14}{'columnar ms':>14}{'speedup':>10}")
+        for r in run(n, args.repeat):
+            print(f"{r['body']:<14}{r['pydantic_ms']:>14.1f}{r['columnar_ms']:>14.1f}"
+                  f"{r['pydantic_ms'] / r['columnar_ms']:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
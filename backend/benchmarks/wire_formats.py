@@ -0,0 +1,90 @@
+"""End-to-end JSON vs Arrow IPC vs .npy for Lasindu ``/predict/batch``.
+
+Drives the app in-process through ``TestClient`` so the timings cover body
+parsing, validation, feature engineering, scaling, inference and encoding.
+The model files are loaded from ``--model-dir`` (the directory ``api.py`` is
+normally started from). Usage::
+
+    python -m benchmarks.wire_formats --model-dir Lasindu --rows 1000 100000
+"""
+import argparse
+import io
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from benchmarks import load_service
+from benchmarks.data import synthetic_loans
+from common.columnar import ARROW_STREAM, NPY
+from common.responses import dumps
+
+
+def _arrow_body(df: pd.DataFrame) -> bytes:
+    import pyarrow as pa
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def _npy_body(df: pd.DataFrame) -> bytes:
+    sink = io.BytesIO()
+    np.save(sink, df.to_records(index=False), allow_pickle=False)
+    return sink.getvalue()
+
+
+def _requests(df: pd.DataFrame) -> Dict[str, dict]:
+    json_body = {"loans": df.to_dict("records")}
+    return {
+        "json -> json": {"json": json_body},
+        "json -> json (columnar)": {"json": json_body, "params": {"format": "columnar"}},
+        "arrow -> arrow": {"content": _arrow_body(df), "headers": {"content-type": ARROW_STREAM, "accept": ARROW_STREAM}},
+        "npy -> npy": {"content": _npy_body(df), "headers": {"content-type": NPY, "accept": NPY}},
+    }
+
+
+def run(n_rows: int, repeat: int, client: TestClient) -> List[dict]:
+    df = synthetic_loans(n_rows)
+    results = []
+    for mode, kwargs in _requests(df).items():
+        request_bytes = len(kwargs["content"]) if "content" in kwargs else len(dumps(kwargs["json"]))
+        best = float("inf")
+        response = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.post("/predict/batch", **kwargs)
+            best = min(best, time.perf_counter() - start)
+            response.raise_for_status()
+        results.append({
+            "mode": mode,
+            "request_bytes": request_bytes,
+            "response_bytes": len(response.content),
+            "ms": best * 1000,
+        })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-dir", required=True, help="Directory holding the Lasindu .pkl files")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    api = load_service("lasindu")
+    os.chdir(args.model_dir)
+    with TestClient(api.app) as client:
+        for n in args.rows:
+            print(f"\nLasindu /predict/batch, {n} loans")
+            print(f"{'mode':<26}{'request B':>14}{'response B':>14}{'ms':>12}")
+            for r in run(n, args.repeat, client):
+                print(f"{r['mode']:<26}{r['request_bytes']:>14,}{r['response_bytes']:>14,}{r['ms']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
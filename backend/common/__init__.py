@@ -0,0 +1 @@
+"""Helpers shared by the Lasindu, Manuji and Kaveesha prediction services."""
@@ -0,0 +1,137 @@
+"""Bounded LRU/TTL cache for model outputs.
+
+Entries are keyed by a digest of the canonical feature vector the model is
+fed (after feature engineering) plus the loaded model version, so two
+requests that only differ in fields the model never sees share an entry.
+Features that depend on the clock (e.g. Kaveesha's ``loan_age``) are part of
+that vector, so a cached result stops matching as soon as the feature value
+changes; the TTL bounds how long anything else can be served from cache.
+
+Services call ``reset(version)`` whenever models are (re)loaded, which drops
+every entry and stamps new keys with the new version.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_MAXSIZE = 10000
+DEFAULT_TTL_SECONDS = 3600.0
+
+
+def file_version(*paths: Any) -> str:
+    """Version string from the name, size and mtime of model artifact files."""
+    parts = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            parts.append(f"{os.path.basename(str(path))}:{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{os.path.basename(str(path))}:missing")
+    return "|".join(parts)
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with per-entry expiry and hit/miss counters."""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: float = DEFAULT_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = ""
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def reset(self, version: str) -> None:
+        """Drop all entries and key new ones with ``version`` (call on model load)."""
+        with self._lock:
+            self._entries.clear()
+            self.version = version
+            self.invalidations += 1
+
+    def keys(self, namespace: str, features: np.ndarray) -> List[bytes]:
+        """One key per row of ``features`` (a 2-D array of the model inputs)."""
+        rows = np.ascontiguousarray(np.atleast_2d(features), dtype=np.float64)
+        prefix = hashlib.blake2b(f"{self.version}\0{namespace}".encode(), digest_size=16)
+        keys = []
+        for row in rows:
+            h = prefix.copy()
+            h.update(row.data)
+            keys.append(h.digest())
+        return keys
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[Any]]:
+        now = time.monotonic()
+        found = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] < now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    found.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    found.append(entry[1])
+        return found
+
+    def put_many(self, keys: Sequence[bytes], values: Sequence[Any]) -> None:
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._entries[key] = (expires, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def lookup(self, namespace: str, features: np.ndarray,
+               compute: Callable[[np.ndarray], Sequence[Any]],
+               cacheable: Optional[Callable[[Any], bool]] = None) -> List[Any]:
+        """Per-row results for ``features``, calling ``compute`` only for cache misses.
+
+        ``compute`` receives the positions of the missing rows and returns
+        their results in the same order; results rejected by ``cacheable`` are
+        returned but not stored. Batches larger than the cache bypass it,
+        since they would only evict themselves.
+        """
+        n_rows = len(features)
+        if n_rows > self.maxsize:
+            return list(compute(np.arange(n_rows)))
+        keys = self.keys(namespace, features)
+        results = self.get_many(keys)
+        missing = np.array([i for i, r in enumerate(results) if r is None], dtype=int)
+        if len(missing):
+            computed = list(compute(missing))
+            store = [(keys[i], value) for i, value in zip(missing, computed) if cacheable is None or cacheable(value)]
+            self.put_many([k for k, _ in store], [v for _, v in store])
+            for i, value in zip(missing, computed):
+                results[i] = value
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "model_version": self.version,
+        }
@@ -0,0 +1,159 @@
+"""Binary columnar request/response bodies for bulk scoring.
+
+Batch endpoints negotiate the wire format from the request ``Content-Type``
+and the ``Accept`` header:
+
+* ``application/vnd.apache.arrow.stream`` - an Arrow IPC stream (needs pyarrow)
+* ``application/x-npy`` - a NumPy ``.npy`` file holding either a structured
+  array (field names are the columns) or a 2-D numeric array whose column
+  names are listed in the ``X-Columns`` header
+* anything else - JSON, decoded once and validated column by column against
+  the same ``FrameSchema``
+
+Numeric Arrow columns without nulls are converted with ``zero_copy_only`` so
+the buffers reach pandas, and from there the scaler, without a copy.
+"""
+import io
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response
+
+from common.validation import FrameSchema
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+NPY = "application/x-npy"
+BINARY_MEDIA_TYPES = (ARROW_STREAM, NPY)
+COLUMNS_HEADER = "X-Columns"
+
+
+def media_type(header: Optional[str]) -> str:
+    """Strip parameters from a Content-Type header value."""
+    return (header or "").split(";")[0].strip().lower()
+
+
+def accepts_binary(accept: Optional[str]) -> Optional[str]:
+    """Return the binary media type requested by an ``Accept`` header, if any."""
+    for part in (accept or "").split(","):
+        candidate = media_type(part)
+        if candidate in BINARY_MEDIA_TYPES:
+            return candidate
+    return None
+
+
+def _require_pyarrow(status_code: int = 415):
+    """pyarrow, or ``status_code``: 415 for Arrow request bodies, 406 for Arrow responses"""
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        raise HTTPException(status_code=status_code, detail="Arrow IPC needs pyarrow installed on the server")
+    return pa
+
+
+def read_arrow(body: bytes) -> pd.DataFrame:
+    pa = _require_pyarrow(415)
+    try:
+        table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    except (pa.ArrowInvalid, OSError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid Arrow IPC stream: {e}")
+    columns = {}
+    for name, chunked in zip(table.column_names, table.columns):
+        array = chunked.combine_chunks()
+        if array.null_count == 0 and pa.types.is_primitive(array.type) and not pa.types.is_boolean(array.type):
+            columns[name] = array.to_numpy(zero_copy_only=True)
+        else:
+            columns[name] = array.to_pandas()
+    return pd.DataFrame(columns, copy=False)
+
+
+def read_npy(body: bytes, columns_header: Optional[str] = None) -> pd.DataFrame:
+    try:
+        array = np.load(io.BytesIO(body), allow_pickle=False)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid .npy body: {e}")
+    if array.dtype.names:
+        return pd.DataFrame({name: array[name] for name in array.dtype.names}, copy=False)
+    if array.ndim != 2:
+        raise HTTPException(status_code=400, detail=".npy body must be a structured array or a 2-D array")
+    names = [c.strip() for c in (columns_header or "").split(",") if c.strip()]
+    if len(names) != array.shape[1]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"2-D .npy bodies need an {COLUMNS_HEADER} header naming all {array.shape[1]} columns",
+        )
+    return pd.DataFrame(array, columns=names, copy=False)
+
+
+def read_frame(body: bytes, content_type: str, columns_header: Optional[str] = None) -> pd.DataFrame:
+    """Decode a binary request body into a DataFrame."""
+    if content_type == ARROW_STREAM:
+        return read_arrow(body)
+    if content_type == NPY:
+        return read_npy(body, columns_header)
+    raise HTTPException(status_code=415, detail=f"Unsupported media type '{content_type}'")
+
+
+def write_frame(df: pd.DataFrame, content_type: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Encode ``df`` as an Arrow IPC stream or a structured ``.npy`` array."""
+    sink = io.BytesIO()
+    if content_type == ARROW_STREAM:
+        pa = _require_pyarrow(406)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    elif content_type == NPY:
+        fields = []
+        for name in df.columns:
+            values = df[name].to_numpy()
+            if values.dtype == object:
+                values = values.astype(str)
+            fields.append((name, values))
+        records = np.empty(len(df), dtype=[(name, values.dtype) for name, values in fields])
+        for name, values in fields:
+            records[name] = values
+        np.save(sink, records, allow_pickle=False)
+    else:
+        raise HTTPException(status_code=406, detail=f"Cannot encode response as '{content_type}'")
+    return Response(content=sink.getvalue(), media_type=content_type, headers=headers)
+
+
+def batch_frame_dependency(schema: FrameSchema, root: str) -> Callable[[Request], Awaitable[pd.DataFrame]]:
+    """Build a FastAPI dependency yielding a validated batch DataFrame.
+
+    Binary bodies are decoded and checked against ``schema`` column by column.
+    JSON bodies must look like ``{root: [record, ...]}`` and are validated
+    against the same schema without building a pydantic model per record.
+    """
+    async def dependency(request: Request) -> pd.DataFrame:
+        content_type = media_type(request.headers.get("content-type"))
+        body = await request.body()
+        if content_type in BINARY_MEDIA_TYPES:
+            df = read_frame(body, content_type, request.headers.get(COLUMNS_HEADER))
+            return schema.validate_frame(df)
+        if not body:
+            raise RequestValidationError([{"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}])
+        return schema.parse_json(body, root)
+
+    return dependency
+
+
+def batch_openapi(json_model: Any) -> Dict[str, Any]:
+    """``openapi_extra`` documenting the JSON and binary request bodies.
+
+    Nested models referenced by ``json_model`` must also be used by another
+    route so they are present under ``components/schemas``.
+    """
+    schema = json_model.model_json_schema(ref_template="#/components/schemas/{model}")
+    schema.pop("$defs", None)
+    binary = {"schema": {"type": "string", "format": "binary"}}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": schema}, ARROW_STREAM: binary, NPY: binary},
+        }
+    }
+
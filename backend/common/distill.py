@@ -0,0 +1,258 @@
+"""Distilled students: small models that mimic a slower teacher, served as the ``fast`` tier.
+
+A student is fitted to the teacher's own outputs over a transfer set of
+inputs, so no labels are needed: the probability of the positive class for
+the Kaveesha and Manuji classifiers, the 1 yr ECL for Lasindu's stacking
+ensemble (probabilities are fitted on the log-odds scale). Two candidates
+are tried, lightest first:
+
+    linear   ridge regression
+    gbm      shallow gradient boosting (depth 3, 100 trees)
+
+and the first within the fidelity bounds is kept (the closest one when none
+is). Fidelity is measured against the teacher on rows not used for fitting:
+
+    classifiers   label agreement, mean and p99 absolute probability error
+    regressors    R^2 against the teacher, mean and p99 absolute error and
+                  the change of the total
+
+A student takes the teacher's feature matrix and answers ``predict`` (and
+``predict_proba``), so a service swaps the model object and keeps scaling,
+calibration and labels. Missing features (which XGBoost teachers accept) get
+the transfer set's median, but only in columns the transfer set had missing
+values in: the teacher's default branch for a missing value is not the
+median, so a student ``accepts`` no other missing values and the teacher
+answers those inputs. It is saved under ``students/<model>.joblib`` next
+to the models with the version of the teacher it was distilled from; a
+service serves it only while that version is loaded and answers ``fast``
+requests with the teacher otherwise. ``Manuji/distill.py`` builds them.
+"""
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+TIERS = ("accurate", "fast")
+# Tier used when a request does not pick one
+DEFAULT_TIER = os.environ.get("SERVING_TIER", "accurate")
+# Response header naming the tier that actually answered
+TIER_HEADER = "X-Serving-Tier"
+STUDENTS_DIR = "students"
+CANDIDATES = ("linear", "gbm")
+KINDS = ("classifier", "regressor")
+# Probabilities are clipped to this margin before taking log-odds
+_EPSILON = 1e-3
+
+
+def check_tier(value: Optional[str]) -> str:
+    """Validate a ``tier`` query parameter (None -> DEFAULT_TIER), raising 400 for unknown values."""
+    from fastapi import HTTPException
+
+    value = value or DEFAULT_TIER
+    if value not in TIERS:
+        raise HTTPException(status_code=400, detail=f"Unknown tier '{value}'. Choose one of: {', '.join(TIERS)}")
+    return value
+
+
+def with_tier(response: Any, tier: str) -> Any:
+    """``response`` with the TIER_HEADER set to the tier that answered"""
+    response.headers[TIER_HEADER] = tier
+    return response
+
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def student_path(model_dir: Any, name: str) -> Path:
+    return Path(model_dir) / STUDENTS_DIR / f"{_slug(name)}.joblib"
+
+
+def _logit(p: np.ndarray) -> np.ndarray:
+    p = np.clip(p, _EPSILON, 1 - _EPSILON)
+    return np.log(p / (1 - p))
+
+
+class Student:
+    """A regressor standing in for ``teacher``: its probability of class ``classes[1]``, or its prediction."""
+
+    def __init__(self, estimator: Any, kind: str, teacher: str, teacher_version: str,
+                 candidate: str, report: Dict[str, Any], classes: Optional[np.ndarray] = None,
+                 fill: Optional[np.ndarray] = None, missing: Optional[np.ndarray] = None):
+        self.estimator = estimator
+        self.kind = kind
+        self.teacher = teacher
+        self.teacher_version = teacher_version
+        self.candidate = candidate
+        self.report = report
+        self.classes_ = None if classes is None else np.asarray(classes)
+        self.fill = fill
+        # Columns the transfer set had missing values in (None: none)
+        self.missing = None if missing is None else np.asarray(missing, dtype=bool)
+
+    def accepts(self, X: Any) -> bool:
+        """False when ``X`` has missing values in a column the student was fitted without any"""
+        missing = np.isnan(np.asarray(X, dtype=np.float64)).any(axis=0)
+        return not (missing & ~self.missing).any() if self.missing is not None else not missing.any()
+
+    def _inputs(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        missing = np.isnan(X)
+        return np.where(missing, self.fill, X) if self.fill is not None and missing.any() else X
+
+    def positive_proba(self, X: np.ndarray) -> np.ndarray:
+        return 1 / (1 + np.exp(-self.estimator.predict(self._inputs(X))))
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        p = self.positive_proba(X)
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        if self.kind == "classifier":
+            return self.classes_[(self.positive_proba(X) > 0.5).astype(int)]
+        return self.estimator.predict(self._inputs(X))
+
+    def info(self) -> Dict[str, Any]:
+        """Student type, fidelity and serving costs against the teacher (for /models/info)"""
+        return {"teacher": self.teacher, "student": self.candidate, **self.report}
+
+    def save(self, path: Any) -> None:
+        import joblib
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump({
+            "estimator": self.estimator, "kind": self.kind, "teacher": self.teacher,
+            "teacher_version": self.teacher_version, "candidate": self.candidate,
+            "report": self.report, "classes": self.classes_, "fill": self.fill, "missing": self.missing,
+        }, path)
+
+    @classmethod
+    def load(cls, path: Any) -> "Student":
+        import joblib
+        data = joblib.load(path)
+        return cls(data["estimator"], data["kind"], data["teacher"], data["teacher_version"],
+                   data["candidate"], data["report"], data["classes"], data["fill"], data.get("missing"))
+
+
+def load_students(model_dir: Any, versions: Mapping[str, str]) -> Dict[str, Student]:
+    """Students under ``model_dir/students`` of the teachers in ``versions`` (name -> loaded version).
+
+    Students that are missing, unreadable or distilled from another version
+    of their teacher are left out.
+    """
+    students = {}
+    for name, version in versions.items():
+        path = student_path(model_dir, name)
+        if not path.exists():
+            continue
+        try:
+            student = Student.load(path)
+        except Exception as e:
+            print(f"⚠️ Ignoring student {path}: {e}")
+            continue
+        if student.teacher_version != version:
+            print(f"⚠️ Ignoring student {path}: distilled from another version of {name}")
+            continue
+        students[name] = student
+    return students
+
+
+def teacher_outputs(teacher: Any, X: np.ndarray, kind: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(target per row, class labels): positive-class probability for classifiers, else ``predict``"""
+    if kind == "classifier":
+        classes = np.asarray(teacher.classes_)
+        if len(classes) != 2:
+            raise ValueError(f"Only binary classifiers can be distilled, not {len(classes)} classes")
+        return np.asarray(teacher.predict_proba(X)[:, 1], dtype=float), classes
+    return np.asarray(teacher.predict(X), dtype=float), None
+
+
+def candidate_estimator(candidate: str, seed: int = 0) -> Any:
+    if candidate == "linear":
+        from sklearn.linear_model import Ridge
+        return Ridge(alpha=1.0)
+    if candidate == "gbm":
+        from sklearn.ensemble import GradientBoostingRegressor
+        return GradientBoostingRegressor(n_estimators=100, max_depth=3, learning_rate=0.1,
+                                         subsample=0.8, random_state=seed)
+    raise ValueError(f"Unknown student '{candidate}', expected one of {CANDIDATES}")
+
+
+def fidelity(target: np.ndarray, predicted: np.ndarray, kind: str) -> Dict[str, float]:
+    """Agreement of a student's outputs with the teacher's on the same rows"""
+    errors = np.abs(predicted - target)
+    if kind == "classifier":
+        return {
+            "label_agreement": float(((predicted > 0.5) == (target > 0.5)).mean()),
+            "mean_abs_prob_error": float(errors.mean()),
+            "p99_abs_prob_error": float(np.percentile(errors, 99)),
+        }
+    spread = float(((target - target.mean()) ** 2).sum())
+    return {
+        "r2_vs_teacher": float(1 - ((predicted - target) ** 2).sum() / spread) if spread else 1.0,
+        "mean_abs_error": float(errors.mean()),
+        "p99_abs_error": float(np.percentile(errors, 99)),
+        "total_delta_pct": float((predicted.sum() / target.sum() - 1) * 100) if target.sum() else 0.0,
+    }
+
+
+def within_bounds(scores: Dict[str, float], bounds: Mapping[str, float]) -> bool:
+    """``bounds``: ``min_r2`` for regressors; ``min_agreement`` and ``max_prob_error`` (p99) for classifiers"""
+    if "r2_vs_teacher" in scores:
+        return scores["r2_vs_teacher"] >= bounds.get("min_r2", 0.99)
+    return (scores["label_agreement"] >= bounds.get("min_agreement", 0.99)
+            and scores["p99_abs_prob_error"] <= bounds.get("max_prob_error", 0.02))
+
+
+def _closeness(scores: Dict[str, float], kind: str) -> tuple:
+    if kind == "classifier":
+        return scores["label_agreement"], -scores["p99_abs_prob_error"]
+    return (scores["r2_vs_teacher"],)
+
+
+def distill(teacher: Any, X: np.ndarray, kind: str, name: str, version: str,
+            candidates: Tuple[str, ...] = CANDIDATES, bounds: Optional[Mapping[str, float]] = None,
+            check_share: float = 0.3, max_fit_rows: int = 20000, seed: int = 0) -> Student:
+    """Fit the candidates to ``teacher`` on transfer rows ``X`` and keep the lightest within ``bounds``.
+
+    ``check_share`` of the rows (not fitted) measure fidelity; at most
+    ``max_fit_rows`` of the rest are fitted. The student's report holds
+    every candidate's fidelity and the bounds used (see ``within_bounds``).
+    """
+    bounds = dict(bounds or {})
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind '{kind}', expected one of {KINDS}")
+    X = np.asarray(X, dtype=np.float64)
+    target, classes = teacher_outputs(teacher, X, kind)
+    # Students fit (and serve) missing features as the column's median, in the columns seen missing here
+    missing = np.isnan(X).any(axis=0)
+    fill = np.nan_to_num(np.nanmedian(X, axis=0))
+    X = np.where(np.isnan(X), fill, X)
+    rows = np.random.default_rng(seed).permutation(len(X))
+    n_check = int(len(X) * check_share)
+    if n_check < 10 or len(X) - n_check < 10:
+        raise ValueError(f"Need more transfer rows than {len(X)} to fit and check a student")
+    check, fit = rows[:n_check], rows[n_check:][:max_fit_rows]
+    fit_target = _logit(target[fit]) if kind == "classifier" else target[fit]
+
+    fitted: List[Tuple[str, Any, Dict[str, float]]] = []
+    for candidate in candidates:
+        estimator = candidate_estimator(candidate, seed).fit(X[fit], fit_target)
+        student = Student(estimator, kind, name, version, candidate, {}, classes, fill, missing)
+        predicted = student.positive_proba(X[check]) if kind == "classifier" else student.predict(X[check])
+        fitted.append((candidate, estimator, fidelity(target[check], predicted, kind)))
+
+    passing = [f for f in fitted if within_bounds(f[2], bounds)]
+    candidate, estimator, scores = passing[0] if passing else max(fitted, key=lambda f: _closeness(f[2], kind))
+    report = {
+        "kind": kind,
+        "fidelity": scores,
+        "within_bounds": bool(passing),
+        "bounds": bounds,
+        "candidates": {c: s for c, _, s in fitted},
+        "rows_fitted": int(len(fit)),
+        "rows_checked": int(n_check),
+        "columns_with_missing": np.flatnonzero(missing).tolist(),
+    }
+    return Student(estimator, kind, name, version, candidate, report, classes, fill, missing)
@@ -0,0 +1,89 @@
+"""
+Compact dtypes for feature frames.
+
+Feature frames default to float64/int64 columns and Python-object strings.
+Each service declares a dtype map ``{column: dtype}`` next to its features:
+
+* ``"float32"`` for amounts, rates and ratios
+* ``"int8"``/``"int16"``/``"int32"`` for counts, flags and encodings. A
+  column that has nulls, fractions or out-of-range values is stored as
+  float32 instead, so no value changes beyond float32 rounding.
+* ``"category"`` for low-cardinality text such as branch or status
+
+``compact_frame`` applies a map. Columns without an entry are left alone.
+"""
+from typing import Any, Callable, Dict, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+FLOAT32 = "float32"
+CATEGORY = "category"
+
+
+def _numeric(values: pd.Series) -> Optional[pd.Series]:
+    if pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype):
+        return values
+    try:
+        return pd.to_numeric(values)
+    except (TypeError, ValueError):
+        return None  # genuinely non-numeric; leave it to the caller's own handling
+
+
+def _compact_int(values: pd.Series, dtype: str) -> pd.Series:
+    if len(values) == 0:
+        return values.astype(dtype)
+    as_float = values.to_numpy(dtype=float)
+    info = np.iinfo(dtype)
+    if (np.isfinite(as_float).all() and (as_float == np.round(as_float)).all()
+            and as_float.min() >= info.min and as_float.max() <= info.max):
+        return values.astype(dtype)
+    return values.astype(FLOAT32)
+
+
+def compact_series(values: pd.Series, dtype: str) -> pd.Series:
+    """``values`` stored as ``dtype`` (see the module docstring for the int fallback)."""
+    if dtype == CATEGORY:
+        return values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype(CATEGORY)
+    numeric = _numeric(values)
+    if numeric is None:
+        return values
+    if np.issubdtype(np.dtype(dtype), np.integer):
+        return _compact_int(numeric, dtype)
+    return numeric.astype(dtype)
+
+
+def compact_frame(df: pd.DataFrame, dtypes: Mapping[str, str]) -> pd.DataFrame:
+    """Copy of ``df`` with every column listed in ``dtypes`` converted to its compact dtype."""
+    return df.assign(**{col: compact_series(df[col], dtype) for col, dtype in dtypes.items() if col in df.columns})
+
+
+def encode_categories(values: pd.Series, mapping: Mapping[Any, int], default: int = 0,
+                      normalize: Callable[[str], str] = str) -> np.ndarray:
+    """``mapping[normalize(str(v))]`` per value, ``default`` for unknown or missing values.
+
+    Categorical input is mapped once per category rather than once per row.
+    """
+    categorical = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype(CATEGORY)
+    categories = [mapping.get(normalize(str(c)), default) for c in categorical.cat.categories]
+    lookup = np.asarray(categories + [default], dtype=np.int64)
+    return lookup[categorical.cat.codes.to_numpy()]  # code -1 (missing) hits the trailing default
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    """Memory held by ``df``, including Python string objects."""
+    return int(df.memory_usage(index=False, deep=True).sum())
+
+
+def bytes_per_million_rows(df: pd.DataFrame) -> float:
+    return frame_bytes(df) / max(len(df), 1) * 1_000_000
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> Dict[str, float]:
+    """MB per million rows before/after compaction, for logging."""
+    old, new = bytes_per_million_rows(before), bytes_per_million_rows(after)
+    return {
+        "before_mb_per_million": round(old / 2**20, 1),
+        "after_mb_per_million": round(new / 2**20, 1),
+        "saved_pct": round(100 * (1 - new / old), 1) if old else 0.0,
+    }
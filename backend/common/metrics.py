@@ -0,0 +1,348 @@
+"""Per-stage latency histograms and request counters in the Prometheus text format.
+
+``install(app, service)`` adds a pure ASGI middleware that times every
+request by route template and serves ``GET /metrics``. Handlers mark their
+stages; time outside a marked stage still shows in the request duration::
+
+    with metrics.stage("scaling"):
+        scaled = scaler.transform(X)
+
+Two stages come from the endpoint wrapper ``@metrics.timed`` (placed under
+the route decorator): ``validation`` runs from request start to the handler
+(body read, JSON decode, pydantic/FrameSchema validation) and ``response``
+from the handler's return to the first response byte (response model checks,
+encoding of plain dict results).
+
+Exported series, all labelled with ``service``:
+
+    creditsense_requests_total              by endpoint, method, status
+    creditsense_request_duration_seconds    histogram by endpoint
+    creditsense_stage_duration_seconds      histogram by endpoint, stage
+    creditsense_model_calls_total           model calls by model (cache misses only)
+    creditsense_model_rows_total            rows scored by model (cache misses only)
+    creditsense_batch_size                  histogram of records per batch request
+    creditsense_in_flight_requests          gauge
+    creditsense_cache_*                     prediction cache counters, read at scrape time
+
+Latency is sampled: ``METRICS_SAMPLE_RATE`` (0-1, default 1) is the share of
+requests whose request/stage durations are recorded. Counters and gauges are
+always kept (one locked addition each). For unsampled requests ``stage()``
+returns a shared no-op context manager, so at 0 instrumentation costs a few
+attribute reads per stage. Nothing is recorded outside a request, so
+benchmarks and training code calling the same functions leave no trace.
+When an instrumented app is mounted inside another (the scoring gateway),
+the innermost middleware records the request and the outer one only its
+in-flight gauge.
+"""
+import functools
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from starlette.responses import Response
+
+METRICS_PATH = "/metrics"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+SAMPLE_RATE = float(os.environ.get("METRICS_SAMPLE_RATE", "1"))
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000, 100000)
+
+# Prediction cache stats exported per service, as (metric suffix, type, stats key)
+CACHE_SERIES = (
+    ("hits_total", "counter", "hits"),
+    ("misses_total", "counter", "misses"),
+    ("evictions_total", "counter", "evictions"),
+    ("expirations_total", "counter", "expirations"),
+    ("entries", "gauge", "size"),
+)
+
+_REGISTRY: List["_Metric"] = []
+_CACHE_STATS: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[Any, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with self._lock:
+            values = {labels: self._copy(value) for labels, value in self._values.items()}
+        for labels, value in sorted(values.items()):
+            yield from self._samples(labels, value)
+
+    def _copy(self, value: Any) -> Any:
+        return value
+
+    def _samples(self, labels: Tuple, value: Any) -> Iterator[str]:
+        yield f"{self.name}{_labels(self.labels, labels)} {_number(value)}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels: Tuple, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; observations store per-bucket counts, sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets: Tuple[float, ...]):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels: Tuple, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _copy(self, value: Any) -> Any:
+        return [list(value[0]), value[1], value[2]]
+
+    def _samples(self, labels: Tuple, value: Any) -> Iterator[str]:
+        counts, total, count = value
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+            yield f"{self.name}_bucket{_labels(self.labels, labels, le)} {cumulative}"
+        yield f"{self.name}_sum{_labels(self.labels, labels)} {_number(total)}"
+        yield f"{self.name}_count{_labels(self.labels, labels)} {count}"
+
+
+REQUESTS = Counter("creditsense_requests_total", "HTTP requests handled",
+                   ("service", "endpoint", "method", "status"))
+REQUEST_SECONDS = Histogram("creditsense_request_duration_seconds", "Request latency (sampled)",
+                            ("service", "endpoint"), LATENCY_BUCKETS)
+STAGE_SECONDS = Histogram("creditsense_stage_duration_seconds", "Latency of one request stage (sampled)",
+                          ("service", "endpoint", "stage"), LATENCY_BUCKETS)
+MODEL_CALLS = Counter("creditsense_model_calls_total", "Model calls, cache misses only", ("service", "model"))
+MODEL_ROWS = Counter("creditsense_model_rows_total", "Rows scored by a model, cache misses only",
+                     ("service", "model"))
+BATCH_SIZE = Histogram("creditsense_batch_size", "Records per batch request", ("service", "endpoint"),
+                       BATCH_BUCKETS)
+IN_FLIGHT = Gauge("creditsense_in_flight_requests", "Requests currently being handled", ("service",))
+# perf_counter() when this process last started handling a request (background work waits for quiet periods)
+_last_arrival = 0.0
+
+
+class _Request:
+    """Per-request state the middleware shares with ``stage``/``timed`` through a context variable."""
+    __slots__ = ("service", "scope", "sampled", "start", "handler_end", "delegated")
+
+    def __init__(self, service: str, scope: Dict[str, Any], sampled: bool):
+        self.service = service
+        self.scope = scope
+        self.sampled = sampled
+        self.start = time.perf_counter()
+        self.handler_end: Optional[float] = None
+        # Set when a mounted app's middleware takes over recording this request
+        self.delegated = False
+
+    def endpoint(self) -> str:
+        # The router stores the matched route in the (shared) scope, so this is the path template
+        return getattr(self.scope.get("route"), "path", None) or "unmatched"
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        STAGE_SECONDS.observe((self.service, self.endpoint(), stage), seconds)
+
+
+_current: ContextVar[Optional[_Request]] = ContextVar("creditsense_request", default=None)
+_NOOP = nullcontext()
+
+
+class _Stage:
+    __slots__ = ("request", "name", "start")
+
+    def __init__(self, request: _Request, name: str):
+        self.request = request
+        self.name = name
+
+    def __enter__(self) -> "_Stage":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        self.request.observe_stage(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def stage(name: str):
+    """Context manager timing ``name`` within the current request (no-op when not sampled)."""
+    request = _current.get()
+    if request is None or not request.sampled:
+        return _NOOP
+    return _Stage(request, name)
+
+
+def count_model(model: str, rows: int) -> None:
+    """Record one call of ``model`` on ``rows`` rows."""
+    request = _current.get()
+    if request is not None:
+        MODEL_CALLS.inc((request.service, model))
+        MODEL_ROWS.inc((request.service, model), rows)
+
+
+def observe_batch(rows: int) -> None:
+    """Record the number of records in the current batch request."""
+    request = _current.get()
+    if request is not None:
+        BATCH_SIZE.observe((request.service, request.endpoint()), rows)
+
+
+def activity() -> Tuple[int, float]:
+    """(requests in flight, seconds since the latest one arrived) for this process.
+
+    In-flight requests are summed over the instrumented services; a request
+    to a service mounted in the gateway counts once per middleware it passes.
+    """
+    with IN_FLIGHT._lock:
+        in_flight = int(sum(IN_FLIGHT._values.values()))
+    return in_flight, time.perf_counter() - _last_arrival
+
+
+def timed(endpoint: Callable) -> Callable:
+    """Wrap an async endpoint to record its ``validation`` and ``response`` stages.
+
+    ``functools.wraps`` keeps the signature FastAPI reads parameters from.
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        request = _current.get()
+        if request is None or not request.sampled:
+            return await endpoint(*args, **kwargs)
+        request.observe_stage("validation", time.perf_counter() - request.start)
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            request.handler_end = time.perf_counter()
+    return wrapper
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: in-flight gauge, request counter and sampled request latency."""
+
+    def __init__(self, app: Any, service: str, sample_rate: float = SAMPLE_RATE):
+        self.app = app
+        self.service = service
+        self.sample_rate = sample_rate
+
+    def _sampled(self) -> bool:
+        return self.sample_rate >= 1 or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        global _last_arrival
+        if scope["type"] != "http" or scope["path"] == METRICS_PATH:
+            await self.app(scope, receive, send)
+            return
+
+        outer = _current.get()
+        if outer is not None:
+            outer.delegated = True
+        request = _Request(self.service, scope, outer.sampled if outer is not None else self._sampled())
+        status = [500]
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if request.handler_end is not None:
+                    request.observe_stage("response", time.perf_counter() - request.handler_end)
+            await send(message)
+
+        token = _current.set(request)
+        _last_arrival = request.start
+        IN_FLIGHT.inc((self.service,))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.inc((self.service,), -1)
+            _current.reset(token)
+            if not request.delegated:
+                endpoint = request.endpoint()
+                REQUESTS.inc((self.service, endpoint, scope["method"], str(status[0])))
+                if request.sampled:
+                    REQUEST_SECONDS.observe((self.service, endpoint), time.perf_counter() - request.start)
+
+
+def _render_caches() -> Iterator[str]:
+    stats = {service: read() for service, read in sorted(_CACHE_STATS.items())}
+    for suffix, kind, key in CACHE_SERIES:
+        name = f"creditsense_cache_{suffix}"
+        yield f"# HELP {name} Prediction cache {key}"
+        yield f"# TYPE {name} {kind}"
+        for service, values in stats.items():
+            yield f'{name}{{service="{_escape(service)}"}} {values.get(key, 0)}'
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    if _CACHE_STATS:
+        lines.extend(_render_caches())
+    return "\n".join(lines) + "\n"
+
+
+async def metrics_endpoint() -> Response:
+    return Response(render(), media_type=CONTENT_TYPE)
+
+
+def install(app: Any, service: str, cache_stats: Optional[Callable[[], Dict[str, Any]]] = None,
+            sample_rate: float = SAMPLE_RATE) -> None:
+    """Add the metrics middleware and ``GET /metrics`` to ``app`` (call before the app starts).
+
+    ``cache_stats`` is read at scrape time, e.g. ``prediction_cache.stats``.
+    """
+    app.add_middleware(MetricsMiddleware, service=service, sample_rate=sample_rate)
+    app.add_api_route(METRICS_PATH, metrics_endpoint, methods=["GET"], include_in_schema=False)
+    register_cache(service, cache_stats)
+
+
+def register_cache(service: str, cache_stats: Optional[Callable[[], Dict[str, Any]]]) -> None:
+    """Export ``cache_stats()`` as the cache series of ``service``; None stops exporting it."""
+    if cache_stats is None:
+        _CACHE_STATS.pop(service, None)
+    else:
+        _CACHE_STATS[service] = cache_stats
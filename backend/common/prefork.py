@@ -0,0 +1,155 @@
+"""Pre-fork multi-worker serving: load the models once, fork N uvicorn workers.
+
+``uvicorn --workers`` spawns fresh interpreters, so every worker imports
+pandas/sklearn/xgboost and loads its own copy of the models. Here the parent
+imports the app, runs its startup and loads the models once
+(``common.warmup.warm_up_all``, whatever ``MODEL_WARMUP`` says), then:
+
+1. ``gc.freeze()`` moves every object into the permanent generation, so the
+   workers' garbage collections don't write to (and un-share) the pages that
+   hold the models;
+2. binds the listening socket and forks ``--workers`` children that serve it
+   with uvicorn (lifespan off: startup already ran in the parent).
+
+Model arrays stay copy-on-write shared between the workers; refcount updates
+only dirty the pages of the Python objects that are actually touched. Workers
+that die are restarted, and SIGTERM/SIGINT stop them all. Each worker keeps its
+own prediction cache and metrics registry. State the workers must agree on lives in
+``common.store.LocalStore`` (Kaveesha's saved predictions). Nothing may start
+threads before the fork, so the parent must not predict (OpenMP/BLAS pools).
+Usage, from the ``backend`` directory::
+
+    python -m common.prefork manuji --manuji-dir Manuji --workers 4 --port 8001
+    python -m common.prefork gateway --lasindu-dir ../models/Lasindu --manuji-dir Manuji --workers 4
+
+Linux/macOS only (``os.fork``).
+"""
+import argparse
+import asyncio
+import gc
+import importlib
+import os
+import signal
+import socket
+import sys
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Dict, Optional
+
+import uvicorn
+
+from common import warmup
+from common.services import BACKEND_DIR, SERVICE_PATHS, load_service, use_model_dir
+
+SERVICES = list(SERVICE_PATHS) + ["gateway"]
+# A worker that dies sooner than this after starting is restarted after a pause
+MIN_WORKER_LIFETIME = 1.0
+
+
+def load_app(service: str, model_dirs: Dict[str, Optional[str]]) -> Any:
+    """Import ``service`` (or the gateway with all three) reading models from ``model_dirs``."""
+    for name, model_dir in model_dirs.items():
+        if model_dir and (service == "gateway" or service == name):
+            use_model_dir(name, model_dir)
+    if service == "gateway":
+        sys.path.insert(0, str(BACKEND_DIR))
+        return importlib.import_module("gateway").app
+    return load_service(service).app
+
+
+async def _startup(app: Any) -> AsyncExitStack:
+    stack = AsyncExitStack()
+    await stack.enter_async_context(app.router.lifespan_context(app))
+    return stack
+
+
+def bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _serve_worker(app: Any, sock: socket.socket, log_level: str) -> None:
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    gc.enable()
+    config = uvicorn.Config(app, lifespan="off", log_level=log_level, access_log=False)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(app: Any, host: str = "0.0.0.0", port: int = 8000, workers: int = 1, log_level: str = "warning") -> None:
+    """Run ``app``'s startup and model loading here, then serve it from ``workers`` forked processes until stopped."""
+    # No collections while loading: they would only shuffle objects between generations
+    gc.disable()
+    stack = asyncio.run(_startup(app))
+    # Load before forking so the workers share the models instead of each loading its own
+    warmup.warm_up_all()
+    gc.collect()
+    gc.freeze()
+    sock = bind(host, port)
+    print(f"🚀 Serving on {host}:{port} with {workers} pre-forked workers "
+          f"({gc.get_freeze_count()} objects frozen)")
+
+    children: Dict[int, float] = {}
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _serve_worker(app, sock, log_level)
+            finally:
+                os._exit(0)
+        children[pid] = time.monotonic()
+
+    def stop(signum: int, frame: Any) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        print(f"⚠️ Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; restarting")
+        if time.monotonic() - started < MIN_WORKER_LIFETIME:
+            time.sleep(MIN_WORKER_LIFETIME)
+        spawn()
+
+    sock.close()
+    asyncio.run(stack.aclose())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("service", choices=SERVICES)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--lasindu-dir", help="Directory holding the Lasindu .pkl files")
+    parser.add_argument("--manuji-dir", help="Directory holding models/ for Manuji")
+    parser.add_argument("--kaveesha-dir", help="Kaveesha models directory (default: the service's own)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    model_dirs = {"lasindu": args.lasindu_dir, "manuji": args.manuji_dir, "kaveesha": args.kaveesha_dir}
+    serve(load_app(args.service, model_dirs), args.host, args.port, args.workers, args.log_level)
+
+
+if __name__ == "__main__":
+    main()
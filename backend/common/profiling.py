@@ -0,0 +1,290 @@
+"""Opt-in sampling profiles of single requests, saved as speedscope/flamegraph files.
+
+``install(app, service)`` adds a pure ASGI middleware. A request is profiled
+when it carries ``X-Profile: <PROFILE_TOKEN>`` or when an operator armed the
+next requests with ``POST /profiles/arm?count=N`` (same header). Without a
+``PROFILE_TOKEN`` in the environment profiling is off and the header is
+ignored.
+
+A profiled request runs under a sampler thread that records the stack of the
+event-loop thread every ``PROFILE_INTERVAL_MS`` (default 1 ms). Sampling
+that thread means requests running concurrently on the same loop show up in
+the profile too. When the request finishes, ``PROFILE_DIR`` (default
+``.profiles``) receives:
+
+    <id>.speedscope.json   open in https://www.speedscope.app
+    <id>.collapsed.txt     folded stacks for flamegraph.pl / inferno
+    <id>.request.json      method, path, query, content type and timing
+    <id>.body              the raw request body, replayed by ``benchmarks.profile_replay``
+
+The response carries ``X-Profile-Id`` and a ``Link`` to ``GET /profiles/<id>``.
+At most one request is profiled at a time and at most one every
+``PROFILE_MIN_INTERVAL`` seconds (default 60). Requests over that limit are
+served unprofiled with ``X-Profile-Skipped: rate-limited``.
+"""
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Query, Request
+from fastapi.responses import FileResponse
+
+PROFILES_PATH = "/profiles"
+PROFILE_HEADER = b"x-profile"
+# Paths never profiled: the profiling routes themselves and the metrics scrape
+SKIPPED_PATHS = (PROFILES_PATH, "/metrics")
+MAX_ARMED = 10
+PROFILE_ID_PATTERN = re.compile(r"^[\w.-]+$")
+OUTPUT_SUFFIXES = {"speedscope": ".speedscope.json", "collapsed": ".collapsed.txt", "request": ".request.json"}
+
+SETTINGS: Dict[str, Any] = {
+    "token": os.environ.get("PROFILE_TOKEN") or None,
+    "directory": os.environ.get("PROFILE_DIR", ".profiles"),
+    "min_interval": float(os.environ.get("PROFILE_MIN_INTERVAL", "60")),
+    "interval": float(os.environ.get("PROFILE_INTERVAL_MS", "1")) / 1000,
+}
+
+_lock = threading.Lock()
+_state = {"active": False, "last_start": float("-inf"), "armed": 0}
+# True inside a request already handled by an outer ProfilingMiddleware (apps mounted in the gateway)
+_handled: ContextVar[bool] = ContextVar("creditsense_profiling_handled", default=False)
+
+
+def configure(**settings: Any) -> None:
+    """Override ``SETTINGS`` (token, directory, min_interval, interval) at runtime."""
+    unknown = set(settings) - set(SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown profiling settings: {sorted(unknown)}")
+    SETTINGS.update(settings)
+
+
+def _token_ok(value: Optional[str]) -> bool:
+    token = SETTINGS["token"]
+    return bool(token and value and hmac.compare_digest(value.encode(), token.encode()))
+
+
+class Sampler:
+    """Samples the stack of one thread from a background thread.
+
+    ``stacks`` are root-first tuples of frame keys ``(name, file, line)``;
+    ``weights`` are the seconds each sample stands for.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: List[Tuple[Tuple[str, str, int], ...]] = []
+        self.weights: List[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._switch_interval = sys.getswitchinterval()
+
+    def start(self) -> "Sampler":
+        self.started = time.perf_counter()
+        # The sampler needs the GIL to read frames; a shorter switch interval lets it in while the
+        # profiled thread runs Python code. Restored in stop().
+        sys.setswitchinterval(min(self._switch_interval, self.interval))
+        self._thread.start()
+        return self
+
+    def stop(self) -> float:
+        self._stop.set()
+        self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+        return time.perf_counter() - self.started
+
+    def _run(self) -> None:
+        last = self.started
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            self.stacks.append(tuple(reversed(stack)))
+            self.weights.append(now - last)
+            last = now
+
+    def speedscope(self, name: str, duration: float) -> Dict[str, Any]:
+        """The samples as a speedscope "sampled" profile."""
+        index: Dict[Tuple[str, str, int], int] = {}
+        samples = [[index.setdefault(key, len(index)) for key in stack] for stack in self.stacks]
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "creditsense-profiling",
+            "shared": {"frames": [{"name": n, "file": f, "line": line} for n, f, line in index]},
+            "profiles": [{
+                "type": "sampled", "name": name, "unit": "seconds",
+                "startValue": 0, "endValue": duration,
+                "samples": samples, "weights": self.weights,
+            }],
+        }
+
+    def collapsed(self) -> str:
+        """Folded stacks (``a;b;c <microseconds>``) for flamegraph.pl and similar tools."""
+        totals: Dict[str, float] = {}
+        for stack, weight in zip(self.stacks, self.weights):
+            folded = ";".join(f"{name} ({Path(file).name}:{line})" for name, file, line in stack)
+            totals[folded] = totals.get(folded, 0.0) + weight
+        return "".join(f"{folded} {max(1, round(seconds * 1e6))}\n" for folded, seconds in totals.items())
+
+
+def _header(scope: Dict[str, Any], name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _admit(scope: Dict[str, Any]) -> Optional[str]:
+    """None when the request didn't ask to be profiled, else "ok" or the reason it is skipped."""
+    requested = _token_ok(_header(scope, PROFILE_HEADER))
+    with _lock:
+        if not requested and not _state["armed"]:
+            return None
+        now = time.monotonic()
+        if _state["active"] or now - _state["last_start"] < SETTINGS["min_interval"]:
+            return "rate-limited"
+        if not requested:
+            _state["armed"] -= 1
+        _state["active"] = True
+        _state["last_start"] = now
+        return "ok"
+
+
+def _release() -> None:
+    with _lock:
+        _state["active"] = False
+
+
+def _save(profile_id: str, sampler: Sampler, duration: float, scope: Dict[str, Any], body: bytes,
+          service: str, status: Optional[int]) -> Path:
+    directory = Path(SETTINGS["directory"])
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"{service} {scope['method']} {scope['path']}"
+    (directory / f"{profile_id}.speedscope.json").write_text(json.dumps(sampler.speedscope(name, duration)))
+    (directory / f"{profile_id}.collapsed.txt").write_text(sampler.collapsed())
+    (directory / f"{profile_id}.body").write_bytes(body)
+    (directory / f"{profile_id}.request.json").write_text(json.dumps({
+        "id": profile_id,
+        "service": service,
+        "method": scope["method"],
+        "path": scope["path"],
+        "query_string": scope.get("query_string", b"").decode("latin-1"),
+        "content_type": _header(scope, b"content-type"),
+        "accept": _header(scope, b"accept"),
+        "body_file": f"{profile_id}.body",
+        "status": status,
+        "duration_ms": duration * 1000,
+        "samples": len(sampler.stacks),
+        "created": datetime.now().isoformat(timespec="seconds"),
+    }, indent=2))
+    return directory
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware profiling requests admitted by ``_admit``."""
+
+    def __init__(self, app: Any, service: str):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(SKIPPED_PATHS) or _handled.get():
+            await self.app(scope, receive, send)
+            return
+        _handled.set(True)
+        decision = _admit(scope)
+        if decision is None:
+            await self.app(scope, receive, send)
+            return
+        if decision != "ok":
+            await self.app(scope, receive, _with_headers(send, [(b"x-profile-skipped", decision.encode())]))
+            return
+
+        profile_id = f"{datetime.now():%Y%m%d-%H%M%S}-{self.service}-{uuid.uuid4().hex[:8]}"
+        body = bytearray()
+        status: List[Optional[int]] = [None]
+
+        async def receive_wrapper() -> Dict[str, Any]:
+            message = await receive()
+            if message["type"] == "http.request":
+                body.extend(message.get("body", b""))
+            return message
+
+        headers = [(b"x-profile-id", profile_id.encode()),
+                   (b"link", f'<{PROFILES_PATH}/{profile_id}>; rel="profile"'.encode())]
+        send_wrapper = _with_headers(send, headers, status)
+        sampler = Sampler(threading.get_ident(), SETTINGS["interval"]).start()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            duration = sampler.stop()
+            _release()
+            try:
+                directory = _save(profile_id, sampler, duration, scope, bytes(body), self.service, status[0])
+            except OSError as e:
+                print(f"⚠️ Could not save profile {profile_id}: {e}")
+            else:
+                print(f"🔥 Profiled {scope['method']} {scope['path']} in {duration * 1000:.1f} ms "
+                      f"({len(sampler.stacks)} samples): {directory / profile_id}.speedscope.json")
+
+
+def _with_headers(send: Callable, headers: List[Tuple[bytes, bytes]],
+                  status: Optional[List[Optional[int]]] = None) -> Callable:
+    async def wrapper(message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            if status is not None:
+                status[0] = message["status"]
+            message = {**message, "headers": list(message.get("headers", [])) + headers}
+        await send(message)
+    return wrapper
+
+
+def _authorize(request: Request) -> None:
+    if not SETTINGS["token"]:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set PROFILE_TOKEN)")
+    if not _token_ok(request.headers.get(PROFILE_HEADER.decode())):
+        raise HTTPException(status_code=403, detail="Missing or wrong X-Profile token")
+
+
+async def get_profile(request: Request, profile_id: str,
+                      output: str = Query("speedscope", alias="format",
+                                          description="speedscope | collapsed | request")) -> FileResponse:
+    """A saved profile (speedscope JSON by default)."""
+    _authorize(request)
+    if output not in OUTPUT_SUFFIXES:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(OUTPUT_SUFFIXES)}")
+    path = Path(SETTINGS["directory"]) / f"{profile_id}{OUTPUT_SUFFIXES[output]}"
+    if not PROFILE_ID_PATTERN.match(profile_id) or not path.is_file():
+        raise HTTPException(status_code=404, detail=f"No profile '{profile_id}'")
+    return FileResponse(path, filename=path.name)
+
+
+async def arm(request: Request, count: int = Query(1, ge=0, le=MAX_ARMED)) -> Dict[str, Any]:
+    """Profile the next ``count`` requests (0 disarms), still subject to the rate limit."""
+    _authorize(request)
+    with _lock:
+        _state["armed"] = count
+    return {"armed": count, "min_interval_seconds": SETTINGS["min_interval"]}
+
+
+def install(app: Any, service: str) -> None:
+    """Add the profiling middleware, ``GET /profiles/{id}`` and ``POST /profiles/arm`` to ``app``."""
+    app.add_middleware(ProfilingMiddleware, service=service)
+    app.add_api_route(f"{PROFILES_PATH}/arm", arm, methods=["POST"], include_in_schema=False)
+    app.add_api_route(f"{PROFILES_PATH}/{{profile_id}}", get_profile, methods=["GET"], include_in_schema=False)
@@ -0,0 +1,141 @@
+"""Fast JSON responses and compact payload shapes for the prediction endpoints.
+
+Returning a ``FastJSONResponse`` from an endpoint makes FastAPI skip the
+``response_model`` re-validation and ``jsonable_encoder`` pass, so the payload
+goes straight to orjson (stdlib ``json`` when orjson is not installed).
+"""
+import json
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Batch payload shapes:
+#   rows     - one object per record, constants repeated (original format)
+#   compact  - constants hoisted into a "model" header, records keep only varying fields
+#   columnar - constants in "model", varying fields as parallel arrays under "columns"
+BATCH_FORMATS = ("rows", "compact", "columnar")
+
+# Single-record payload shapes:
+#   full     - original response
+#   compact  - static model metadata blobs dropped (available from /models/info)
+SINGLE_FORMATS = ("full", "compact")
+
+
+def _default(obj: Any) -> Any:
+    """Fallback encoder for numpy values when orjson is unavailable."""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "item"):
+        return obj.item()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize ``content`` to compact JSON bytes."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(content, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(body: bytes) -> Any:
+    """Parse JSON bytes; raises ``ValueError`` (``json.JSONDecodeError`` or orjson's subclass of it)."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; content is not re-validated."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def check_format(value: str, allowed: Sequence[str]) -> str:
+    """Validate a ``format`` query parameter, raising 400 for unknown values."""
+    if value not in allowed:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported format '{value}'. Choose one of: {', '.join(allowed)}",
+        )
+    return value
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Optional[List[str]]:
+    """Parse a comma separated ``fields`` query parameter.
+
+    Returns None when no selection was requested. Unknown names raise 400 so a
+    typo does not silently produce an empty payload.
+    """
+    if not fields:
+        return None
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(allowed)}",
+        )
+    return selected
+
+
+def select_fields(record: Mapping[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Return ``record`` restricted to ``fields`` (all fields when None)."""
+    if fields is None:
+        return dict(record)
+    return {f: record[f] for f in fields if f in record}
+
+
+def batch_payload(
+    columns: Mapping[str, Sequence[Any]],
+    constants: Mapping[str, Any],
+    fmt: str = "rows",
+    fields: Optional[Sequence[str]] = None,
+    key: str = "predictions",
+    summary: Optional[Mapping[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Shape per-record results for a batch response.
+
+    ``columns`` maps each varying field to its per-record values (all the same
+    length) and ``constants`` holds fields that are identical for every
+    record. ``fields`` restricts both. ``summary`` entries are copied to the
+    top level unchanged.
+    """
+    varying = {k: list(v) for k, v in columns.items() if fields is None or k in fields}
+    static = {k: v for k, v in constants.items() if fields is None or k in fields}
+    names = list(varying)
+    n_rows = len(next(iter(columns.values()))) if columns else 0
+
+    payload: Dict[str, Any] = {}
+    if fmt == "rows":
+        payload[key] = [
+            {**dict(zip(names, values)), **static}
+            for values in zip(*(varying[n] for n in names))
+        ] if names else [dict(static) for _ in range(n_rows)]
+    elif fmt == "compact":
+        if static:
+            payload["model"] = static
+        payload[key] = [dict(zip(names, values)) for values in zip(*(varying[n] for n in names))]
+    elif fmt == "columnar":
+        if static:
+            payload["model"] = static
+        payload["columns"] = varying
+    else:
+        check_format(fmt, BATCH_FORMATS)
+
+    if summary:
+        payload.update(summary)
+    return payload
@@ -0,0 +1,51 @@
+"""Import the three prediction services by path and point them at a model directory.
+
+Each service is a flat script directory (``Lasindu/api.py``, ``Manuji/api.py``,
+``Kaveesha/app/main.py``) with imports relative to itself, so they are loaded
+under unique module names (``lasindu_api``, ...) rather than as packages. Used
+by the scoring gateway and the benchmarks.
+"""
+import importlib.util
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+SERVICE_PATHS = {
+    "lasindu": BACKEND_DIR / "Lasindu" / "api.py",
+    "manuji": BACKEND_DIR / "Manuji" / "api.py",
+    "kaveesha": BACKEND_DIR / "Kaveesha" / "app" / "main.py",
+}
+
+
+def load_service(name: str):
+    """Import a service module by path under a unique module name."""
+    path = SERVICE_PATHS[name]
+    module_name = f"{name}_api"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    # Service modules use flat imports relative to their own directory
+    sys.path.insert(0, str(path.parent))
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def use_model_dir(name: str, model_dir: str):
+    """Load service ``name`` reading its models from ``model_dir``.
+
+    ``model_dir`` holds the Lasindu ``.pkl`` files, Manuji's ``models/``
+    directory or Kaveesha's models. Lasindu and Manuji read ``MODEL_DIR``
+    when their models load; Kaveesha gets a new ``PredictionModels``.
+    """
+    api = load_service(name)
+    model_dir = Path(model_dir).resolve()
+    if name == "lasindu":
+        api.MODEL_DIR = model_dir
+    elif name == "manuji":
+        api.MODEL_DIR = model_dir / "models"
+    else:
+        api.prediction_models = api.PredictionModels(str(model_dir))
+    return api
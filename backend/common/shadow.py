@@ -0,0 +1,322 @@
+"""Shadow evaluation: challenger models scored off the request path against the champion.
+
+A service answers every request with its champion as before and then
+offers it to a ``ShadowEvaluator``: the rows it scored, the champion's
+labels and scores, and a callable scoring a challenger on those rows.
+When the champion answered through another code path than the one
+challengers are scored on, the service offers no champion results and the
+champion is scored again off the request path with the same callable, so
+an identical challenger records zero delta. A
+sampled share of the offers is queued, and one background thread per
+process scores the challengers. For each request and challenger it records
+the rows compared, how many labels agree and the score deltas (challenger
+minus champion). Records are buffered and written to a
+``common.store.LocalStore`` collection in batches, so ``summary()`` adds up
+the comparisons of every worker process on the host.
+
+Shadow work is shed rather than allowed to slow the requests it shadows:
+
+    sampling    SHADOW_SAMPLE_RATE (0-1, default 0 = off) of the requests are offered
+    queue       at most SHADOW_QUEUE requests wait; offers beyond that are dropped
+    idle gate   each challenger (and each store write) starts only while the process
+                handles at most SHADOW_MAX_IN_FLIGHT requests (default 0) and none
+                has arrived for SHADOW_QUIET_MS (default 20), read from
+                ``common.metrics.activity``
+    staleness   jobs that found no idle moment within SHADOW_MAX_AGE seconds are dropped
+    job size    a batch request contributes at most SHADOW_MAX_ROWS sampled rows
+
+A challenger that started can still overlap a request arriving meanwhile,
+and the thread shares the GIL with the request. The quiet period keeps
+shadow work out of busy stretches, where most such overlaps would happen;
+offers never wake the worker (it polls), and it runs at the lowest OS
+scheduling priority where threads have their own (Linux).
+SHADOW_CHALLENGERS (comma separated) limits the challengers; by default
+every other model is one.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from common import metrics
+from common.store import LocalStore
+
+SAMPLE_RATE = float(os.environ.get("SHADOW_SAMPLE_RATE", "0"))
+QUEUE_SIZE = int(os.environ.get("SHADOW_QUEUE", "64"))
+MAX_IN_FLIGHT = int(os.environ.get("SHADOW_MAX_IN_FLIGHT", "0"))
+QUIET_SECONDS = float(os.environ.get("SHADOW_QUIET_MS", "20")) / 1000
+MAX_AGE_SECONDS = float(os.environ.get("SHADOW_MAX_AGE", "5"))
+MAX_ROWS = int(os.environ.get("SHADOW_MAX_ROWS", "256"))
+CHALLENGERS = [name.strip() for name in os.environ.get("SHADOW_CHALLENGERS", "").split(",") if name.strip()]
+COLLECTION = "shadow"
+# Comparison records buffered before a store write, and the longest one waits for it
+FLUSH_RECORDS = 50
+FLUSH_SECONDS = 2.0
+# How often the worker looks for queued jobs, and for an idle moment while one waits
+IDLE_POLL_SECONDS = 0.1
+POLL_SECONDS = 0.005
+COUNTERS = ("offered", "not_sampled", "queued", "shed_queue_full", "shed_stale", "evaluated", "errors")
+
+# (challenger name, inputs) -> (labels, scores or None), one per input row
+Scorer = Callable[[str, Any], Tuple[Sequence[Any], Optional[Sequence[float]]]]
+
+
+def challengers(available: Iterable[str], champion: str) -> List[str]:
+    """The models shadowing ``champion``: SHADOW_CHALLENGERS among ``available``, else all the others."""
+    names = [name for name in available if name != champion]
+    return [name for name in names if name in CHALLENGERS] if CHALLENGERS else names
+
+
+def _take(inputs: Any, rows: np.ndarray) -> Any:
+    if hasattr(inputs, "iloc"):
+        return inputs.iloc[rows]
+    if isinstance(inputs, list):
+        return [inputs[i] for i in rows]
+    return np.asarray(inputs)[rows]
+
+
+def _lower_priority() -> None:
+    """Lowest scheduling priority for the calling thread (Linux applies it per thread)."""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (AttributeError, OSError):
+        pass
+
+
+class _Job:
+    __slots__ = ("champion", "challengers", "inputs", "labels", "scores", "score", "version", "queued")
+
+    def __init__(self, champion: str, challengers: Tuple[str, ...], inputs: Any, labels: Optional[List[Any]],
+                 scores: Optional[np.ndarray], score: Scorer, version: str):
+        self.champion = champion
+        self.challengers = challengers
+        self.inputs = inputs
+        self.labels = labels
+        self.scores = scores
+        self.score = score
+        self.version = version
+        self.queued = time.monotonic()
+
+
+class ShadowEvaluator:
+    """Sampled, load-shed comparison of challenger models with the champion, recorded in ``store``."""
+
+    def __init__(self, service: str, store: LocalStore, collection: str = COLLECTION,
+                 sample_rate: float = SAMPLE_RATE, queue_size: int = QUEUE_SIZE,
+                 max_in_flight: int = MAX_IN_FLIGHT, quiet: float = QUIET_SECONDS, max_age: float = MAX_AGE_SECONDS,
+                 max_rows: int = MAX_ROWS):
+        self.service = service
+        self.store = store
+        self.collection = collection
+        self.sample_rate = sample_rate
+        self.queue_size = queue_size
+        self.max_in_flight = max_in_flight
+        self.quiet = quiet
+        self.max_age = max_age
+        self.max_rows = max_rows
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.errors: Dict[str, int] = {}
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+        self._last_flush = time.monotonic()
+        self._queue: deque = deque()
+        self._pid: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counts[key] += amount
+
+    def _start(self) -> None:
+        """Start this process's worker (call holding the lock); threads do not survive a fork."""
+        self._queue, self._pending, self._pid = deque(), [], os.getpid()
+        threading.Thread(target=self._run, name=f"shadow-{self.service}", daemon=True).start()
+
+    def offer(self, champion: str, inputs: Any, labels: Optional[Sequence[Any]], scores: Optional[Sequence[float]],
+              challengers: Sequence[str], score: Scorer, version: str = "") -> bool:
+        """Queue ``challengers`` to be compared with ``champion`` on a sample of ``inputs``; True when queued.
+
+        ``inputs`` (a frame, array or list, one row per result) is what ``score``
+        takes; ``labels`` and ``scores`` are the champion's results for it, or
+        None to have ``score`` rescore the champion before its challengers.
+        Never blocks: unsampled offers and offers to a full queue return False.
+        """
+        n = len(inputs) if labels is None else len(labels)
+        if not self.enabled or not challengers or not n:
+            return False
+        with self._lock:
+            self.counts["offered"] += 1
+            if self.sample_rate < 1 and random.random() >= self.sample_rate:
+                self.counts["not_sampled"] += 1
+                return False
+            if self._pid != os.getpid():
+                self._start()
+            if len(self._queue) >= self.queue_size:
+                self.counts["shed_queue_full"] += 1
+                return False
+        rows = np.arange(n) if n <= self.max_rows else np.sort(np.random.choice(n, self.max_rows, replace=False))
+        job = _Job(
+            champion, tuple(challengers),
+            inputs if n <= self.max_rows else _take(inputs, rows),
+            None if labels is None else [labels[i] for i in rows],
+            None if scores is None else np.asarray(scores, dtype=float)[rows],
+            score, version,
+        )
+        with self._lock:
+            self._queue.append(job)
+            self.counts["queued"] += 1
+        return True
+
+    def _idle(self) -> bool:
+        in_flight, since_arrival = metrics.activity()
+        return in_flight <= self.max_in_flight and since_arrival >= self.quiet
+
+    def _wait_idle(self, job: _Job) -> bool:
+        while not self._idle():
+            if time.monotonic() - job.queued > self.max_age:
+                return False
+            time.sleep(POLL_SECONDS)
+        return time.monotonic() - job.queued <= self.max_age
+
+    def _run(self) -> None:
+        _lower_priority()
+        while True:
+            with self._lock:
+                job = self._queue.popleft() if self._queue else None
+            if job is None:
+                time.sleep(IDLE_POLL_SECONDS)
+            else:
+                records = self._evaluate(job)
+                with self._lock:
+                    self._pending.extend(records)
+            with self._lock:
+                due = len(self._pending) >= FLUSH_RECORDS or (
+                    self._pending and time.monotonic() - self._last_flush >= FLUSH_SECONDS)
+            if due and self._idle():
+                self.flush()
+
+    def _evaluate(self, job: _Job) -> List[Dict[str, Any]]:
+        """One comparison record per challenger that could score the job's rows.
+
+        Every challenger (and a champion offered without results) waits for
+        an idle moment of its own; once the job is stale the remaining
+        challengers are dropped.
+        """
+        records = []
+        if job.labels is None:
+            if not self._wait_idle(job):
+                self._count("shed_stale")
+                return records
+            try:
+                labels, scores = job.score(job.champion, job.inputs)
+            except Exception as e:
+                self._error(job.champion, e)
+                return records
+            job.labels, job.scores = list(labels), None if scores is None else np.asarray(scores, dtype=float)
+        for challenger in job.challengers:
+            if not self._wait_idle(job):
+                self._count("shed_stale")
+                return records
+            waited = time.monotonic() - job.queued
+            start = time.perf_counter()
+            try:
+                labels, scores = job.score(challenger, job.inputs)
+            except Exception as e:
+                self._error(challenger, e)
+                continue
+            record = {
+                "time": datetime.now().isoformat(),
+                "version": job.version,
+                "champion": job.champion,
+                "challenger": challenger,
+                "rows": len(job.labels),
+                "agree": int(sum(a == b for a, b in zip(labels, job.labels))),
+                "waited_ms": round(waited * 1000, 3),
+                "score_ms": round((time.perf_counter() - start) * 1000, 3),
+            }
+            if job.scores is not None and scores is not None:
+                deltas = np.asarray(scores, dtype=float) - job.scores
+                record.update(delta_sum=float(deltas.sum()), abs_delta_sum=float(np.abs(deltas).sum()),
+                              max_abs_delta=float(np.abs(deltas).max()))
+            records.append(record)
+        self._count("evaluated")
+        return records
+
+    def _error(self, model: str, error: Exception) -> None:
+        with self._lock:
+            self.counts["errors"] += 1
+            self.errors[model] = self.errors.get(model, 0) + 1
+            self.last_error = f"{model}: {error}"
+
+    def flush(self) -> None:
+        """Write the buffered comparison records to the store."""
+        with self._lock:
+            records, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if records:
+            try:
+                self.store.append_many(self.collection, records)
+            except Exception as e:
+                print(f"⚠️ Could not record {len(records)} shadow comparisons: {e}")
+
+    def summary(self, version: Optional[str] = None) -> Dict[str, Any]:
+        """Agreement and score deltas per champion/challenger pair (of ``version`` only, if given),
+        plus this process's settings and counters."""
+        self.flush()
+        pairs: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for record in self.store.records(self.collection):
+            if version is not None and record.get("version") != version:
+                continue
+            pair = pairs.setdefault((record["champion"], record["challenger"]), {
+                "requests": 0, "rows": 0, "agree": 0, "scored_rows": 0,
+                "delta_sum": 0.0, "abs_delta_sum": 0.0, "max_abs_delta": None, "score_ms": 0.0,
+            })
+            pair["requests"] += 1
+            pair["rows"] += record["rows"]
+            pair["agree"] += record["agree"]
+            pair["score_ms"] += record["score_ms"]
+            if "delta_sum" in record:
+                pair["scored_rows"] += record["rows"]
+                pair["delta_sum"] += record["delta_sum"]
+                pair["abs_delta_sum"] += record["abs_delta_sum"]
+                pair["max_abs_delta"] = max(pair["max_abs_delta"] or 0.0, record["max_abs_delta"])
+
+        comparisons = []
+        for (champion, challenger), pair in sorted(pairs.items()):
+            scored = pair["scored_rows"]
+            comparisons.append({
+                "champion": champion,
+                "challenger": challenger,
+                "requests": pair["requests"],
+                "rows": pair["rows"],
+                "label_agreement": pair["agree"] / pair["rows"] if pair["rows"] else None,
+                "mean_score_delta": pair["delta_sum"] / scored if scored else None,
+                "mean_abs_score_delta": pair["abs_delta_sum"] / scored if scored else None,
+                "max_abs_score_delta": pair["max_abs_delta"],
+                "mean_score_ms": pair["score_ms"] / pair["requests"],
+            })
+        with self._lock:
+            counts = dict(self.counts)
+            errors = dict(self.errors)
+            depth = len(self._queue) if self._pid == os.getpid() else 0
+        return {
+            "sample_rate": self.sample_rate,
+            "max_in_flight": self.max_in_flight,
+            "quiet_ms": self.quiet * 1000,
+            "max_age_seconds": self.max_age,
+            "max_rows": self.max_rows,
+            "version": version,
+            "comparisons": comparisons,
+            # This process only; the comparisons above cover every worker
+            "process": {**counts, "errors_by_challenger": errors, "queue_depth": depth,
+                        "last_error": self.last_error},
+        }
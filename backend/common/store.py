@@ -0,0 +1,174 @@
+"""Local record store shared by every worker process of a service.
+
+State that used to live in module-level lists (e.g. Kaveesha's saved
+predictions) is lost on restart and, with several workers, split between
+processes. ``LocalStore`` keeps JSON records in one SQLite file instead:
+any worker forked from the same parent (``common.prefork``) or started
+separately on the same host sees the same records. Writes take SQLite's
+file lock, so the store suits low-rate bookkeeping and batched writes
+(``put_many``, e.g. the delta-scoring fingerprints; ``append_many``, e.g.
+the buffered shadow comparisons), not per-prediction logging.
+"""
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from common.responses import dumps, loads
+
+# Keys per SELECT ... IN (...), under SQLite's bound-parameter limit
+KEYS_PER_QUERY = 500
+# get_many scans the whole collection instead for more keys than this
+SCAN_KEYS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    collection TEXT NOT NULL,
+    key TEXT,
+    data TEXT NOT NULL,
+    UNIQUE (collection, key)
+)
+"""
+# Records appended per collection, so append returns positions without counting the collection
+COUNTERS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS appended (
+    collection TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+)
+"""
+
+
+def _encode(record: Dict[str, Any]) -> str:
+    return dumps(record).decode()
+
+
+class LocalStore:
+    """JSON records grouped in named collections, optionally unique by key."""
+
+    def __init__(self, path: str, timeout: float = 10.0):
+        self.path = Path(path)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # A connection must not cross a fork: each worker opens its own on first use
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=self.timeout, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+            conn.execute(COUNTERS_SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    @staticmethod
+    def _reserve(conn: sqlite3.Connection, collection: str, n: int) -> int:
+        """Advance ``collection``'s append counter by ``n`` (inside a write transaction); the old size.
+
+        A collection written before the counter existed is counted once.
+        """
+        row = conn.execute("SELECT size FROM appended WHERE collection = ?", (collection,)).fetchone()
+        if row is None:
+            size = conn.execute("SELECT COUNT(*) FROM records WHERE collection = ?", (collection,)).fetchone()[0]
+            conn.execute("INSERT INTO appended (collection, size) VALUES (?, ?)", (collection, size + n))
+            return size
+        conn.execute("UPDATE appended SET size = size + ? WHERE collection = ?", (n, collection))
+        return row[0]
+
+    def append(self, collection: str, record: Dict[str, Any]) -> int:
+        """Add ``record`` and return its 0-based position in ``collection``."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                position = self._reserve(conn, collection, 1)
+                conn.execute("INSERT INTO records (collection, data) VALUES (?, ?)", (collection, _encode(record)))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return position
+
+    def append_many(self, collection: str, records: Sequence[Dict[str, Any]]) -> None:
+        """Add ``records`` to ``collection`` in one transaction."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._reserve(conn, collection, len(records))
+                conn.executemany("INSERT INTO records (collection, data) VALUES (?, ?)",
+                                 ((collection, _encode(record)) for record in records))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def add_unique(self, collection: str, key: str, record: Dict[str, Any]) -> bool:
+        """Add ``record`` unless ``collection`` already has one for ``key``; True when added."""
+        with self._lock:
+            cursor = self._connection().execute(
+                "INSERT OR IGNORE INTO records (collection, key, data) VALUES (?, ?, ?)",
+                (collection, str(key), _encode(record)))
+        return cursor.rowcount == 1
+
+    def get_many(self, collection: str, keys: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """``{key: record}`` for the ``keys`` that ``collection`` has."""
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            if len(keys) > SCAN_KEYS:
+                # One scan beats hundreds of IN queries when the keys are most of the collection
+                wanted = set(map(str, keys))
+                rows = conn.execute("SELECT key, data FROM records WHERE collection = ?", (collection,))
+                return {key: loads(data) for key, data in rows if key in wanted}
+            for start in range(0, len(keys), KEYS_PER_QUERY):
+                chunk = [str(k) for k in keys[start:start + KEYS_PER_QUERY]]
+                rows = conn.execute(
+                    f"SELECT key, data FROM records WHERE collection = ? AND key IN ({','.join('?' * len(chunk))})",
+                    (collection, *chunk)).fetchall()
+                found.update((key, loads(data)) for key, data in rows)
+        return found
+
+    def put_many(self, collection: str, records: Mapping[str, Dict[str, Any]]) -> None:
+        """Insert or replace the record of each key, in one transaction."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO records (collection, key, data) VALUES (?, ?, ?) "
+                    "ON CONFLICT (collection, key) DO UPDATE SET data = excluded.data",
+                    ((collection, str(key), _encode(record)) for key, record in records.items()))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def records(self, collection: str) -> List[Dict[str, Any]]:
+        """Every record of ``collection`` in insertion order."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT data FROM records WHERE collection = ? ORDER BY id", (collection,)).fetchall()
+        return [loads(data) for (data,) in rows]
+
+    def count(self, collection: str) -> int:
+        with self._lock:
+            return self._connection().execute(
+                "SELECT COUNT(*) FROM records WHERE collection = ?", (collection,)).fetchone()[0]
+
+    def clear(self, collection: str) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM records WHERE collection = ?", (collection,))
+                conn.execute("DELETE FROM appended WHERE collection = ?", (collection,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
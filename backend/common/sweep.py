@@ -0,0 +1,82 @@
+"""What-if sweeps: one facility scored over a grid of one or two input values.
+
+A sweep axis names one numeric input and its values, listed or as
+``start``/``stop``/``steps`` (evenly spaced, both ends included). Two axes
+make a grid. ``grid`` flattens it to one column of values per axis (row
+``i * len(second) + j`` holds the i-th value of the first axis and the j-th
+of the second), so a service scores the whole grid as one batch and
+``reshape`` turns each per-point result back into a curve or a
+``[first][second]`` nested list for the UI.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+MAX_AXES = 2
+MAX_AXIS_POINTS = 1000
+MAX_GRID_POINTS = 10000
+
+
+class SweepAxis(BaseModel):
+    feature: str = Field(..., description="Input to vary", example="EffectiveRate")
+    values: Optional[List[float]] = Field(None, description="Values to score (instead of start/stop/steps)")
+    start: Optional[float] = Field(None, example=8.0)
+    stop: Optional[float] = Field(None, example=20.0)
+    steps: int = Field(25, ge=2, le=MAX_AXIS_POINTS, description="Points from start to stop, both included")
+
+    def points(self) -> np.ndarray:
+        if self.values is not None:
+            if not self.values or len(self.values) > MAX_AXIS_POINTS:
+                raise ValueError(f"Sweep '{self.feature}': give 1 to {MAX_AXIS_POINTS} values")
+            return np.asarray(self.values, dtype=float)
+        if self.start is None or self.stop is None:
+            raise ValueError(f"Sweep '{self.feature}': give values, or start and stop")
+        return np.linspace(self.start, self.stop, self.steps)
+
+
+def check_axes(axes: Sequence[SweepAxis], columns: Dict[str, Any]) -> List[np.ndarray]:
+    """Each axis's points, checked against ``columns`` (name -> ``common.validation.Column``).
+
+    Raises ValueError for unknown or repeated features, too many axes or
+    points, values under the column's ``ge`` bound and fractions for ``int``
+    columns.
+    """
+    if not 1 <= len(axes) <= MAX_AXES:
+        raise ValueError(f"Give 1 or {MAX_AXES} sweep axes, not {len(axes)}")
+    features = [axis.feature for axis in axes]
+    if len(set(features)) != len(features):
+        raise ValueError(f"Sweep axes must vary different inputs: {', '.join(features)}")
+    points = []
+    for axis in axes:
+        column = columns.get(axis.feature)
+        if column is None:
+            raise ValueError(f"Cannot sweep '{axis.feature}'. Choose from: {', '.join(columns)}")
+        values = axis.points()
+        if column.ge is not None and (values < column.ge).any():
+            raise ValueError(f"Sweep '{axis.feature}': values must be >= {column.ge:g}")
+        if column.dtype == "int" and (values != np.round(values)).any():
+            raise ValueError(f"Sweep '{axis.feature}': values must be whole numbers")
+        points.append(values)
+    if int(np.prod([len(p) for p in points])) > MAX_GRID_POINTS:
+        raise ValueError(f"Sweep grid has more than {MAX_GRID_POINTS} points")
+    return points
+
+
+def grid(features: Sequence[str], points: Sequence[np.ndarray]) -> Dict[str, np.ndarray]:
+    """Flattened grid: ``{feature: value per point}``, the last axis varying fastest"""
+    mesh = np.meshgrid(*points, indexing="ij")
+    return {feature: values.ravel() for feature, values in zip(features, mesh)}
+
+
+def reshape(values: Sequence[Any], points: Sequence[np.ndarray]) -> list:
+    """Per-point results as a list (one axis) or a ``[first][second]`` nested list (two axes)"""
+    values = list(values)
+    if len(points) == 1:
+        return values
+    width = len(points[1])
+    return [values[i:i + width] for i in range(0, len(values), width)]
+
+
+def axes_payload(features: Sequence[str], points: Sequence[np.ndarray]) -> List[Dict[str, Any]]:
+    return [{"feature": feature, "values": values.tolist()} for feature, values in zip(features, points)]
@@ -0,0 +1,113 @@
+"""Deferred model loading: nothing heavy happens until the models are needed.
+
+Unpickling the models imports scikit-learn/scipy (and xgboost) and reads the
+artifacts, which took seconds before a service could answer its first health
+probe. Each service wraps its load function in a ``ModelLoader``, which runs
+it once, at the first of:
+
+- a call that needs the models (``ensure()``/``ready()`` in the prediction endpoints);
+- ``POST /warmup`` (``install``), e.g. from a readiness probe or deploy hook;
+- startup, depending on ``MODEL_WARMUP``:
+
+    lazy        (default) load on the first prediction or ``/warmup``
+    background  start loading in a thread at startup; probes answer meanwhile
+    startup     load before the server accepts connections (the old behaviour)
+
+``common.prefork`` always loads in the parent before forking (``warm_up_all``)
+so the workers share the models.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+WARMUP_MODES = ("lazy", "background", "startup")
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "lazy")
+
+# Load states, as reported by /health and /warmup
+COLD, LOADING, LOADED, FAILED = "cold", "loading", "loaded", "failed"
+
+_LOADERS: Dict[str, "ModelLoader"] = {}
+# One load at a time in the process: loads import the same packages (scikit-learn),
+# and first imports of them from several threads at once can deadlock on the import locks
+_LOAD_LOCK = threading.RLock()
+
+
+class ModelLoader:
+    """Runs ``load`` (which returns True when the models are usable) at most once."""
+
+    def __init__(self, name: str, load: Callable[[], Any]):
+        self.name = name
+        self.load = load
+        self.state = COLD
+        self.seconds: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        _LOADERS[name] = self
+
+    @property
+    def loaded(self) -> bool:
+        return self.state == LOADED
+
+    def ensure(self) -> bool:
+        """Load now unless already done (waiting for a load in progress); True when loaded."""
+        if self.state in (LOADED, FAILED):
+            return self.state == LOADED
+        with _LOAD_LOCK:
+            if self.state == COLD:
+                self.state = LOADING
+                started = time.perf_counter()
+                try:
+                    ok = bool(self.load())
+                except Exception as e:
+                    print(f"❌ {self.name}: error loading models: {e}")
+                    ok = False
+                self.seconds = time.perf_counter() - started
+                self.state = LOADED if ok else FAILED
+                print(f"{'✅' if ok else '⚠️'} {self.name}: models {self.state} in {self.seconds:.2f} s")
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        return self.state == LOADED
+
+    async def ready(self) -> bool:
+        """``ensure()`` for async endpoints: a first load runs off the event loop."""
+        if self.state in (LOADED, FAILED):
+            return self.state == LOADED
+        return await run_in_threadpool(self.ensure)
+
+    def start(self, mode: Optional[str] = None) -> None:
+        """Startup hook: load per ``mode`` (default ``MODEL_WARMUP``)."""
+        mode = mode or MODEL_WARMUP
+        if mode not in WARMUP_MODES:
+            raise ValueError(f"MODEL_WARMUP must be one of {WARMUP_MODES}, not {mode!r}")
+        if mode == "startup":
+            self.ensure()
+        elif mode == "background" and self.state == COLD and self._thread is None:
+            self._thread = threading.Thread(target=self.ensure, name=f"warmup-{self.name}", daemon=True)
+            self._thread.start()
+
+    def status(self) -> Dict[str, Any]:
+        return {"state": self.state, "seconds": None if self.seconds is None else round(self.seconds, 3)}
+
+
+def warm_up_all() -> Dict[str, Dict[str, Any]]:
+    """Load every registered service's models (in this thread) and report their states."""
+    for loader in list(_LOADERS.values()):
+        loader.ensure()
+    return {name: loader.status() for name, loader in _LOADERS.items()}
+
+
+def install(app: Any, service: Optional[str] = None) -> None:
+    """Add ``POST /warmup``: load ``service``'s models (every service's when None) and report."""
+
+    @app.post("/warmup", tags=["General"])
+    def warmup():
+        """Load the models now instead of on the first prediction"""
+        if service is None:
+            return {"models": warm_up_all()}
+        # Looked up per call: a service may replace its loader (e.g. a new PredictionModels)
+        loader = _LOADERS[service]
+        loader.ensure()
+        return {"models": {service: loader.status()}}
@@ -0,0 +1,211 @@
+"""Scoring gateway: the three prediction services in one process.
+
+Mounts the services unchanged under a prefix each:
+
+    /impairment    Lasindu's impairment & 1 yr ECL API (e.g. /impairment/predict)
+    /branch        Manuji's branch performance API
+    /credit-risk   Kaveesha's credit-risk (PD) API
+
+pandas, scikit-learn and xgboost are imported once instead of three times,
+the services share one prediction cache (one memory bound; any service
+loading models clears it), the ``/metrics`` registry and the executor that
+``POST /score`` runs on. ``/score`` returns impairment, ECL, branch
+performance and PD for one facility in a single call; each family is scored
+from its own section of the body and families without a section are skipped.
+
+Run from the ``backend`` directory::
+
+    python gateway.py --lasindu-dir ../models/Lasindu --manuji-dir Manuji --port 8000
+
+or with uvicorn, setting LASINDU_MODEL_DIR, MANUJI_MODEL_DIR (the
+``models`` directory) and KAVEESHA_MODEL_DIR::
+
+    uvicorn gateway:app --port 8000
+"""
+import argparse
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel, Field
+
+from common import metrics, profiling, warmup
+from common.cache import PredictionCache
+from common.distill import check_tier
+from common.responses import FastJSONResponse
+from common.services import load_service, use_model_dir
+
+MOUNTS = {"lasindu": "/impairment", "manuji": "/branch", "kaveesha": "/credit-risk"}
+SCORE_WORKERS = int(os.environ.get("GATEWAY_WORKERS", "3"))
+
+lasindu = load_service("lasindu")
+manuji = load_service("manuji")
+kaveesha = load_service("kaveesha")
+
+# One bounded cache for all three; namespaces (impairment_ecl, model names) keep their entries apart
+prediction_cache = PredictionCache()
+# Shared by the /score families; sized for the three of them running side by side
+executor = ThreadPoolExecutor(max_workers=SCORE_WORKERS, thread_name_prefix="score")
+
+
+def share_cache() -> None:
+    """Point every service at the shared prediction cache (before they load models)."""
+    lasindu.prediction_cache = prediction_cache
+    manuji.prediction_cache = prediction_cache
+    kaveesha.prediction_models.cache = prediction_cache
+    for service in MOUNTS:
+        metrics.register_cache(service, None)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run each mounted service's own startup/shutdown (mounted apps don't get lifespan events)."""
+    share_cache()
+    async with AsyncExitStack() as stack:
+        for service in (lasindu, manuji, kaveesha):
+            await stack.enter_async_context(service.app.router.lifespan_context(service.app))
+        yield
+    executor.shutdown(wait=False)
+
+
+app = FastAPI(
+    title="CreditSense Scoring Gateway",
+    description="Impairment/ECL, branch performance and credit-risk APIs in one process, plus combined scoring",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+metrics.install(app, "gateway", cache_stats=lambda: prediction_cache.stats())
+profiling.install(app, "gateway")
+# POST /warmup loads all three services' models (each mount also has its own /warmup)
+warmup.install(app)
+
+for name, prefix in MOUNTS.items():
+    app.mount(prefix, load_service(name).app)
+
+
+class ScoreRequest(BaseModel):
+    loan: Optional[lasindu.LoanInput] = Field(None, description="Scores impairment and 1 yr ECL")
+    branch: Optional[manuji.BranchInput] = Field(None, description="Scores branch performance")
+    customer: Optional[kaveesha.PredictionRequest] = Field(None, description="Scores probability of default")
+
+
+def score_impairment(loan: Any, tier: str = "accurate") -> Dict[str, Any]:
+    if not lasindu.model_loader.ensure():
+        raise HTTPException(status_code=503, detail="Impairment/ECL models not loaded")
+    impairment, ecl = lasindu.score_loan(loan.model_dump(), tier)
+    return {"impairment": impairment, "ecl_1yr": ecl, "tier": lasindu.resolve_tier(tier)}
+
+
+def score_branch(branch: Any, tier: str = "accurate") -> Dict[str, Any]:
+    if not manuji.model_loader.ensure():
+        raise HTTPException(status_code=503, detail="Branch performance models not loaded")
+    return manuji.score_branch(branch.model_dump(by_alias=True), tier=tier)
+
+
+def score_credit_risk(customer: Any, tier: str = "accurate") -> Dict[str, Any]:
+    _, result = kaveesha.score_customer(customer, tier=tier)
+    return {
+        "pd": result["pd"],
+        "risk_category": result["risk_category"],
+        "confidence": result["confidence"],
+        "model_used": result["model"],
+        "fallback_used": result["fallback"],
+        "tier": kaveesha.prediction_models.resolve_tier("random_forest", tier),
+    }
+
+
+# Response section -> (request section, scorer)
+FAMILIES: Dict[str, tuple] = {
+    "impairment_ecl": ("loan", score_impairment),
+    "branch_performance": ("branch", score_branch),
+    "credit_risk": ("customer", score_credit_risk),
+}
+
+
+async def _run(fn: Callable, arg: Any) -> Any:
+    # Each task gets its own copy of the request context so metrics stages still attach to /score
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(executor, context.run, fn, arg)
+
+
+@app.post("/score")
+@metrics.timed
+async def score(request: ScoreRequest,
+                tier: Optional[str] = Query(None, description="accurate | fast (distilled students where installed)")):
+    """
+    Score one facility with every model family it has a section for
+
+    The families run concurrently on the shared executor. A family that fails
+    (models not loaded, bad input) is reported under `errors` while the
+    others are still returned. With `tier=fast` each family uses its
+    distilled student when it has one; each section's `tier` says which
+    answered.
+    """
+    tier = check_tier(tier)
+    tasks = {
+        section: _run(partial(scorer, tier=tier), getattr(request, field))
+        for section, (field, scorer) in FAMILIES.items()
+        if getattr(request, field) is not None
+    }
+    if not tasks:
+        raise HTTPException(status_code=400, detail=f"Send at least one of: {', '.join(f for f, _ in FAMILIES.values())}")
+
+    outcomes = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    response: Dict[str, Any] = {section: None for section in FAMILIES}
+    errors = {}
+    for section, outcome in zip(tasks, outcomes):
+        if isinstance(outcome, HTTPException):
+            errors[section] = outcome.detail
+        elif isinstance(outcome, Exception):
+            errors[section] = f"Scoring error: {outcome}"
+        else:
+            response[section] = outcome
+    response["errors"] = errors
+    response["timestamp"] = datetime.now().isoformat()
+    with metrics.stage("serialization"):
+        return FastJSONResponse(response)
+
+
+@app.get("/health")
+async def health():
+    states = {
+        "impairment_ecl": lasindu.model_loader.state,
+        "branch_performance": manuji.model_loader.state,
+        "credit_risk": kaveesha.prediction_models.loader.state,
+    }
+    # Models not loaded yet load on first use; only a failed load degrades the gateway
+    return {"status": "degraded" if warmup.FAILED in states.values() else "healthy",
+            "models_loaded": {family: state == warmup.LOADED for family, state in states.items()},
+            "models": states, "timestamp": datetime.now().isoformat()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the three prediction APIs from one process")
+    parser.add_argument("--lasindu-dir", help="Directory holding the Lasindu .pkl files")
+    parser.add_argument("--manuji-dir", help="Directory holding models/ for Manuji")
+    parser.add_argument("--kaveesha-dir", help="Kaveesha models directory (default: the service's own)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    for name, model_dir in (("lasindu", args.lasindu_dir), ("manuji", args.manuji_dir),
+                            ("kaveesha", args.kaveesha_dir)):
+        if model_dir:
+            use_model_dir(name, model_dir)
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,23 @@
+"""
+Shared fixtures. Run from the backend directory::
+
+    python -m pytest -q tests
+
+Tests of HTTP-facing helpers skip when fastapi is not installed.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make the shared backend helpers importable when run from this directory
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture
+def store(tmp_path):
+    # common.store encodes records with common.responses, which imports fastapi
+    pytest.importorskip("fastapi")
+    from common.store import LocalStore
+
+    return LocalStore(str(tmp_path / "state.db"))
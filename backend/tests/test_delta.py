@@ -0,0 +1,53 @@
+"""common.delta: snapshot statuses and what delta_score stores."""
+import numpy as np
+import pytest
+
+pytest.importorskip("fastapi")  # common.store imports it through common.responses
+from common import delta  # noqa: E402
+
+
+def _scorer(features, calls):
+    def compute(rows):
+        calls.append(list(rows))
+        return [{"pd": float(np.nansum(features[i]))} for i in rows]
+    return compute
+
+
+def test_delta_score_statuses(store):
+    ids = ["a", "b", "c"]
+    features = np.array([[1.0, 2.0], [3.0, np.nan], [5.0, 6.0]])
+    calls = []
+
+    results, statuses = delta.delta_score(store, "delta:test", ids, features, "v1", _scorer(features, calls))
+    assert statuses == ["new"] * 3 and calls == [[0, 1, 2]]
+
+    # The same snapshot again: nothing is scored, stored results come back
+    again, statuses = delta.delta_score(store, "delta:test", ids, features, "v1", _scorer(features, calls))
+    assert statuses == ["unchanged"] * 3 and again == results and len(calls) == 1
+
+    # One changed row and one new id: only those are scored
+    changed = np.vstack([features, [[7.0, 8.0]]])
+    changed[1, 1] = 4.0
+    results, statuses = delta.delta_score(store, "delta:test", ids + ["d"], changed, "v1", _scorer(changed, calls))
+    assert statuses == ["unchanged", "changed", "unchanged", "new"] and calls[-1] == [1, 3]
+    assert results[1] == {"pd": 7.0}
+
+    # New model version: everything is rescored
+    _, statuses = delta.delta_score(store, "delta:test", ids + ["d"], changed, "v2", _scorer(changed, calls))
+    assert statuses == ["model_updated"] * 4
+    assert delta.summary(statuses) == {"new": 0, "changed": 0, "model_updated": 4, "unchanged": 0, "rescored": 4}
+
+
+def test_delta_score_keeps_unstorable_results_out(store):
+    # "b" stands in for a scorecard fallback: returned every time, never stored
+    features, calls = np.array([[1.0], [2.0]]), []
+    for _ in range(2):
+        results, statuses = delta.delta_score(store, "delta:test", ["a", "b"], features, "v1",
+                                              _scorer(features, calls), lambda result: result["pd"] != 2.0)
+        assert results == [{"pd": 1.0}, {"pd": 2.0}]
+    assert statuses == ["unchanged", "new"] and calls[-1] == [1]
+
+
+def test_delta_score_rejects_duplicate_ids(store):
+    with pytest.raises(ValueError, match="Duplicate ids"):
+        delta.delta_score(store, "delta:test", ["a", "a"], np.zeros((2, 1)), "v1", lambda rows: [])
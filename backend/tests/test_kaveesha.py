@@ -0,0 +1,46 @@
+"""
+Kaveesha /predict and /predict/batch agree on PD around the calibrate_pd thresholds.
+
+Scores with the models in KAVEESHA_MODEL_DIR when that is set, and with the
+scorecard fallback otherwise; both go through the same thresholds.
+"""
+import copy
+import os
+import tempfile
+
+import pytest
+
+CUSTOMER = {
+    "customer_info": {"name": "A", "customerId": "C1", "grantedDate": "2023-01-01", "branch": "KANDY",
+                      "Age": 35, "monthlyIncome": 200000},
+    "financial_data": {"FacilityAmount": 1500000, "Tenor": 48, "EffectiveRate": 14, "NetRental": 42000,
+                       "ArrearsCapital": 25000, "NoOfRentalInArrears": 2},
+    "behavioral_data": {"onTimePaymentPercentage": 78},
+}
+
+
+@pytest.fixture(scope="module")
+def kaveesha():
+    pytest.importorskip("fastapi")
+    os.environ.setdefault("KAVEESHA_STATE_DB", os.path.join(tempfile.mkdtemp(), "kaveesha.db"))
+    from fastapi.testclient import TestClient
+    from common.services import load_service
+
+    api = load_service("kaveesha")
+    with TestClient(api.app) as client:
+        yield client
+
+
+# On-time percentages at and around the payment thresholds (50% and 70%, payment_regularity 0.5 and 0.7),
+# and monthly incomes putting debt_to_income_ratio at its 1.0 and 2.0 bands
+@pytest.mark.parametrize("on_time", [49, 50, 51, 69, 70, 71, 100])
+@pytest.mark.parametrize("income", [None, 31250, 15625])
+def test_single_and_batch_pd_agree_at_thresholds(kaveesha, on_time, income):
+    body = copy.deepcopy(CUSTOMER)
+    body["behavioral_data"]["onTimePaymentPercentage"] = on_time
+    if income is not None:
+        body["customer_info"]["monthlyIncome"] = income
+    single = kaveesha.post("/predict", params={"fields": "pd"}, json=body)
+    batch = kaveesha.post("/predict/batch", json={"requests": [body]})
+    assert single.status_code == batch.status_code == 200
+    assert batch.json()["predictions"][0]["pd"] == single.json()["pd"]
@@ -0,0 +1,74 @@
+"""common.shadow.ShadowEvaluator: comparisons, sampling and load shedding."""
+import os
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("fastapi")  # common.shadow counts through common.metrics (starlette)
+from common import shadow  # noqa: E402
+from common.shadow import ShadowEvaluator  # noqa: E402
+
+
+def _score(name, inputs):
+    """Labels and scores per row: 'twin' answers like 'champion', 'other' is 0.1 higher"""
+    scores = np.asarray(inputs, dtype=float) + (0.1 if name == "other" else 0.0)
+    return ["high" if s >= 0.5 else "low" for s in scores], scores.tolist()
+
+
+def _evaluator(store, **settings):
+    settings = {"sample_rate": 1.0, "max_in_flight": 1000, "quiet": 0.0, **settings}
+    return ShadowEvaluator("test", store, **settings)
+
+
+def _wait_for(evaluator, counter, value=1, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while evaluator.counts[counter] < value and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return evaluator.counts[counter] >= value
+
+
+def _comparisons(evaluator, version=None, timeout=5.0):
+    """/shadow/stats comparisons once the worker has recorded some"""
+    deadline = time.monotonic() + timeout
+    while not evaluator.summary(version)["comparisons"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return evaluator.summary(version)["comparisons"]
+
+
+def test_shadow_rescored_champion_and_identical_challenger_agree(store):
+    evaluator = _evaluator(store)
+    assert evaluator.offer("champion", [0.2, 0.45, 0.7], None, None, ["twin", "other"], _score, "v1")
+    comparisons = {c["challenger"]: c for c in _comparisons(evaluator, "v1")}
+    assert comparisons["twin"]["label_agreement"] == 1.0
+    assert comparisons["twin"]["max_abs_score_delta"] == 0.0
+    assert comparisons["other"]["label_agreement"] == pytest.approx(2 / 3)
+    assert comparisons["other"]["mean_score_delta"] == pytest.approx(0.1)
+
+
+def test_shadow_sampling_and_row_limit(store, monkeypatch):
+    evaluator = _evaluator(store, sample_rate=0.25, max_rows=4)
+    monkeypatch.setattr(shadow.random, "random", lambda: 0.5)
+    assert not evaluator.offer("champion", [0.1], None, None, ["twin"], _score)
+    assert evaluator.counts["not_sampled"] == 1
+
+    monkeypatch.setattr(shadow.random, "random", lambda: 0.1)
+    assert evaluator.offer("champion", list(np.linspace(0, 1, 10)), None, None, ["twin"], _score)
+    assert _comparisons(evaluator)[0]["rows"] == 4
+
+
+def test_shadow_sheds_when_never_idle(store):
+    # A busy process (more requests in flight than allowed) never starts shadow work
+    evaluator = _evaluator(store, max_in_flight=-1, max_age=0.05, queue_size=1)
+    assert evaluator.offer("champion", [0.1], None, None, ["twin"], _score)
+    assert _wait_for(evaluator, "shed_stale")
+    assert evaluator.counts["evaluated"] == 0
+    assert evaluator.summary()["comparisons"] == []
+
+
+def test_shadow_sheds_offers_beyond_the_queue(store):
+    evaluator = _evaluator(store, queue_size=1)
+    evaluator._pid = os.getpid()  # no worker: queued jobs stay queued
+    assert evaluator.offer("champion", [0.1], None, None, ["twin"], _score)
+    assert not evaluator.offer("champion", [0.2], None, None, ["twin"], _score)
+    assert evaluator.counts["shed_queue_full"] == 1
@@ -0,0 +1,10 @@
+"""common.store.LocalStore append positions."""
+
+
+def test_append_positions(store):
+    assert [store.append("a", {"i": i}) for i in range(3)] == [0, 1, 2]
+    assert store.append("b", {}) == 0
+    store.append_many("a", [{}, {}])
+    assert store.append("a", {}) == 5 and store.count("a") == 6
+    store.clear("a")
+    assert store.append("a", {}) == 0
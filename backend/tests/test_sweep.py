@@ -0,0 +1,40 @@
+"""common.sweep: grid order, reshaping and axis checks."""
+import numpy as np
+import pytest
+
+pytest.importorskip("fastapi")  # common.validation raises fastapi's RequestValidationError
+from common import sweep  # noqa: E402
+from common.validation import Column  # noqa: E402
+
+
+def test_grid_flattens_with_last_axis_fastest():
+    first, second = np.array([1.0, 2.0, 3.0]), np.array([10.0, 20.0])
+    values = sweep.grid(["x", "y"], [first, second])
+    assert len(values["x"]) == len(values["y"]) == 6
+    for i, x in enumerate(first):
+        for j, y in enumerate(second):
+            assert (values["x"][i * len(second) + j], values["y"][i * len(second) + j]) == (x, y)
+
+
+def test_reshape_inverts_grid():
+    first, second = np.array([1.0, 2.0, 3.0]), np.array([10.0, 20.0])
+    values = sweep.grid(["x", "y"], [first, second])
+    nested = sweep.reshape(list(zip(values["x"], values["y"])), [first, second])
+    assert nested == [[(x, y) for y in second] for x in first]
+    assert sweep.reshape([1, 2, 3], [first]) == [1, 2, 3]
+
+
+def test_check_axes_rejects_bad_axes():
+    columns = {"rate": Column("rate", "float", ge=0), "tenor": Column("tenor", "int", ge=1)}
+    points = sweep.check_axes([sweep.SweepAxis(feature="rate", start=0, stop=10, steps=11)], columns)
+    assert points[0].tolist() == list(range(11))
+    for axes in (
+        [sweep.SweepAxis(feature="other", values=[1])],
+        [sweep.SweepAxis(feature="rate", values=[1]), sweep.SweepAxis(feature="rate", values=[2])],
+        [sweep.SweepAxis(feature="rate", values=[-1])],
+        [sweep.SweepAxis(feature="tenor", values=[12.5])],
+        [sweep.SweepAxis(feature="rate", start=0, stop=1, steps=1000),
+         sweep.SweepAxis(feature="tenor", start=1, stop=1000, steps=1000)],
+    ):
+        with pytest.raises(ValueError):
+            sweep.check_axes(axes, columns)